@@ -30,7 +30,9 @@ from invokeai.app.services.session_processor.session_processor_default import (
     DefaultSessionProcessor,
     DefaultSessionRunner,
 )
+from invokeai.app.services.session_processor.session_processor_process import ProcessSessionRunner
 from invokeai.app.services.session_queue.session_queue_sqlite import SqliteSessionQueue
+from invokeai.app.services.shared.sqlite.sqlite_database import SqliteDatabase
 from invokeai.app.services.shared.sqlite.sqlite_util import init_db
 from invokeai.app.services.style_preset_images.style_preset_images_disk import StylePresetImageFileStorageDisk
 from invokeai.app.services.style_preset_records.style_preset_records_sqlite import SqliteStylePresetRecordsStorage
@@ -64,6 +66,7 @@ class ApiDependencies:
     """Contains and initializes all dependencies for the API"""
 
     invoker: Invoker
+    db: SqliteDatabase
 
     @staticmethod
     def initialize(
@@ -114,7 +117,16 @@ class ApiDependencies:
         )
         names = SimpleNameService()
         performance_statistics = InvocationStatsService()
-        session_processor = DefaultSessionProcessor(session_runner=DefaultSessionRunner())
+        session_runner = (
+            ProcessSessionRunner() if configuration.session_processor_mode == "process" else DefaultSessionRunner()
+        )
+        session_processor = DefaultSessionProcessor(
+            session_runner=session_runner,
+            thread_limit=configuration.session_processor_workers,
+            devices=configuration.session_processor_devices,
+            micro_batch_size=configuration.denoise_batch_size,
+            micro_batch_wait=configuration.denoise_batch_wait,
+        )
         session_queue = SqliteSessionQueue(db=db)
         urls = LocalUrlService()
         workflow_records = SqliteWorkflowRecordsStorage(db=db)
@@ -150,9 +162,12 @@ class ApiDependencies:
         )
 
         ApiDependencies.invoker = Invoker(services)
+        ApiDependencies.db = db
         db.clean()
 
     @staticmethod
     def shutdown() -> None:
         if ApiDependencies.invoker:
             ApiDependencies.invoker.stop()
+        if ApiDependencies.db:
+            ApiDependencies.db.log_stats()
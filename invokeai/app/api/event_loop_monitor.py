@@ -0,0 +1,83 @@
+import asyncio
+from collections import deque
+from logging import Logger
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class EventLoopLagStats(BaseModel):
+    """Event loop lag stats. The lag is how late a periodic timer fires, which is how long the loop was blocked."""
+
+    interval_ms: float = Field(description="The interval at which the lag is sampled, in milliseconds")
+    samples: int = Field(description="The number of lag samples taken since the app started")
+    last_ms: float = Field(description="The most recent lag sample, in milliseconds")
+    mean_ms: float = Field(description="The mean lag over the recent samples, in milliseconds")
+    max_ms: float = Field(description="The max lag over the recent samples, in milliseconds")
+    max_ever_ms: float = Field(description="The max lag since the app started, in milliseconds")
+    blocked_count: int = Field(description="The number of samples with a lag over the warning threshold")
+
+
+class EventLoopLagMonitor:
+    """
+    Measures event loop lag by sleeping for a fixed interval and checking how late the loop wakes up.
+
+    Any blocking work on the loop - a synchronous query or file read in an `async def` route, for example - delays every
+    other request and socket.io emit by the same amount, and shows up as lag.
+    """
+
+    def __init__(self, interval: float = 0.5, warn_threshold: float = 0.25, window: int = 120) -> None:
+        self._interval = interval
+        self._warn_threshold = warn_threshold
+        self._recent: deque[float] = deque(maxlen=window)
+        self._samples = 0
+        self._last = 0.0
+        self._max_ever = 0.0
+        self._blocked_count = 0
+        self._task: Optional[asyncio.Task[None]] = None
+        self._logger: Optional[Logger] = None
+
+    def start(self, logger: Optional[Logger] = None) -> None:
+        """Starts sampling on the running event loop."""
+        if self._task is not None:
+            return
+        self._logger = logger
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def record(self, lag: float) -> None:
+        self._samples += 1
+        self._last = lag
+        self._recent.append(lag)
+        self._max_ever = max(self._max_ever, lag)
+        if lag > self._warn_threshold:
+            self._blocked_count += 1
+            if self._logger is not None:
+                self._logger.warning(f"Event loop was blocked for {lag * 1000:.0f}ms")
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self._interval)
+            self.record(max(0.0, loop.time() - start - self._interval))
+
+    def get_stats(self) -> EventLoopLagStats:
+        recent = list(self._recent)
+        return EventLoopLagStats(
+            interval_ms=self._interval * 1000,
+            samples=self._samples,
+            last_ms=self._last * 1000,
+            mean_ms=(sum(recent) / len(recent) * 1000) if recent else 0.0,
+            max_ms=max(recent, default=0.0) * 1000,
+            max_ever_ms=self._max_ever * 1000,
+            blocked_count=self._blocked_count,
+        )
+
+
+event_loop_monitor = EventLoopLagMonitor()
+"""The API's event loop lag monitor, started when the app starts."""
@@ -11,6 +11,7 @@ from fastapi.routing import APIRouter
 from pydantic import BaseModel, Field
 
 from invokeai.app.api.dependencies import ApiDependencies
+from invokeai.app.api.event_loop_monitor import EventLoopLagStats, event_loop_monitor
 from invokeai.app.invocations.upscale import ESRGAN_MODELS
 from invokeai.app.services.invocation_cache.invocation_cache_common import InvocationCacheStatus
 from invokeai.backend.image_util.infill_methods.patchmatch import PatchMatch
@@ -184,3 +185,13 @@ async def disable_invocation_cache() -> None:
 async def get_invocation_cache_status() -> InvocationCacheStatus:
     """Clears the invocation cache"""
     return ApiDependencies.invoker.services.invocation_cache.get_status()
+
+
+@app_router.get(
+    "/event_loop_lag",
+    operation_id="get_event_loop_lag",
+    responses={200: {"model": EventLoopLagStats}},
+)
+async def get_event_loop_lag() -> EventLoopLagStats:
+    """Gets the event loop lag stats, which measure how long the API's event loop was blocked"""
+    return event_loop_monitor.get_stats()
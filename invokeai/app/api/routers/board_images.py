@@ -24,7 +24,7 @@ class RemoveImagesFromBoardResult(BaseModel):
     },
     status_code=201,
 )
-async def add_image_to_board(
+def add_image_to_board(
     board_id: str = Body(description="The id of the board to add to"),
     image_name: str = Body(description="The name of the image to add"),
 ):
@@ -46,7 +46,7 @@ async def add_image_to_board(
     },
     status_code=201,
 )
-async def remove_image_from_board(
+def remove_image_from_board(
     image_name: str = Body(description="The name of the image to remove", embed=True),
 ):
     """Removes an image from its board, if it had one"""
@@ -66,7 +66,7 @@ async def remove_image_from_board(
     status_code=201,
     response_model=AddImagesToBoardResult,
 )
-async def add_images_to_board(
+def add_images_to_board(
     board_id: str = Body(description="The id of the board to add to"),
     image_names: list[str] = Body(description="The names of the images to add", embed=True),
 ) -> AddImagesToBoardResult:
@@ -95,7 +95,7 @@ async def add_images_to_board(
     status_code=201,
     response_model=RemoveImagesFromBoardResult,
 )
-async def remove_images_from_board(
+def remove_images_from_board(
     image_names: list[str] = Body(description="The names of the images to remove", embed=True),
 ) -> RemoveImagesFromBoardResult:
     """Removes a list of images from their board, if they had one"""
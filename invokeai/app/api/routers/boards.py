@@ -30,7 +30,7 @@ class DeleteBoardResult(BaseModel):
     status_code=201,
     response_model=BoardDTO,
 )
-async def create_board(
+def create_board(
     board_name: str = Query(description="The name of the board to create", max_length=300),
     is_private: bool = Query(default=False, description="Whether the board is private"),
 ) -> BoardDTO:
@@ -43,7 +43,7 @@ async def create_board(
 
 
 @boards_router.get("/{board_id}", operation_id="get_board", response_model=BoardDTO)
-async def get_board(
+def get_board(
     board_id: str = Path(description="The id of board to get"),
 ) -> BoardDTO:
     """Gets a board"""
@@ -66,7 +66,7 @@ async def get_board(
     status_code=201,
     response_model=BoardDTO,
 )
-async def update_board(
+def update_board(
     board_id: str = Path(description="The id of board to update"),
     changes: BoardChanges = Body(description="The changes to apply to the board"),
 ) -> BoardDTO:
@@ -79,7 +79,7 @@ async def update_board(
 
 
 @boards_router.delete("/{board_id}", operation_id="delete_board", response_model=DeleteBoardResult)
-async def delete_board(
+def delete_board(
     board_id: str = Path(description="The id of board to delete"),
     include_images: Optional[bool] = Query(description="Permanently delete all images on the board", default=False),
 ) -> DeleteBoardResult:
@@ -115,7 +115,7 @@ async def delete_board(
     operation_id="list_boards",
     response_model=Union[OffsetPaginatedResults[BoardDTO], list[BoardDTO]],
 )
-async def list_boards(
+def list_boards(
     order_by: BoardRecordOrderBy = Query(default=BoardRecordOrderBy.CreatedAt, description="The attribute to order by"),
     direction: SQLiteDirection = Query(default=SQLiteDirection.Descending, description="The direction to order by"),
     all: Optional[bool] = Query(default=None, description="Whether to list all boards"),
@@ -140,7 +140,7 @@ async def list_boards(
     operation_id="list_all_board_image_names",
     response_model=list[str],
 )
-async def list_all_board_image_names(
+def list_all_board_image_names(
     board_id: str = Path(description="The id of the board"),
 ) -> list[str]:
     """Gets a list of images for a board"""
@@ -1,22 +1,30 @@
 import io
+import os
 import traceback
 from typing import Optional
 
 from fastapi import BackgroundTasks, Body, HTTPException, Path, Query, Request, Response, UploadFile
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from fastapi.routing import APIRouter
 from PIL import Image
 from pydantic import BaseModel, Field, JsonValue
 
 from invokeai.app.api.dependencies import ApiDependencies
 from invokeai.app.invocations.fields import MetadataField
+from invokeai.app.services.board_records.board_records_common import BoardRecordNotFoundException
+from invokeai.app.services.bulk_download.bulk_download_common import (
+    BulkDownloadChangedException,
+    BulkDownloadParametersException,
+    BulkDownloadTargetException,
+)
 from invokeai.app.services.image_records.image_records_common import (
     ImageCategory,
     ImageRecordChanges,
+    ImageRecordNotFoundException,
     ResourceOrigin,
 )
 from invokeai.app.services.images.images_common import ImageDTO, ImageUrlsDTO
-from invokeai.app.services.shared.pagination import OffsetPaginatedResults
+from invokeai.app.services.shared.pagination import CursorPaginatedResults, OffsetPaginatedResults
 from invokeai.app.services.shared.sqlite.sqlite_common import SQLiteDirection
 
 images_router = APIRouter(prefix="/v1/images", tags=["images"])
@@ -26,6 +34,24 @@ images_router = APIRouter(prefix="/v1/images", tags=["images"])
 IMAGE_MAX_AGE = 31536000
 
 
+def _get_image_file_response(
+    request: Request, path: str, media_type: str, headers: Optional[dict[str, str]] = None
+) -> Response:
+    """
+    Streams an image file from disk, or responds with 304 Not Modified if the client's `If-None-Match` header matches
+    the file's ETag. The ETag is derived from the file's mtime and size.
+    """
+    headers = {"Cache-Control": f"max-age={IMAGE_MAX_AGE}", **(headers or {})}
+    response = FileResponse(path, media_type=media_type, headers=headers, stat_result=os.stat(path))
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        etag = response.headers["etag"]
+        client_etags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+        if "*" in client_etags or etag in client_etags:
+            return Response(status_code=304, headers={"ETag": etag, "Cache-Control": headers["Cache-Control"]})
+    return response
+
+
 @images_router.post(
     "/upload",
     operation_id="upload_image",
@@ -36,7 +62,7 @@ IMAGE_MAX_AGE = 31536000
     status_code=201,
     response_model=ImageDTO,
 )
-async def upload_image(
+def upload_image(
     file: UploadFile,
     request: Request,
     response: Response,
@@ -57,7 +83,7 @@ async def upload_image(
     _workflow = None
     _graph = None
 
-    contents = await file.read()
+    contents = file.file.read()
     try:
         pil_image = Image.open(io.BytesIO(contents))
         if crop_visible:
@@ -115,7 +141,7 @@ async def upload_image(
 
 
 @images_router.delete("/i/{image_name}", operation_id="delete_image")
-async def delete_image(
+def delete_image(
     image_name: str = Path(description="The name of the image to delete"),
 ) -> None:
     """Deletes an image"""
@@ -128,7 +154,7 @@ async def delete_image(
 
 
 @images_router.delete("/intermediates", operation_id="clear_intermediates")
-async def clear_intermediates() -> int:
+def clear_intermediates() -> int:
     """Clears all intermediates"""
 
     try:
@@ -140,7 +166,7 @@ async def clear_intermediates() -> int:
 
 
 @images_router.get("/intermediates", operation_id="get_intermediates_count")
-async def get_intermediates_count() -> int:
+def get_intermediates_count() -> int:
     """Gets the count of intermediate images"""
 
     try:
@@ -155,7 +181,7 @@ async def get_intermediates_count() -> int:
     operation_id="update_image",
     response_model=ImageDTO,
 )
-async def update_image(
+def update_image(
     image_name: str = Path(description="The name of the image to update"),
     image_changes: ImageRecordChanges = Body(description="The changes to apply to the image"),
 ) -> ImageDTO:
@@ -172,7 +198,7 @@ async def update_image(
     operation_id="get_image_dto",
     response_model=ImageDTO,
 )
-async def get_image_dto(
+def get_image_dto(
     image_name: str = Path(description="The name of image to get"),
 ) -> ImageDTO:
     """Gets an image's DTO"""
@@ -188,7 +214,7 @@ async def get_image_dto(
     operation_id="get_image_metadata",
     response_model=Optional[MetadataField],
 )
-async def get_image_metadata(
+def get_image_metadata(
     image_name: str = Path(description="The name of image to get"),
 ) -> Optional[MetadataField]:
     """Gets an image's metadata"""
@@ -207,7 +233,7 @@ class WorkflowAndGraphResponse(BaseModel):
 @images_router.get(
     "/i/{image_name}/workflow", operation_id="get_image_workflow", response_model=WorkflowAndGraphResponse
 )
-async def get_image_workflow(
+def get_image_workflow(
     image_name: str = Path(description="The name of image whose workflow to get"),
 ) -> WorkflowAndGraphResponse:
     try:
@@ -227,6 +253,7 @@ async def get_image_workflow(
             "description": "Return the full-resolution image",
             "content": {"image/png": {}},
         },
+        304: {"description": "The image has not been modified"},
         404: {"description": "Image not found"},
     },
 )
@@ -239,22 +266,21 @@ async def get_image_workflow(
             "description": "Return the full-resolution image",
             "content": {"image/png": {}},
         },
+        304: {"description": "The image has not been modified"},
         404: {"description": "Image not found"},
     },
 )
-async def get_image_full(
+def get_image_full(
+    request: Request,
     image_name: str = Path(description="The name of full-resolution image file to get"),
 ) -> Response:
     """Gets a full-resolution image file"""
 
     try:
         path = ApiDependencies.invoker.services.images.get_path(image_name)
-        with open(path, "rb") as f:
-            content = f.read()
-        response = Response(content, media_type="image/png")
-        response.headers["Cache-Control"] = f"max-age={IMAGE_MAX_AGE}"
-        response.headers["Content-Disposition"] = f'inline; filename="{image_name}"'
-        return response
+        return _get_image_file_response(
+            request, path, "image/png", headers={"Content-Disposition": f'inline; filename="{image_name}"'}
+        )
     except Exception:
         raise HTTPException(status_code=404)
 
@@ -268,21 +294,19 @@ async def get_image_full(
             "description": "Return the image thumbnail",
             "content": {"image/webp": {}},
         },
+        304: {"description": "The image has not been modified"},
         404: {"description": "Image not found"},
     },
 )
-async def get_image_thumbnail(
+def get_image_thumbnail(
+    request: Request,
     image_name: str = Path(description="The name of thumbnail image file to get"),
 ) -> Response:
     """Gets a thumbnail image file"""
 
     try:
         path = ApiDependencies.invoker.services.images.get_path(image_name, thumbnail=True)
-        with open(path, "rb") as f:
-            content = f.read()
-        response = Response(content, media_type="image/webp")
-        response.headers["Cache-Control"] = f"max-age={IMAGE_MAX_AGE}"
-        return response
+        return _get_image_file_response(request, path, "image/webp")
     except Exception:
         raise HTTPException(status_code=404)
 
@@ -292,7 +316,7 @@ async def get_image_thumbnail(
     operation_id="get_image_urls",
     response_model=ImageUrlsDTO,
 )
-async def get_image_urls(
+def get_image_urls(
     image_name: str = Path(description="The name of the image whose URL to get"),
 ) -> ImageUrlsDTO:
     """Gets an image and thumbnail URL"""
@@ -314,7 +338,7 @@ async def get_image_urls(
     operation_id="list_image_dtos",
     response_model=OffsetPaginatedResults[ImageDTO],
 )
-async def list_image_dtos(
+def list_image_dtos(
     image_origin: Optional[ResourceOrigin] = Query(default=None, description="The origin of images to list."),
     categories: Optional[list[ImageCategory]] = Query(default=None, description="The categories of image to include."),
     is_intermediate: Optional[bool] = Query(default=None, description="Whether to list intermediate images."),
@@ -337,12 +361,71 @@ async def list_image_dtos(
     return image_dtos
 
 
+@images_router.get(
+    "/cursor",
+    operation_id="list_image_dtos_by_cursor",
+    response_model=CursorPaginatedResults[ImageDTO],
+    responses={400: {"description": "Invalid cursor"}},
+)
+def list_image_dtos_by_cursor(
+    image_origin: Optional[ResourceOrigin] = Query(default=None, description="The origin of images to list."),
+    categories: Optional[list[ImageCategory]] = Query(default=None, description="The categories of image to include."),
+    is_intermediate: Optional[bool] = Query(default=None, description="Whether to list intermediate images."),
+    board_id: Optional[str] = Query(
+        default=None,
+        description="The board id to filter by. Use 'none' to find images without a board.",
+    ),
+    cursor: Optional[str] = Query(
+        default=None,
+        description="The next_cursor of the previous page, listed with the same order and filters. Omit for the first page.",
+    ),
+    limit: int = Query(default=10, description="The number of images per page"),
+    order_dir: SQLiteDirection = Query(default=SQLiteDirection.Descending, description="The order of sort"),
+    starred_first: bool = Query(default=True, description="Whether to sort by starred images first"),
+    search_term: Optional[str] = Query(default=None, description="The term to search for"),
+) -> CursorPaginatedResults[ImageDTO]:
+    """Gets a page of image DTOs after a cursor. Unlike offset pagination, later pages are as fast as the first."""
+
+    try:
+        return ApiDependencies.invoker.services.images.get_many_by_cursor(
+            limit, cursor, starred_first, order_dir, image_origin, categories, is_intermediate, board_id, search_term
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+@images_router.get(
+    "/search",
+    operation_id="search_image_dtos",
+    response_model=OffsetPaginatedResults[ImageDTO],
+)
+def search_image_dtos(
+    query: str = Query(
+        description='The search query. Terms match word prefixes in image metadata, and "quoted terms" match phrases.'
+    ),
+    image_origin: Optional[ResourceOrigin] = Query(default=None, description="The origin of images to list."),
+    categories: Optional[list[ImageCategory]] = Query(default=None, description="The categories of image to include."),
+    is_intermediate: Optional[bool] = Query(default=None, description="Whether to list intermediate images."),
+    board_id: Optional[str] = Query(
+        default=None,
+        description="The board id to filter by. Use 'none' to find images without a board.",
+    ),
+    offset: int = Query(default=0, description="The page offset"),
+    limit: int = Query(default=10, description="The number of images per page"),
+) -> OffsetPaginatedResults[ImageDTO]:
+    """Searches image metadata - prompts, model names, seeds and other values - ranking the images by relevance"""
+
+    return ApiDependencies.invoker.services.images.search(
+        query, offset, limit, image_origin, categories, is_intermediate, board_id
+    )
+
+
 class DeleteImagesFromListResult(BaseModel):
     deleted_images: list[str]
 
 
 @images_router.post("/delete", operation_id="delete_images_from_list", response_model=DeleteImagesFromListResult)
-async def delete_images_from_list(
+def delete_images_from_list(
     image_names: list[str] = Body(description="The list of names of images to delete", embed=True),
 ) -> DeleteImagesFromListResult:
     try:
@@ -363,7 +446,7 @@ class ImagesUpdatedFromListResult(BaseModel):
 
 
 @images_router.post("/star", operation_id="star_images_in_list", response_model=ImagesUpdatedFromListResult)
-async def star_images_in_list(
+def star_images_in_list(
     image_names: list[str] = Body(description="The list of names of images to star", embed=True),
 ) -> ImagesUpdatedFromListResult:
     try:
@@ -380,7 +463,7 @@ async def star_images_in_list(
 
 
 @images_router.post("/unstar", operation_id="unstar_images_in_list", response_model=ImagesUpdatedFromListResult)
-async def unstar_images_in_list(
+def unstar_images_in_list(
     image_names: list[str] = Body(description="The list of names of images to unstar", embed=True),
 ) -> ImagesUpdatedFromListResult:
     try:
@@ -408,7 +491,7 @@ class ImagesDownloaded(BaseModel):
 @images_router.post(
     "/download", operation_id="download_images_from_list", response_model=ImagesDownloaded, status_code=202
 )
-async def download_images_from_list(
+def download_images_from_list(
     background_tasks: BackgroundTasks,
     image_names: Optional[list[str]] = Body(
         default=None, description="The list of names of images to download", embed=True
@@ -443,7 +526,7 @@ async def download_images_from_list(
         404: {"description": "Image not found"},
     },
 )
-async def get_bulk_download_item(
+def get_bulk_download_item(
     background_tasks: BackgroundTasks,
     bulk_download_item_name: str = Path(description="The bulk_download_item_name of the bulk download item to get"),
 ) -> FileResponse:
@@ -462,3 +545,147 @@ async def get_bulk_download_item(
         return response
     except Exception:
         raise HTTPException(status_code=404)
+
+
+def _parse_range(range_header: str, size: int) -> tuple[int, int]:
+    """Parses a single-range `Range` header into the range [start, end) of a resource of the given size.
+
+    Raises:
+        ValueError: If the header is not a single, satisfiable byte range.
+    """
+    unit, _, byte_range = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in byte_range:
+        raise ValueError(f"Unsupported range: {range_header}")
+    first, _, last = byte_range.strip().partition("-")
+    if not first:
+        # A suffix range, e.g. `bytes=-500` for the last 500 bytes.
+        start, end = max(size - int(last), 0), size
+    else:
+        start = int(first)
+        end = min(int(last) + 1, size) if last else size
+    if start >= end:
+        raise ValueError(f"Unsatisfiable range: {range_header}")
+    return start, end
+
+
+def _get_zip_stream_headers(bulk_download_item_name: str, size: int, etag: Optional[str]) -> dict[str, str]:
+    headers = {
+        "Content-Disposition": f'attachment; filename="{bulk_download_item_name}"',
+        # Images are already compressed. This also stops the gzip middleware from compressing the archive, which would
+        # drop its Content-Length and break ranged requests.
+        "Content-Encoding": "identity",
+        "Content-Length": str(size),
+        "X-Bulk-Download-Item-Name": bulk_download_item_name,
+    }
+    if etag is not None:
+        headers["Accept-Ranges"] = "bytes"
+        headers["ETag"] = etag
+    return headers
+
+
+@images_router.post(
+    "/download/stream",
+    operation_id="stream_images_download",
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "description": "The zip archive of the images, streamed as it is built",
+            "content": {"application/zip": {}},
+        },
+        400: {"description": "No images or board id specified"},
+        404: {"description": "Image or board not found"},
+    },
+)
+def stream_images_download(
+    image_names: Optional[list[str]] = Body(
+        default=None, description="The list of names of images to download", embed=True
+    ),
+    board_id: Optional[str] = Body(
+        default=None, description="The board from which image should be downloaded", embed=True
+    ),
+    resumable: bool = Body(
+        default=False,
+        description="Whether the download can be resumed with `get_bulk_download_stream`. This reads every image once "
+        "before the archive is streamed.",
+        embed=True,
+    ),
+) -> StreamingResponse:
+    """Streams a zip archive of images as it is built, without writing it to disk first. Bulk download events are
+    emitted for the item named in the `X-Bulk-Download-Item-Name` header."""
+    if (image_names is None or len(image_names) == 0) and board_id is None:
+        raise HTTPException(status_code=400, detail="No images or board id specified.")
+    bulk_download = ApiDependencies.invoker.services.bulk_download
+    bulk_download_item_id: str = bulk_download.generate_item_id(board_id)
+    bulk_download_item_name = bulk_download_item_id + ".zip"
+
+    try:
+        zip_stream = bulk_download.stream(image_names, board_id, bulk_download_item_id, resumable)
+    except BulkDownloadParametersException:
+        raise HTTPException(status_code=400, detail="No images or board id specified.")
+    except (ImageRecordNotFoundException, BoardRecordNotFoundException, FileNotFoundError):
+        raise HTTPException(status_code=404, detail="Image or board not found")
+
+    return StreamingResponse(
+        bulk_download.iter_stream(zip_stream, bulk_download_item_name),
+        media_type="application/zip",
+        headers=_get_zip_stream_headers(bulk_download_item_name, zip_stream.size, zip_stream.etag),
+    )
+
+
+@images_router.api_route(
+    "/download/stream/{bulk_download_item_name}",
+    methods=["GET"],
+    operation_id="get_bulk_download_stream",
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "description": "The zip archive of a resumable bulk download",
+            "content": {"application/zip": {}},
+        },
+        206: {
+            "description": "The requested byte range of the zip archive",
+            "content": {"application/zip": {}},
+        },
+        404: {"description": "Bulk download not found"},
+        412: {"description": "The images of the bulk download have changed"},
+        416: {"description": "The requested range is not satisfiable"},
+    },
+)
+def get_bulk_download_stream(
+    request: Request,
+    bulk_download_item_name: str = Path(description="The bulk_download_item_name of the resumable bulk download"),
+) -> StreamingResponse:
+    """Streams a resumable bulk download, or the byte range of it requested with a `Range` header."""
+    bulk_download = ApiDependencies.invoker.services.bulk_download
+    try:
+        zip_stream = bulk_download.get_stream(bulk_download_item_name)
+    except BulkDownloadChangedException:
+        raise HTTPException(status_code=412, detail="The images of the bulk download have changed")
+    except BulkDownloadTargetException:
+        raise HTTPException(status_code=404)
+
+    size = zip_stream.size
+    etag = zip_stream.etag
+    headers = _get_zip_stream_headers(bulk_download_item_name, size, etag)
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    # If the archive changed since the client's partial download, the whole archive must be sent again.
+    if range_header is None or (if_range is not None and if_range != etag):
+        return StreamingResponse(
+            bulk_download.iter_stream(zip_stream, bulk_download_item_name),
+            media_type="application/zip",
+            headers=headers,
+        )
+
+    try:
+        start, end = _parse_range(range_header, size)
+    except ValueError:
+        raise HTTPException(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+    headers["Content-Length"] = str(end - start)
+    headers["Content-Range"] = f"bytes {start}-{end - 1}/{size}"
+    return StreamingResponse(
+        bulk_download.iter_stream(zip_stream, bulk_download_item_name, start, end),
+        status_code=206,
+        media_type="application/zip",
+        headers=headers,
+    )
@@ -117,7 +117,7 @@ example_model_input = {
     "/",
     operation_id="list_model_records",
 )
-async def list_model_records(
+def list_model_records(
     base_models: Optional[List[BaseModelType]] = Query(default=None, description="Base models to include"),
     model_type: Optional[ModelType] = Query(default=None, description="The type of model to get"),
     model_name: Optional[str] = Query(default=None, description="Exact match on the name of the model"),
@@ -149,7 +149,7 @@ async def list_model_records(
     operation_id="get_model_records_by_attrs",
     response_model=AnyModelConfig,
 )
-async def get_model_records_by_attrs(
+def get_model_records_by_attrs(
     name: str = Query(description="The name of the model"),
     type: ModelType = Query(description="The type of the model"),
     base: BaseModelType = Query(description="The base model of the model"),
@@ -177,7 +177,7 @@ async def get_model_records_by_attrs(
         404: {"description": "The model could not be found"},
     },
 )
-async def get_model_record(
+def get_model_record(
     key: str = Path(description="Key of the model record to fetch."),
 ) -> AnyModelConfig:
     """Get a model record"""
@@ -203,7 +203,7 @@ class FoundModel(BaseModel):
     status_code=200,
     response_model=List[FoundModel],
 )
-async def scan_for_models(
+def scan_for_models(
     scan_path: str = Query(description="Directory path to search for models", default=None),
 ) -> List[FoundModel]:
     path = pathlib.Path(scan_path)
@@ -257,7 +257,7 @@ class HuggingFaceModels(BaseModel):
     status_code=200,
     response_model=HuggingFaceModels,
 )
-async def get_hugging_face_models(
+def get_hugging_face_models(
     hugging_face_repo: str = Query(description="Hugging face repo to search for models", default=None),
 ) -> HuggingFaceModels:
     try:
@@ -290,7 +290,7 @@ async def get_hugging_face_models(
     },
     status_code=200,
 )
-async def update_model_record(
+def update_model_record(
     key: Annotated[str, Path(description="Unique key of model")],
     changes: Annotated[ModelRecordChanges, Body(description="Model config", example=example_model_input)],
 ) -> AnyModelConfig:
@@ -323,7 +323,7 @@ async def update_model_record(
     },
     status_code=200,
 )
-async def get_model_image(
+def get_model_image(
     key: str = Path(description="The name of model image file to get"),
 ) -> FileResponse:
     """Gets an image file that previews the model"""
@@ -354,14 +354,14 @@ async def get_model_image(
     },
     status_code=200,
 )
-async def update_model_image(
+def update_model_image(
     key: Annotated[str, Path(description="Unique key of model")],
     image: UploadFile,
 ) -> None:
     if not image.content_type or not image.content_type.startswith("image"):
         raise HTTPException(status_code=415, detail="Not an image")
 
-    contents = await image.read()
+    contents = image.file.read()
     try:
         pil_image = Image.open(io.BytesIO(contents))
 
@@ -389,7 +389,7 @@ async def update_model_image(
     },
     status_code=204,
 )
-async def delete_model(
+def delete_model(
     key: str = Path(description="Unique key of model to remove from model registry."),
 ) -> Response:
     """
@@ -419,7 +419,7 @@ async def delete_model(
     },
     status_code=204,
 )
-async def delete_model_image(
+def delete_model_image(
     key: str = Path(description="Unique key of model image to remove from model_images directory."),
 ) -> None:
     logger = ApiDependencies.invoker.services.logger
@@ -444,7 +444,7 @@ async def delete_model_image(
     },
     status_code=201,
 )
-async def install_model(
+def install_model(
     source: str = Query(description="Model source to install, can be a local path, repo_id, or remote URL"),
     inplace: Optional[bool] = Query(description="Whether or not to install a local model in place", default=False),
     access_token: Optional[str] = Query(description="access token for the remote resource", default=None),
@@ -514,7 +514,7 @@ async def install_model(
     status_code=201,
     response_class=HTMLResponse,
 )
-async def install_hugging_face_model(
+def install_hugging_face_model(
     source: str = Query(description="HuggingFace repo_id to install"),
 ) -> HTMLResponse:
     """Install a Hugging Face model using a string identifier."""
@@ -634,7 +634,7 @@ async def install_hugging_face_model(
     "/install",
     operation_id="list_model_installs",
 )
-async def list_model_installs() -> List[ModelInstallJob]:
+def list_model_installs() -> List[ModelInstallJob]:
     """Return the list of model install jobs.
 
     Install jobs have a numeric `id`, a `status`, and other fields that provide information on
@@ -665,7 +665,7 @@ async def list_model_installs() -> List[ModelInstallJob]:
         404: {"description": "No such job"},
     },
 )
-async def get_model_install_job(id: int = Path(description="Model install id")) -> ModelInstallJob:
+def get_model_install_job(id: int = Path(description="Model install id")) -> ModelInstallJob:
     """
     Return model install job corresponding to the given source. See the documentation for 'List Model Install Jobs'
     for information on the format of the return value.
@@ -686,7 +686,7 @@ async def get_model_install_job(id: int = Path(description="Model install id"))
     },
     status_code=201,
 )
-async def cancel_model_install_job(id: int = Path(description="Model install job ID")) -> None:
+def cancel_model_install_job(id: int = Path(description="Model install job ID")) -> None:
     """Cancel the model install job(s) corresponding to the given job ID."""
     installer = ApiDependencies.invoker.services.model_manager.install
     try:
@@ -704,7 +704,7 @@ async def cancel_model_install_job(id: int = Path(description="Model install job
         400: {"description": "Bad request"},
     },
 )
-async def prune_model_install_jobs() -> Response:
+def prune_model_install_jobs() -> Response:
     """Prune all completed and errored jobs from the install job list."""
     ApiDependencies.invoker.services.model_manager.install.prune_jobs()
     return Response(status_code=204)
@@ -723,7 +723,7 @@ async def prune_model_install_jobs() -> Response:
         409: {"description": "There is already a model registered at this location"},
     },
 )
-async def convert_model(
+def convert_model(
     key: str = Path(description="Unique key of the safetensors main model to convert to diffusers format."),
 ) -> AnyModelConfig:
     """
@@ -819,7 +819,7 @@ def get_is_installed(
 
 
 @model_manager_router.get("/starter_models", operation_id="get_starter_models", response_model=StarterModelResponse)
-async def get_starter_models() -> StarterModelResponse:
+def get_starter_models() -> StarterModelResponse:
     installed_models = ApiDependencies.invoker.services.model_manager.store.search_by_attr()
     starter_models = deepcopy(STARTER_MODELS)
     starter_bundles = deepcopy(STARTER_BUNDLES)
@@ -852,7 +852,7 @@ async def get_starter_models() -> StarterModelResponse:
     response_model=Optional[CacheStats],
     summary="Get model manager RAM cache performance statistics.",
 )
-async def get_stats() -> Optional[CacheStats]:
+def get_stats() -> Optional[CacheStats]:
     """Return performance statistics on the model manager's RAM cache. Will return null if no models have been loaded."""
 
     return ApiDependencies.invoker.services.model_manager.load.ram_cache.stats
@@ -884,7 +884,7 @@ class HFTokenHelper:
 
 
 @model_manager_router.get("/hf_login", operation_id="get_hf_login_status", response_model=HFTokenStatus)
-async def get_hf_login_status() -> HFTokenStatus:
+def get_hf_login_status() -> HFTokenStatus:
     token_status = HFTokenHelper.get_status()
 
     if token_status is HFTokenStatus.UNKNOWN:
@@ -894,7 +894,7 @@ async def get_hf_login_status() -> HFTokenStatus:
 
 
 @model_manager_router.post("/hf_login", operation_id="do_hf_login", response_model=HFTokenStatus)
-async def do_hf_login(
+def do_hf_login(
     token: str = Body(description="Hugging Face token to use for login", embed=True),
 ) -> HFTokenStatus:
     HFTokenHelper.set_token(token)
@@ -39,7 +39,7 @@ class SessionQueueAndProcessorStatus(BaseModel):
         201: {"model": EnqueueBatchResult},
     },
 )
-async def enqueue_batch(
+def enqueue_batch(
     queue_id: str = Path(description="The queue id to perform this operation on"),
     batch: Batch = Body(description="Batch to process"),
     prepend: bool = Body(default=False, description="Whether or not to prepend this batch in the queue"),
@@ -56,7 +56,7 @@ async def enqueue_batch(
         200: {"model": CursorPaginatedResults[SessionQueueItemDTO]},
     },
 )
-async def list_queue_items(
+def list_queue_items(
     queue_id: str = Path(description="The queue id to perform this operation on"),
     limit: int = Query(default=50, description="The number of items to fetch"),
     status: Optional[QUEUE_ITEM_STATUS] = Query(default=None, description="The status of items to fetch"),
@@ -75,7 +75,7 @@ async def list_queue_items(
     operation_id="resume",
     responses={200: {"model": SessionProcessorStatus}},
 )
-async def resume(
+def resume(
     queue_id: str = Path(description="The queue id to perform this operation on"),
 ) -> SessionProcessorStatus:
     """Resumes session processor"""
@@ -87,7 +87,7 @@ async def resume(
     operation_id="pause",
     responses={200: {"model": SessionProcessorStatus}},
 )
-async def Pause(
+def Pause(
     queue_id: str = Path(description="The queue id to perform this operation on"),
 ) -> SessionProcessorStatus:
     """Pauses session processor"""
@@ -99,7 +99,7 @@ async def Pause(
     operation_id="cancel_by_batch_ids",
     responses={200: {"model": CancelByBatchIDsResult}},
 )
-async def cancel_by_batch_ids(
+def cancel_by_batch_ids(
     queue_id: str = Path(description="The queue id to perform this operation on"),
     batch_ids: list[str] = Body(description="The list of batch_ids to cancel all queue items for", embed=True),
 ) -> CancelByBatchIDsResult:
@@ -112,7 +112,7 @@ async def cancel_by_batch_ids(
     operation_id="cancel_by_destination",
     responses={200: {"model": CancelByDestinationResult}},
 )
-async def cancel_by_destination(
+def cancel_by_destination(
     queue_id: str = Path(description="The queue id to perform this operation on"),
     destination: str = Query(description="The destination to cancel all queue items for"),
 ) -> CancelByDestinationResult:
@@ -129,7 +129,7 @@ async def cancel_by_destination(
         200: {"model": ClearResult},
     },
 )
-async def clear(
+def clear(
     queue_id: str = Path(description="The queue id to perform this operation on"),
 ) -> ClearResult:
     """Clears the queue entirely, immediately canceling the currently-executing session"""
@@ -147,7 +147,7 @@ async def clear(
         200: {"model": PruneResult},
     },
 )
-async def prune(
+def prune(
     queue_id: str = Path(description="The queue id to perform this operation on"),
 ) -> PruneResult:
     """Prunes all completed or errored queue items"""
@@ -161,7 +161,7 @@ async def prune(
         200: {"model": Optional[SessionQueueItem]},
     },
 )
-async def get_current_queue_item(
+def get_current_queue_item(
     queue_id: str = Path(description="The queue id to perform this operation on"),
 ) -> Optional[SessionQueueItem]:
     """Gets the currently execution queue item"""
@@ -175,7 +175,7 @@ async def get_current_queue_item(
         200: {"model": Optional[SessionQueueItem]},
     },
 )
-async def get_next_queue_item(
+def get_next_queue_item(
     queue_id: str = Path(description="The queue id to perform this operation on"),
 ) -> Optional[SessionQueueItem]:
     """Gets the next queue item, without executing it"""
@@ -189,7 +189,7 @@ async def get_next_queue_item(
         200: {"model": SessionQueueAndProcessorStatus},
     },
 )
-async def get_queue_status(
+def get_queue_status(
     queue_id: str = Path(description="The queue id to perform this operation on"),
 ) -> SessionQueueAndProcessorStatus:
     """Gets the status of the session queue"""
@@ -205,7 +205,7 @@ async def get_queue_status(
         200: {"model": BatchStatus},
     },
 )
-async def get_batch_status(
+def get_batch_status(
     queue_id: str = Path(description="The queue id to perform this operation on"),
     batch_id: str = Path(description="The batch to get the status of"),
 ) -> BatchStatus:
@@ -221,7 +221,7 @@ async def get_batch_status(
     },
     response_model_exclude_none=True,
 )
-async def get_queue_item(
+def get_queue_item(
     queue_id: str = Path(description="The queue id to perform this operation on"),
     item_id: int = Path(description="The queue item to get"),
 ) -> SessionQueueItem:
@@ -236,7 +236,7 @@ async def get_queue_item(
         200: {"model": SessionQueueItem},
     },
 )
-async def cancel_queue_item(
+def cancel_queue_item(
     queue_id: str = Path(description="The queue id to perform this operation on"),
     item_id: int = Path(description="The queue item to cancel"),
 ) -> SessionQueueItem:
@@ -250,7 +250,7 @@ async def cancel_queue_item(
     operation_id="counts_by_destination",
     responses={200: {"model": SessionQueueCountsByDestination}},
 )
-async def counts_by_destination(
+def counts_by_destination(
     queue_id: str = Path(description="The queue id to query"),
     destination: str = Query(description="The destination to query"),
 ) -> SessionQueueCountsByDestination:
@@ -3,7 +3,7 @@ from typing import Optional
 from fastapi import APIRouter, Body, HTTPException, Path, Query
 
 from invokeai.app.api.dependencies import ApiDependencies
-from invokeai.app.services.shared.pagination import PaginatedResults
+from invokeai.app.services.shared.pagination import CursorPaginatedResults, PaginatedResults
 from invokeai.app.services.shared.sqlite.sqlite_common import SQLiteDirection
 from invokeai.app.services.workflow_records.workflow_records_common import (
     Workflow,
@@ -25,7 +25,7 @@ workflows_router = APIRouter(prefix="/v1/workflows", tags=["workflows"])
         200: {"model": WorkflowRecordDTO},
     },
 )
-async def get_workflow(
+def get_workflow(
     workflow_id: str = Path(description="The workflow to get"),
 ) -> WorkflowRecordDTO:
     """Gets a workflow"""
@@ -42,7 +42,7 @@ async def get_workflow(
         200: {"model": WorkflowRecordDTO},
     },
 )
-async def update_workflow(
+def update_workflow(
     workflow: Workflow = Body(description="The updated workflow", embed=True),
 ) -> WorkflowRecordDTO:
     """Updates a workflow"""
@@ -53,7 +53,7 @@ async def update_workflow(
     "/i/{workflow_id}",
     operation_id="delete_workflow",
 )
-async def delete_workflow(
+def delete_workflow(
     workflow_id: str = Path(description="The workflow to delete"),
 ) -> None:
     """Deletes a workflow"""
@@ -67,7 +67,7 @@ async def delete_workflow(
         200: {"model": WorkflowRecordDTO},
     },
 )
-async def create_workflow(
+def create_workflow(
     workflow: WorkflowWithoutID = Body(description="The workflow to create", embed=True),
 ) -> WorkflowRecordDTO:
     """Creates a workflow"""
@@ -81,7 +81,7 @@ async def create_workflow(
         200: {"model": PaginatedResults[WorkflowRecordListItemDTO]},
     },
 )
-async def list_workflows(
+def list_workflows(
     page: int = Query(default=0, description="The page to get"),
     per_page: Optional[int] = Query(default=None, description="The number of workflows per page"),
     order_by: WorkflowRecordOrderBy = Query(
@@ -89,9 +89,43 @@ async def list_workflows(
     ),
     direction: SQLiteDirection = Query(default=SQLiteDirection.Ascending, description="The direction to order by"),
     category: WorkflowCategory = Query(default=WorkflowCategory.User, description="The category of workflow to get"),
-    query: Optional[str] = Query(default=None, description="The text to query by (matches name and description)"),
+    query: Optional[str] = Query(
+        default=None, description="The text to query by (matches word prefixes in the name, description and tags)"
+    ),
 ) -> PaginatedResults[WorkflowRecordListItemDTO]:
     """Gets a page of workflows"""
     return ApiDependencies.invoker.services.workflow_records.get_many(
         order_by=order_by, direction=direction, page=page, per_page=per_page, query=query, category=category
     )
+
+
+@workflows_router.get(
+    "/cursor",
+    operation_id="list_workflows_by_cursor",
+    responses={
+        200: {"model": CursorPaginatedResults[WorkflowRecordListItemDTO]},
+        400: {"description": "Invalid cursor"},
+    },
+)
+def list_workflows_by_cursor(
+    cursor: Optional[str] = Query(
+        default=None,
+        description="The next_cursor of the previous page, listed with the same order and filters. Omit for the first page.",
+    ),
+    limit: int = Query(default=10, description="The number of workflows per page"),
+    order_by: WorkflowRecordOrderBy = Query(
+        default=WorkflowRecordOrderBy.Name, description="The attribute to order by"
+    ),
+    direction: SQLiteDirection = Query(default=SQLiteDirection.Ascending, description="The direction to order by"),
+    category: WorkflowCategory = Query(default=WorkflowCategory.User, description="The category of workflow to get"),
+    query: Optional[str] = Query(
+        default=None, description="The text to query by (matches word prefixes in the name, description and tags)"
+    ),
+) -> CursorPaginatedResults[WorkflowRecordListItemDTO]:
+    """Gets a page of workflows after a cursor"""
+    try:
+        return ApiDependencies.invoker.services.workflow_records.get_many_by_cursor(
+            order_by=order_by, direction=direction, limit=limit, cursor=cursor, query=query, category=category
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
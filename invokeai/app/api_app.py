@@ -22,6 +22,7 @@ from torch.backends.mps import is_available as is_mps_available
 import invokeai.backend.util.hotfixes  # noqa: F401 (monkeypatching on import)
 import invokeai.frontend.web as web_dir
 from invokeai.app.api.dependencies import ApiDependencies
+from invokeai.app.api.event_loop_monitor import event_loop_monitor
 from invokeai.app.api.no_cache_staticfiles import NoCacheStaticFiles
 from invokeai.app.api.routers import (
     app_info,
@@ -36,8 +37,10 @@ from invokeai.app.api.routers import (
     workflows,
 )
 from invokeai.app.api.sockets import SocketIO
+from invokeai.app.invocations.baseinvocation import BaseInvocation, BaseInvocationOutput
 from invokeai.app.services.config.config_default import get_config
 from invokeai.app.util.custom_openapi import get_openapi_func
+from invokeai.app.util.startup_profiler import startup_profiler
 from invokeai.backend.util.devices import TorchDevice
 from invokeai.backend.util.logging import InvokeAILogger
 
@@ -67,7 +70,21 @@ port = app_config.port
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Add startup event to load dependencies
-    ApiDependencies.initialize(config=app_config, event_handler_id=event_handler_id, loop=loop, logger=logger)
+    with startup_profiler.phase("initialize services"):
+        ApiDependencies.initialize(config=app_config, event_handler_id=event_handler_id, loop=loop, logger=logger)
+
+    # When serving, the schema is cached on disk in the root dir, which is only known once the app starts
+    app.openapi = get_openapi_func(app, cache_dir=app_config.root_path / ".openapi_cache")
+
+    if startup_profiler.is_running:
+        # These are otherwise built on first use. Build them now, so that they are included in the report.
+        with startup_profiler.phase("build node type adapters"):
+            BaseInvocation.get_typeadapter()
+            BaseInvocationOutput.get_typeadapter()
+        with startup_profiler.phase("generate OpenAPI schema"):
+            app.openapi()
+        startup_profiler.stop()
+        startup_profiler.log_report(logger)
 
     # Log the server address when it starts - in case the network log level is not high enough to see the startup log
     proto = "https" if app_config.ssl_certfile else "http"
@@ -85,8 +102,11 @@ async def lifespan(app: FastAPI):
     )
     logger.handle(record)
 
+    event_loop_monitor.start(logger)
+
     yield
     # Shut down threads
+    event_loop_monitor.stop()
     ApiDependencies.shutdown()
 
 
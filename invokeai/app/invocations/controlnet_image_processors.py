@@ -1,28 +1,16 @@
 # Invocations for ControlNet image preprocessors
 # initial implementation by Gregg Helt, 2023
 # heavily leverages controlnet_aux package: https://github.com/patrickvonplaten/controlnet_aux
+# controlnet_aux and the other heavy dependencies of the processors are imported in `run_processor()`, so they are only
+# loaded when a processor is used, rather than at startup.
 from builtins import bool, float
 from pathlib import Path
-from typing import Dict, List, Literal, Union
+from typing import List, Literal, Union
 
 import cv2
 import numpy as np
-from controlnet_aux import (
-    ContentShuffleDetector,
-    LeresDetector,
-    MediapipeFaceDetector,
-    MidasDetector,
-    MLSDdetector,
-    NormalBaeDetector,
-    PidiNetDetector,
-    SamDetector,
-    ZoeDetector,
-)
-from controlnet_aux.util import HWC3, ade_palette
 from PIL import Image
 from pydantic import BaseModel, Field, field_validator, model_validator
-from transformers import pipeline
-from transformers.pipelines import DepthEstimationPipeline
 
 from invokeai.app.invocations.baseinvocation import (
     BaseInvocation,
@@ -46,8 +34,6 @@ from invokeai.app.invocations.util import validate_begin_end_step, validate_weig
 from invokeai.app.services.shared.invocation_context import InvocationContext
 from invokeai.app.util.controlnet_utils import CONTROLNET_MODE_VALUES, CONTROLNET_RESIZE_VALUES, heuristic_resize
 from invokeai.backend.image_util.canny import get_canny_edges
-from invokeai.backend.image_util.depth_anything.depth_anything_pipeline import DepthAnythingPipeline
-from invokeai.backend.image_util.dw_openpose import DWPOSE_MODELS, DWOpenposeDetector
 from invokeai.backend.image_util.hed import HEDProcessor
 from invokeai.backend.image_util.lineart import LineartProcessor
 from invokeai.backend.image_util.lineart_anime import LineartAnimeProcessor
@@ -300,6 +286,8 @@ class MidasDepthImageProcessorInvocation(ImageProcessorInvocation):
 
     def run_processor(self, image: Image.Image) -> Image.Image:
         # TODO: replace from_pretrained() calls with context.models.download_and_cache() (or similar)
+        from controlnet_aux import MidasDetector
+
         midas_processor = MidasDetector.from_pretrained("lllyasviel/Annotators")
         processed_image = midas_processor(
             image,
@@ -328,6 +316,8 @@ class NormalbaeImageProcessorInvocation(ImageProcessorInvocation):
     image_resolution: int = InputField(default=512, ge=1, description=FieldDescriptions.image_res)
 
     def run_processor(self, image: Image.Image) -> Image.Image:
+        from controlnet_aux import NormalBaeDetector
+
         normalbae_processor = NormalBaeDetector.from_pretrained("lllyasviel/Annotators")
         processed_image = normalbae_processor(
             image, detect_resolution=self.detect_resolution, image_resolution=self.image_resolution
@@ -352,6 +342,8 @@ class MlsdImageProcessorInvocation(ImageProcessorInvocation):
     thr_d: float = InputField(default=0.1, ge=0, description="MLSD parameter `thr_d`")
 
     def run_processor(self, image: Image.Image) -> Image.Image:
+        from controlnet_aux import MLSDdetector
+
         mlsd_processor = MLSDdetector.from_pretrained("lllyasviel/Annotators")
         processed_image = mlsd_processor(
             image,
@@ -380,6 +372,8 @@ class PidiImageProcessorInvocation(ImageProcessorInvocation):
     scribble: bool = InputField(default=False, description=FieldDescriptions.scribble_mode)
 
     def run_processor(self, image: Image.Image) -> Image.Image:
+        from controlnet_aux import PidiNetDetector
+
         pidi_processor = PidiNetDetector.from_pretrained("lllyasviel/Annotators")
         processed_image = pidi_processor(
             image,
@@ -409,6 +403,8 @@ class ContentShuffleImageProcessorInvocation(ImageProcessorInvocation):
     f: int = InputField(default=256, ge=0, description="Content shuffle `f` parameter")
 
     def run_processor(self, image: Image.Image) -> Image.Image:
+        from controlnet_aux import ContentShuffleDetector
+
         content_shuffle_processor = ContentShuffleDetector()
         processed_image = content_shuffle_processor(
             image,
@@ -434,6 +430,8 @@ class ZoeDepthImageProcessorInvocation(ImageProcessorInvocation):
     """Applies Zoe depth processing to image"""
 
     def run_processor(self, image: Image.Image) -> Image.Image:
+        from controlnet_aux import ZoeDetector
+
         zoe_depth_processor = ZoeDetector.from_pretrained("lllyasviel/Annotators")
         processed_image = zoe_depth_processor(image)
         return processed_image
@@ -456,6 +454,8 @@ class MediapipeFaceProcessorInvocation(ImageProcessorInvocation):
     image_resolution: int = InputField(default=512, ge=1, description=FieldDescriptions.image_res)
 
     def run_processor(self, image: Image.Image) -> Image.Image:
+        from controlnet_aux import MediapipeFaceDetector
+
         mediapipe_face_processor = MediapipeFaceDetector()
         processed_image = mediapipe_face_processor(
             image,
@@ -485,6 +485,8 @@ class LeresImageProcessorInvocation(ImageProcessorInvocation):
     image_resolution: int = InputField(default=512, ge=1, description=FieldDescriptions.image_res)
 
     def run_processor(self, image: Image.Image) -> Image.Image:
+        from controlnet_aux import LeresDetector
+
         leres_processor = LeresDetector.from_pretrained("lllyasviel/Annotators")
         processed_image = leres_processor(
             image,
@@ -518,6 +520,8 @@ class TileResamplerProcessorInvocation(ImageProcessorInvocation):
         res=512,  # never used?
         down_sampling_rate=1.0,
     ):
+        from controlnet_aux.util import HWC3
+
         np_img = HWC3(np_img)
         if down_sampling_rate < 1.1:
             return np_img
@@ -553,6 +557,10 @@ class SegmentAnythingProcessorInvocation(ImageProcessorInvocation):
     image_resolution: int = InputField(default=512, ge=1, description=FieldDescriptions.image_res)
 
     def run_processor(self, image: Image.Image) -> Image.Image:
+        from invokeai.backend.image_util.segment_anything.sam_detector_reproducible_colors import (
+            SamDetectorReproducibleColors,
+        )
+
         # segment_anything_processor = SamDetector.from_pretrained("ybelkada/segment-anything", subfolder="checkpoints")
         segment_anything_processor = SamDetectorReproducibleColors.from_pretrained(
             "ybelkada/segment-anything", subfolder="checkpoints"
@@ -564,28 +572,6 @@ class SegmentAnythingProcessorInvocation(ImageProcessorInvocation):
         return processed_image
 
 
-class SamDetectorReproducibleColors(SamDetector):
-    # overriding SamDetector.show_anns() method to use reproducible colors for segmentation image
-    #     base class show_anns() method randomizes colors,
-    #     which seems to also lead to non-reproducible image generation
-    # so using ADE20k color palette instead
-    def show_anns(self, anns: List[Dict]):
-        if len(anns) == 0:
-            return
-        sorted_anns = sorted(anns, key=(lambda x: x["area"]), reverse=True)
-        h, w = anns[0]["segmentation"].shape
-        final_img = Image.fromarray(np.zeros((h, w, 3), dtype=np.uint8), mode="RGB")
-        palette = ade_palette()
-        for i, ann in enumerate(sorted_anns):
-            m = ann["segmentation"]
-            img = np.empty((m.shape[0], m.shape[1], 3), dtype=np.uint8)
-            # doing modulo just in case number of annotated regions exceeds number of colors in palette
-            ann_color = palette[i % len(palette)]
-            img[:, :] = ann_color
-            final_img.paste(Image.fromarray(img, mode="RGB"), (0, 0), Image.fromarray(np.uint8(m * 255)))
-        return np.array(final_img, dtype=np.uint8)
-
-
 @invocation(
     "color_map_image_processor",
     title="Color Map Processor",
@@ -643,6 +629,11 @@ class DepthAnythingImageProcessorInvocation(ImageProcessorInvocation):
     resolution: int = InputField(default=512, ge=1, description=FieldDescriptions.image_res)
 
     def run_processor(self, image: Image.Image) -> Image.Image:
+        from transformers import pipeline
+        from transformers.pipelines import DepthEstimationPipeline
+
+        from invokeai.backend.image_util.depth_anything.depth_anything_pipeline import DepthAnythingPipeline
+
         def load_depth_anything(model_path: Path):
             depth_anything_pipeline = pipeline(model=str(model_path), task="depth-estimation", local_files_only=True)
             assert isinstance(depth_anything_pipeline, DepthEstimationPipeline)
@@ -678,6 +669,8 @@ class DWOpenposeImageProcessorInvocation(ImageProcessorInvocation):
     image_resolution: int = InputField(default=512, ge=1, description=FieldDescriptions.image_res)
 
     def run_processor(self, image: Image.Image) -> Image.Image:
+        from invokeai.backend.image_util.dw_openpose import DWPOSE_MODELS, DWOpenposeDetector
+
         onnx_det = self._context.models.download_and_cache_model(DWPOSE_MODELS["yolox_l.onnx"])
         onnx_pose = self._context.models.download_and_cache_model(DWPOSE_MODELS["dw-ll_ucoco_384.onnx"])
 
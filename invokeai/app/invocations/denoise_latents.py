@@ -2,7 +2,8 @@
 import inspect
 import os
 from contextlib import ExitStack
-from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+from functools import partial
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
 
 import torch
 import torchvision
@@ -48,6 +49,7 @@ from invokeai.backend.stable_diffusion import PipelineIntermediateState
 from invokeai.backend.stable_diffusion.denoise_context import DenoiseContext, DenoiseInputs
 from invokeai.backend.stable_diffusion.diffusers_pipeline import (
     ControlNetData,
+    DenoiseBatchItem,
     StableDiffusionGeneratorPipeline,
     T2IAdapterData,
 )
@@ -71,6 +73,7 @@ from invokeai.backend.stable_diffusion.extensions.lora import LoRAExt
 from invokeai.backend.stable_diffusion.extensions.preview import PreviewExt
 from invokeai.backend.stable_diffusion.extensions.rescale_cfg import RescaleCFGExt
 from invokeai.backend.stable_diffusion.extensions.seamless import SeamlessExt
+from invokeai.backend.stable_diffusion.extensions.step_cache import StepCacheExt
 from invokeai.backend.stable_diffusion.extensions.t2i_adapter import T2IAdapterExt
 from invokeai.backend.stable_diffusion.extensions_manager import ExtensionsManager
 from invokeai.backend.stable_diffusion.schedulers import SCHEDULER_MAP
@@ -79,6 +82,7 @@ from invokeai.backend.util.devices import TorchDevice
 from invokeai.backend.util.hotfixes import ControlNetModel
 from invokeai.backend.util.mask import to_standard_float_mask
 from invokeai.backend.util.silence_warnings import SilenceWarnings
+from invokeai.backend.util.step_cache import StepCache
 
 
 def get_scheduler(
@@ -130,7 +134,7 @@ def get_scheduler(
     title="Denoise Latents",
     tags=["latents", "denoise", "txt2img", "t2i", "t2l", "img2img", "i2i", "l2l"],
     category="latents",
-    version="1.5.3",
+    version="1.6.0",
 )
 class DenoiseLatentsInvocation(BaseInvocation):
     """Denoises noisy latents to decodable images"""
@@ -191,6 +195,12 @@ class DenoiseLatentsInvocation(BaseInvocation):
     cfg_rescale_multiplier: float = InputField(
         title="CFG Rescale Multiplier", default=0, ge=0, lt=1, description=FieldDescriptions.cfg_rescale_multiplier
     )
+    step_cache_interval: int = InputField(
+        default=1, ge=1, title="Step Cache Interval", description=FieldDescriptions.step_cache_interval
+    )
+    step_cache_threshold: float = InputField(
+        default=0.0, ge=0, title="Step Cache Threshold", description=FieldDescriptions.step_cache_threshold
+    )
     latents: Optional[LatentsField] = InputField(
         default=None,
         description=FieldDescriptions.latents,
@@ -896,6 +906,11 @@ class DenoiseLatentsInvocation(BaseInvocation):
         if self.unet.seamless_axes:
             ext_manager.add_extension(SeamlessExt(self.unet.seamless_axes))
 
+        ### step cache
+        step_cache = StepCache(interval=self.step_cache_interval, threshold=self.step_cache_threshold)
+        if step_cache.enabled:
+            ext_manager.add_extension(StepCacheExt(step_cache))
+
         ### inpaint
         mask, masked_latents, is_gradient_mask = self.prep_inpaint_mask(context, latents)
         # NOTE: We used to identify inpainting models by inpecting the shape of the loaded UNet model weights. Now we
@@ -951,6 +966,9 @@ class DenoiseLatentsInvocation(BaseInvocation):
                 denoise_ctx.unet = unet
                 result_latents = sd_backend.latents_from_embeddings(denoise_ctx, ext_manager)
 
+        if step_cache.enabled:
+            context.logger.info(step_cache.stats.summary())
+
         # https://discuss.huggingface.co/t/memory-usage-by-later-pipeline-stages/23699
         result_latents = result_latents.detach().to("cpu")
         TorchDevice.empty_cache()
@@ -1000,29 +1018,29 @@ class DenoiseLatentsInvocation(BaseInvocation):
         def step_callback(state: PipelineIntermediateState) -> None:
             context.util.sd_step_callback(state, unet_config.base)
 
-        def _lora_loader() -> Iterator[Tuple[ModelPatchRaw, float]]:
-            for lora in self.unet.loras:
-                lora_info = context.models.load(lora.lora)
-                assert isinstance(lora_info.model, ModelPatchRaw)
-                yield (lora_info.model, lora.weight)
-                del lora_info
-            return
+        step_cache = StepCache(interval=self.step_cache_interval, threshold=self.step_cache_threshold)
 
-        with (
-            ExitStack() as exit_stack,
-            context.models.load(self.unet.unet).model_on_device() as (cached_weights, unet),
-            ModelPatcher.apply_freeu(unet, self.unet.freeu_config),
-            SeamlessExt.static_patch_model(unet, self.unet.seamless_axes),  # FIXME
-            # Apply the LoRA after unet has been moved to its target device for faster patching.
-            LayerPatcher.apply_smart_model_patches(
-                model=unet,
-                patches=_lora_loader(),
-                prefix="lora_unet_",
-                dtype=unet.dtype,
-                cached_weights=cached_weights,
-            ),
+        if (
+            context.config.get().denoise_batch_size > 1
+            and not self.control
+            and not self.t2i_adapter
+            and not ip_adapters
+            and mask is None
+            and not step_cache.enabled
+            and unet_config.variant != ModelVariantType.Inpaint
         ):
-            assert isinstance(unet, UNet2DConditionModel)
+            # Without these extensions, denoising only needs the UNet and its model patches, so it can run in a batch
+            # with compatible denoise nodes from other queue items.
+            result_latents = self._denoise_batched(context, unet_config, seed, noise, latents, step_callback)
+            if result_latents is not None:
+                result_latents = result_latents.to("cpu")
+                TorchDevice.empty_cache()
+
+                name = context.tensors.save(tensor=result_latents)
+                return LatentsOutput.build(latents_name=name, latents=result_latents, seed=None)
+
+        with ExitStack() as exit_stack:
+            unet = self._load_unet(context, exit_stack, step_cache)
             latents = latents.to(device=device, dtype=unet.dtype)
             if noise is not None:
                 noise = noise.to(device=device, dtype=unet.dtype)
@@ -1101,9 +1119,149 @@ class DenoiseLatentsInvocation(BaseInvocation):
                 callback=step_callback,
             )
 
+        if step_cache.enabled:
+            context.logger.info(step_cache.stats.summary())
+
         # https://discuss.huggingface.co/t/memory-usage-by-later-pipeline-stages/23699
         result_latents = result_latents.to("cpu")
         TorchDevice.empty_cache()
 
         name = context.tensors.save(tensor=result_latents)
         return LatentsOutput.build(latents_name=name, latents=result_latents, seed=None)
+
+    def _load_unet(
+        self, context: InvocationContext, exit_stack: ExitStack, step_cache: Optional[StepCache] = None
+    ) -> UNet2DConditionModel:
+        """Load the UNet onto its execution device and apply FreeU, seamless tiling, the step cache and the LoRAs to it,
+        for the duration of the exit stack.
+        """
+
+        def _lora_loader() -> Iterator[Tuple[ModelPatchRaw, float]]:
+            for lora in self.unet.loras:
+                lora_info = context.models.load(lora.lora)
+                assert isinstance(lora_info.model, ModelPatchRaw)
+                yield (lora_info.model, lora.weight)
+                del lora_info
+            return
+
+        unet_info = context.models.load(self.unet.unet)
+        (cached_weights, unet) = exit_stack.enter_context(unet_info.model_on_device())
+        assert isinstance(unet, UNet2DConditionModel)
+        exit_stack.enter_context(ModelPatcher.apply_freeu(unet, self.unet.freeu_config))
+        exit_stack.enter_context(SeamlessExt.static_patch_model(unet, self.unet.seamless_axes))  # FIXME
+        if step_cache is not None:
+            exit_stack.enter_context(StepCacheExt.static_patch_model(unet, step_cache))
+        # Apply the LoRA after unet has been moved to its target device for faster patching.
+        exit_stack.enter_context(
+            LayerPatcher.apply_smart_model_patches(
+                model=unet,
+                patches=_lora_loader(),
+                prefix="lora_unet_",
+                dtype=unet.dtype,
+                cached_weights=cached_weights,
+                patched_weights_cache=unet_info,
+                patches_key=tuple((lora.lora.key, lora.weight) for lora in self.unet.loras),
+            )
+        )
+        return unet
+
+    def _denoise_batched(
+        self,
+        context: InvocationContext,
+        unet_config: AnyModelConfig,
+        seed: int,
+        noise: Optional[torch.Tensor],
+        latents: torch.Tensor,
+        step_callback: Callable[[PipelineIntermediateState], None],
+    ) -> Optional[torch.Tensor]:
+        """Denoise the latents in a batch with compatible denoise nodes from other queue items.
+
+        Returns:
+            The denoised latents, or None if the text conditioning has regions, which can't be batched.
+        """
+        device = TorchDevice.choose_torch_device()
+        _, _, latent_height, latent_width = latents.shape
+        conditioning_data = self.get_conditioning_data(
+            context=context,
+            positive_conditioning_field=self.positive_conditioning,
+            negative_conditioning_field=self.negative_conditioning,
+            device=device,
+            dtype=TorchDevice.choose_torch_dtype(),
+            latent_height=latent_height,
+            latent_width=latent_width,
+            cfg_scale=self.cfg_scale,
+            steps=self.steps,
+            cfg_rescale_multiplier=self.cfg_rescale_multiplier,
+        )
+        if conditioning_data.cond_regions is not None or conditioning_data.uncond_regions is not None:
+            return None
+
+        scheduler = get_scheduler(
+            context=context,
+            scheduler_info=self.unet.scheduler,
+            scheduler_name=self.scheduler,
+            seed=seed,
+            unet_config=unet_config,
+        )
+        timesteps, init_timestep, scheduler_step_kwargs = self.init_scheduler(
+            scheduler,
+            device=device,
+            steps=self.steps,
+            denoising_start=self.denoising_start,
+            denoising_end=self.denoising_end,
+            seed=seed,
+        )
+
+        item = DenoiseBatchItem(
+            latents=latents.to(device=device),
+            noise=noise.to(device=device) if noise is not None else None,
+            conditioning_data=conditioning_data,
+            scheduler=scheduler,
+            scheduler_step_kwargs=scheduler_step_kwargs,
+            callback=step_callback,
+        )
+        key = (
+            self.get_type(),
+            self.unet.unet.key,
+            self.unet.scheduler.key,
+            tuple((lora.lora.key, lora.weight) for lora in self.unet.loras),
+            self.unet.freeu_config.model_dump_json() if self.unet.freeu_config else None,
+            tuple(self.unet.seamless_axes),
+            device,
+            latents.shape,
+            noise is not None,
+            self.scheduler,
+            tuple(timesteps.tolist()),
+            tuple(init_timestep.tolist()),
+            tuple(self.cfg_scale) if isinstance(self.cfg_scale, list) else self.cfg_scale,
+            self.cfg_rescale_multiplier,
+            conditioning_data.is_sdxl(),
+            conditioning_data.uncond_text.embeds.shape,
+            conditioning_data.cond_text.embeds.shape,
+        )
+        return context.util.run_batched(
+            key,
+            item,
+            partial(self._run_denoise_batch, context=context, timesteps=timesteps, init_timestep=init_timestep),
+        )
+
+    def _run_denoise_batch(
+        self,
+        items: list[DenoiseBatchItem],
+        context: InvocationContext,
+        timesteps: torch.Tensor,
+        init_timestep: torch.Tensor,
+    ) -> list[torch.Tensor | Exception]:
+        """Denoise this node's latents together with the latents of compatible denoise nodes from other queue items."""
+        if len(items) > 1:
+            context.logger.info(f"Denoising {len(items)} images from different queue items in a batch")
+        with ExitStack() as exit_stack:
+            unet = self._load_unet(context, exit_stack)
+            for item in items:
+                item.latents = item.latents.to(dtype=unet.dtype)
+                if item.noise is not None:
+                    item.noise = item.noise.to(dtype=unet.dtype)
+                item.conditioning_data.uncond_text.to(device=unet.device, dtype=unet.dtype)
+                item.conditioning_data.cond_text.to(device=unet.device, dtype=unet.dtype)
+            pipeline = self.create_pipeline(unet, items[0].scheduler)
+            return pipeline.latents_from_embeddings_batch(items=items, timesteps=timesteps, init_timestep=init_timestep)
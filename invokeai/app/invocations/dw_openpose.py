@@ -1,10 +1,7 @@
-import onnxruntime as ort
-
 from invokeai.app.invocations.baseinvocation import BaseInvocation, invocation
 from invokeai.app.invocations.fields import ImageField, InputField, WithBoard, WithMetadata
 from invokeai.app.invocations.primitives import ImageOutput
 from invokeai.app.services.shared.invocation_context import InvocationContext
-from invokeai.backend.image_util.dw_openpose import DWOpenposeDetector2
 
 
 @invocation(
@@ -23,6 +20,11 @@ class DWOpenposeDetectionInvocation(BaseInvocation, WithMetadata, WithBoard):
     draw_hands: bool = InputField(default=False)
 
     def invoke(self, context: InvocationContext) -> ImageOutput:
+        # onnxruntime and the DWPose dependencies are slow to import, so they are only imported when the node is used.
+        import onnxruntime as ort
+
+        from invokeai.backend.image_util.dw_openpose import DWOpenposeDetector2
+
         image = context.images.get_pil(self.image.image_name, "RGB")
 
         onnx_det_path = context.models.download_and_cache_model(DWOpenposeDetector2.get_model_url_det())
@@ -5,7 +5,6 @@ from typing import Optional, TypedDict
 
 import cv2
 import numpy as np
-from mediapipe.python.solutions.face_mesh import FaceMesh  # type: ignore[import]
 from PIL import Image, ImageDraw, ImageFilter, ImageFont, ImageOps
 from PIL.Image import Image as ImageType
 from pydantic import field_validator
@@ -194,6 +193,9 @@ def generate_face_box_mask(
         # Convert RGBA to RGB by removing the alpha channel.
         np_image = np_image[:, :, :3]
 
+    # mediapipe is slow to import, so it is only imported when faces are detected.
+    from mediapipe.python.solutions.face_mesh import FaceMesh  # type: ignore[import]
+
     # Create a FaceMesh object for face landmark detection and mesh generation.
     face_mesh = FaceMesh(
         max_num_faces=999,
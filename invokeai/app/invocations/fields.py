@@ -128,6 +128,15 @@ class FieldDescriptions:
     denoising_end = "When to stop denoising, expressed a percentage of total steps"
     cfg_scale = "Classifier-Free Guidance scale"
     cfg_rescale_multiplier = "Rescale multiplier for CFG guidance, used for models trained with zero-terminal SNR"
+    step_cache_interval = (
+        "Compute the deep model blocks only every N steps, and reuse their output in between. 1 disables step caching "
+        "by interval. Higher values are faster, at some cost in quality. Ignored if the step cache threshold is set."
+    )
+    step_cache_threshold = (
+        "Reuse the output of the deep model blocks until their input has changed by this much (relative L1 distance, "
+        "accumulated over steps) since they were last computed. 0 disables adaptive step caching. Higher values are "
+        "faster, at some cost in quality."
+    )
     scheduler = "Scheduler to use during inference"
     positive_cond = "Positive conditioning tensor"
     negative_cond = "Negative conditioning tensor"
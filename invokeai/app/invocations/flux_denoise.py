@@ -1,4 +1,5 @@
 from contextlib import ExitStack
+from functools import partial
 from typing import Callable, Iterator, Optional, Tuple, Union
 
 import einops
@@ -30,10 +31,11 @@ from invokeai.app.invocations.primitives import LatentsOutput
 from invokeai.app.services.shared.invocation_context import InvocationContext
 from invokeai.backend.flux.controlnet.instantx_controlnet_flux import InstantXControlNetFlux
 from invokeai.backend.flux.controlnet.xlabs_controlnet_flux import XLabsControlNetFlux
-from invokeai.backend.flux.denoise import denoise
+from invokeai.backend.flux.denoise import DenoiseBatchItem, denoise, denoise_batch
 from invokeai.backend.flux.extensions.inpaint_extension import InpaintExtension
 from invokeai.backend.flux.extensions.instantx_controlnet_extension import InstantXControlNetExtension
 from invokeai.backend.flux.extensions.regional_prompting_extension import RegionalPromptingExtension
+from invokeai.backend.flux.extensions.step_cache_extension import StepCacheExtension
 from invokeai.backend.flux.extensions.xlabs_controlnet_extension import XLabsControlNetExtension
 from invokeai.backend.flux.extensions.xlabs_ip_adapter_extension import XLabsIPAdapterExtension
 from invokeai.backend.flux.ip_adapter.xlabs_ip_adapter_flux import XlabsIpAdapterFlux
@@ -47,13 +49,14 @@ from invokeai.backend.flux.sampling_utils import (
     unpack,
 )
 from invokeai.backend.flux.text_conditioning import FluxTextConditioning
-from invokeai.backend.model_manager.config import ModelFormat
+from invokeai.backend.model_manager.config import AnyModelConfig, ModelFormat
 from invokeai.backend.patches.layer_patcher import LayerPatcher
 from invokeai.backend.patches.lora_conversions.flux_lora_constants import FLUX_LORA_TRANSFORMER_PREFIX
 from invokeai.backend.patches.model_patch_raw import ModelPatchRaw
 from invokeai.backend.stable_diffusion.diffusers_pipeline import PipelineIntermediateState
 from invokeai.backend.stable_diffusion.diffusion.conditioning_data import FLUXConditioningInfo
 from invokeai.backend.util.devices import TorchDevice
+from invokeai.backend.util.step_cache import StepCache
 
 
 @invocation(
@@ -61,7 +64,7 @@ from invokeai.backend.util.devices import TorchDevice
     title="FLUX Denoise",
     tags=["image", "flux"],
     category="image",
-    version="3.2.2",
+    version="3.4.0",
     classification=Classification.Prototype,
 )
 class FluxDenoiseInvocation(BaseInvocation, WithMetadata, WithBoard):
@@ -116,6 +119,18 @@ class FluxDenoiseInvocation(BaseInvocation, WithMetadata, WithBoard):
         description="Index of the last step to apply cfg_scale. Negative indices count backwards from the "
         + "last step (e.g. a value of -1 refers to the final step).",
     )
+    batched_cfg: bool = InputField(
+        default=False,
+        title="Batched CFG",
+        description="Run the positive and negative predictions of CFG steps in a single batch. This is faster, "
+        + "but uses more memory.",
+    )
+    step_cache_interval: int = InputField(
+        default=1, ge=1, title="Step Cache Interval", description=FieldDescriptions.step_cache_interval
+    )
+    step_cache_threshold: float = InputField(
+        default=0.0, ge=0, title="Step Cache Threshold", description=FieldDescriptions.step_cache_threshold
+    )
     width: int = InputField(default=1024, multiple_of=16, description="Width of the generated image.")
     height: int = InputField(default=1024, multiple_of=16, description="Height of the generated image.")
     num_steps: int = InputField(
@@ -286,6 +301,46 @@ class FluxDenoiseInvocation(BaseInvocation, WithMetadata, WithBoard):
             cfg_scale_end_step=self.cfg_scale_end_step,
         )
 
+        if context.config.get().denoise_batch_size > 1 and not self.control and not ip_adapter_fields:
+            # Without ControlNets and IP-Adapters, denoising only needs the transformer and its LoRAs, so it can run in
+            # a batch with compatible denoise nodes from other queue items.
+            item = DenoiseBatchItem(
+                img=x,
+                img_ids=img_ids,
+                pos_regional_prompting_extension=pos_regional_prompting_extension,
+                neg_regional_prompting_extension=neg_regional_prompting_extension,
+                step_callback=self._build_step_callback(context),
+                inpaint_extension=inpaint_extension,
+                img_cond=img_cond,
+            )
+            key = (
+                self.get_type(),
+                self.transformer.transformer.key,
+                tuple((lora.lora.key, lora.weight) for lora in self._get_loras()),
+                x.device,
+                x.shape,
+                img_cond is not None,
+                neg_regional_prompting_extension is not None,
+                tuple(timesteps),
+                self.guidance,
+                tuple(cfg_scale),
+                self.batched_cfg,
+                self.step_cache_interval,
+                self.step_cache_threshold,
+            )
+            x = context.util.run_batched(
+                key,
+                item,
+                partial(
+                    self._run_denoise_batch,
+                    context=context,
+                    transformer_config=transformer_config,
+                    timesteps=timesteps,
+                    cfg_scale=cfg_scale,
+                ),
+            )
+            return unpack(x.float(), self.height, self.width)
+
         with ExitStack() as exit_stack:
             # Prepare ControlNet extensions.
             # Note: We do this before loading the transformer model to minimize peak memory (see implementation).
@@ -298,40 +353,8 @@ class FluxDenoiseInvocation(BaseInvocation, WithMetadata, WithBoard):
                 device=x.device,
             )
 
-            # Load the transformer model.
-            (cached_weights, transformer) = exit_stack.enter_context(
-                context.models.load(self.transformer.transformer).model_on_device()
-            )
-            assert isinstance(transformer, Flux)
-            config = transformer_config
-            assert config is not None
-
-            # Determine if the model is quantized.
-            # If the model is quantized, then we need to apply the LoRA weights as sidecar layers. This results in
-            # slower inference than direct patching, but is agnostic to the quantization format.
-            if config.format in [ModelFormat.Checkpoint]:
-                model_is_quantized = False
-            elif config.format in [
-                ModelFormat.BnbQuantizedLlmInt8b,
-                ModelFormat.BnbQuantizednf4b,
-                ModelFormat.GGUFQuantized,
-            ]:
-                model_is_quantized = True
-            else:
-                raise ValueError(f"Unsupported model format: {config.format}")
-
-            # Apply LoRA models to the transformer.
-            # Note: We apply the LoRA after the transformer has been moved to its target device for faster patching.
-            exit_stack.enter_context(
-                LayerPatcher.apply_smart_model_patches(
-                    model=transformer,
-                    patches=self._lora_iterator(context),
-                    prefix=FLUX_LORA_TRANSFORMER_PREFIX,
-                    dtype=inference_dtype,
-                    cached_weights=cached_weights,
-                    force_sidecar_patching=model_is_quantized,
-                )
-            )
+            transformer = self._load_transformer(context, exit_stack, transformer_config, inference_dtype)
+            step_cache = self._build_step_cache()
 
             # Prepare IP-Adapter extensions.
             pos_ip_adapter_extensions, neg_ip_adapter_extensions = self._prep_ip_adapter_extensions(
@@ -358,11 +381,93 @@ class FluxDenoiseInvocation(BaseInvocation, WithMetadata, WithBoard):
                 pos_ip_adapter_extensions=pos_ip_adapter_extensions,
                 neg_ip_adapter_extensions=neg_ip_adapter_extensions,
                 img_cond=img_cond,
+                batched_cfg=self.batched_cfg,
+                step_cache_extension=StepCacheExtension(step_cache) if step_cache else None,
             )
+            if step_cache:
+                context.logger.info(step_cache.stats.summary())
 
         x = unpack(x.float(), self.height, self.width)
         return x
 
+    def _load_transformer(
+        self,
+        context: InvocationContext,
+        exit_stack: ExitStack,
+        transformer_config: AnyModelConfig,
+        inference_dtype: torch.dtype,
+    ) -> Flux:
+        """Load the transformer model onto its execution device and apply the LoRAs to it, for the duration of the exit
+        stack.
+        """
+        transformer_info = context.models.load(self.transformer.transformer)
+        (cached_weights, transformer) = exit_stack.enter_context(transformer_info.model_on_device())
+        assert isinstance(transformer, Flux)
+        config = transformer_config
+        assert config is not None
+
+        # Determine if the model is quantized.
+        # If the model is quantized, then we need to apply the LoRA weights as sidecar layers. This results in
+        # slower inference than direct patching, but is agnostic to the quantization format.
+        if config.format in [ModelFormat.Checkpoint]:
+            model_is_quantized = False
+        elif config.format in [
+            ModelFormat.BnbQuantizedLlmInt8b,
+            ModelFormat.BnbQuantizednf4b,
+            ModelFormat.GGUFQuantized,
+        ]:
+            model_is_quantized = True
+        else:
+            raise ValueError(f"Unsupported model format: {config.format}")
+
+        # Apply LoRA models to the transformer.
+        # Note: We apply the LoRA after the transformer has been moved to its target device for faster patching.
+        exit_stack.enter_context(
+            LayerPatcher.apply_smart_model_patches(
+                model=transformer,
+                patches=self._lora_iterator(context),
+                prefix=FLUX_LORA_TRANSFORMER_PREFIX,
+                dtype=inference_dtype,
+                cached_weights=cached_weights,
+                force_sidecar_patching=model_is_quantized,
+                patched_weights_cache=transformer_info,
+                patches_key=tuple((lora.lora.key, lora.weight) for lora in self._get_loras()),
+            )
+        )
+        return transformer
+
+    def _run_denoise_batch(
+        self,
+        items: list[DenoiseBatchItem],
+        context: InvocationContext,
+        transformer_config: AnyModelConfig,
+        timesteps: list[float],
+        cfg_scale: list[float],
+    ) -> list[torch.Tensor | Exception]:
+        """Denoise this node's image together with the images of compatible denoise nodes from other queue items."""
+        if len(items) > 1:
+            context.logger.info(f"Denoising {len(items)} images from different queue items in a batch")
+        step_cache = self._build_step_cache()
+        with ExitStack() as exit_stack:
+            transformer = self._load_transformer(context, exit_stack, transformer_config, torch.bfloat16)
+            results = denoise_batch(
+                model=transformer,
+                items=items,
+                timesteps=timesteps,
+                guidance=self.guidance,
+                cfg_scale=cfg_scale,
+                batched_cfg=self.batched_cfg,
+                step_cache_extension=StepCacheExtension(step_cache) if step_cache else None,
+            )
+        if step_cache:
+            context.logger.info(step_cache.stats.summary())
+        return results
+
+    def _build_step_cache(self) -> StepCache | None:
+        """Builds the step cache for the transformer blocks, or returns None if step caching is disabled."""
+        step_cache = StepCache(interval=self.step_cache_interval, threshold=self.step_cache_threshold)
+        return step_cache if step_cache.enabled else None
+
     def _load_text_conditioning(
         self,
         context: InvocationContext,
@@ -719,13 +824,16 @@ class FluxDenoiseInvocation(BaseInvocation, WithMetadata, WithBoard):
 
         return pos_ip_adapter_extensions, neg_ip_adapter_extensions
 
-    def _lora_iterator(self, context: InvocationContext) -> Iterator[Tuple[ModelPatchRaw, float]]:
+    def _get_loras(self) -> list[Union[LoRAField, ControlLoRAField]]:
         loras: list[Union[LoRAField, ControlLoRAField]] = [*self.transformer.loras]
         if self.control_lora:
             # Note: Since FLUX structural control LoRAs modify the shape of some weights, it is important that they are
             # applied last.
             loras.append(self.control_lora)
-        for lora in loras:
+        return loras
+
+    def _lora_iterator(self, context: InvocationContext) -> Iterator[Tuple[ModelPatchRaw, float]]:
+        for lora in self._get_loras():
             lora_info = context.models.load(lora.lora)
             assert isinstance(lora_info.model, ModelPatchRaw)
             yield (lora_info.model, lora.weight)
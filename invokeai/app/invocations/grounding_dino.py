@@ -3,8 +3,6 @@ from typing import Literal
 
 import torch
 from PIL import Image
-from transformers import pipeline
-from transformers.pipelines import ZeroShotObjectDetectionPipeline
 
 from invokeai.app.invocations.baseinvocation import BaseInvocation, invocation
 from invokeai.app.invocations.fields import BoundingBoxField, ImageField, InputField
@@ -70,6 +68,10 @@ class GroundingDinoInvocation(BaseInvocation):
 
     @staticmethod
     def _load_grounding_dino(model_path: Path):
+        # transformers pipelines are slow to import, so they are only imported when the model is loaded.
+        from transformers import pipeline
+        from transformers.pipelines import ZeroShotObjectDetectionPipeline
+
         grounding_dino_pipeline = pipeline(
             model=str(model_path),
             task="zero-shot-object-detection",
@@ -202,11 +202,17 @@ class TiledMultiDiffusionDenoiseLatents(BaseInvocation):
                 del lora_info
 
         device = TorchDevice.choose_torch_device()
+        unet_info = context.models.load(self.unet.unet)
         with (
             ExitStack() as exit_stack,
-            context.models.load(self.unet.unet) as unet,
+            unet_info as unet,
             LayerPatcher.apply_smart_model_patches(
-                model=unet, patches=_lora_loader(), prefix="lora_unet_", dtype=unet.dtype
+                model=unet,
+                patches=_lora_loader(),
+                prefix="lora_unet_",
+                dtype=unet.dtype,
+                patched_weights_cache=unet_info,
+                patches_key=tuple((lora.lora.key, lora.weight) for lora in self.unet.loras),
             ),
         ):
             assert isinstance(unet, UNet2DConditionModel)
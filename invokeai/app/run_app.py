@@ -5,8 +5,14 @@ def run_app() -> None:
     # Before doing _anything_, parse CLI args!
     from invokeai.frontend.cli.arg_parser import InvokeAIArgs
 
-    InvokeAIArgs.parse_args()
+    args = InvokeAIArgs.parse_args()
 
-    from invokeai.app.api_app import invoke_api
+    from invokeai.app.util.startup_profiler import startup_profiler
+
+    if args is not None and args.profile_startup:
+        startup_profiler.start()
+
+    with startup_profiler.phase("import app"):
+        from invokeai.app.api_app import invoke_api
 
     invoke_api()
@@ -1,6 +1,8 @@
 from abc import ABC, abstractmethod
 from typing import Optional
 
+from invokeai.app.services.board_image_records.board_image_records_common import BoardSummary
+
 
 class BoardImageRecordStorageBase(ABC):
     """Abstract base class for the one-to-many board-image relationship record storage."""
@@ -45,3 +47,11 @@ class BoardImageRecordStorageBase(ABC):
     ) -> int:
         """Gets the number of images for a board."""
         pass
+
+    @abstractmethod
+    def get_board_summaries(
+        self,
+        board_ids: list[str],
+    ) -> dict[str, BoardSummary]:
+        """Gets the image counts and cover images for many boards, keyed by board id."""
+        pass
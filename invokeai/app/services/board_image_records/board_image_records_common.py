@@ -0,0 +1,13 @@
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class BoardSummary(BaseModel):
+    """A board's image count and cover image, maintained by the database as images are added, removed and changed."""
+
+    board_id: str = Field(description="The id of the board.")
+    image_count: int = Field(description="The number of non-intermediate images in the board.")
+    cover_image_name: Optional[str] = Field(
+        description="The board's most recent non-intermediate image, starred images first."
+    )
@@ -1,20 +1,23 @@
 import sqlite3
-import threading
 from typing import Optional, cast
 
 from invokeai.app.services.board_image_records.board_image_records_base import BoardImageRecordStorageBase
+from invokeai.app.services.board_image_records.board_image_records_common import BoardSummary
 from invokeai.app.services.image_records.image_records_common import ImageRecord, deserialize_image_record
 from invokeai.app.services.shared.pagination import OffsetPaginatedResults
+from invokeai.app.services.shared.sqlite.sqlite_common import InstrumentedRLock
 from invokeai.app.services.shared.sqlite.sqlite_database import SqliteDatabase
 
 
 class SqliteBoardImageRecordStorage(BoardImageRecordStorageBase):
     _conn: sqlite3.Connection
     _cursor: sqlite3.Cursor
-    _lock: threading.RLock
+    _lock: InstrumentedRLock
+    _SUMMARIES_BATCH_SIZE = 500
 
     def __init__(self, db: SqliteDatabase) -> None:
         super().__init__()
+        self._db = db
         self._lock = db.lock
         self._conn = db.conn
         self._cursor = self._conn.cursor()
@@ -68,9 +71,8 @@ class SqliteBoardImageRecordStorage(BoardImageRecordStorageBase):
         limit: int = 10,
     ) -> OffsetPaginatedResults[ImageRecord]:
         # TODO: this isn't paginated yet?
-        try:
-            self._lock.acquire()
-            self._cursor.execute(
+        with self._db.read() as cursor:
+            cursor.execute(
                 """--sql
                 SELECT images.*
                 FROM board_images
@@ -80,27 +82,21 @@ class SqliteBoardImageRecordStorage(BoardImageRecordStorageBase):
                 """,
                 (board_id,),
             )
-            result = cast(list[sqlite3.Row], self._cursor.fetchall())
+            result = cast(list[sqlite3.Row], cursor.fetchall())
             images = [deserialize_image_record(dict(r)) for r in result]
 
-            self._cursor.execute(
+            cursor.execute(
                 """--sql
                 SELECT COUNT(*) FROM images WHERE 1=1;
                 """
             )
-            count = cast(int, self._cursor.fetchone()[0])
+            count = cast(int, cursor.fetchone()[0])
 
-        except sqlite3.Error as e:
-            self._conn.rollback()
-            raise e
-        finally:
-            self._lock.release()
         return OffsetPaginatedResults(items=images, offset=offset, limit=limit, total=count)
 
     def get_all_board_image_names_for_board(self, board_id: str) -> list[str]:
-        try:
-            self._lock.acquire()
-            self._cursor.execute(
+        with self._db.read() as cursor:
+            cursor.execute(
                 """--sql
                 SELECT image_name
                 FROM board_images
@@ -108,22 +104,16 @@ class SqliteBoardImageRecordStorage(BoardImageRecordStorageBase):
                 """,
                 (board_id,),
             )
-            result = cast(list[sqlite3.Row], self._cursor.fetchall())
+            result = cast(list[sqlite3.Row], cursor.fetchall())
             image_names = [r[0] for r in result]
             return image_names
-        except sqlite3.Error as e:
-            self._conn.rollback()
-            raise e
-        finally:
-            self._lock.release()
 
     def get_board_for_image(
         self,
         image_name: str,
     ) -> Optional[str]:
-        try:
-            self._lock.acquire()
-            self._cursor.execute(
+        with self._db.read() as cursor:
+            cursor.execute(
                 """--sql
                 SELECT board_id
                 FROM board_images
@@ -131,33 +121,39 @@ class SqliteBoardImageRecordStorage(BoardImageRecordStorageBase):
                 """,
                 (image_name,),
             )
-            result = self._cursor.fetchone()
+            result = cursor.fetchone()
             if result is None:
                 return None
             return cast(str, result[0])
-        except sqlite3.Error as e:
-            self._conn.rollback()
-            raise e
-        finally:
-            self._lock.release()
 
     def get_image_count_for_board(self, board_id: str) -> int:
-        try:
-            self._lock.acquire()
-            self._cursor.execute(
+        with self._db.read() as cursor:
+            cursor.execute(
                 """--sql
-                SELECT COUNT(*)
-                FROM board_images
-                INNER JOIN images ON board_images.image_name = images.image_name
-                WHERE images.is_intermediate = FALSE
-                AND board_images.board_id = ?;
+                SELECT image_count
+                FROM board_summaries
+                WHERE board_id = ?;
                 """,
                 (board_id,),
             )
-            count = cast(int, self._cursor.fetchone()[0])
-            return count
-        except sqlite3.Error as e:
-            self._conn.rollback()
-            raise e
-        finally:
-            self._lock.release()
+            result = cursor.fetchone()
+            return cast(int, result[0]) if result is not None else 0
+
+    def get_board_summaries(self, board_ids: list[str]) -> dict[str, BoardSummary]:
+        summaries: dict[str, BoardSummary] = {}
+        with self._db.read() as cursor:
+            # Batched to stay under SQLite's limit on the number of query parameters
+            for i in range(0, len(board_ids), self._SUMMARIES_BATCH_SIZE):
+                batch = board_ids[i : i + self._SUMMARIES_BATCH_SIZE]
+                placeholders = ", ".join("?" for _ in batch)
+                cursor.execute(
+                    f"""--sql
+                    SELECT board_id, image_count, cover_image_name
+                    FROM board_summaries
+                    WHERE board_id IN ({placeholders});
+                    """,
+                    batch,
+                )
+                for row in cast(list[sqlite3.Row], cursor.fetchall()):
+                    summaries[row[0]] = BoardSummary(board_id=row[0], image_count=row[1], cover_image_name=row[2])
+        return summaries
@@ -1,5 +1,4 @@
 import sqlite3
-import threading
 from typing import Union, cast
 
 from invokeai.app.services.board_records.board_records_base import BoardRecordStorageBase
@@ -13,7 +12,7 @@ from invokeai.app.services.board_records.board_records_common import (
     deserialize_board_record,
 )
 from invokeai.app.services.shared.pagination import OffsetPaginatedResults
-from invokeai.app.services.shared.sqlite.sqlite_common import SQLiteDirection
+from invokeai.app.services.shared.sqlite.sqlite_common import InstrumentedRLock, SQLiteDirection
 from invokeai.app.services.shared.sqlite.sqlite_database import SqliteDatabase
 from invokeai.app.util.misc import uuid_string
 
@@ -21,10 +20,11 @@ from invokeai.app.util.misc import uuid_string
 class SqliteBoardRecordStorage(BoardRecordStorageBase):
     _conn: sqlite3.Connection
     _cursor: sqlite3.Cursor
-    _lock: threading.RLock
+    _lock: InstrumentedRLock
 
     def __init__(self, db: SqliteDatabase) -> None:
         super().__init__()
+        self._db = db
         self._lock = db.lock
         self._conn = db.conn
         self._cursor = self._conn.cursor()
@@ -76,22 +76,19 @@ class SqliteBoardRecordStorage(BoardRecordStorageBase):
         board_id: str,
     ) -> BoardRecord:
         try:
-            self._lock.acquire()
-            self._cursor.execute(
-                """--sql
-                SELECT *
-                FROM boards
-                WHERE board_id = ?;
-                """,
-                (board_id,),
-            )
+            with self._db.read() as cursor:
+                cursor.execute(
+                    """--sql
+                    SELECT *
+                    FROM boards
+                    WHERE board_id = ?;
+                    """,
+                    (board_id,),
+                )
 
-            result = cast(Union[sqlite3.Row, None], self._cursor.fetchone())
+                result = cast(Union[sqlite3.Row, None], cursor.fetchone())
         except sqlite3.Error as e:
-            self._conn.rollback()
             raise BoardRecordNotFoundException from e
-        finally:
-            self._lock.release()
         if result is None:
             raise BoardRecordNotFoundException
         return BoardRecord(**dict(result))
@@ -153,9 +150,7 @@ class SqliteBoardRecordStorage(BoardRecordStorageBase):
         limit: int = 10,
         include_archived: bool = False,
     ) -> OffsetPaginatedResults[BoardRecord]:
-        try:
-            self._lock.acquire()
-
+        with self._db.read() as cursor:
             # Build base query
             base_query = """
                 SELECT *
@@ -173,9 +168,9 @@ class SqliteBoardRecordStorage(BoardRecordStorageBase):
             )
 
             # Execute query to fetch boards
-            self._cursor.execute(final_query, (limit, offset))
+            cursor.execute(final_query, (limit, offset))
 
-            result = cast(list[sqlite3.Row], self._cursor.fetchall())
+            result = cast(list[sqlite3.Row], cursor.fetchall())
             boards = [deserialize_board_record(dict(r)) for r in result]
 
             # Determine count query
@@ -192,54 +187,38 @@ class SqliteBoardRecordStorage(BoardRecordStorageBase):
                 """
 
             # Execute count query
-            self._cursor.execute(count_query)
-
-            count = cast(int, self._cursor.fetchone()[0])
+            cursor.execute(count_query)
 
-            return OffsetPaginatedResults[BoardRecord](items=boards, offset=offset, limit=limit, total=count)
+            count = cast(int, cursor.fetchone()[0])
 
-        except sqlite3.Error as e:
-            self._conn.rollback()
-            raise e
-        finally:
-            self._lock.release()
+        return OffsetPaginatedResults[BoardRecord](items=boards, offset=offset, limit=limit, total=count)
 
     def get_all(
         self, order_by: BoardRecordOrderBy, direction: SQLiteDirection, include_archived: bool = False
     ) -> list[BoardRecord]:
-        try:
-            self._lock.acquire()
-
-            if order_by == BoardRecordOrderBy.Name:
-                base_query = """
-                    SELECT *
-                    FROM boards
-                    {archived_filter}
-                    ORDER BY LOWER(board_name) {direction}
-                """
-            else:
-                base_query = """
-                    SELECT *
-                    FROM boards
-                    {archived_filter}
-                    ORDER BY {order_by} {direction}
-                """
-
-            archived_filter = "" if include_archived else "WHERE archived = 0"
-
-            final_query = base_query.format(
-                archived_filter=archived_filter, order_by=order_by.value, direction=direction.value
-            )
+        if order_by == BoardRecordOrderBy.Name:
+            base_query = """
+                SELECT *
+                FROM boards
+                {archived_filter}
+                ORDER BY LOWER(board_name) {direction}
+            """
+        else:
+            base_query = """
+                SELECT *
+                FROM boards
+                {archived_filter}
+                ORDER BY {order_by} {direction}
+            """
 
-            self._cursor.execute(final_query)
+        archived_filter = "" if include_archived else "WHERE archived = 0"
 
-            result = cast(list[sqlite3.Row], self._cursor.fetchall())
-            boards = [deserialize_board_record(dict(r)) for r in result]
+        final_query = base_query.format(
+            archived_filter=archived_filter, order_by=order_by.value, direction=direction.value
+        )
 
-            return boards
+        with self._db.read() as cursor:
+            cursor.execute(final_query)
+            result = cast(list[sqlite3.Row], cursor.fetchall())
 
-        except sqlite3.Error as e:
-            self._conn.rollback()
-            raise e
-        finally:
-            self._lock.release()
+        return [deserialize_board_record(dict(r)) for r in result]
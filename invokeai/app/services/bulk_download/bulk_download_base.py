@@ -1,5 +1,7 @@
 from abc import ABC, abstractmethod
-from typing import Optional
+from typing import Iterator, Optional
+
+from invokeai.app.services.bulk_download.zip_stream import ZipStream
 
 
 class BulkDownloadBase(ABC):
@@ -17,6 +19,54 @@ class BulkDownloadBase(ABC):
         :param bulk_download_item_id: The bulk_download_item_id that will be used to retrieve the bulk download item when it is prepared, if none is provided a uuid will be generated.
         """
 
+    @abstractmethod
+    def stream(
+        self,
+        image_names: Optional[list[str]],
+        board_id: Optional[str],
+        bulk_download_item_id: str,
+        resumable: bool = False,
+    ) -> ZipStream:
+        """
+        Prepare a zip archive of the images specified by the given image names or board id, to be streamed with
+        `iter_stream()` as it is built, without writing it to disk.
+
+        :param image_names: A list of image names to include in the archive.
+        :param board_id: The ID of the board. If provided, all images associated with the board will be included in the archive.
+        :param bulk_download_item_id: The bulk_download_item_id that events will be emitted for.
+        :param resumable: Whether to save a manifest of the archive, so that byte ranges of it can be streamed later with `get_stream()`. This reads every image once before the archive is streamed.
+        :return: The zip stream.
+        """
+
+    @abstractmethod
+    def get_stream(self, bulk_download_item_name: str) -> ZipStream:
+        """
+        Get the zip stream of a resumable bulk download from its manifest.
+
+        :param bulk_download_item_name: The name of the bulk download item.
+        :return: The zip stream, which supports byte ranges.
+        :raises BulkDownloadTargetException: If there is no manifest for the item.
+        :raises BulkDownloadChangedException: If any of the images changed since the manifest was saved.
+        """
+
+    @abstractmethod
+    def iter_stream(
+        self, zip_stream: ZipStream, bulk_download_item_name: str, start: int = 0, end: Optional[int] = None
+    ) -> Iterator[bytes]:
+        """
+        Yield the bytes [start, end) of a zip stream, emitting the bulk download events for the item.
+
+        The events are flagged as streamed. The started event is emitted for the first request of an archive, and the
+        complete event when its last byte is first sent, so resuming a download doesn't emit them again. Once the last
+        byte is sent, the manifest of a resumable archive is deleted and it can't be streamed again. A client
+        disconnecting is not an error.
+
+        :param zip_stream: The zip stream, from `stream()` or `get_stream()`.
+        :param bulk_download_item_name: The name of the bulk download item.
+        :param start: The offset of the first byte to yield.
+        :param end: The offset after the last byte to yield. Defaults to the end of the archive.
+        """
+
     @abstractmethod
     def get_path(self, bulk_download_item_name: str) -> str:
         """
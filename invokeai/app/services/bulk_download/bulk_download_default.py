@@ -1,22 +1,33 @@
+import threading
 from pathlib import Path
 from tempfile import TemporaryDirectory
-from typing import Optional, Union
+from typing import Iterator, Optional, Union
 from zipfile import ZipFile
 
+from pydantic import BaseModel, Field, ValidationError
+
 from invokeai.app.services.board_records.board_records_common import BoardRecordNotFoundException
 from invokeai.app.services.bulk_download.bulk_download_base import BulkDownloadBase
 from invokeai.app.services.bulk_download.bulk_download_common import (
     DEFAULT_BULK_DOWNLOAD_ID,
+    BulkDownloadChangedException,
     BulkDownloadException,
     BulkDownloadParametersException,
     BulkDownloadTargetException,
 )
+from invokeai.app.services.bulk_download.zip_stream import ZipStream, ZipStreamEntry
 from invokeai.app.services.image_records.image_records_common import ImageRecordNotFoundException
 from invokeai.app.services.images.images_common import ImageDTO
 from invokeai.app.services.invoker import Invoker
 from invokeai.app.util.misc import uuid_string
 
 
+class BulkDownloadManifest(BaseModel):
+    """The entries of a resumable bulk download, from which any byte range of its archive can be rebuilt."""
+
+    entries: list[ZipStreamEntry] = Field(description="The entries of the archive, in order.")
+
+
 class BulkDownloadService(BulkDownloadBase):
     def start(self, invoker: Invoker) -> None:
         self._invoker = invoker
@@ -25,6 +36,9 @@ class BulkDownloadService(BulkDownloadBase):
         self._temp_directory = TemporaryDirectory()
         self._bulk_downloads_folder = Path(self._temp_directory.name) / "bulk_downloads"
         self._bulk_downloads_folder.mkdir(parents=True, exist_ok=True)
+        # A resumable archive may be streamed by several ranged requests. Its events are only emitted once.
+        self._stream_events_lock = threading.Lock()
+        self._started_streams: set[str] = set()
 
     def handler(
         self, image_names: Optional[list[str]], board_id: Optional[str], bulk_download_item_id: Optional[str]
@@ -59,6 +73,98 @@ class BulkDownloadService(BulkDownloadBase):
             self._invoker.services.logger.error("Problem bulk downloading images.")
             raise e
 
+    def stream(
+        self,
+        image_names: Optional[list[str]],
+        board_id: Optional[str],
+        bulk_download_item_id: str,
+        resumable: bool = False,
+    ) -> ZipStream:
+        bulk_download_id: str = DEFAULT_BULK_DOWNLOAD_ID
+        bulk_download_item_name = bulk_download_item_id + ".zip"
+
+        try:
+            image_dtos: list[ImageDTO] = []
+
+            if board_id:
+                image_dtos = self._board_handler(board_id)
+            elif image_names:
+                image_dtos = self._image_handler(image_names)
+            else:
+                raise BulkDownloadParametersException()
+
+            entries = [
+                ZipStreamEntry.from_path(
+                    arcname=(Path(image_dto.image_category.value) / image_dto.image_name).as_posix(),
+                    path=Path(self._invoker.services.images.get_path(image_dto.image_name)),
+                    compute_crc32=resumable,
+                )
+                for image_dto in image_dtos
+            ]
+            zip_stream = ZipStream(entries)
+            if resumable:
+                manifest = BulkDownloadManifest(entries=entries)
+                self._get_manifest_path(bulk_download_item_name).write_text(manifest.model_dump_json())
+            return zip_stream
+        except Exception as e:
+            self._signal_job_started(bulk_download_id, bulk_download_item_id, bulk_download_item_name, streamed=True)
+            self._signal_job_failed(bulk_download_id, bulk_download_item_id, bulk_download_item_name, e, streamed=True)
+            raise
+
+    def get_stream(self, bulk_download_item_name: str) -> ZipStream:
+        manifest_path = self._get_manifest_path(bulk_download_item_name)
+        try:
+            manifest = BulkDownloadManifest.model_validate_json(manifest_path.read_text())
+        except (OSError, ValidationError) as e:
+            raise BulkDownloadTargetException() from e
+        if not all(entry.is_unchanged() for entry in manifest.entries):
+            raise BulkDownloadChangedException()
+        return ZipStream(manifest.entries)
+
+    def iter_stream(
+        self, zip_stream: ZipStream, bulk_download_item_name: str, start: int = 0, end: Optional[int] = None
+    ) -> Iterator[bytes]:
+        bulk_download_id: str = DEFAULT_BULK_DOWNLOAD_ID
+        bulk_download_item_id = bulk_download_item_name.removesuffix(".zip")
+        reaches_end = end is None or end >= zip_stream.size
+
+        with self._stream_events_lock:
+            is_first_request = bulk_download_item_name not in self._started_streams
+            self._started_streams.add(bulk_download_item_name)
+        if is_first_request:
+            self._signal_job_started(bulk_download_id, bulk_download_item_id, bulk_download_item_name, streamed=True)
+
+        try:
+            yield from zip_stream.iter_bytes(start, end)
+        except GeneratorExit:
+            # The client disconnected or paused the download. This isn't an error, and a resumable download can be
+            # continued from where it stopped.
+            self._invoker.services.logger.debug(f"Bulk download stream {bulk_download_item_name} was interrupted.")
+            raise
+        except BulkDownloadException as e:
+            self._signal_job_failed(bulk_download_id, bulk_download_item_id, bulk_download_item_name, e, streamed=True)
+            raise
+        except Exception as e:
+            self._signal_job_failed(bulk_download_id, bulk_download_item_id, bulk_download_item_name, e, streamed=True)
+            self._invoker.services.logger.error("Problem streaming bulk download.")
+            raise e
+
+        if reaches_end:
+            # The whole archive has been sent, so it doesn't need to be resumed.
+            with self._stream_events_lock:
+                is_first_completion = bulk_download_item_name in self._started_streams
+                self._started_streams.discard(bulk_download_item_name)
+                self._get_manifest_path(bulk_download_item_name).unlink(missing_ok=True)
+            if is_first_completion:
+                self._signal_job_completed(
+                    bulk_download_id, bulk_download_item_id, bulk_download_item_name, streamed=True
+                )
+
+    def _get_manifest_path(self, bulk_download_item_name: str) -> Path:
+        if Path(bulk_download_item_name).name != bulk_download_item_name:
+            raise BulkDownloadTargetException()
+        return self._bulk_downloads_folder / (Path(bulk_download_item_name).stem + ".manifest.json")
+
     def _image_handler(self, image_names: list[str]) -> list[ImageDTO]:
         return [self._invoker.services.images.get_dto(image_name) for image_name in image_names]
 
@@ -99,38 +205,48 @@ class BulkDownloadService(BulkDownloadBase):
         return "".join([c for c in s if c.isalpha() or c.isdigit() or c == " " or c == "_" or c == "-"]).rstrip()
 
     def _signal_job_started(
-        self, bulk_download_id: str, bulk_download_item_id: str, bulk_download_item_name: str
+        self, bulk_download_id: str, bulk_download_item_id: str, bulk_download_item_name: str, streamed: bool = False
     ) -> None:
         """Signal that a bulk download job has started."""
         if self._invoker:
             assert bulk_download_id is not None
             self._invoker.services.events.emit_bulk_download_started(
-                bulk_download_id, bulk_download_item_id, bulk_download_item_name
+                bulk_download_id, bulk_download_item_id, bulk_download_item_name, streamed
             )
 
     def _signal_job_completed(
-        self, bulk_download_id: str, bulk_download_item_id: str, bulk_download_item_name: str
+        self, bulk_download_id: str, bulk_download_item_id: str, bulk_download_item_name: str, streamed: bool = False
     ) -> None:
         """Signal that a bulk download job has completed."""
         if self._invoker:
             assert bulk_download_id is not None
             assert bulk_download_item_name is not None
             self._invoker.services.events.emit_bulk_download_complete(
-                bulk_download_id, bulk_download_item_id, bulk_download_item_name
+                bulk_download_id, bulk_download_item_id, bulk_download_item_name, streamed
             )
 
     def _signal_job_failed(
-        self, bulk_download_id: str, bulk_download_item_id: str, bulk_download_item_name: str, exception: Exception
+        self,
+        bulk_download_id: str,
+        bulk_download_item_id: str,
+        bulk_download_item_name: str,
+        exception: Exception,
+        streamed: bool = False,
     ) -> None:
         """Signal that a bulk download job has failed."""
         if self._invoker:
             assert bulk_download_id is not None
             assert exception is not None
             self._invoker.services.events.emit_bulk_download_error(
-                bulk_download_id, bulk_download_item_id, bulk_download_item_name, str(exception)
+                bulk_download_id, bulk_download_item_id, bulk_download_item_name, str(exception), streamed
             )
 
     def stop(self, *args, **kwargs):
+        # The manifests of downloads that were never completed can't be resumed once the service stops.
+        with self._stream_events_lock:
+            self._started_streams.clear()
+            for manifest_path in self._bulk_downloads_folder.glob("*.manifest.json"):
+                manifest_path.unlink(missing_ok=True)
         self._temp_directory.cleanup()
 
     def delete(self, bulk_download_item_name: str) -> None:
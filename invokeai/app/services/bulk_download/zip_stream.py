@@ -0,0 +1,293 @@
+import hashlib
+import struct
+import time
+import zlib
+from pathlib import Path
+from typing import Generator, Iterator, Optional
+
+from pydantic import BaseModel, Field
+
+from invokeai.app.services.bulk_download.bulk_download_common import BulkDownloadException
+
+# The size of the chunks that files are read in.
+CHUNK_SIZE = 2**20
+
+_LOCAL_FILE_HEADER = struct.Struct("<IHHHHHIIIHH")
+_DATA_DESCRIPTOR = struct.Struct("<IIII")
+_CENTRAL_DIRECTORY_HEADER = struct.Struct("<IHHHHHHIIIHHHHHII")
+_ZIP64_OFFSET_EXTRA = struct.Struct("<HHQ")
+_ZIP64_END_OF_CENTRAL_DIRECTORY = struct.Struct("<IQHHIIQQQQ")
+_ZIP64_END_OF_CENTRAL_DIRECTORY_LOCATOR = struct.Struct("<IIQI")
+_END_OF_CENTRAL_DIRECTORY = struct.Struct("<IHHHHIIH")
+
+_UINT16_MAX = 0xFFFF
+_UINT32_MAX = 0xFFFFFFFF
+
+# General purpose flags.
+_FLAG_DATA_DESCRIPTOR = 0x08
+_FLAG_UTF8 = 0x800
+
+# The versions needed to extract (2.0 for stored entries, 4.5 for zip64).
+_VERSION = 20
+_VERSION_ZIP64 = 45
+# Made by a Unix host, so that the external attributes are the file's mode.
+_VERSION_MADE_BY = (3 << 8) | _VERSION_ZIP64
+_EXTERNAL_ATTRIBUTES = 0o100644 << 16
+
+
+class ZipStreamEntry(BaseModel):
+    """A file to add to a zip stream."""
+
+    arcname: str = Field(description="The name of the file in the archive.")
+    path: Path = Field(description="The path of the file on disk.")
+    size: int = Field(description="The size of the file in bytes.")
+    mtime: float = Field(description="The modification time of the file.")
+    crc32: Optional[int] = Field(default=None, description="The CRC-32 of the file, if it has been computed.")
+
+    @classmethod
+    def from_path(cls, arcname: str, path: Path, compute_crc32: bool = False) -> "ZipStreamEntry":
+        stat = path.stat()
+        crc32 = None
+        if compute_crc32:
+            crc32 = 0
+            with open(path, "rb") as file:
+                while chunk := file.read(CHUNK_SIZE):
+                    crc32 = zlib.crc32(chunk, crc32)
+        return cls(arcname=arcname, path=path, size=stat.st_size, mtime=stat.st_mtime, crc32=crc32)
+
+    def is_unchanged(self) -> bool:
+        """Whether the file on disk still has the size and modification time of the entry."""
+        try:
+            stat = self.path.stat()
+        except OSError:
+            return False
+        return stat.st_size == self.size and stat.st_mtime == self.mtime
+
+
+class ZipStream:
+    """A zip archive that is built as it is read, without writing it to disk.
+
+    The files are stored without compression. This is what images need, as PNG and WEBP data is already compressed, and
+    it makes the layout of the archive known up front:
+    - The size of the archive is known before any file is read.
+    - If the CRC-32 of every entry is known (e.g. from a manifest of an earlier stream), any byte range of the archive
+        can be produced without reading the files before it, so interrupted downloads can be resumed.
+    - Otherwise, the CRC-32 of each file is computed as it is streamed, and written after the file in a data descriptor.
+
+    Archives larger than 4GB use zip64 offsets. The files themselves must be smaller than 4GB.
+    """
+
+    def __init__(self, entries: list[ZipStreamEntry]):
+        for entry in entries:
+            if entry.size >= _UINT32_MAX:
+                raise BulkDownloadException(f"{entry.arcname} is too large to be added to the archive.")
+        self._entries = entries
+        self._use_data_descriptors = any(entry.crc32 is None for entry in entries)
+
+        self._local_header_offsets: list[int] = []
+        offset = 0
+        for entry in entries:
+            self._local_header_offsets.append(offset)
+            offset += len(self._local_file_header(entry)) + entry.size
+            if self._use_data_descriptors:
+                offset += _DATA_DESCRIPTOR.size
+        self._central_directory_offset = offset
+        # The size of the central directory doesn't depend on the CRCs, which may not be known yet.
+        self._size = offset + len(self._central_directory([0] * len(entries)))
+
+    @property
+    def size(self) -> int:
+        """The size of the archive in bytes."""
+        return self._size
+
+    @property
+    def supports_ranges(self) -> bool:
+        """Whether `iter_bytes()` can start at any offset, i.e. whether the CRC-32 of every entry is known."""
+        return not self._use_data_descriptors
+
+    @property
+    def etag(self) -> Optional[str]:
+        """A validator of the archive's contents for ranged requests, if it supports them."""
+        if not self.supports_ranges:
+            return None
+        digest = hashlib.sha256()
+        for entry in self._entries:
+            digest.update(f"{entry.arcname}\0{entry.size}\0{entry.mtime}\0{entry.crc32}\0".encode("utf-8"))
+        return f'"{digest.hexdigest()[:32]}"'
+
+    @property
+    def entries(self) -> list[ZipStreamEntry]:
+        return self._entries
+
+    def iter_bytes(self, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        """Yield the bytes of the archive in the range [start, end).
+
+        Raises:
+            ValueError: If the range is not the whole archive, but `supports_ranges` is False.
+            BulkDownloadException: If a file changed since its entry was created.
+        """
+        end = self._size if end is None else min(end, self._size)
+        if (start > 0 or end < self._size) and not self.supports_ranges:
+            raise ValueError("Streaming a byte range of an archive requires the CRC-32 of every entry.")
+
+        crc32s: list[int] = []
+        for entry, offset in zip(self._entries, self._local_header_offsets, strict=True):
+            local_file_header = self._local_file_header(entry)
+            data_offset = offset + len(local_file_header)
+            yield from _clip(local_file_header, offset, start, end)
+
+            crc32: Optional[int]
+            if data_offset + entry.size > start and data_offset < end:
+                crc32 = yield from self._iter_file(
+                    entry, max(start - data_offset, 0), min(end - data_offset, entry.size)
+                )
+            else:
+                crc32 = entry.crc32
+            assert crc32 is not None
+            crc32s.append(crc32)
+
+            if self._use_data_descriptors:
+                data_descriptor = _DATA_DESCRIPTOR.pack(0x08074B50, crc32, entry.size, entry.size)
+                yield from _clip(data_descriptor, data_offset + entry.size, start, end)
+
+        yield from _clip(self._central_directory(crc32s), self._central_directory_offset, start, end)
+
+    def _iter_file(self, entry: ZipStreamEntry, start: int, end: int) -> Generator[bytes, None, int]:
+        """Yield the bytes [start, end) of a file, and return its CRC-32.
+
+        The CRC-32 is checked against the entry's if the whole file is read, and computed if the entry has none.
+        """
+        whole_file = start == 0 and end == entry.size
+        crc32 = 0
+        with open(entry.path, "rb") as file:
+            file.seek(start)
+            remaining = end - start
+            while remaining > 0:
+                chunk = file.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    raise BulkDownloadException(f"{entry.arcname} changed while it was being downloaded.")
+                remaining -= len(chunk)
+                if whole_file:
+                    crc32 = zlib.crc32(chunk, crc32)
+                yield chunk
+
+        if not whole_file:
+            assert entry.crc32 is not None
+            return entry.crc32
+        if entry.crc32 is not None and crc32 != entry.crc32:
+            raise BulkDownloadException(f"{entry.arcname} changed while it was being downloaded.")
+        return crc32
+
+    def _local_file_header(self, entry: ZipStreamEntry) -> bytes:
+        name = entry.arcname.encode("utf-8")
+        mod_time, mod_date = _dos_date_time(entry.mtime)
+        crc32 = 0 if self._use_data_descriptors or entry.crc32 is None else entry.crc32
+        return (
+            _LOCAL_FILE_HEADER.pack(
+                0x04034B50,
+                _VERSION,
+                self._flags(entry),
+                0,  # Stored, without compression.
+                mod_time,
+                mod_date,
+                crc32,
+                entry.size,
+                entry.size,
+                len(name),
+                0,
+            )
+            + name
+        )
+
+    def _central_directory(self, crc32s: list[int]) -> bytes:
+        records: list[bytes] = []
+        for entry, offset, crc32 in zip(self._entries, self._local_header_offsets, crc32s, strict=True):
+            name = entry.arcname.encode("utf-8")
+            mod_time, mod_date = _dos_date_time(entry.mtime)
+            extra = b""
+            if offset >= _UINT32_MAX:
+                extra = _ZIP64_OFFSET_EXTRA.pack(0x0001, 8, offset)
+            records.append(
+                _CENTRAL_DIRECTORY_HEADER.pack(
+                    0x02014B50,
+                    _VERSION_MADE_BY,
+                    _VERSION_ZIP64 if extra else _VERSION,
+                    self._flags(entry),
+                    0,
+                    mod_time,
+                    mod_date,
+                    crc32,
+                    entry.size,
+                    entry.size,
+                    len(name),
+                    len(extra),
+                    0,  # Comment length.
+                    0,  # Disk number.
+                    0,  # Internal attributes.
+                    _EXTERNAL_ATTRIBUTES,
+                    min(offset, _UINT32_MAX),
+                )
+                + name
+                + extra
+            )
+        central_directory = b"".join(records)
+
+        num_entries = len(self._entries)
+        central_directory_size = len(central_directory)
+        central_directory_offset = self._central_directory_offset
+        if (
+            num_entries >= _UINT16_MAX
+            or central_directory_size >= _UINT32_MAX
+            or central_directory_offset >= _UINT32_MAX
+        ):
+            zip64_end_of_central_directory_offset = central_directory_offset + central_directory_size
+            central_directory += _ZIP64_END_OF_CENTRAL_DIRECTORY.pack(
+                0x06064B50,
+                _ZIP64_END_OF_CENTRAL_DIRECTORY.size - 12,
+                _VERSION_MADE_BY,
+                _VERSION_ZIP64,
+                0,
+                0,
+                num_entries,
+                num_entries,
+                central_directory_size,
+                central_directory_offset,
+            )
+            central_directory += _ZIP64_END_OF_CENTRAL_DIRECTORY_LOCATOR.pack(
+                0x07064B50, 0, zip64_end_of_central_directory_offset, 1
+            )
+        central_directory += _END_OF_CENTRAL_DIRECTORY.pack(
+            0x06054B50,
+            0,
+            0,
+            min(num_entries, _UINT16_MAX),
+            min(num_entries, _UINT16_MAX),
+            min(central_directory_size, _UINT32_MAX),
+            min(central_directory_offset, _UINT32_MAX),
+            0,
+        )
+        return central_directory
+
+    def _flags(self, entry: ZipStreamEntry) -> int:
+        flags = _FLAG_DATA_DESCRIPTOR if self._use_data_descriptors else 0
+        if not entry.arcname.isascii():
+            flags |= _FLAG_UTF8
+        return flags
+
+
+def _clip(data: bytes, offset: int, start: int, end: int) -> Iterator[bytes]:
+    """Yield the part of `data`, which is at `offset` in the archive, that is in the range [start, end)."""
+    data_start = max(start - offset, 0)
+    data_end = min(end - offset, len(data))
+    if data_start < data_end:
+        yield data[data_start:data_end]
+
+
+def _dos_date_time(mtime: float) -> tuple[int, int]:
+    """Convert a timestamp to the MS-DOS time and date used by zip files."""
+    t = time.localtime(mtime)
+    if t.tm_year < 1980:
+        return 0, (1 << 5) | 1
+    return (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2), ((t.tm_year - 1980) << 9) | (
+        t.tm_mon << 5
+    ) | t.tm_mday
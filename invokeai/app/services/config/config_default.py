@@ -30,6 +30,7 @@ ATTENTION_TYPE = Literal["auto", "normal", "xformers", "sliced", "torch-sdp"]
 ATTENTION_SLICE_SIZE = Literal["auto", "balanced", "max", 1, 2, 3, 4, 5, 6, 7, 8]
 LOG_FORMAT = Literal["plain", "color", "syslog", "legacy"]
 LOG_LEVEL = Literal["debug", "info", "warning", "error", "critical"]
+SESSION_PROCESSOR_MODE = Literal["thread", "process"]
 CONFIG_SCHEMA_VERSION = "4.0.2"
 
 
@@ -67,6 +68,7 @@ class InvokeAIAppConfig(BaseSettings):
         models_dir: Path to the models directory.
         convert_cache_dir: Path to the converted models cache directory (DEPRECATED, but do not delete because it is needed for migration from previous versions).
         download_cache_dir: Path to the directory that contains dynamically downloaded models.
+        prepared_weights_cache_dir: Path to the directory that caches the converted weights of single-file models.
         legacy_conf_dir: Path to directory of legacy checkpoint config files.
         db_dir: Path to InvokeAI databases directory.
         outputs_dir: Path to directory for outputs.
@@ -88,6 +90,9 @@ class InvokeAIAppConfig(BaseSettings):
         device_working_mem_gb: The amount of working memory to keep available on the compute device (in GB). Has no effect if running on CPU. If you are experiencing OOM errors, try increasing this value.
         enable_partial_loading: Enable partial loading of models. This enables models to run with reduced VRAM requirements (at the cost of slower speed) by streaming the model from RAM to VRAM as its used. In some edge cases, partial loading can cause models to run more slowly if they were previously being fully loaded into VRAM.
         keep_ram_copy_of_weights: Whether to keep a full RAM copy of a model's weights when the model is loaded in VRAM. Keeping a RAM copy increases average RAM usage, but speeds up model switching and LoRA patching (assuming there is sufficient RAM). Set this to False if RAM pressure is consistently high.
+        cache_patched_weights: Whether to keep the weights of models patched with LoRAs in the free RAM of the model cache. Repeated generations with the same model and LoRA weights then copy the cached weights instead of patching the model again. Only applies to models that are fully loaded onto the compute device.
+        dequantized_weights_cache_gb: The maximum memory to use for caching the dequantized weights of GGUF-quantized models, in GB. Without the cache, every layer is dequantized again on every denoising step. The cached weights are kept on the execution device, and the weights that are used most often relative to their size are kept when the cache is full. Set to 0 to disable the cache.
+        prepared_weights_cache_gb: The maximum disk space to use for caching the converted weights of single-file (checkpoint) models, in GB. Cached weights are loaded without converting them again. The least recently used weights are evicted when the cache is full. Set to 0 to disable the cache.
         ram: DEPRECATED: This setting is no longer used. It has been replaced by `max_cache_ram_gb`, but most users will not need to use this config since automatic cache size limits should work well in most cases. This config setting will be removed once the new model cache behavior is stable.
         vram: DEPRECATED: This setting is no longer used. It has been replaced by `max_cache_vram_gb`, but most users will not need to use this config since automatic cache size limits should work well in most cases. This config setting will be removed once the new model cache behavior is stable.
         lazy_offload: DEPRECATED: This setting is no longer used. Lazy-offloading is enabled by default. This config setting will be removed once the new model cache behavior is stable.
@@ -100,10 +105,18 @@ class InvokeAIAppConfig(BaseSettings):
         pil_compress_level: The compress_level setting of PIL.Image.save(), used for PNG encoding. All settings are lossless. 0 = no compression, 1 = fastest with slightly larger filesize, 9 = slowest with smallest filesize. 1 is typically the best setting.
         max_queue_size: Maximum number of items in the session queue.
         clear_queue_on_startup: Empties session queue on startup.
+        queue_history_keep_items: Number of the most recent finished (completed, failed or canceled) queue items to keep in full. Older finished items are archived to a summary row in the background, once they are also older than `queue_history_keep_days`.
+        queue_history_keep_days: Number of days to keep finished queue items in full. Older finished items are archived to a summary row in the background, unless they are among the last `queue_history_keep_items` items.
+        session_processor_workers: Number of queue items to process concurrently. Each worker runs one session at a time. Increasing this can improve throughput on CPU-only hosts with many cores, or on hosts with multiple GPUs (see `session_processor_devices`).
+        session_processor_devices: Execution devices to assign to the session processor workers, e.g. `["cuda:0", "cuda:1"]`. Devices are assigned to workers in order, wrapping around if there are more workers than devices. Each device gets its own model cache, sharing `max_cache_ram_gb` if it is set. Omit to run all workers on `device`.
+        session_processor_mode: How session processor workers run sessions. `thread` runs sessions in the API process. `process` runs each worker's sessions in its own worker process, with its own model cache, so that generation does not add latency to the API. Each worker process loads its own copy of the models it uses.<br>Valid values: `thread`, `process`
+        denoise_batch_size: Maximum number of compatible denoise nodes from different queue items to run as a single batch. Nodes are compatible if they use the same model, LoRAs, resolution and step schedule. Each queue item runs on its own worker, so this needs `session_processor_workers` > 1 and the `thread` session processor mode. FLUX denoising without ControlNets or IP-Adapters, and SD denoising without ControlNets, T2I-Adapters, IP-Adapters, regional prompts, inpainting or the step cache, are batched. 1 disables batching.
+        denoise_batch_wait: How long, in seconds, a denoise node waits for compatible nodes from other workers to join its batch.
         allow_nodes: List of nodes to allow. Omit to allow all.
         deny_nodes: List of nodes to deny. Omit to deny none.
         node_cache_size: How many cached nodes to keep in memory.
         hashing_algorithm: Model hashing algorthim for model installs. 'blake3_multi' is best for SSDs. 'blake3_single' is best for spinning disk HDDs. 'random' disables hashing, instead assigning a UUID to models. Useful when using a memory db to reduce model installation time, or if you don't care about storing stable hashes for models. Alternatively, any other hashlib algorithm is accepted, though these are not nearly as performant as blake3.<br>Valid values: `blake3_multi`, `blake3_single`, `random`, `md5`, `sha1`, `sha224`, `sha256`, `sha384`, `sha512`, `blake2b`, `blake2s`, `sha3_224`, `sha3_256`, `sha3_384`, `sha3_512`, `shake_128`, `shake_256`
+        download_segments: The maximum number of byte ranges a file is downloaded in concurrently, from servers that support range requests. Each range is at least 16MB, so small files are downloaded in one request. 1 disables segmented downloads.
         remote_api_tokens: List of regular expression and token pairs used when downloading models from URLs. The download URL is tested against the regex, and if it matches, the token is provided in as a Bearer token.
         scan_models_on_startup: Scan the models directory on startup, registering orphaned models. This is typically only used in conjunction with `use_memory_db` for testing purposes.
     """
@@ -136,6 +149,7 @@ class InvokeAIAppConfig(BaseSettings):
     models_dir:                    Path = Field(default=Path("models"),     description="Path to the models directory.")
     convert_cache_dir:             Path = Field(default=Path("models/.convert_cache"), description="Path to the converted models cache directory (DEPRECATED, but do not delete because it is needed for migration from previous versions).")
     download_cache_dir:            Path = Field(default=Path("models/.download_cache"), description="Path to the directory that contains dynamically downloaded models.")
+    prepared_weights_cache_dir:    Path = Field(default=Path("models/.prepared_weights_cache"), description="Path to the directory that caches the converted weights of single-file models.")
     legacy_conf_dir:               Path = Field(default=Path("configs"), description="Path to directory of legacy checkpoint config files.")
     db_dir:                        Path = Field(default=Path("databases"),  description="Path to InvokeAI databases directory.")
     outputs_dir:                   Path = Field(default=Path("outputs"),    description="Path to directory for outputs.")
@@ -164,6 +178,9 @@ class InvokeAIAppConfig(BaseSettings):
     device_working_mem_gb:        float = Field(default=3,                  description="The amount of working memory to keep available on the compute device (in GB). Has no effect if running on CPU. If you are experiencing OOM errors, try increasing this value.")
     enable_partial_loading:        bool = Field(default=False,              description="Enable partial loading of models. This enables models to run with reduced VRAM requirements (at the cost of slower speed) by streaming the model from RAM to VRAM as its used. In some edge cases, partial loading can cause models to run more slowly if they were previously being fully loaded into VRAM.")
     keep_ram_copy_of_weights:      bool = Field(default=True,              description="Whether to keep a full RAM copy of a model's weights when the model is loaded in VRAM. Keeping a RAM copy increases average RAM usage, but speeds up model switching and LoRA patching (assuming there is sufficient RAM). Set this to False if RAM pressure is consistently high.")
+    cache_patched_weights:         bool = Field(default=False,              description="Whether to keep the weights of models patched with LoRAs in the free RAM of the model cache. Repeated generations with the same model and LoRA weights then copy the cached weights instead of patching the model again. Only applies to models that are fully loaded onto the compute device.")
+    dequantized_weights_cache_gb: float = Field(default=0, ge=0,            description="The maximum memory to use for caching the dequantized weights of GGUF-quantized models, in GB. Without the cache, every layer is dequantized again on every denoising step. The cached weights are kept on the execution device, and the weights that are used most often relative to their size are kept when the cache is full. Set to 0 to disable the cache.")
+    prepared_weights_cache_gb:    float = Field(default=0, ge=0,            description="The maximum disk space to use for caching the converted weights of single-file (checkpoint) models, in GB. Cached weights are loaded without converting them again. The least recently used weights are evicted when the cache is full. Set to 0 to disable the cache.")
     # Deprecated CACHE configs
     ram:                Optional[float] = Field(default=None, gt=0,         description="DEPRECATED: This setting is no longer used. It has been replaced by `max_cache_ram_gb`, but most users will not need to use this config since automatic cache size limits should work well in most cases. This config setting will be removed once the new model cache behavior is stable.")
     vram:               Optional[float] = Field(default=None, ge=0,         description="DEPRECATED: This setting is no longer used. It has been replaced by `max_cache_vram_gb`, but most users will not need to use this config since automatic cache size limits should work well in most cases. This config setting will be removed once the new model cache behavior is stable.")
@@ -181,6 +198,13 @@ class InvokeAIAppConfig(BaseSettings):
     pil_compress_level:             int = Field(default=1,                  description="The compress_level setting of PIL.Image.save(), used for PNG encoding. All settings are lossless. 0 = no compression, 1 = fastest with slightly larger filesize, 9 = slowest with smallest filesize. 1 is typically the best setting.")
     max_queue_size:                 int = Field(default=10000, gt=0,        description="Maximum number of items in the session queue.")
     clear_queue_on_startup:        bool = Field(default=False,              description="Empties session queue on startup.")
+    queue_history_keep_items:       int = Field(default=1000, ge=0,         description="Number of the most recent finished (completed, failed or canceled) queue items to keep in full. Older finished items are archived to a summary row in the background, once they are also older than `queue_history_keep_days`.")
+    queue_history_keep_days:      float = Field(default=7, ge=0,            description="Number of days to keep finished queue items in full. Older finished items are archived to a summary row in the background, unless they are among the last `queue_history_keep_items` items.")
+    session_processor_workers:      int = Field(default=1, ge=1,            description="Number of queue items to process concurrently. Each worker runs one session at a time. Increasing this can improve throughput on CPU-only hosts with many cores, or on hosts with multiple GPUs (see `session_processor_devices`).")
+    session_processor_devices: Optional[list[str]] = Field(default=None,    description="Execution devices to assign to the session processor workers, e.g. `[\"cuda:0\", \"cuda:1\"]`. Devices are assigned to workers in order, wrapping around if there are more workers than devices. Each device gets its own model cache, sharing `max_cache_ram_gb` if it is set. Omit to run all workers on `device`.")
+    session_processor_mode: SESSION_PROCESSOR_MODE = Field(default="thread", description="How session processor workers run sessions. `thread` runs sessions in the API process. `process` runs each worker's sessions in its own worker process, with its own model cache, so that generation does not add latency to the API. Each worker process loads its own copy of the models it uses.")
+    denoise_batch_size:             int = Field(default=1, ge=1,            description="Maximum number of compatible denoise nodes from different queue items to run as a single batch. Nodes are compatible if they use the same model, LoRAs, resolution and step schedule. Each queue item runs on its own worker, so this needs `session_processor_workers` > 1 and the `thread` session processor mode. FLUX denoising without ControlNets or IP-Adapters, and SD denoising without ControlNets, T2I-Adapters, IP-Adapters, regional prompts, inpainting or the step cache, are batched. 1 disables batching.")
+    denoise_batch_wait:           float = Field(default=0.1, ge=0,          description="How long, in seconds, a denoise node waits for compatible nodes from other workers to join its batch.")
 
     # NODES
     allow_nodes:    Optional[list[str]] = Field(default=None,               description="List of nodes to allow. Omit to allow all.")
@@ -189,6 +213,7 @@ class InvokeAIAppConfig(BaseSettings):
 
     # MODEL INSTALL
     hashing_algorithm: HASHING_ALGORITHMS = Field(default="blake3_single",  description="Model hashing algorthim for model installs. 'blake3_multi' is best for SSDs. 'blake3_single' is best for spinning disk HDDs. 'random' disables hashing, instead assigning a UUID to models. Useful when using a memory db to reduce model installation time, or if you don't care about storing stable hashes for models. Alternatively, any other hashlib algorithm is accepted, though these are not nearly as performant as blake3.")
+    download_segments:              int = Field(default=1, ge=1,            description="The maximum number of byte ranges a file is downloaded in concurrently, from servers that support range requests. Each range is at least 16MB, so small files are downloaded in one request. 1 disables segmented downloads.")
     remote_api_tokens: Optional[list[URLRegexTokenPair]] = Field(default=None, description="List of regular expression and token pairs used when downloading models from URLs. The download URL is tested against the regex, and if it matches, the token is provided in as a Bearer token.")
     scan_models_on_startup:        bool = Field(default=False,              description="Scan the models directory on startup, registering orphaned models. This is typically only used in conjunction with `use_memory_db` for testing purposes.")
 
@@ -310,6 +335,11 @@ class InvokeAIAppConfig(BaseSettings):
         """Path to the downloaded models directory, resolved to an absolute path.."""
         return self._resolve(self.download_cache_dir)
 
+    @property
+    def prepared_weights_cache_path(self) -> Path:
+        """Path to the prepared weights cache directory, resolved to an absolute path.."""
+        return self._resolve(self.prepared_weights_cache_dir)
+
     @property
     def custom_nodes_path(self) -> Path:
         """Path to the custom nodes directory, resolved to an absolute path.."""
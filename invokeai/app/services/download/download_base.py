@@ -27,6 +27,10 @@ class DownloadJobCancelledException(Exception):
     """This exception is raised when a download job is cancelled."""
 
 
+class DownloadFileChangedException(Exception):
+    """This exception is raised when the remote file changes while it is being downloaded."""
+
+
 class UnknownJobIDException(Exception):
     """This exception is raised when an invalid job id is referened."""
 
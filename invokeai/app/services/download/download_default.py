@@ -6,9 +6,10 @@ import re
 import threading
 import time
 import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from queue import Empty, PriorityQueue
-from typing import TYPE_CHECKING, Any, Dict, List, Literal, Optional, Set
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Literal, Optional, Set
 
 import requests
 from pydantic.networks import AnyHttpUrl
@@ -19,6 +20,7 @@ from invokeai.app.services.config import InvokeAIAppConfig, get_config
 from invokeai.app.services.download.download_base import (
     DownloadEventHandler,
     DownloadExceptionHandler,
+    DownloadFileChangedException,
     DownloadJob,
     DownloadJobBase,
     DownloadJobCancelledException,
@@ -38,6 +40,12 @@ if TYPE_CHECKING:
 # Maximum number of bytes to download during each call to requests.iter_content()
 DOWNLOAD_CHUNK_SIZE = 100000
 
+# Minimum size of each byte range of a segmented download
+SEGMENT_MIN_SIZE = 16 * 2**20
+
+# Number of times a byte range is requested again after an error, before the download fails
+SEGMENT_MAX_RETRIES = 3
+
 
 class DownloadQueueService(DownloadQueueServiceBase):
     """Class for queued download of models."""
@@ -361,6 +369,14 @@ class DownloadQueueService(DownloadQueueServiceBase):
         elif resp.status_code != 200:
             raise HTTPError(resp.reason)
 
+        num_segments = self._get_num_segments(resp, content_length)
+        if num_segments > 1:
+            self._logger.debug(f"{job.source}: Downloading {job.download_path} in {num_segments} segments")
+            self._download_segments(job, resp, header, in_progress_path, num_segments)
+            self._logger.debug(f"{job.source}: saved to {job.download_path} (bytes={job.bytes})")
+            in_progress_path.rename(job.download_path)
+            return
+
         self._logger.debug(f"{job.source}: Downloading {job.download_path}")
         report_delta = job.total_bytes / 100  # report every 1% change
         last_report_bytes = 0
@@ -380,6 +396,141 @@ class DownloadQueueService(DownloadQueueServiceBase):
         self._logger.debug(f"{job.source}: saved to {job.download_path} (bytes={job.bytes})")
         in_progress_path.rename(job.download_path)
 
+    def _get_num_segments(self, resp: requests.Response, content_length: int) -> int:
+        """
+        Get the number of byte ranges to download a file in.
+
+        Files are only segmented if the server supports range requests, and the content is not encoded (so that the
+        ranges are of the file itself).
+        """
+        if (
+            resp.status_code != 200
+            or resp.headers.get("Accept-Ranges", "").lower() != "bytes"
+            or resp.headers.get("Content-Encoding", "identity").lower() != "identity"
+        ):
+            return 1
+        return max(1, min(self._app_config.download_segments, content_length // SEGMENT_MIN_SIZE))
+
+    def _download_segments(
+        self,
+        job: DownloadJob,
+        resp: requests.Response,
+        header: Dict[str, str],
+        in_progress_path: Path,
+        num_segments: int,
+    ) -> None:
+        """
+        Download a file in byte ranges concurrently.
+
+        The file is preallocated, and each range is written at its offset as it arrives. The response to the initial
+        request is used for the first range, so that its bytes aren't requested twice. A range that fails is requested
+        again from where it stopped, without restarting the other ranges. Progress is reported for the whole file.
+        """
+        total_bytes = job.total_bytes
+        boundaries = [total_bytes * i // num_segments for i in range(num_segments + 1)]
+        # Every range must be of the same version of the file as the initial response.
+        validator = resp.headers.get("ETag") or resp.headers.get("Last-Modified")
+        report_delta = total_bytes / 100  # report every 1% change
+        last_report_bytes = 0
+        progress_lock = threading.Lock()
+        stop_event = threading.Event()
+
+        def on_progress(num_bytes: int) -> None:
+            nonlocal last_report_bytes
+            with progress_lock:
+                job.bytes += num_bytes
+                if (job.bytes - last_report_bytes >= report_delta) or (job.bytes >= total_bytes):
+                    last_report_bytes = job.bytes
+                    self._signal_job_progress(job)
+
+        # Truncating preallocates the file. On most filesystems, the file is sparse until the ranges are written.
+        with open(in_progress_path, "wb") as file:
+            file.truncate(total_bytes)
+
+        with ThreadPoolExecutor(max_workers=num_segments, thread_name_prefix="download_segment") as executor:
+            futures = [
+                executor.submit(
+                    self._download_segment,
+                    job,
+                    header,
+                    validator,
+                    in_progress_path,
+                    start,
+                    end,
+                    resp if start == 0 else None,
+                    on_progress,
+                    stop_event,
+                )
+                for start, end in zip(boundaries[:-1], boundaries[1:], strict=True)
+            ]
+            try:
+                for future in as_completed(futures):
+                    future.result()
+            finally:
+                # If a range failed, stop the others.
+                stop_event.set()
+
+    def _download_segment(
+        self,
+        job: DownloadJob,
+        header: Dict[str, str],
+        validator: Optional[str],
+        path: Path,
+        start: int,
+        end: int,
+        resp: Optional[requests.Response],
+        on_progress: Callable[[int], None],
+        stop_event: threading.Event,
+    ) -> None:
+        """Download the bytes [start, end) of a file and write them at their offset in the file at `path`."""
+        position = start
+        retries = 0
+        with open(path, "r+b") as file:
+            while position < end and not stop_event.is_set():
+                try:
+                    if resp is None:
+                        range_header = {**header, "Range": f"bytes={position}-{end - 1}"}
+                        if validator:
+                            range_header["If-Range"] = validator
+                        resp = self._requests.get(str(job.source), headers=range_header, stream=True)
+                        self._validate_segment_response(resp, position, end, job.total_bytes)
+
+                    file.seek(position)
+                    for data in resp.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                        if job.cancelled:
+                            raise DownloadJobCancelledException("Job was cancelled at caller's request")
+                        if stop_event.is_set():
+                            return
+                        # The initial response continues past the end of the first range.
+                        data = data[: end - position]
+                        position += file.write(data)
+                        on_progress(len(data))
+                        if position >= end:
+                            break
+                    if position < end:
+                        raise HTTPError(f"Connection closed after {position - start} of {end - start} bytes")
+                except requests.RequestException as excp:
+                    retries += 1
+                    if retries > SEGMENT_MAX_RETRIES:
+                        raise
+                    self._logger.warning(f"{job.source}: Retrying bytes {position}-{end - 1} after error: {excp}")
+                finally:
+                    if resp is not None:
+                        resp.close()
+                    resp = None
+
+    def _validate_segment_response(self, resp: requests.Response, start: int, end: int, total_bytes: int) -> None:
+        """Check that a response is the requested byte range of the file, and not all or another part of it."""
+        if not resp.ok:
+            raise HTTPError(resp.reason)
+        # If-Range makes the server send the whole file if it changed since the initial response. Requesting the range
+        # again would not help, so this fails the download.
+        if resp.status_code != 206:
+            raise DownloadFileChangedException("The file changed on the server during the download")
+        content_range = resp.headers.get("Content-Range", "")
+        if content_range != f"bytes {start}-{end - 1}/{total_bytes}":
+            raise HTTPError(f"Expected bytes {start}-{end - 1}/{total_bytes}, got Content-Range {content_range}")
+
     def _validate_filename(self, directory: str, filename: str) -> bool:
         pc_name_max = get_pc_name_max(directory)
         pc_path_max = get_pc_path_max(directory)
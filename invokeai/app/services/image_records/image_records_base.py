@@ -7,9 +7,10 @@ from invokeai.app.services.image_records.image_records_common import (
     ImageCategory,
     ImageRecord,
     ImageRecordChanges,
+    ImageRecordWithBoardId,
     ResourceOrigin,
 )
-from invokeai.app.services.shared.pagination import OffsetPaginatedResults
+from invokeai.app.services.shared.pagination import CursorPaginatedResults, OffsetPaginatedResults
 from invokeai.app.services.shared.sqlite.sqlite_common import SQLiteDirection
 
 
@@ -49,8 +50,47 @@ class ImageRecordStorageBase(ABC):
         is_intermediate: Optional[bool] = None,
         board_id: Optional[str] = None,
         search_term: Optional[str] = None,
-    ) -> OffsetPaginatedResults[ImageRecord]:
-        """Gets a page of image records."""
+    ) -> OffsetPaginatedResults[ImageRecordWithBoardId]:
+        """Gets a page of image records, with the id of the board each image belongs to."""
+        pass
+
+    @abstractmethod
+    def get_many_by_cursor(
+        self,
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        starred_first: bool = True,
+        order_dir: SQLiteDirection = SQLiteDirection.Descending,
+        image_origin: Optional[ResourceOrigin] = None,
+        categories: Optional[list[ImageCategory]] = None,
+        is_intermediate: Optional[bool] = None,
+        board_id: Optional[str] = None,
+        search_term: Optional[str] = None,
+    ) -> CursorPaginatedResults[ImageRecordWithBoardId]:
+        """
+        Gets the page of image records after the cursor, with the id of the board each image belongs to.
+
+        The cursor is the `next_cursor` of the previous page, which must have been listed with the same order and
+        filters. Raises a `ValueError` if the cursor is invalid.
+        """
+        pass
+
+    @abstractmethod
+    def search(
+        self,
+        query: str,
+        offset: int = 0,
+        limit: int = 10,
+        image_origin: Optional[ResourceOrigin] = None,
+        categories: Optional[list[ImageCategory]] = None,
+        is_intermediate: Optional[bool] = None,
+        board_id: Optional[str] = None,
+    ) -> OffsetPaginatedResults[ImageRecordWithBoardId]:
+        """
+        Searches image metadata, ranking the matches by relevance.
+
+        Double-quoted terms in the query are matched as phrases, and other terms as word prefixes. All terms must match.
+        """
         pass
 
     # TODO: The database has a nullable `deleted_at` column, currently unused.
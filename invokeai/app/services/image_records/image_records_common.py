@@ -172,6 +172,15 @@ class ImageRecordChanges(BaseModelExcludeNull, extra="allow"):
     """The image's new `starred` state."""
 
 
+class ImageRecordWithBoardId(ImageRecord):
+    """Deserialized image record without metadata, with the id of the board it belongs to."""
+
+    board_id: Optional[str] = Field(
+        default=None, description="The id of the board the image belongs to, if one exists."
+    )
+    """The id of the board the image belongs to, if one exists."""
+
+
 def deserialize_image_record(image_dict: dict) -> ImageRecord:
     """Deserializes an image record."""
 
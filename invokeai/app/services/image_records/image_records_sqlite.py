@@ -1,7 +1,6 @@
 import sqlite3
-import threading
 from datetime import datetime
-from typing import Optional, Union, cast
+from typing import Any, Optional, Union, cast
 
 from invokeai.app.invocations.fields import MetadataField, MetadataFieldValidator
 from invokeai.app.services.image_records.image_records_base import ImageRecordStorageBase
@@ -13,43 +12,53 @@ from invokeai.app.services.image_records.image_records_common import (
     ImageRecordDeleteException,
     ImageRecordNotFoundException,
     ImageRecordSaveException,
+    ImageRecordWithBoardId,
     ResourceOrigin,
     deserialize_image_record,
 )
-from invokeai.app.services.shared.pagination import OffsetPaginatedResults
-from invokeai.app.services.shared.sqlite.sqlite_common import SQLiteDirection
+from invokeai.app.services.shared.pagination import (
+    CursorPaginatedResults,
+    OffsetPaginatedResults,
+    decode_cursor,
+    encode_cursor,
+)
+from invokeai.app.services.shared.sqlite.sqlite_common import (
+    InstrumentedRLock,
+    SQLiteDirection,
+    VersionedCountCache,
+    build_fts_query,
+    build_keyset_condition,
+)
 from invokeai.app.services.shared.sqlite.sqlite_database import SqliteDatabase
 
 
 class SqliteImageRecordStorage(ImageRecordStorageBase):
     _conn: sqlite3.Connection
     _cursor: sqlite3.Cursor
-    _lock: threading.RLock
+    _lock: InstrumentedRLock
 
     def __init__(self, db: SqliteDatabase) -> None:
         super().__init__()
+        self._db = db
         self._lock = db.lock
         self._conn = db.conn
         self._cursor = self._conn.cursor()
+        self._counts = VersionedCountCache("images")
 
     def get(self, image_name: str) -> ImageRecord:
         try:
-            self._lock.acquire()
-
-            self._cursor.execute(
-                f"""--sql
-                SELECT {IMAGE_DTO_COLS} FROM images
-                WHERE image_name = ?;
-                """,
-                (image_name,),
-            )
+            with self._db.read() as cursor:
+                cursor.execute(
+                    f"""--sql
+                    SELECT {IMAGE_DTO_COLS} FROM images
+                    WHERE image_name = ?;
+                    """,
+                    (image_name,),
+                )
 
-            result = cast(Optional[sqlite3.Row], self._cursor.fetchone())
+                result = cast(Optional[sqlite3.Row], cursor.fetchone())
         except sqlite3.Error as e:
-            self._conn.rollback()
             raise ImageRecordNotFoundException from e
-        finally:
-            self._lock.release()
 
         if not result:
             raise ImageRecordNotFoundException
@@ -58,29 +67,25 @@ class SqliteImageRecordStorage(ImageRecordStorageBase):
 
     def get_metadata(self, image_name: str) -> Optional[MetadataField]:
         try:
-            self._lock.acquire()
-
-            self._cursor.execute(
-                """--sql
-                SELECT metadata FROM images
-                WHERE image_name = ?;
-                """,
-                (image_name,),
-            )
+            with self._db.read() as cursor:
+                cursor.execute(
+                    """--sql
+                    SELECT metadata FROM images
+                    WHERE image_name = ?;
+                    """,
+                    (image_name,),
+                )
 
-            result = cast(Optional[sqlite3.Row], self._cursor.fetchone())
+                result = cast(Optional[sqlite3.Row], cursor.fetchone())
 
-            if not result:
-                raise ImageRecordNotFoundException
+                if not result:
+                    raise ImageRecordNotFoundException
 
-            as_dict = dict(result)
-            metadata_raw = cast(Optional[str], as_dict.get("metadata", None))
-            return MetadataFieldValidator.validate_json(metadata_raw) if metadata_raw is not None else None
+                as_dict = dict(result)
+                metadata_raw = cast(Optional[str], as_dict.get("metadata", None))
+                return MetadataFieldValidator.validate_json(metadata_raw) if metadata_raw is not None else None
         except sqlite3.Error as e:
-            self._conn.rollback()
             raise ImageRecordNotFoundException from e
-        finally:
-            self._lock.release()
 
     def update(
         self,
@@ -140,115 +145,237 @@ class SqliteImageRecordStorage(ImageRecordStorageBase):
         finally:
             self._lock.release()
 
-    def get_many(
+    def _build_query_conditions(
         self,
-        offset: int = 0,
-        limit: int = 10,
-        starred_first: bool = True,
-        order_dir: SQLiteDirection = SQLiteDirection.Descending,
-        image_origin: Optional[ResourceOrigin] = None,
-        categories: Optional[list[ImageCategory]] = None,
-        is_intermediate: Optional[bool] = None,
-        board_id: Optional[str] = None,
-        search_term: Optional[str] = None,
-    ) -> OffsetPaginatedResults[ImageRecord]:
-        try:
-            self._lock.acquire()
-
-            # Manually build two queries - one for the count, one for the records
-            count_query = """--sql
-            SELECT COUNT(*)
-            FROM images
-            LEFT JOIN board_images ON board_images.image_name = images.image_name
-            WHERE 1=1
+        image_origin: Optional[ResourceOrigin],
+        categories: Optional[list[ImageCategory]],
+        is_intermediate: Optional[bool],
+        board_id: Optional[str],
+        search_term: Optional[str],
+    ) -> tuple[str, list[Union[int, str, bool]]]:
+        """Builds the conditions and params for the image listing filters."""
+        query_conditions = ""
+        query_params: list[Union[int, str, bool]] = []
+
+        if image_origin is not None:
+            query_conditions += """--sql
+            AND images.image_origin = ?
             """
+            query_params.append(image_origin.value)
 
-            images_query = f"""--sql
-            SELECT {IMAGE_DTO_COLS}
-            FROM images
-            LEFT JOIN board_images ON board_images.image_name = images.image_name
-            WHERE 1=1
-            """
-
-            query_conditions = ""
-            query_params: list[Union[int, str, bool]] = []
-
-            if image_origin is not None:
-                query_conditions += """--sql
-                AND images.image_origin = ?
-                """
-                query_params.append(image_origin.value)
+        if categories is not None:
+            # Convert the enum values to unique list of strings
+            category_strings = [c.value for c in set(categories)]
+            # Create the correct length of placeholders
+            placeholders = ",".join("?" * len(category_strings))
 
-            if categories is not None:
-                # Convert the enum values to unique list of strings
-                category_strings = [c.value for c in set(categories)]
-                # Create the correct length of placeholders
-                placeholders = ",".join("?" * len(category_strings))
+            query_conditions += f"""--sql
+            AND images.image_category IN ( {placeholders} )
+            """
 
-                query_conditions += f"""--sql
-                AND images.image_category IN ( {placeholders} )
-                """
+            # Unpack the included categories into the query params
+            for c in category_strings:
+                query_params.append(c)
 
-                # Unpack the included categories into the query params
-                for c in category_strings:
-                    query_params.append(c)
+        if is_intermediate is not None:
+            query_conditions += """--sql
+            AND images.is_intermediate = ?
+            """
 
-            if is_intermediate is not None:
-                query_conditions += """--sql
-                AND images.is_intermediate = ?
-                """
+            query_params.append(is_intermediate)
 
-                query_params.append(is_intermediate)
+        # board_id of "none" is reserved for images without a board
+        if board_id == "none":
+            query_conditions += """--sql
+            AND board_images.board_id IS NULL
+            """
+        elif board_id is not None:
+            query_conditions += """--sql
+            AND board_images.board_id = ?
+            """
+            query_params.append(board_id)
+
+        # Search term condition, matched against the metadata full-text search index
+        fts_query = build_fts_query(search_term) if search_term else None
+        if fts_query is not None:
+            query_conditions += """--sql
+            AND images.image_name IN (
+                SELECT images_fts_rowids.image_name
+                FROM images_fts
+                JOIN images_fts_rowids ON images_fts_rowids.rowid = images_fts.rowid
+                WHERE images_fts MATCH ?
+            )
+            """
+            query_params.append(fts_query)
 
-            # board_id of "none" is reserved for images without a board
-            if board_id == "none":
-                query_conditions += """--sql
-                AND board_images.board_id IS NULL
-                """
-            elif board_id is not None:
-                query_conditions += """--sql
-                AND board_images.board_id = ?
-                """
-                query_params.append(board_id)
+        return query_conditions, query_params
 
-            # Search term condition
-            if search_term:
-                query_conditions += """--sql
-                AND images.metadata LIKE ?
-                """
-                query_params.append(f"%{search_term.lower()}%")
+    def _get_order_columns(self, starred_first: bool, order_dir: SQLiteDirection) -> list[tuple[str, SQLiteDirection]]:
+        """Gets the listing's order columns. The image name is last, so that the order is total, for keyset pagination."""
+        columns = [("images.created_at", order_dir), ("images.image_name", order_dir)]
+        if starred_first:
+            columns.insert(0, ("images.starred", SQLiteDirection.Descending))
+        return columns
 
-            if starred_first:
-                query_pagination = f"""--sql
-                ORDER BY images.starred DESC, images.created_at {order_dir.value} LIMIT ? OFFSET ?
-                """
-            else:
-                query_pagination = f"""--sql
-                ORDER BY images.created_at {order_dir.value} LIMIT ? OFFSET ?
-                """
+    def _count(
+        self,
+        cursor: sqlite3.Cursor,
+        query_conditions: str,
+        query_params: list[Union[int, str, bool]],
+    ) -> int:
+        """Counts the images matching the conditions, reusing the last count if the images are unchanged."""
+
+        def count() -> int:
+            count_query = f"""--sql
+            SELECT COUNT(*)
+            FROM images
+            LEFT JOIN board_images ON board_images.image_name = images.image_name
+            WHERE 1=1
+            {query_conditions};
+            """
+            cursor.execute(count_query, query_params)
+            return cast(int, cursor.fetchone()[0])
 
-            # Final images query with pagination
-            images_query += query_conditions + query_pagination + ";"
-            # Add all the parameters
-            images_params = query_params.copy()
-            # Add the pagination parameters
-            images_params.extend([limit, offset])
+        # The conditions and params identify the filters
+        return self._counts.get_count(cursor, (query_conditions, tuple(query_params)), count)
 
+    def get_many(
+        self,
+        offset: int = 0,
+        limit: int = 10,
+        starred_first: bool = True,
+        order_dir: SQLiteDirection = SQLiteDirection.Descending,
+        image_origin: Optional[ResourceOrigin] = None,
+        categories: Optional[list[ImageCategory]] = None,
+        is_intermediate: Optional[bool] = None,
+        board_id: Optional[str] = None,
+        search_term: Optional[str] = None,
+    ) -> OffsetPaginatedResults[ImageRecordWithBoardId]:
+        query_conditions, query_params = self._build_query_conditions(
+            image_origin, categories, is_intermediate, board_id, search_term
+        )
+        order_by = ", ".join(
+            f"{column} {direction.value}" for column, direction in self._get_order_columns(starred_first, order_dir)
+        )
+        images_query = f"""--sql
+        SELECT {IMAGE_DTO_COLS}, board_images.board_id
+        FROM images
+        LEFT JOIN board_images ON board_images.image_name = images.image_name
+        WHERE 1=1
+        {query_conditions}
+        ORDER BY {order_by}
+        LIMIT ? OFFSET ?;
+        """
+
+        with self._db.read() as cursor:
             # Build the list of images, deserializing each row
-            self._cursor.execute(images_query, images_params)
-            result = cast(list[sqlite3.Row], self._cursor.fetchall())
-            images = [deserialize_image_record(dict(r)) for r in result]
+            cursor.execute(images_query, [*query_params, limit, offset])
+            result = cast(list[sqlite3.Row], cursor.fetchall())
+            images = [
+                ImageRecordWithBoardId(**deserialize_image_record(dict(r)).model_dump(), board_id=r["board_id"])
+                for r in result
+            ]
+            count = self._count(cursor, query_conditions, query_params)
 
-            # Set up and execute the count query, without pagination
-            count_query += query_conditions + ";"
-            count_params = query_params.copy()
-            self._cursor.execute(count_query, count_params)
-            count = cast(int, self._cursor.fetchone()[0])
-        except sqlite3.Error as e:
-            self._conn.rollback()
-            raise e
-        finally:
-            self._lock.release()
+        return OffsetPaginatedResults(items=images, offset=offset, limit=limit, total=count)
+
+    def get_many_by_cursor(
+        self,
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        starred_first: bool = True,
+        order_dir: SQLiteDirection = SQLiteDirection.Descending,
+        image_origin: Optional[ResourceOrigin] = None,
+        categories: Optional[list[ImageCategory]] = None,
+        is_intermediate: Optional[bool] = None,
+        board_id: Optional[str] = None,
+        search_term: Optional[str] = None,
+    ) -> CursorPaginatedResults[ImageRecordWithBoardId]:
+        query_conditions, query_params = self._build_query_conditions(
+            image_origin, categories, is_intermediate, board_id, search_term
+        )
+        order_columns = self._get_order_columns(starred_first, order_dir)
+        order_by = ", ".join(f"{column} {direction.value}" for column, direction in order_columns)
+
+        # The count is of all pages, so it does not include the keyset condition
+        keyset_condition = ""
+        keyset_params: list[Any] = []
+        if cursor is not None:
+            condition, keyset_params = build_keyset_condition(order_columns, decode_cursor(cursor, len(order_columns)))
+            keyset_condition = f"AND {condition}"
+
+        images_query = f"""--sql
+        SELECT {IMAGE_DTO_COLS}, board_images.board_id
+        FROM images
+        LEFT JOIN board_images ON board_images.image_name = images.image_name
+        WHERE 1=1
+        {query_conditions}
+        {keyset_condition}
+        ORDER BY {order_by}
+        LIMIT ?;
+        """
+
+        with self._db.read() as db_cursor:
+            # Get one extra row, to check if there are more
+            db_cursor.execute(images_query, [*query_params, *keyset_params, limit + 1])
+            result = cast(list[sqlite3.Row], db_cursor.fetchall())
+            has_more = len(result) > limit
+            result = result[:limit]
+            images = [
+                ImageRecordWithBoardId(**deserialize_image_record(dict(r)).model_dump(), board_id=r["board_id"])
+                for r in result
+            ]
+            count = self._count(db_cursor, query_conditions, query_params)
+
+        next_cursor = None
+        if has_more:
+            last = result[-1]
+            next_cursor = encode_cursor([last[column.removeprefix("images.")] for column, _ in order_columns])
+
+        return CursorPaginatedResults(
+            items=images, limit=limit, has_more=has_more, next_cursor=next_cursor, total=count
+        )
+
+    def search(
+        self,
+        query: str,
+        offset: int = 0,
+        limit: int = 10,
+        image_origin: Optional[ResourceOrigin] = None,
+        categories: Optional[list[ImageCategory]] = None,
+        is_intermediate: Optional[bool] = None,
+        board_id: Optional[str] = None,
+    ) -> OffsetPaginatedResults[ImageRecordWithBoardId]:
+        fts_query = build_fts_query(query)
+        if fts_query is None:
+            return OffsetPaginatedResults(items=[], offset=offset, limit=limit, total=0)
+
+        query_conditions, query_params = self._build_query_conditions(
+            image_origin, categories, is_intermediate, board_id, None
+        )
+        # Prompt matches rank highest, then model names, seeds and other metadata values
+        images_query = f"""--sql
+        SELECT {IMAGE_DTO_COLS}, board_images.board_id
+        FROM images_fts
+        JOIN images_fts_rowids ON images_fts_rowids.rowid = images_fts.rowid
+        JOIN images ON images.image_name = images_fts_rowids.image_name
+        LEFT JOIN board_images ON board_images.image_name = images.image_name
+        WHERE images_fts MATCH ?
+        {query_conditions}
+        ORDER BY bm25(images_fts, 10.0, 3.0, 2.0, 1.0), images.created_at DESC, images.image_name DESC
+        LIMIT ? OFFSET ?;
+        """
+
+        with self._db.read() as cursor:
+            cursor.execute(images_query, [fts_query, *query_params, limit, offset])
+            result = cast(list[sqlite3.Row], cursor.fetchall())
+            images = [
+                ImageRecordWithBoardId(**deserialize_image_record(dict(r)).model_dump(), board_id=r["board_id"])
+                for r in result
+            ]
+            count = self._count(
+                cursor, *self._build_query_conditions(image_origin, categories, is_intermediate, board_id, query)
+            )
 
         return OffsetPaginatedResults(items=images, offset=offset, limit=limit, total=count)
 
@@ -34,7 +34,7 @@ def image_record_to_dto(
 ) -> ImageDTO:
     """Converts an image record to an image DTO."""
     return ImageDTO(
-        **image_record.model_dump(),
+        **image_record.model_dump(exclude={"board_id"}),
         image_url=image_url,
         thumbnail_url=thumbnail_url,
         board_id=board_id,
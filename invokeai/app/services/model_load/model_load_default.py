@@ -32,13 +32,22 @@ class ModelLoadService(ModelLoadServiceBase):
         app_config: InvokeAIAppConfig,
         ram_cache: ModelCache,
         registry: Optional[Type[ModelLoaderRegistryBase]] = ModelLoaderRegistry,
+        device_ram_caches: Optional[list[ModelCache]] = None,
     ):
-        """Initialize the model load service."""
+        """Initialize the model load service.
+
+        :param ram_cache: The model cache to use.
+        :param registry: The model loader registry.
+        :param device_ram_caches: Additional model caches for other execution devices. When the current thread's
+            execution device (see `TorchDevice.set_thread_device()`) matches one of these caches, it is used instead of
+            `ram_cache`.
+        """
         logger = InvokeAILogger.get_logger(self.__class__.__name__)
         logger.setLevel(app_config.log_level.upper())
         self._logger = logger
         self._app_config = app_config
         self._ram_cache = ram_cache
+        self._device_ram_caches = {cache.execution_device: cache for cache in device_ram_caches or []}
         self._registry = registry
 
     def start(self, invoker: Invoker) -> None:
@@ -46,8 +55,10 @@ class ModelLoadService(ModelLoadServiceBase):
 
     @property
     def ram_cache(self) -> ModelCache:
-        """Return the RAM cache used by this loader."""
-        return self._ram_cache
+        """Return the RAM cache used by this loader, for the current thread's execution device."""
+        if not self._device_ram_caches:
+            return self._ram_cache
+        return self._device_ram_caches.get(TorchDevice.choose_torch_device(), self._ram_cache)
 
     def load_model(self, model_config: AnyModelConfig, submodel_type: Optional[SubModelType] = None) -> LoadedModel:
         """
@@ -66,7 +77,7 @@ class ModelLoadService(ModelLoadServiceBase):
         loaded_model: LoadedModel = implementation(
             app_config=self._app_config,
             logger=self._logger,
-            ram_cache=self._ram_cache,
+            ram_cache=self.ram_cache,
         ).load_model(model_config, submodel_type)
 
         if hasattr(self, "_invoker"):
@@ -78,8 +89,9 @@ class ModelLoadService(ModelLoadServiceBase):
         self, model_path: Path, loader: Optional[Callable[[Path], AnyModel]] = None
     ) -> LoadedModelWithoutConfig:
         cache_key = str(model_path)
+        ram_cache = self.ram_cache
         try:
-            return LoadedModelWithoutConfig(cache_record=self._ram_cache.get(key=cache_key), cache=self._ram_cache)
+            return LoadedModelWithoutConfig(cache_record=ram_cache.get(key=cache_key), cache=ram_cache)
         except IndexError:
             pass
 
@@ -94,7 +106,7 @@ class ModelLoadService(ModelLoadServiceBase):
             load_class = GenericDiffusersLoader(
                 app_config=self._app_config,
                 logger=self._logger,
-                ram_cache=self._ram_cache,
+                ram_cache=ram_cache,
                 convert_cache=self.convert_cache,
             ).get_hf_load_class(directory)
             return load_class.from_pretrained(model_path, torch_dtype=TorchDevice.choose_torch_dtype())
@@ -108,5 +120,5 @@ class ModelLoadService(ModelLoadServiceBase):
         )
         assert loader is not None
         raw_model = loader(model_path)
-        self._ram_cache.put(key=cache_key, model=raw_model)
-        return LoadedModelWithoutConfig(cache_record=self._ram_cache.get(key=cache_key), cache=self._ram_cache)
+        ram_cache.put(key=cache_key, model=raw_model)
+        return LoadedModelWithoutConfig(cache_record=ram_cache.get(key=cache_key), cache=ram_cache)
@@ -81,19 +81,36 @@ class ModelManagerService(ModelManagerServiceBase):
         logger = InvokeAILogger.get_logger(cls.__name__)
         logger.setLevel(app_config.log_level.upper())
 
-        ram_cache = ModelCache(
-            execution_device_working_mem_gb=app_config.device_working_mem_gb,
-            enable_partial_loading=app_config.enable_partial_loading,
-            keep_ram_copy_of_weights=app_config.keep_ram_copy_of_weights,
-            max_ram_cache_size_gb=app_config.max_cache_ram_gb,
-            max_vram_cache_size_gb=app_config.max_cache_vram_gb,
-            execution_device=execution_device or TorchDevice.choose_torch_device(),
-            logger=logger,
-        )
+        # When session processor workers are assigned to multiple devices, each device gets its own model cache. The
+        # RAM cache size limit, if set, is shared between them.
+        execution_devices = [execution_device or TorchDevice.choose_torch_device()]
+        for device in app_config.session_processor_devices or []:
+            normalized_device = TorchDevice.normalize(device)
+            if normalized_device not in execution_devices:
+                execution_devices.append(normalized_device)
+        max_ram_cache_size_gb = app_config.max_cache_ram_gb
+        if max_ram_cache_size_gb is not None:
+            max_ram_cache_size_gb /= len(execution_devices)
+
+        ram_caches = [
+            ModelCache(
+                execution_device_working_mem_gb=app_config.device_working_mem_gb,
+                enable_partial_loading=app_config.enable_partial_loading,
+                keep_ram_copy_of_weights=app_config.keep_ram_copy_of_weights,
+                max_ram_cache_size_gb=max_ram_cache_size_gb,
+                max_vram_cache_size_gb=app_config.max_cache_vram_gb,
+                execution_device=device,
+                logger=logger,
+                cache_patched_weights=app_config.cache_patched_weights,
+                dequantized_weights_cache_gb=app_config.dequantized_weights_cache_gb,
+            )
+            for device in execution_devices
+        ]
         loader = ModelLoadService(
             app_config=app_config,
-            ram_cache=ram_cache,
+            ram_cache=ram_caches[0],
             registry=ModelLoaderRegistry,
+            device_ram_caches=ram_caches[1:],
         )
         installer = ModelInstallService(
             app_config=app_config,
@@ -0,0 +1,123 @@
+import time
+from dataclasses import dataclass, field
+from threading import Condition
+from threading import Event as ThreadEvent
+from typing import Any, Callable, Generic, Hashable, Optional, Sequence, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+RunBatch = Callable[[list[T]], Sequence[R | Exception]]
+"""Runs a batch of items, returning a result for each item, in order. A result may be an exception, which is raised in
+the thread that submitted the item. An exception raised by the function itself is raised in every submitting thread."""
+
+
+def run_unbatched(item: T, run_batch: RunBatch[T, R]) -> R:
+    """Runs a single item with a batch function, as a batch of one."""
+    result = run_batch([item])[0]
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+
+@dataclass
+class _Batch:
+    items: list[Any] = field(default_factory=list)
+    results: Sequence[Any] = field(default_factory=list)
+    error: Optional[BaseException] = None
+    done: ThreadEvent = field(default_factory=ThreadEvent)
+
+
+class MicroBatcher(Generic[T, R]):
+    """Groups compatible work submitted by concurrent threads into batches.
+
+    Each session processor worker runs its queue item on its own thread. When workers reach compatible work at about
+    the same time (e.g. denoising with the same model and settings), the work can run as a single batch, which is
+    faster than running it item by item.
+
+    The first thread to submit work for a key waits for other threads to submit work with the same key, then runs the
+    batch on behalf of all of them. It waits until the batch is full or `max_wait` has elapsed, whichever comes first.
+    The other threads wait for their results.
+    """
+
+    def __init__(
+        self,
+        max_batch_size: int,
+        max_wait: float,
+        get_max_batch_size: Optional[Callable[[], int]] = None,
+    ) -> None:
+        """
+        Args:
+            max_batch_size: The maximum number of items in a batch. 1 disables batching.
+            max_wait: The longest time, in seconds, to wait for other items to join a batch.
+            get_max_batch_size: Returns the number of items that could possibly join a batch right now, e.g. the
+                number of busy workers. A batch does not wait for items that cannot arrive.
+        """
+        self._max_batch_size = max_batch_size
+        self._max_wait = max_wait
+        self._get_max_batch_size = get_max_batch_size
+        self._condition = Condition()
+        self._pending: dict[Hashable, _Batch] = {}
+
+    def run(self, key: Hashable, item: T, run_batch: RunBatch[T, R]) -> R:
+        """Runs an item, batched with compatible items submitted by other threads.
+
+        Args:
+            key: The compatibility key. Only items with equal keys are batched together, and are run with the
+                `run_batch` of the first of them.
+            item: The item to run.
+            run_batch: The function that runs a batch.
+
+        Returns:
+            The result for the item.
+        """
+        if self._max_batch_size <= 1:
+            return run_unbatched(item, run_batch)
+
+        with self._condition:
+            batch = self._pending.get(key)
+            if batch is not None:
+                # Join the pending batch, and let the thread that started it run it.
+                index = len(batch.items)
+                batch.items.append(item)
+                if len(batch.items) >= self._max_batch_size:
+                    del self._pending[key]
+                self._condition.notify_all()
+            else:
+                index = 0
+                batch = _Batch(items=[item])
+                self._pending[key] = batch
+                self._wait_for_items(key, batch)
+
+        if index > 0:
+            batch.done.wait()
+        else:
+            try:
+                batch.results = run_batch(batch.items)
+                assert len(batch.results) == len(batch.items)
+            except BaseException as e:
+                batch.error = e
+                raise
+            finally:
+                batch.done.set()
+
+        if batch.error is not None:
+            raise batch.error
+        result = batch.results[index]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def _wait_for_items(self, key: Hashable, batch: _Batch) -> None:
+        """Waits for other items to join a new batch, then closes it to new items. Must hold the condition's lock."""
+        deadline = time.monotonic() + self._max_wait
+        while self._pending.get(key) is batch:
+            target = self._max_batch_size
+            if self._get_max_batch_size is not None:
+                target = min(target, self._get_max_batch_size())
+            remaining = deadline - time.monotonic()
+            if len(batch.items) >= target or remaining <= 0:
+                break
+            self._condition.wait(remaining)
+        if self._pending.get(key) is batch:
+            del self._pending[key]
@@ -1,13 +1,17 @@
 from abc import ABC, abstractmethod
 from threading import Event
-from typing import Optional, Protocol
+from typing import Hashable, Optional, Protocol, TypeVar
 
 from invokeai.app.invocations.baseinvocation import BaseInvocation, BaseInvocationOutput
 from invokeai.app.services.invocation_services import InvocationServices
+from invokeai.app.services.session_processor.micro_batcher import RunBatch, run_unbatched
 from invokeai.app.services.session_processor.session_processor_common import SessionProcessorStatus
 from invokeai.app.services.session_queue.session_queue_common import SessionQueueItem
 from invokeai.app.util.profiler import Profiler
 
+T = TypeVar("T")
+R = TypeVar("R")
+
 
 class SessionRunnerBase(ABC):
     """
@@ -45,6 +49,10 @@ class SessionRunnerBase(ABC):
         """
         pass
 
+    def stop(self) -> None:  # noqa: B027
+        """Stops the session runner, releasing any resources it holds. Called when its worker stops."""
+        pass
+
 
 class SessionProcessorBase(ABC):
     """
@@ -70,6 +78,26 @@ class SessionProcessorBase(ABC):
         """Gets the status of the session processor"""
         pass
 
+    @property
+    def supports_batching(self) -> bool:
+        """Whether `run_batched()` batches items from different sessions. If not, items are run on their own."""
+        return False
+
+    def run_batched(self, key: Hashable, item: T, run_batch: RunBatch[T, R]) -> R:
+        """Runs an item, batched with compatible items from other sessions that are being processed concurrently.
+
+        The default implementation runs the item on its own.
+
+        Args:
+            key: The compatibility key. Only items with equal keys are batched together.
+            item: The item to run.
+            run_batch: Runs a batch of items, returning a result or an exception for each item.
+
+        Returns:
+            The result for the item.
+        """
+        return run_unbatched(item, run_batch)
+
 
 class OnBeforeRunNode(Protocol):
     def __call__(self, invocation: BaseInvocation, queue_item: SessionQueueItem) -> None:
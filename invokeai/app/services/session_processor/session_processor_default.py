@@ -1,8 +1,10 @@
 import traceback
 from contextlib import suppress
+from copy import copy
+from dataclasses import dataclass, field
 from threading import BoundedSemaphore, Thread
 from threading import Event as ThreadEvent
-from typing import Optional
+from typing import Hashable, Optional, TypeVar
 
 from invokeai.app.invocations.baseinvocation import BaseInvocation, BaseInvocationOutput
 from invokeai.app.services.events.events_common import (
@@ -14,6 +16,7 @@ from invokeai.app.services.events.events_common import (
 )
 from invokeai.app.services.invocation_stats.invocation_stats_common import GESStatsNotFoundError
 from invokeai.app.services.invoker import Invoker
+from invokeai.app.services.session_processor.micro_batcher import MicroBatcher, RunBatch
 from invokeai.app.services.session_processor.session_processor_base import (
     InvocationServices,
     OnAfterRunNode,
@@ -30,6 +33,10 @@ from invokeai.app.services.session_queue.session_queue_common import SessionQueu
 from invokeai.app.services.shared.graph import NodeInputError
 from invokeai.app.services.shared.invocation_context import InvocationContextData, build_invocation_context
 from invokeai.app.util.profiler import Profiler
+from invokeai.backend.util.devices import TorchDevice
+
+T = TypeVar("T")
+R = TypeVar("R")
 
 
 class DefaultSessionRunner(SessionRunnerBase):
@@ -210,7 +217,7 @@ class DefaultSessionRunner(SessionRunnerBase):
             # we don't care about that - suppress the error.
             with suppress(GESStatsNotFoundError):
                 self._services.performance_statistics.log_stats(queue_item.session.id)
-                self._services.performance_statistics.reset_stats()
+                self._services.performance_statistics.reset_stats(queue_item.session.id)
 
             for callback in self._on_after_run_session_callbacks:
                 callback(queue_item=queue_item)
@@ -307,6 +314,23 @@ class DefaultSessionRunner(SessionRunnerBase):
             )
 
 
+@dataclass
+class SessionProcessorWorker:
+    """The state of a single session processor worker.
+
+    Each worker runs in its own thread and processes one queue item at a time.
+    """
+
+    worker_id: int
+    session_runner: SessionRunnerBase
+    # The execution device for this worker. If None, the configured device is used.
+    device: Optional[str] = None
+    cancel_event: ThreadEvent = field(default_factory=ThreadEvent)
+    poll_now_event: ThreadEvent = field(default_factory=ThreadEvent)
+    queue_item: Optional[SessionQueueItem] = None
+    thread: Optional[Thread] = None
+
+
 class DefaultSessionProcessor(SessionProcessorBase):
     def __init__(
         self,
@@ -314,23 +338,43 @@ class DefaultSessionProcessor(SessionProcessorBase):
         on_non_fatal_processor_error_callbacks: Optional[list[OnNonFatalProcessorError]] = None,
         thread_limit: int = 1,
         polling_interval: int = 1,
+        devices: Optional[list[str]] = None,
+        micro_batch_size: int = 1,
+        micro_batch_wait: float = 0.1,
     ) -> None:
+        """
+        Args:
+            session_runner: The session runner. Each worker gets its own copy of it.
+            on_non_fatal_processor_error_callbacks: Callbacks to run when a non-fatal processor error occurs.
+            thread_limit: The number of workers, i.e. how many queue items are processed concurrently.
+            polling_interval: How often to poll the queue when it is empty, in seconds.
+            devices: Execution devices to assign to the workers, in order, wrapping around. Omit to use the configured
+                device for all workers.
+            micro_batch_size: The maximum number of compatible items from different workers to run as a single batch
+                (see `run_batched()`). 1 disables batching.
+            micro_batch_wait: How long, in seconds, an item waits for items from other workers to join its batch.
+        """
         super().__init__()
 
         self.session_runner = session_runner if session_runner else DefaultSessionRunner()
         self._on_non_fatal_processor_error_callbacks = on_non_fatal_processor_error_callbacks or []
         self._thread_limit = thread_limit
         self._polling_interval = polling_interval
+        self._devices = devices or []
+        self._micro_batch_size = micro_batch_size
+        # Batches never wait for more items than there are busy workers, as only a busy worker can submit an item.
+        self._micro_batcher: MicroBatcher = MicroBatcher(
+            max_batch_size=micro_batch_size,
+            max_wait=micro_batch_wait,
+            get_max_batch_size=self._count_busy_workers,
+        )
 
     def start(self, invoker: Invoker) -> None:
         self._invoker: Invoker = invoker
-        self._queue_item: Optional[SessionQueueItem] = None
         self._invocation: Optional[BaseInvocation] = None
 
         self._resume_event = ThreadEvent()
         self._stop_event = ThreadEvent()
-        self._poll_now_event = ThreadEvent()
-        self._cancel_event = ThreadEvent()
 
         register_events(QueueClearedEvent, self._on_queue_cleared)
         register_events(BatchEnqueuedEvent, self._on_batch_enqueued)
@@ -338,60 +382,91 @@ class DefaultSessionProcessor(SessionProcessorBase):
 
         self._thread_semaphore = BoundedSemaphore(self._thread_limit)
 
-        # If profiling is enabled, create a profiler. The same profiler will be used for all sessions. Internally,
-        # the profiler will create a new profile for each session.
-        self._profiler = (
-            Profiler(
-                logger=self._invoker.services.logger,
-                output_dir=self._invoker.services.configuration.profiles_path,
-                prefix=self._invoker.services.configuration.profile_prefix,
+        self._workers: list[SessionProcessorWorker] = []
+        for worker_id in range(self._thread_limit):
+            # Session runners hold the cancel event and profiler for the session they run, so each worker needs its own.
+            # The first worker uses the provided runner.
+            session_runner = self.session_runner if worker_id == 0 else copy(self.session_runner)
+            device = self._devices[worker_id % len(self._devices)] if self._devices else None
+            worker = SessionProcessorWorker(worker_id=worker_id, session_runner=session_runner, device=device)
+
+            # If profiling is enabled, create a profiler. The same profiler will be used for all sessions run by this
+            # worker. Internally, the profiler will create a new profile for each session.
+            profiler = (
+                Profiler(
+                    logger=self._invoker.services.logger,
+                    output_dir=self._invoker.services.configuration.profiles_path,
+                    prefix=self._invoker.services.configuration.profile_prefix,
+                )
+                if self._invoker.services.configuration.profile_graphs
+                else None
             )
-            if self._invoker.services.configuration.profile_graphs
-            else None
-        )
 
-        self.session_runner.start(services=invoker.services, cancel_event=self._cancel_event, profiler=self._profiler)
-        self._thread = Thread(
-            name="session_processor",
-            target=self._process,
-            kwargs={
-                "stop_event": self._stop_event,
-                "poll_now_event": self._poll_now_event,
-                "resume_event": self._resume_event,
-                "cancel_event": self._cancel_event,
-            },
-        )
-        self._thread.start()
+            session_runner.start(services=invoker.services, cancel_event=worker.cancel_event, profiler=profiler)
+            worker.thread = Thread(
+                name="session_processor" if self._thread_limit == 1 else f"session_processor_{worker_id}",
+                target=self._process,
+                kwargs={
+                    "stop_event": self._stop_event,
+                    "resume_event": self._resume_event,
+                    "worker": worker,
+                },
+            )
+            self._workers.append(worker)
+
+        for worker in self._workers:
+            assert worker.thread is not None
+            worker.thread.start()
 
     def stop(self, *args, **kwargs) -> None:
         self._stop_event.set()
 
+    @property
+    def supports_batching(self) -> bool:
+        return self._micro_batch_size > 1
+
+    def run_batched(self, key: Hashable, item: T, run_batch: RunBatch[T, R]) -> R:
+        return self._micro_batcher.run(key, item, run_batch)
+
+    def _count_busy_workers(self) -> int:
+        return sum(worker.queue_item is not None for worker in self._workers)
+
     def _poll_now(self) -> None:
-        self._poll_now_event.set()
+        for worker in self._workers:
+            worker.poll_now_event.set()
+
+    def _get_worker_for_item(self, item_id: int) -> Optional[SessionProcessorWorker]:
+        for worker in self._workers:
+            if worker.queue_item is not None and worker.queue_item.item_id == item_id:
+                return worker
+        return None
 
     async def _on_queue_cleared(self, event: FastAPIEvent[QueueClearedEvent]) -> None:
-        if self._queue_item and self._queue_item.queue_id == event[1].queue_id:
-            self._cancel_event.set()
-            self._poll_now()
+        for worker in self._workers:
+            if worker.queue_item and worker.queue_item.queue_id == event[1].queue_id:
+                worker.cancel_event.set()
+        self._poll_now()
 
     async def _on_batch_enqueued(self, event: FastAPIEvent[BatchEnqueuedEvent]) -> None:
         self._poll_now()
 
     async def _on_queue_item_status_changed(self, event: FastAPIEvent[QueueItemStatusChangedEvent]) -> None:
-        # Make sure the cancel event is for the currently processing queue item
-        if self._queue_item and self._queue_item.item_id != event[1].item_id:
+        if event[1].status not in ["completed", "failed", "canceled"]:
             return
-        if self._queue_item and event[1].status in ["completed", "failed", "canceled"]:
-            # When the queue item is canceled via HTTP, the queue item status is set to `"canceled"` and this event is
-            # emitted. We need to respond to this event and stop graph execution. This is done by setting the cancel
-            # event, which the session runner checks between invocations. If set, the session runner loop is broken.
-            #
-            # Long-running nodes that cannot be interrupted easily present a challenge. `denoise_latents` is one such
-            # node, but it gets a step callback, called on each step of denoising. This callback checks if the queue item
-            # is canceled, and if it is, raises a `CanceledException` to stop execution immediately.
-            if event[1].status == "canceled":
-                self._cancel_event.set()
-            self._poll_now()
+        # Make sure the event is for a queue item that is being processed
+        worker = self._get_worker_for_item(event[1].item_id)
+        if worker is None:
+            return
+        # When the queue item is canceled via HTTP, the queue item status is set to `"canceled"` and this event is
+        # emitted. We need to respond to this event and stop graph execution. This is done by setting the worker's cancel
+        # event, which its session runner checks between invocations. If set, the session runner loop is broken.
+        #
+        # Long-running nodes that cannot be interrupted easily present a challenge. `denoise_latents` is one such
+        # node, but it gets a step callback, called on each step of denoising. This callback checks if the queue item
+        # is canceled, and if it is, raises a `CanceledException` to stop execution immediately.
+        if event[1].status == "canceled":
+            worker.cancel_event.set()
+        worker.poll_now_event.set()
 
     def resume(self) -> SessionProcessorStatus:
         if not self._resume_event.is_set():
@@ -406,22 +481,24 @@ class DefaultSessionProcessor(SessionProcessorBase):
     def get_status(self) -> SessionProcessorStatus:
         return SessionProcessorStatus(
             is_started=self._resume_event.is_set(),
-            is_processing=self._queue_item is not None,
+            is_processing=any(worker.queue_item is not None for worker in self._workers),
         )
 
     def _process(
         self,
         stop_event: ThreadEvent,
-        poll_now_event: ThreadEvent,
         resume_event: ThreadEvent,
-        cancel_event: ThreadEvent,
+        worker: SessionProcessorWorker,
     ):
+        poll_now_event = worker.poll_now_event
+        cancel_event = worker.cancel_event
         try:
-            # Any unhandled exception in this block is a fatal processor error and will stop the processor.
+            # Any unhandled exception in this block is a fatal processor error and will stop the worker.
             self._thread_semaphore.acquire()
-            stop_event.clear()
             resume_event.set()
             cancel_event.clear()
+            if worker.device is not None:
+                TorchDevice.set_thread_device(worker.device)
 
             while not stop_event.is_set():
                 poll_now_event.clear()
@@ -430,33 +507,37 @@ class DefaultSessionProcessor(SessionProcessorBase):
                     # If we are paused, wait for resume event
                     resume_event.wait()
 
-                    # Get the next session to process
-                    self._queue_item = self._invoker.services.session_queue.dequeue()
+                    # Get the next session to process. The queue claims the item atomically, so no other worker can
+                    # dequeue it.
+                    worker.queue_item = self._invoker.services.session_queue.dequeue()
 
-                    if self._queue_item is None:
+                    if worker.queue_item is None:
                         # The queue was empty, wait for next polling interval or event to try again
                         self._invoker.services.logger.debug("Waiting for next polling interval or event")
                         poll_now_event.wait(self._polling_interval)
                         continue
 
                     self._invoker.services.logger.info(
-                        f"Executing queue item {self._queue_item.item_id}, session {self._queue_item.session_id}"
+                        f"Executing queue item {worker.queue_item.item_id}, session {worker.queue_item.session_id}"
+                        + (f" on worker {worker.worker_id}" if self._thread_limit > 1 else "")
                     )
                     cancel_event.clear()
 
                     # Run the graph
-                    self.session_runner.run(queue_item=self._queue_item)
+                    worker.session_runner.run(queue_item=worker.queue_item)
+                    worker.queue_item = None
 
                 except Exception as e:
                     error_type = e.__class__.__name__
                     error_message = str(e)
                     error_traceback = traceback.format_exc()
                     self._on_non_fatal_processor_error(
-                        queue_item=self._queue_item,
+                        queue_item=worker.queue_item,
                         error_type=error_type,
                         error_message=error_message,
                         error_traceback=error_traceback,
                     )
+                    worker.queue_item = None
                     # Wait for next polling interval or event to try again
                     poll_now_event.wait(self._polling_interval)
                     continue
@@ -469,9 +550,10 @@ class DefaultSessionProcessor(SessionProcessorBase):
             self._invoker.services.logger.error(error_traceback)
             pass
         finally:
-            stop_event.clear()
             poll_now_event.clear()
-            self._queue_item = None
+            worker.queue_item = None
+            worker.session_runner.stop()
+            TorchDevice.set_thread_device(None)
             self._thread_semaphore.release()
 
     def _on_non_fatal_processor_error(
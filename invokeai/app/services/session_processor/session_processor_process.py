@@ -0,0 +1,485 @@
+"""Runs sessions in worker processes.
+
+In this mode, the API process keeps the session queue and the database. Each session processor worker owns a worker
+process, which has its own model cache. The worker thread in the API process claims queue items as usual and hands them
+to its worker process over a pipe.
+
+The worker process streams events back to the API process, which dispatches them on its own event bus. Services backed
+by the database, like the session queue and the image records, are not available in the worker process. Calls to them
+are forwarded to the API process and run on the worker thread, just as they would be if the session were run in-process.
+"""
+
+import multiprocessing
+import pickle
+import queue
+import threading
+import traceback
+from dataclasses import dataclass, field
+from functools import reduce
+from multiprocessing.connection import Connection
+from threading import Event as ThreadEvent
+from typing import Any, Optional, cast
+
+import torch
+
+from invokeai.app.invocations.baseinvocation import BaseInvocation
+from invokeai.app.services.board_image_records.board_image_records_base import BoardImageRecordStorageBase
+from invokeai.app.services.board_images.board_images_default import BoardImagesService
+from invokeai.app.services.board_records.board_records_base import BoardRecordStorageBase
+from invokeai.app.services.boards.boards_default import BoardService
+from invokeai.app.services.bulk_download.bulk_download_base import BulkDownloadBase
+from invokeai.app.services.config.config_default import InvokeAIAppConfig, get_config
+from invokeai.app.services.download.download_base import DownloadQueueServiceBase
+from invokeai.app.services.events.events_base import EventServiceBase
+from invokeai.app.services.events.events_common import EventBase
+from invokeai.app.services.image_files.image_files_disk import DiskImageFileStorage
+from invokeai.app.services.image_records.image_records_base import ImageRecordStorageBase
+from invokeai.app.services.images.images_default import ImageService
+from invokeai.app.services.invocation_cache.invocation_cache_memory import MemoryInvocationCache
+from invokeai.app.services.invocation_services import InvocationServices
+from invokeai.app.services.invocation_stats.invocation_stats_default import InvocationStatsService
+from invokeai.app.services.invoker import Invoker
+from invokeai.app.services.model_images.model_images_default import ModelImageFileStorageDisk
+from invokeai.app.services.model_install.model_install_base import ModelInstallServiceBase
+from invokeai.app.services.model_manager.model_manager_default import ModelManagerService
+from invokeai.app.services.model_records.model_records_base import ModelRecordServiceBase
+from invokeai.app.services.names.names_default import SimpleNameService
+from invokeai.app.services.object_serializer.object_serializer_disk import ObjectSerializerDisk
+from invokeai.app.services.object_serializer.object_serializer_forward_cache import ObjectSerializerForwardCache
+from invokeai.app.services.session_processor.session_processor_base import SessionProcessorBase, SessionRunnerBase
+from invokeai.app.services.session_processor.session_processor_common import SessionProcessorStatus
+from invokeai.app.services.session_processor.session_processor_default import DefaultSessionRunner
+from invokeai.app.services.session_queue.session_queue_base import SessionQueueBase
+from invokeai.app.services.session_queue.session_queue_common import SessionQueueItem
+from invokeai.app.services.shared.graph import GraphExecutionState
+from invokeai.app.services.style_preset_images.style_preset_images_disk import StylePresetImageFileStorageDisk
+from invokeai.app.services.style_preset_records.style_preset_records_base import StylePresetRecordsStorageBase
+from invokeai.app.services.urls.urls_default import LocalUrlService
+from invokeai.app.services.workflow_records.workflow_records_base import WorkflowRecordsStorageBase
+from invokeai.app.util.profiler import Profiler
+from invokeai.backend.stable_diffusion.diffusion.conditioning_data import ConditioningFieldData
+from invokeai.backend.util.devices import TorchDevice
+from invokeai.backend.util.logging import InvokeAILogger
+
+# Services that the worker process uses from the API process. Each is addressed by its attribute path on the API
+# process's `InvocationServices`.
+PROXIED_SERVICES = {
+    "board_image_records",
+    "board_records",
+    "bulk_download",
+    "download_queue",
+    "image_records",
+    "model_manager.install",
+    "model_manager.store",
+    "session_processor",
+    "session_queue",
+    "style_preset_records",
+    "workflow_records",
+}
+
+# How often the worker thread checks its cancel event while waiting on the worker process, in seconds
+CANCEL_POLL_INTERVAL = 0.1
+
+
+# Messages from the API process to the worker process
+
+
+@dataclass
+class SessionJob:
+    """Run the queue item's session, or only the given node of it."""
+
+    queue_item: SessionQueueItem
+    invocation: Optional[BaseInvocation] = None
+
+
+@dataclass
+class CancelSession:
+    """Cancel the session that is running."""
+
+
+@dataclass
+class StopWorker:
+    """Stop the worker process."""
+
+
+@dataclass
+class ServiceCallResult:
+    """The result of a `ServiceCall`."""
+
+    value: Any = None
+    error: Optional[BaseException] = None
+
+
+# Messages from the worker process to the API process
+
+
+@dataclass
+class ServiceCall:
+    """Call a method on one of the `PROXIED_SERVICES` in the API process."""
+
+    service: str
+    method: str
+    args: tuple[Any, ...] = ()
+    kwargs: dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class WorkerEvent:
+    """Dispatch an event in the API process."""
+
+    event: EventBase
+
+
+@dataclass
+class SessionJobDone:
+    """The session is done running. The error fields are set if the session runner raised."""
+
+    session: GraphExecutionState
+    error_type: Optional[str] = None
+    error_message: Optional[str] = None
+    error_traceback: Optional[str] = None
+
+
+class SessionWorkerError(Exception):
+    """Raised in the API process when a worker process fails to run a session."""
+
+
+class ProcessSessionRunner(SessionRunnerBase):
+    """Runs sessions in a worker process.
+
+    The worker process is started when the first session is run, on the execution device of the worker thread. It is
+    restarted if it exits unexpectedly.
+    """
+
+    def __init__(self, stop_timeout: float = 5) -> None:
+        """
+        Args:
+            stop_timeout: How long to wait for the worker process to exit when stopping, in seconds.
+        """
+        self._stop_timeout = stop_timeout
+        self._process: Optional[multiprocessing.process.BaseProcess] = None
+        self._conn: Optional[Connection] = None
+
+    def start(
+        self, services: InvocationServices, cancel_event: ThreadEvent, profiler: Optional[Profiler] = None
+    ) -> None:
+        # The worker process creates its own profiler if profiling is enabled
+        self._services = services
+        self._cancel_event = cancel_event
+
+    def stop(self) -> None:
+        if self._process is None or self._conn is None:
+            return
+        try:
+            self._conn.send(StopWorker())
+        except (BrokenPipeError, OSError):
+            pass
+        self._process.join(timeout=self._stop_timeout)
+        if self._process.is_alive():
+            self._process.terminate()
+            self._process.join()
+        self._conn.close()
+        self._process = None
+        self._conn = None
+
+    def _get_conn(self) -> Connection:
+        """Gets the connection to the worker process, starting the process if it is not running."""
+        if self._process is not None and self._conn is not None and self._process.is_alive():
+            return self._conn
+        self.stop()
+
+        device = str(TorchDevice.choose_torch_device())
+        ctx = multiprocessing.get_context("spawn")
+        conn, child_conn = ctx.Pipe()
+        self._process = ctx.Process(
+            target=run_session_worker,
+            name=f"{threading.current_thread().name}_process",
+            kwargs={"conn": child_conn, "config": self._services.configuration, "device": device},
+            daemon=True,
+        )
+        self._process.start()
+        # The child end belongs to the worker process now. Closing our copy means we get an EOFError if it exits.
+        child_conn.close()
+        self._conn = conn
+        self._services.logger.info(f"Started session worker process {self._process.pid} on device {device}")
+        return conn
+
+    def run(self, queue_item: SessionQueueItem) -> None:
+        self._run_job(SessionJob(queue_item=queue_item))
+
+    def run_node(self, invocation: BaseInvocation, queue_item: SessionQueueItem) -> None:
+        self._run_job(SessionJob(queue_item=queue_item, invocation=invocation))
+
+    def _run_job(self, job: SessionJob) -> None:
+        """Runs a job in the worker process, handling its events and service calls until it is done. The queue item's
+        session is updated with the worker's copy of it."""
+        queue_item = job.queue_item
+        conn = self._get_conn()
+        conn.send(job)
+        cancel_sent = False
+
+        while True:
+            if not cancel_sent and self._cancel_event.is_set():
+                conn.send(CancelSession())
+                cancel_sent = True
+
+            if not conn.poll(CANCEL_POLL_INTERVAL):
+                continue
+
+            try:
+                message = conn.recv()
+            except EOFError as e:
+                self.stop()
+                raise SessionWorkerError("Session worker process exited unexpectedly") from e
+
+            if isinstance(message, WorkerEvent):
+                self._services.events.dispatch(message.event)
+            elif isinstance(message, ServiceCall):
+                self._send_service_call_result(conn, self._handle_service_call(message))
+            elif isinstance(message, SessionJobDone):
+                queue_item.session = message.session
+                if message.error_type is not None:
+                    self._services.logger.error(message.error_traceback)
+                    raise SessionWorkerError(f"{message.error_type}: {message.error_message}")
+                return
+
+    def _handle_service_call(self, call: ServiceCall) -> ServiceCallResult:
+        if call.service not in PROXIED_SERVICES or call.method.startswith("_"):
+            return ServiceCallResult(error=AttributeError(f"{call.service}.{call.method} is not available to workers"))
+        try:
+            service = reduce(getattr, call.service.split("."), self._services)
+            return ServiceCallResult(value=getattr(service, call.method)(*call.args, **call.kwargs))
+        except Exception as e:
+            return ServiceCallResult(error=e)
+
+    def _send_service_call_result(self, conn: Connection, result: ServiceCallResult) -> None:
+        try:
+            conn.send(result)
+        except (pickle.PicklingError, TypeError, AttributeError) as e:
+            # The worker process still needs a result, or it would wait forever
+            error = result.error or e
+            conn.send(ServiceCallResult(error=SessionWorkerError(f"{error.__class__.__name__}: {error}")))
+
+
+class SessionWorkerClient:
+    """The worker process's end of the pipe to the API process.
+
+    A thread reads all messages from the API process. Jobs are queued for the worker process's main thread, cancellation
+    sets the cancel event immediately, and service call results are handed to the waiting caller.
+    """
+
+    def __init__(self, conn: Connection) -> None:
+        self.cancel_event = ThreadEvent()
+        self._conn = conn
+        self._send_lock = threading.Lock()
+        # Only one service call is in flight at a time, so results need no correlation
+        self._call_lock = threading.Lock()
+        self._jobs: queue.Queue[Optional[SessionJob]] = queue.Queue()
+        self._results: queue.Queue[ServiceCallResult] = queue.Queue()
+        self._reader = threading.Thread(target=self._read, name="session_worker_reader", daemon=True)
+        self._reader.start()
+
+    def _read(self) -> None:
+        while True:
+            try:
+                message = self._conn.recv()
+            except (EOFError, OSError):
+                message = StopWorker()
+
+            if isinstance(message, SessionJob):
+                # A cancel that follows the job on the pipe must not be lost, so the event is cleared here rather than
+                # when the job starts.
+                self.cancel_event.clear()
+                self._jobs.put(message)
+            elif isinstance(message, CancelSession):
+                self.cancel_event.set()
+            elif isinstance(message, ServiceCallResult):
+                self._results.put(message)
+            elif isinstance(message, StopWorker):
+                self.cancel_event.set()
+                self._jobs.put(None)
+                self._results.put(ServiceCallResult(error=SessionWorkerError("Session worker is stopping")))
+                return
+
+    def send(self, message: Any) -> None:
+        with self._send_lock:
+            self._conn.send(message)
+
+    def next_job(self) -> Optional[SessionJob]:
+        """Waits for the next job. Returns None when the worker should stop."""
+        return self._jobs.get()
+
+    def call(self, service: str, method: str, args: tuple[Any, ...], kwargs: dict[str, Any]) -> Any:
+        with self._call_lock:
+            self.send(ServiceCall(service=service, method=method, args=args, kwargs=kwargs))
+            result = self._results.get()
+        if result.error is not None:
+            raise result.error
+        return result.value
+
+
+class ServiceProxy:
+    """Forwards method calls to a service in the API process."""
+
+    def __init__(self, client: SessionWorkerClient, service: str) -> None:
+        self._client = client
+        self._service = service
+
+    def start(self, invoker: Invoker) -> None:
+        # The service is started by the API process
+        pass
+
+    def stop(self, invoker: Invoker) -> None:
+        pass
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        def call(*args: Any, **kwargs: Any) -> Any:
+            return self._client.call(self._service, name, args, kwargs)
+
+        return call
+
+
+class WorkerEventService(EventServiceBase):
+    """Sends events to the API process, which dispatches them."""
+
+    def __init__(self, client: SessionWorkerClient) -> None:
+        self._client = client
+        super().__init__()
+
+    def dispatch(self, event: EventBase) -> None:
+        self._client.send(WorkerEvent(event=event))
+
+
+class WorkerSessionProcessor(SessionProcessorBase):
+    """The session processor of a worker process.
+
+    The queue is processed by the session processor in the API process, so its status calls are forwarded there.
+    Batching groups items from worker threads in a single process, so a worker process runs each item on its own.
+    """
+
+    def __init__(self, client: SessionWorkerClient) -> None:
+        self._session_processor = cast(SessionProcessorBase, ServiceProxy(client, "session_processor"))
+
+    def resume(self) -> SessionProcessorStatus:
+        return self._session_processor.resume()
+
+    def pause(self) -> SessionProcessorStatus:
+        return self._session_processor.pause()
+
+    def get_status(self) -> SessionProcessorStatus:
+        return self._session_processor.get_status()
+
+
+def build_worker_services(
+    config: InvokeAIAppConfig, client: SessionWorkerClient, execution_device: torch.device
+) -> InvocationServices:
+    """Builds the services for a worker process. Services backed by the database are proxied to the API process."""
+
+    logger = InvokeAILogger.get_logger(config=config)
+    output_folder = config.outputs_path
+    if output_folder is None:
+        raise ValueError("Output folder is not set")
+
+    events = WorkerEventService(client)
+    download_queue = cast(DownloadQueueServiceBase, ServiceProxy(client, "download_queue"))
+    model_records = cast(ModelRecordServiceBase, ServiceProxy(client, "model_manager.store"))
+    # Only the loader is used from the worker's model manager. It owns the worker's model cache.
+    model_loader = ModelManagerService.build_model_manager(
+        app_config=config,
+        model_record_service=model_records,
+        download_queue=download_queue,
+        events=events,
+        execution_device=execution_device,
+    ).load
+    model_manager = ModelManagerService(
+        store=model_records,
+        install=cast(ModelInstallServiceBase, ServiceProxy(client, "model_manager.install")),
+        load=model_loader,
+    )
+
+    return InvocationServices(
+        board_image_records=cast(BoardImageRecordStorageBase, ServiceProxy(client, "board_image_records")),
+        board_images=BoardImagesService(),
+        board_records=cast(BoardRecordStorageBase, ServiceProxy(client, "board_records")),
+        boards=BoardService(),
+        bulk_download=cast(BulkDownloadBase, ServiceProxy(client, "bulk_download")),
+        configuration=config,
+        events=events,
+        image_files=DiskImageFileStorage(f"{output_folder}/images"),
+        image_records=cast(ImageRecordStorageBase, ServiceProxy(client, "image_records")),
+        images=ImageService(),
+        invocation_cache=MemoryInvocationCache(max_cache_size=config.node_cache_size),
+        logger=logger,
+        model_images=ModelImageFileStorageDisk(config.models_path / "model_images"),
+        model_manager=model_manager,
+        download_queue=download_queue,
+        names=SimpleNameService(),
+        performance_statistics=InvocationStatsService(),
+        session_processor=WorkerSessionProcessor(client),
+        session_queue=cast(SessionQueueBase, ServiceProxy(client, "session_queue")),
+        urls=LocalUrlService(),
+        workflow_records=cast(WorkflowRecordsStorageBase, ServiceProxy(client, "workflow_records")),
+        tensors=ObjectSerializerForwardCache(
+            ObjectSerializerDisk[torch.Tensor](output_folder / "tensors", ephemeral=True)
+        ),
+        conditioning=ObjectSerializerForwardCache(
+            ObjectSerializerDisk[ConditioningFieldData](output_folder / "conditioning", ephemeral=True)
+        ),
+        style_preset_records=cast(StylePresetRecordsStorageBase, ServiceProxy(client, "style_preset_records")),
+        style_preset_image_files=StylePresetImageFileStorageDisk(config.style_presets_path / "images"),
+    )
+
+
+def run_session_worker(conn: Connection, config: InvokeAIAppConfig, device: str) -> None:
+    """The entrypoint of a worker process. Runs sessions sent by the API process until told to stop."""
+
+    # The worker process is spawned, so the global config must be set up before anything reads it. This includes the
+    # invocations package, which loads custom nodes from the configured root.
+    app_config = get_config()
+    app_config.update_config(config)
+    app_config._root = config.root_path
+    app_config._config_file = config._config_file
+    # The worker only runs on its own device. With the other configured devices, its model manager would build a model
+    # cache for each of them, and give the one cache it uses only a share of the RAM cache size.
+    app_config.session_processor_devices = [device]
+
+    # Importing the invocations registers them, including custom nodes, so the queue items' sessions can be unpickled
+    import invokeai.app.invocations  # noqa: F401
+
+    execution_device = TorchDevice.normalize(device)
+    TorchDevice.set_thread_device(execution_device)
+
+    client = SessionWorkerClient(conn)
+    services = build_worker_services(app_config, client, execution_device)
+    invoker = Invoker(services)
+    profiler = (
+        Profiler(logger=services.logger, output_dir=app_config.profiles_path, prefix=app_config.profile_prefix)
+        if app_config.profile_graphs
+        else None
+    )
+    session_runner = DefaultSessionRunner()
+    session_runner.start(services=services, cancel_event=client.cancel_event, profiler=profiler)
+
+    try:
+        while (job := client.next_job()) is not None:
+            queue_item = job.queue_item
+            try:
+                if job.invocation is None:
+                    session_runner.run(queue_item=queue_item)
+                else:
+                    session_runner.run_node(invocation=job.invocation, queue_item=queue_item)
+                client.send(SessionJobDone(session=queue_item.session))
+            except Exception as e:
+                client.send(
+                    SessionJobDone(
+                        session=queue_item.session,
+                        error_type=e.__class__.__name__,
+                        error_message=str(e),
+                        error_traceback=traceback.format_exc(),
+                    )
+                )
+    finally:
+        invoker.stop()
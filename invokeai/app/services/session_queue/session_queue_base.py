@@ -3,6 +3,7 @@ from typing import Optional
 
 from invokeai.app.services.session_queue.session_queue_common import (
     QUEUE_ITEM_STATUS,
+    ArchiveResult,
     Batch,
     BatchStatus,
     CancelByBatchIDsResult,
@@ -55,6 +56,11 @@ class SessionQueueBase(ABC):
         """Deletes all completed and errored session queue items"""
         pass
 
+    @abstractmethod
+    def archive_history(self) -> ArchiveResult:
+        """Archives the finished session queue items that are past the queue history retention policy"""
+        pass
+
     @abstractmethod
     def is_empty(self, queue_id: str) -> IsEmptyResult:
         """Checks if the queue is empty"""
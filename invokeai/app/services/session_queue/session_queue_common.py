@@ -356,6 +356,12 @@ class PruneResult(ClearResult):
     pass
 
 
+class ArchiveResult(BaseModel):
+    """Result of archiving the session queue history"""
+
+    archived: int = Field(..., description="Number of queue items archived")
+
+
 class CancelByBatchIDsResult(BaseModel):
     """Result of canceling by list of batch ids"""
 
@@ -1,5 +1,6 @@
 import sqlite3
 import threading
+import time
 from typing import Optional, Union, cast
 
 from invokeai.app.services.invoker import Invoker
@@ -7,6 +8,7 @@ from invokeai.app.services.session_queue.session_queue_base import SessionQueueB
 from invokeai.app.services.session_queue.session_queue_common import (
     DEFAULT_QUEUE_ID,
     QUEUE_ITEM_STATUS,
+    ArchiveResult,
     Batch,
     BatchStatus,
     CancelByBatchIDsResult,
@@ -27,6 +29,7 @@ from invokeai.app.services.session_queue.session_queue_common import (
 )
 from invokeai.app.services.shared.graph import GraphExecutionState
 from invokeai.app.services.shared.pagination import CursorPaginatedResults
+from invokeai.app.services.shared.sqlite.sqlite_common import InstrumentedRLock
 from invokeai.app.services.shared.sqlite.sqlite_database import SqliteDatabase
 
 
@@ -34,7 +37,14 @@ class SqliteSessionQueue(SessionQueueBase):
     __invoker: Invoker
     __conn: sqlite3.Connection
     __cursor: sqlite3.Cursor
-    __lock: threading.RLock
+    __lock: InstrumentedRLock
+
+    _ARCHIVE_INTERVAL = 60.0
+    """How often finished queue items are checked against the queue history retention policy, in seconds."""
+    _ARCHIVE_BATCH_SIZE = 100
+    """The number of queue items archived per transaction."""
+    _ARCHIVE_BATCH_PAUSE = 0.1
+    """How long the background archival pauses between batches, in seconds, so that it does not starve other writers."""
 
     def start(self, invoker: Invoker) -> None:
         self.__invoker = invoker
@@ -47,12 +57,22 @@ class SqliteSessionQueue(SessionQueueBase):
             prune_result = self.prune(DEFAULT_QUEUE_ID)
             if prune_result.deleted > 0:
                 self.__invoker.services.logger.info(f"Pruned {prune_result.deleted} finished queue items")
+        self.__stop_event.clear()
+        self.__archive_thread = threading.Thread(
+            name="session_queue_archive", target=self._archive_history_worker, daemon=True
+        )
+        self.__archive_thread.start()
+
+    def stop(self, *args, **kwargs) -> None:
+        self.__stop_event.set()
 
     def __init__(self, db: SqliteDatabase) -> None:
         super().__init__()
+        self.__db = db
         self.__lock = db.lock
         self.__conn = db.conn
         self.__cursor = self.__conn.cursor()
+        self.__stop_event = threading.Event()
 
     def _set_in_progress_to_canceled(self) -> None:
         """
@@ -78,15 +98,27 @@ class SqliteSessionQueue(SessionQueueBase):
         """Gets the current number of pending queue items"""
         self.__cursor.execute(
             """--sql
-            SELECT count(*)
-            FROM session_queue
-            WHERE
-              queue_id = ?
-              AND status = 'pending'
+            SELECT pending
+            FROM session_queue_counts
+            WHERE queue_id = ?
+            """,
+            (queue_id,),
+        )
+        result = cast(Union[sqlite3.Row, None], self.__cursor.fetchone())
+        return cast(int, result[0]) if result is not None else 0
+
+    def _get_total_queue_size(self, queue_id: str) -> int:
+        """Gets the total number of queue items, regardless of status"""
+        self.__cursor.execute(
+            """--sql
+            SELECT pending + in_progress + completed + failed + canceled
+            FROM session_queue_counts
+            WHERE queue_id = ?
             """,
             (queue_id,),
         )
-        return cast(int, self.__cursor.fetchone()[0])
+        result = cast(Union[sqlite3.Row, None], self.__cursor.fetchone())
+        return cast(int, result[0]) if result is not None else 0
 
     def _get_highest_priority(self, queue_id: str) -> int:
         """Gets the highest priority value in the queue"""
@@ -155,7 +187,7 @@ class SqliteSessionQueue(SessionQueueBase):
             self.__lock.acquire()
             self.__cursor.execute(
                 """--sql
-                SELECT *
+                SELECT item_id
                 FROM session_queue
                 WHERE status = 'pending'
                 ORDER BY
@@ -165,15 +197,15 @@ class SqliteSessionQueue(SessionQueueBase):
                 """
             )
             result = cast(Union[sqlite3.Row, None], self.__cursor.fetchone())
+            if result is None:
+                return None
+            # The item is claimed before the lock is released, so concurrent workers never dequeue the same item.
+            queue_item = self._set_queue_item_status(item_id=result["item_id"], status="in_progress")
         except Exception:
             self.__conn.rollback()
             raise
         finally:
             self.__lock.release()
-        if result is None:
-            return None
-        queue_item = SessionQueueItem.queue_item_from_dict(dict(result))
-        queue_item = self._set_queue_item_status(item_id=queue_item.item_id, status="in_progress")
         return queue_item
 
     def get_next(self, queue_id: str) -> Optional[SessionQueueItem]:
@@ -188,7 +220,7 @@ class SqliteSessionQueue(SessionQueueBase):
                   AND status = 'pending'
                 ORDER BY
                   priority DESC,
-                  created_at ASC
+                  item_id ASC
                 LIMIT 1
                 """,
                 (queue_id,),
@@ -203,10 +235,24 @@ class SqliteSessionQueue(SessionQueueBase):
             return None
         return SessionQueueItem.queue_item_from_dict(dict(result))
 
+    def _get_in_progress_items(self, queue_id: str) -> list[SessionQueueItem]:
+        """Gets all in-progress queue items. There is one per session processor worker that is processing an item."""
+        self.__cursor.execute(
+            """--sql
+            SELECT *
+            FROM session_queue
+            WHERE
+              queue_id = ?
+              AND status = 'in_progress'
+            """,
+            (queue_id,),
+        )
+        results = cast(list[sqlite3.Row], self.__cursor.fetchall())
+        return [SessionQueueItem.queue_item_from_dict(dict(result)) for result in results]
+
     def get_current(self, queue_id: str) -> Optional[SessionQueueItem]:
-        try:
-            self.__lock.acquire()
-            self.__cursor.execute(
+        with self.__db.read() as cursor:
+            cursor.execute(
                 """--sql
                 SELECT *
                 FROM session_queue
@@ -217,12 +263,7 @@ class SqliteSessionQueue(SessionQueueBase):
                 """,
                 (queue_id,),
             )
-            result = cast(Union[sqlite3.Row, None], self.__cursor.fetchone())
-        except Exception:
-            self.__conn.rollback()
-            raise
-        finally:
-            self.__lock.release()
+            result = cast(Union[sqlite3.Row, None], cursor.fetchone())
         if result is None:
             return None
         return SessionQueueItem.queue_item_from_dict(dict(result))
@@ -246,29 +287,23 @@ class SqliteSessionQueue(SessionQueueBase):
                 (status, error_type, error_message, error_traceback, item_id),
             )
             self.__conn.commit()
+            # The status counters are updated by triggers in the same transaction, so the batch and queue status can
+            # be read from them without aggregating over the whole queue.
+            queue_item = self.get_queue_item(item_id)
+            batch_status = self.get_batch_status(queue_id=queue_item.queue_id, batch_id=queue_item.batch_id)
+            queue_status = self.get_queue_status(queue_id=queue_item.queue_id)
         except Exception:
             self.__conn.rollback()
             raise
         finally:
             self.__lock.release()
-        queue_item = self.get_queue_item(item_id)
-        batch_status = self.get_batch_status(queue_id=queue_item.queue_id, batch_id=queue_item.batch_id)
-        queue_status = self.get_queue_status(queue_id=queue_item.queue_id)
         self.__invoker.services.events.emit_queue_item_status_changed(queue_item, batch_status, queue_status)
         return queue_item
 
     def is_empty(self, queue_id: str) -> IsEmptyResult:
         try:
             self.__lock.acquire()
-            self.__cursor.execute(
-                """--sql
-                SELECT count(*)
-                FROM session_queue
-                WHERE queue_id = ?
-                """,
-                (queue_id,),
-            )
-            is_empty = cast(int, self.__cursor.fetchone()[0]) == 0
+            is_empty = self._get_total_queue_size(queue_id) == 0
         except Exception:
             self.__conn.rollback()
             raise
@@ -279,16 +314,8 @@ class SqliteSessionQueue(SessionQueueBase):
     def is_full(self, queue_id: str) -> IsFullResult:
         try:
             self.__lock.acquire()
-            self.__cursor.execute(
-                """--sql
-                SELECT count(*)
-                FROM session_queue
-                WHERE queue_id = ?
-                """,
-                (queue_id,),
-            )
             max_queue_size = self.__invoker.services.configuration.max_queue_size
-            is_full = cast(int, self.__cursor.fetchone()[0]) >= max_queue_size
+            is_full = self._get_total_queue_size(queue_id) >= max_queue_size
         except Exception:
             self.__conn.rollback()
             raise
@@ -299,15 +326,7 @@ class SqliteSessionQueue(SessionQueueBase):
     def clear(self, queue_id: str) -> ClearResult:
         try:
             self.__lock.acquire()
-            self.__cursor.execute(
-                """--sql
-                SELECT COUNT(*)
-                FROM session_queue
-                WHERE queue_id = ?
-                """,
-                (queue_id,),
-            )
-            count = self.__cursor.fetchone()[0]
+            count = self._get_total_queue_size(queue_id)
             self.__cursor.execute(
                 """--sql
                 DELETE
@@ -362,6 +381,98 @@ class SqliteSessionQueue(SessionQueueBase):
             self.__lock.release()
         return PruneResult(deleted=count)
 
+    def _archive_history_batch(self) -> int:
+        """
+        Archives the oldest finished queue items that are past the queue history retention policy, up to a batch of
+        them, in one short transaction. Returns the number of items archived.
+
+        An item is kept in full while it is among the last `queue_history_keep_items` finished items, or while it
+        finished less than `queue_history_keep_days` ago. Archived items are moved to `session_queue_history`, keeping
+        only a summary of them.
+        """
+        config = self.__invoker.services.configuration
+        try:
+            self.__lock.acquire()
+            # The newest finished item that is not among the last `queue_history_keep_items` finished items
+            self.__cursor.execute(
+                """--sql
+                SELECT item_id
+                FROM session_queue
+                WHERE status IN ('completed', 'failed', 'canceled')
+                ORDER BY item_id DESC
+                LIMIT 1 OFFSET ?
+                """,
+                (config.queue_history_keep_items,),
+            )
+            result = cast(Union[sqlite3.Row, None], self.__cursor.fetchone())
+            if result is None:
+                return 0
+            self.__cursor.execute(
+                """--sql
+                SELECT item_id
+                FROM session_queue
+                WHERE status IN ('completed', 'failed', 'canceled')
+                  AND item_id <= ?
+                  AND completed_at < STRFTIME('%Y-%m-%d %H:%M:%f', 'NOW', ?)
+                ORDER BY item_id ASC
+                LIMIT ?
+                """,
+                (result["item_id"], f"-{config.queue_history_keep_days} days", self._ARCHIVE_BATCH_SIZE),
+            )
+            item_ids = [row["item_id"] for row in self.__cursor.fetchall()]
+            if not item_ids:
+                return 0
+            placeholders = ", ".join("?" for _ in item_ids)
+            columns = """item_id, batch_id, queue_id, session_id, status, priority, origin, destination, error_type,
+                error_message, created_at, updated_at, started_at, completed_at"""
+            self.__cursor.execute(
+                f"""--sql
+                INSERT INTO session_queue_history ({columns})
+                SELECT {columns}
+                FROM session_queue
+                WHERE item_id IN ({placeholders});
+                """,
+                item_ids,
+            )
+            self.__cursor.execute(
+                f"""--sql
+                DELETE
+                FROM session_queue
+                WHERE item_id IN ({placeholders});
+                """,
+                item_ids,
+            )
+            self.__conn.commit()
+        except Exception:
+            self.__conn.rollback()
+            raise
+        finally:
+            self.__lock.release()
+        return len(item_ids)
+
+    def _archive_history(self, batch_pause: float) -> int:
+        """Archives finished queue items a batch at a time, pausing between batches. Returns the number archived."""
+        archived = 0
+        while (count := self._archive_history_batch()) > 0:
+            archived += count
+            if count < self._ARCHIVE_BATCH_SIZE:
+                break
+            time.sleep(batch_pause)
+        return archived
+
+    def _archive_history_worker(self) -> None:
+        """Periodically archives the finished queue items that are past the queue history retention policy."""
+        while not self.__stop_event.wait(self._ARCHIVE_INTERVAL):
+            try:
+                archived = self._archive_history(batch_pause=self._ARCHIVE_BATCH_PAUSE)
+                if archived > 0:
+                    self.__invoker.services.logger.info(f"Archived {archived} finished queue items")
+            except Exception:
+                self.__invoker.services.logger.exception("Failed to archive finished queue items")
+
+    def archive_history(self) -> ArchiveResult:
+        return ArchiveResult(archived=self._archive_history(batch_pause=0))
+
     def cancel_queue_item(self, item_id: int) -> SessionQueueItem:
         queue_item = self._set_queue_item_status(item_id=item_id, status="canceled")
         return queue_item
@@ -388,8 +499,8 @@ class SqliteSessionQueue(SessionQueueBase):
 
     def cancel_by_batch_ids(self, queue_id: str, batch_ids: list[str]) -> CancelByBatchIDsResult:
         try:
-            current_queue_item = self.get_current(queue_id)
             self.__lock.acquire()
+            in_progress_items = self._get_in_progress_items(queue_id)
             placeholders = ", ".join(["?" for _ in batch_ids])
             where = f"""--sql
                 WHERE
@@ -418,8 +529,9 @@ class SqliteSessionQueue(SessionQueueBase):
                 tuple(params),
             )
             self.__conn.commit()
-            if current_queue_item is not None and current_queue_item.batch_id in batch_ids:
-                self._set_queue_item_status(current_queue_item.item_id, "canceled")
+            for queue_item in in_progress_items:
+                if queue_item.batch_id in batch_ids:
+                    self._set_queue_item_status(queue_item.item_id, "canceled")
         except Exception:
             self.__conn.rollback()
             raise
@@ -429,8 +541,8 @@ class SqliteSessionQueue(SessionQueueBase):
 
     def cancel_by_destination(self, queue_id: str, destination: str) -> CancelByDestinationResult:
         try:
-            current_queue_item = self.get_current(queue_id)
             self.__lock.acquire()
+            in_progress_items = self._get_in_progress_items(queue_id)
             where = """--sql
                 WHERE
                   queue_id == ?
@@ -458,8 +570,9 @@ class SqliteSessionQueue(SessionQueueBase):
                 params,
             )
             self.__conn.commit()
-            if current_queue_item is not None and current_queue_item.destination == destination:
-                self._set_queue_item_status(current_queue_item.item_id, "canceled")
+            for queue_item in in_progress_items:
+                if queue_item.destination == destination:
+                    self._set_queue_item_status(queue_item.item_id, "canceled")
         except Exception:
             self.__conn.rollback()
             raise
@@ -469,8 +582,8 @@ class SqliteSessionQueue(SessionQueueBase):
 
     def cancel_by_queue_id(self, queue_id: str) -> CancelByQueueIDResult:
         try:
-            current_queue_item = self.get_current(queue_id)
             self.__lock.acquire()
+            in_progress_items = self._get_in_progress_items(queue_id)
             where = """--sql
                 WHERE
                   queue_id is ?
@@ -497,12 +610,8 @@ class SqliteSessionQueue(SessionQueueBase):
                 tuple(params),
             )
             self.__conn.commit()
-            if current_queue_item is not None and current_queue_item.queue_id == queue_id:
-                batch_status = self.get_batch_status(queue_id=queue_id, batch_id=current_queue_item.batch_id)
-                queue_status = self.get_queue_status(queue_id=queue_id)
-                self.__invoker.services.events.emit_queue_item_status_changed(
-                    current_queue_item, batch_status, queue_status
-                )
+            for queue_item in in_progress_items:
+                self._set_queue_item_status(queue_item.item_id, "canceled")
         except Exception:
             self.__conn.rollback()
             raise
@@ -562,9 +671,8 @@ class SqliteSessionQueue(SessionQueueBase):
         cursor: Optional[int] = None,
         status: Optional[QUEUE_ITEM_STATUS] = None,
     ) -> CursorPaginatedResults[SessionQueueItemDTO]:
-        try:
-            item_id = cursor
-            self.__lock.acquire()
+        item_id = cursor
+        with self.__db.read() as db_cursor:
             query = """--sql
                 SELECT item_id,
                     status,
@@ -595,7 +703,7 @@ class SqliteSessionQueue(SessionQueueBase):
 
             if item_id is not None:
                 query += """--sql
-                    AND (priority < ?) OR (priority = ? AND item_id > ?)
+                    AND ((priority < ?) OR (priority = ? AND item_id > ?))
                     """
                 params.extend([priority, priority, item_id])
 
@@ -606,43 +714,44 @@ class SqliteSessionQueue(SessionQueueBase):
                 LIMIT ?
                 """
             params.append(limit + 1)
-            self.__cursor.execute(query, params)
-            results = cast(list[sqlite3.Row], self.__cursor.fetchall())
+            db_cursor.execute(query, params)
+            results = cast(list[sqlite3.Row], db_cursor.fetchall())
             items = [SessionQueueItemDTO.queue_item_dto_from_dict(dict(result)) for result in results]
             has_more = False
             if len(items) > limit:
                 # remove the extra item
                 items.pop()
                 has_more = True
-        except Exception:
-            self.__conn.rollback()
-            raise
-        finally:
-            self.__lock.release()
         return CursorPaginatedResults(items=items, limit=limit, has_more=has_more)
 
     def get_queue_status(self, queue_id: str) -> SessionQueueStatus:
-        try:
-            self.__lock.acquire()
-            self.__cursor.execute(
+        with self.__db.read() as cursor:
+            cursor.execute(
                 """--sql
-                SELECT status, count(*)
-                FROM session_queue
+                SELECT pending, in_progress, completed, failed, canceled
+                FROM session_queue_counts
                 WHERE queue_id = ?
-                GROUP BY status
                 """,
                 (queue_id,),
             )
-            counts_result = cast(list[sqlite3.Row], self.__cursor.fetchall())
-        except Exception:
-            self.__conn.rollback()
-            raise
-        finally:
-            self.__lock.release()
+            counts_result = cast(Union[sqlite3.Row, None], cursor.fetchone())
+            # The current item is read in the same snapshot as the counts
+            cursor.execute(
+                """--sql
+                SELECT *
+                FROM session_queue
+                WHERE
+                  queue_id = ?
+                  AND status = 'in_progress'
+                LIMIT 1
+                """,
+                (queue_id,),
+            )
+            current_result = cast(Union[sqlite3.Row, None], cursor.fetchone())
 
-        current_item = self.get_current(queue_id=queue_id)
-        total = sum(row[1] for row in counts_result)
-        counts: dict[str, int] = {row[0]: row[1] for row in counts_result}
+        current_item = SessionQueueItem.queue_item_from_dict(dict(current_result)) if current_result else None
+        counts: dict[str, int] = dict(counts_result) if counts_result is not None else {}
+        total = sum(counts.values())
         return SessionQueueStatus(
             queue_id=queue_id,
             item_id=current_item.item_id if current_item else None,
@@ -657,29 +766,26 @@ class SqliteSessionQueue(SessionQueueBase):
         )
 
     def get_batch_status(self, queue_id: str, batch_id: str) -> BatchStatus:
-        try:
-            self.__lock.acquire()
-            self.__cursor.execute(
+        with self.__db.read() as cursor:
+            cursor.execute(
                 """--sql
-                SELECT status, count(*), origin, destination
-                FROM session_queue
+                SELECT origin, destination, pending, in_progress, completed, failed, canceled
+                FROM session_queue_batch_counts
                 WHERE
                   queue_id = ?
                   AND batch_id = ?
-                GROUP BY status
                 """,
                 (queue_id, batch_id),
             )
-            result = cast(list[sqlite3.Row], self.__cursor.fetchall())
-            total = sum(row[1] for row in result)
-            counts: dict[str, int] = {row[0]: row[1] for row in result}
-            origin = result[0]["origin"] if result else None
-            destination = result[0]["destination"] if result else None
-        except Exception:
-            self.__conn.rollback()
-            raise
-        finally:
-            self.__lock.release()
+            result = cast(Union[sqlite3.Row, None], cursor.fetchone())
+            counts: dict[str, int] = {}
+            origin = result["origin"] if result else None
+            destination = result["destination"] if result else None
+            if result is not None:
+                counts = {
+                    status: result[status] for status in ("pending", "in_progress", "completed", "failed", "canceled")
+                }
+            total = sum(counts.values())
 
         return BatchStatus(
             batch_id=batch_id,
@@ -695,9 +801,8 @@ class SqliteSessionQueue(SessionQueueBase):
         )
 
     def get_counts_by_destination(self, queue_id: str, destination: str) -> SessionQueueCountsByDestination:
-        try:
-            self.__lock.acquire()
-            self.__cursor.execute(
+        with self.__db.read() as cursor:
+            cursor.execute(
                 """--sql
                 SELECT status, count(*)
                 FROM session_queue
@@ -707,12 +812,7 @@ class SqliteSessionQueue(SessionQueueBase):
                 """,
                 (queue_id, destination),
             )
-            counts_result = cast(list[sqlite3.Row], self.__cursor.fetchall())
-        except Exception:
-            self.__conn.rollback()
-            raise
-        finally:
-            self.__lock.release()
+            counts_result = cast(list[sqlite3.Row], cursor.fetchall())
 
         total = sum(row[1] for row in counts_result)
         counts: dict[str, int] = {row[0]: row[1] for row in counts_result}
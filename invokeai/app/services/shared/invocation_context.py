@@ -1,7 +1,7 @@
 from copy import deepcopy
 from dataclasses import dataclass
 from pathlib import Path
-from typing import TYPE_CHECKING, Callable, Optional, Union
+from typing import TYPE_CHECKING, Callable, Hashable, Optional, TypeVar, Union
 
 from PIL.Image import Image
 from pydantic.networks import AnyHttpUrl
@@ -15,6 +15,7 @@ from invokeai.app.services.image_records.image_records_common import ImageCatego
 from invokeai.app.services.images.images_common import ImageDTO
 from invokeai.app.services.invocation_services import InvocationServices
 from invokeai.app.services.model_records.model_records_base import UnknownModelException
+from invokeai.app.services.session_processor.micro_batcher import RunBatch, run_unbatched
 from invokeai.app.services.session_processor.session_processor_common import ProgressImage
 from invokeai.app.util.step_callback import flux_step_callback, stable_diffusion_step_callback
 from invokeai.backend.model_manager.config import (
@@ -56,6 +57,9 @@ user-facing docstrings and not need to go and update the internal services to ma
 Note: The docstrings are in weird places, but that's where they must be to get IDEs to see them.
 """
 
+T = TypeVar("T")
+R = TypeVar("R")
+
 
 @dataclass
 class InvocationContextData:
@@ -566,6 +570,31 @@ class UtilInterface(InvocationContextInterface):
         """
         return self._is_canceled()
 
+    def run_batched(self, key: Hashable, item: T, run_batch: RunBatch[T, R]) -> R:
+        """Runs an item, batched with compatible items from other queue items that are being processed concurrently.
+
+        When the session processor runs several queue items at once, the first of them to submit an item for a key
+        waits briefly for the others to submit items with the same key. It then calls its `run_batch` with all of the
+        items, on its own thread, and each caller gets the result for its item. Without concurrent queue items, the
+        item is run on its own, as a batch of one.
+
+        `run_batch` runs on the thread of the caller that submitted it, with its context, but the other items in the
+        batch come from other queue items. Anything they carry, such as step callbacks, runs on this thread too.
+
+        Args:
+            key: The compatibility key. Items with equal keys must be safe to run with each other's `run_batch`.
+            item: The item to run.
+            run_batch: Runs a batch of items, returning a result for each item, in order. A result may be an
+                exception, which is raised for that item only.
+
+        Returns:
+            The result for the item.
+        """
+        session_processor = self._services.session_processor
+        if not session_processor.supports_batching:
+            return run_unbatched(item, run_batch)
+        return session_processor.run_batched(key, item, run_batch)
+
     def sd_step_callback(self, intermediate_state: PipelineIntermediateState, base_model: BaseModelType) -> None:
         """
         The step callback emits a progress event with the current step, the total number of
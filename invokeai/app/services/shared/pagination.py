@@ -1,4 +1,7 @@
-from typing import Generic, TypeVar
+import base64
+import binascii
+import json
+from typing import Any, Generic, Optional, Sequence, TypeVar
 
 from pydantic import BaseModel, Field
 
@@ -14,6 +17,10 @@ class CursorPaginatedResults(BaseModel, Generic[GenericBaseModel]):
     limit: int = Field(..., description="Limit of items to get")
     has_more: bool = Field(..., description="Whether there are more items available")
     items: list[GenericBaseModel] = Field(..., description="Items")
+    next_cursor: Optional[str] = Field(
+        default=None, description="The cursor to get the next page of items, if there are more items"
+    )
+    total: Optional[int] = Field(default=None, description="Total number of items in result, if counted")
 
 
 class OffsetPaginatedResults(BaseModel, Generic[GenericBaseModel]):
@@ -39,3 +46,19 @@ class PaginatedResults(BaseModel, Generic[GenericBaseModel]):
     per_page: int = Field(description="Number of items per page")
     total: int = Field(description="Total number of items in result")
     items: list[GenericBaseModel] = Field(description="Items")
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encodes the ordered column values of a row as an opaque cursor, for keyset pagination."""
+    return base64.urlsafe_b64encode(json.dumps(list(values)).encode()).decode()
+
+
+def decode_cursor(cursor: str, length: int) -> list[Any]:
+    """Decodes a cursor from `encode_cursor`, raising a `ValueError` if it is not a list of `length` values."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if not isinstance(values, list) or len(values) != length:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return values
@@ -1,4 +1,10 @@
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
 from enum import Enum
+from typing import Any, Callable, Hashable, Optional, Sequence
 
 from invokeai.app.util.metaenum import MetaEnum
 
@@ -8,3 +14,172 @@ sqlite_memory = ":memory:"
 class SQLiteDirection(str, Enum, metaclass=MetaEnum):
     Ascending = "ASC"
     Descending = "DESC"
+
+
+@dataclass
+class LatencyStats:
+    """The count, total and max of a latency, in seconds. Thread-safe."""
+
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def record(self, elapsed: float) -> None:
+        with self._lock:
+            self.count += 1
+            self.total += elapsed
+            self.max = max(self.max, elapsed)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def __str__(self) -> str:
+        return f"count={self.count} mean={self.mean * 1000:.2f}ms max={self.max * 1000:.2f}ms"
+
+
+@dataclass
+class SqliteDatabaseStats:
+    """Lock wait and query latency stats for a `SqliteDatabase`."""
+
+    writer_lock_wait: LatencyStats = field(default_factory=LatencyStats)
+    """Time spent waiting to acquire the writer lock."""
+    writer_lock_hold: LatencyStats = field(default_factory=LatencyStats)
+    """Time the writer lock was held, which includes the queries run with it."""
+    reader_wait: LatencyStats = field(default_factory=LatencyStats)
+    """Time spent waiting for a pooled reader connection, when all are in use."""
+    read: LatencyStats = field(default_factory=LatencyStats)
+    """Time spent in `read()` blocks."""
+
+    def __str__(self) -> str:
+        return "\n".join(
+            f"  {name:<18} {stats}"
+            for name, stats in (
+                ("writer lock wait", self.writer_lock_wait),
+                ("writer lock hold", self.writer_lock_hold),
+                ("reader wait", self.reader_wait),
+                ("read", self.read),
+            )
+        )
+
+
+class InstrumentedRLock:
+    """
+    A re-entrant lock that records how long threads wait to acquire it, and how long they hold it.
+
+    Only the outermost acquire and release of each thread are recorded.
+    """
+
+    def __init__(self, wait_stats: LatencyStats, hold_stats: LatencyStats) -> None:
+        self._lock = threading.RLock()
+        self._wait_stats = wait_stats
+        self._hold_stats = hold_stats
+        # Only the owning thread reads or writes these
+        self._depth = 0
+        self._acquired_at = 0.0
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        start = time.perf_counter()
+        acquired = self._lock.acquire(blocking, timeout)
+        if acquired:
+            self._depth += 1
+            if self._depth == 1:
+                self._acquired_at = time.perf_counter()
+                self._wait_stats.record(self._acquired_at - start)
+        return acquired
+
+    def release(self) -> None:
+        if self._depth == 1:
+            self._hold_stats.record(time.perf_counter() - self._acquired_at)
+        self._depth -= 1
+        self._lock.release()
+
+    def __enter__(self) -> bool:
+        return self.acquire()
+
+    def __exit__(self, *args: Any) -> None:
+        self.release()
+
+
+def build_keyset_condition(
+    columns: Sequence[tuple[str, SQLiteDirection]], values: Sequence[Any]
+) -> tuple[str, list[Any]]:
+    """
+    Builds a condition selecting the rows after a cursor, for keyset pagination.
+
+    The columns and directions must match the query's `ORDER BY`, and the last column must be unique. The values are
+    the cursor - the ordered column values of the last row of the previous page.
+
+    For example, `[("starred", DESC), ("created_at", ASC)]` gives
+    `(starred < ? OR (starred = ? AND created_at > ?))`, with the params `[starred, starred, created_at]`.
+    """
+    if len(columns) != len(values) or not columns:
+        raise ValueError(f"Expected {len(columns)} cursor values, got {len(values)}")
+
+    def operator(direction: SQLiteDirection) -> str:
+        return "<" if direction is SQLiteDirection.Descending else ">"
+
+    last_column, last_direction = columns[-1]
+    condition = f"{last_column} {operator(last_direction)} ?"
+    params: list[Any] = [values[-1]]
+    for (column, direction), value in zip(reversed(columns[:-1]), reversed(values[:-1]), strict=True):
+        condition = f"({column} {operator(direction)} ? OR ({column} = ? AND {condition}))"
+        params = [value, value, *params]
+    return condition, params
+
+
+_FTS_QUERY_TERM = re.compile(r'"([^"]*)"?|(\S+)')
+
+
+def build_fts_query(text: str) -> Optional[str]:
+    """
+    Builds an FTS5 `MATCH` query from a user's search text, or returns None if the text has no terms.
+
+    Double-quoted terms are matched as phrases. Other terms are matched as prefixes, so `ban` matches `banana`. All of
+    the terms must match. Terms are always quoted, so FTS5 syntax like `AND`, `NEAR` or `col:` in the text is matched
+    as text.
+
+    For example, `red "a fox" ban` gives `"red"* "a fox" "ban"*`.
+    """
+    terms: list[str] = []
+    for phrase, word in _FTS_QUERY_TERM.findall(text):
+        term = phrase if phrase else word
+        if not term.strip():
+            continue
+        quoted = '"' + term.replace('"', '""') + '"'
+        terms.append(quoted if phrase else f"{quoted}*")
+    return " ".join(terms) if terms else None
+
+
+class VersionedCountCache:
+    """
+    Caches the counts of a table's listings, keyed by the listing filters, while the table is unchanged.
+
+    The table's version is kept in the `table_versions` table, and incremented by triggers whenever the table changes.
+    Checking the version is a primary key lookup, which replaces a count over the whole filtered set. The version must
+    be read in the same transaction as the count, so that a count is never cached with a newer version.
+    """
+
+    def __init__(self, table_name: str, max_size: int = 128) -> None:
+        self._table_name = table_name
+        self._max_size = max_size
+        self._counts: dict[Hashable, tuple[int, int]] = {}
+        self._lock = threading.Lock()
+
+    def get_count(self, cursor: sqlite3.Cursor, key: Hashable, count: Callable[[], int]) -> int:
+        """Gets the cached count for the key, calling `count` to count the rows if the table has changed."""
+        cursor.execute("SELECT version FROM table_versions WHERE table_name = ?;", (self._table_name,))
+        version = cursor.fetchone()[0]
+        with self._lock:
+            cached = self._counts.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        result = count()
+        with self._lock:
+            if key not in self._counts and len(self._counts) >= self._max_size:
+                # Evict the oldest entry
+                self._counts.pop(next(iter(self._counts)))
+            self._counts[key] = (version, result)
+        return result
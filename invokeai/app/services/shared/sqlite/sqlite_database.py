@@ -1,9 +1,13 @@
+import queue
 import sqlite3
 import threading
+import time
+from contextlib import contextmanager
 from logging import Logger
 from pathlib import Path
+from typing import Iterator
 
-from invokeai.app.services.shared.sqlite.sqlite_common import sqlite_memory
+from invokeai.app.services.shared.sqlite.sqlite_common import InstrumentedRLock, SqliteDatabaseStats, sqlite_memory
 
 
 class SqliteDatabase:
@@ -14,22 +18,45 @@ class SqliteDatabase:
     :param logger: Logger to use for logging.
     :param verbose: Whether to log SQL statements. Provides `logger.debug` as the SQLite trace callback.
 
+    :param reader_pool_size: The maximum number of read-only connections, used by `read()`.
+
     This is a light wrapper around the `sqlite3` module, providing a few conveniences:
     - The database file is written to disk if it does not exist.
     - Foreign key constraints are enabled by default.
     - The connection is configured to use the `sqlite3.Row` row factory.
+    - File databases use WAL journaling, so that reads are not blocked by writes, and vice versa.
 
     In addition to the constructor args, the instance provides the following attributes and methods:
-    - `conn`: A `sqlite3.Connection` object. Note that the connection must never be closed if the database is in-memory.
-    - `lock`: A shared re-entrant lock, used to approximate thread safety.
+    - `conn`: A `sqlite3.Connection` object, the only connection that writes. Note that the connection must never be
+      closed if the database is in-memory.
+    - `lock`: A shared re-entrant lock, used to approximate thread safety. It must be held to use `conn`.
+    - `read()`: A context manager providing a cursor on a pooled, read-only connection.
+    - `stats`: Lock wait and query latency stats.
     - `clean()`: Runs the SQL `VACUUM;` command and reports on the freed space.
     """
 
-    def __init__(self, db_path: Path | None, logger: Logger, verbose: bool = False) -> None:
+    # WAL makes commits durable at checkpoints rather than on every commit. A crash may roll back the latest commits,
+    # but never corrupts the database.
+    WRITER_PRAGMAS = [
+        "PRAGMA journal_mode = WAL;",
+        "PRAGMA synchronous = NORMAL;",
+        "PRAGMA mmap_size = 268435456;",  # 256MB
+        "PRAGMA cache_size = -65536;",  # 64MB
+        "PRAGMA busy_timeout = 5000;",
+    ]
+    READER_PRAGMAS = [
+        "PRAGMA query_only = ON;",
+        "PRAGMA mmap_size = 268435456;",
+        "PRAGMA cache_size = -16384;",  # 16MB
+        "PRAGMA busy_timeout = 5000;",
+    ]
+
+    def __init__(self, db_path: Path | None, logger: Logger, verbose: bool = False, reader_pool_size: int = 4) -> None:
         """Initializes the database. This is used internally by the class constructor."""
         self.logger = logger
         self.db_path = db_path
         self.verbose = verbose
+        self.stats = SqliteDatabaseStats()
 
         if not self.db_path:
             logger.info("Initializing in-memory database")
@@ -38,7 +65,7 @@ class SqliteDatabase:
             self.logger.info(f"Initializing database at {self.db_path}")
 
         self.conn = sqlite3.connect(database=self.db_path or sqlite_memory, check_same_thread=False)
-        self.lock = threading.RLock()
+        self.lock = InstrumentedRLock(self.stats.writer_lock_wait, self.stats.writer_lock_hold)
         self.conn.row_factory = sqlite3.Row
 
         if self.verbose:
@@ -46,6 +73,92 @@ class SqliteDatabase:
 
         self.conn.execute("PRAGMA foreign_keys = ON;")
 
+        # An in-memory database is private to its connection, so it is read via the writer connection
+        self._reader_pool_size = reader_pool_size if self.db_path else 0
+        self._readers: queue.LifoQueue[sqlite3.Connection] = queue.LifoQueue()
+        self._reader_count = 0
+        self._reader_count_lock = threading.Lock()
+
+        if self.db_path:
+            for pragma in self.WRITER_PRAGMAS:
+                self.conn.execute(pragma)
+
+    def _open_reader(self) -> sqlite3.Connection:
+        assert self.db_path is not None
+        conn = sqlite3.connect(
+            f"{self.db_path.resolve().as_uri()}?mode=ro", uri=True, check_same_thread=False, isolation_level=None
+        )
+        conn.row_factory = sqlite3.Row
+        if self.verbose:
+            conn.set_trace_callback(self.logger.debug)
+        for pragma in self.READER_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def _acquire_reader(self) -> sqlite3.Connection:
+        try:
+            return self._readers.get_nowait()
+        except queue.Empty:
+            pass
+        with self._reader_count_lock:
+            if self._reader_count < self._reader_pool_size:
+                self._reader_count += 1
+                open_new = True
+            else:
+                open_new = False
+        if open_new:
+            try:
+                return self._open_reader()
+            except Exception:
+                with self._reader_count_lock:
+                    self._reader_count -= 1
+                raise
+        # All readers are in use - wait for one to be returned
+        start = time.perf_counter()
+        conn = self._readers.get()
+        self.stats.reader_wait.record(time.perf_counter() - start)
+        return conn
+
+    @contextmanager
+    def read(self) -> Iterator[sqlite3.Cursor]:
+        """
+        Provides a cursor for reads. The cursor must not be used to write, or outside of the context.
+
+        For a file database, the cursor is on a read-only connection from the pool, in a transaction, so all queries
+        see the same snapshot of the database. Reads do not take `lock`, and are not blocked by writes in progress.
+        For an in-memory database, `lock` is held and the cursor is on the writer connection.
+
+        Reads must not be nested - when the pool is exhausted, a nested read would wait on itself.
+        """
+        if not self._reader_pool_size:
+            with self.lock:
+                start = time.perf_counter()
+                cursor = self.conn.cursor()
+                try:
+                    yield cursor
+                finally:
+                    cursor.close()
+                    self.stats.read.record(time.perf_counter() - start)
+            return
+
+        conn = self._acquire_reader()
+        start = time.perf_counter()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("BEGIN;")
+            yield cursor
+        finally:
+            try:
+                cursor.close()
+                conn.rollback()
+            finally:
+                self._readers.put(conn)
+                self.stats.read.record(time.perf_counter() - start)
+
+    def log_stats(self) -> None:
+        """Logs the lock wait and query latency stats."""
+        self.logger.debug(f"Database stats:\n{self.stats}")
+
     def clean(self) -> None:
         """
         Cleans the database by running the VACUUM command, reporting on the freed space.
@@ -0,0 +1,198 @@
+import sqlite3
+
+from invokeai.app.services.shared.sqlite_migrator.sqlite_migrator_common import Migration
+
+
+class Migration16Callback:
+    def __call__(self, cursor: sqlite3.Cursor) -> None:
+        self._add_pending_index(cursor)
+        self._create_status_counts(cursor)
+
+    def _add_pending_index(self, cursor: sqlite3.Cursor) -> None:
+        """
+        Adds a partial index over pending queue items, matching the dequeue ordering. Only pending items are indexed,
+        so dequeuing does not need to scan the queue history.
+        """
+
+        cursor.execute(
+            """--sql
+            CREATE INDEX IF NOT EXISTS idx_session_queue_pending
+            ON session_queue(priority DESC, item_id ASC, queue_id)
+            WHERE status = 'pending';
+            """
+        )
+
+    def _create_status_counts(self, cursor: sqlite3.Cursor) -> None:
+        """
+        Creates per-queue and per-batch status counters, maintained by triggers on `session_queue`.
+
+        The counters are updated in the same transaction as the change to the queue item, so they are always consistent
+        with the `session_queue` table. The counters are backfilled from the existing queue items.
+        """
+
+        tables = [
+            """--sql
+            CREATE TABLE IF NOT EXISTS session_queue_counts (
+                queue_id TEXT NOT NULL PRIMARY KEY,
+                pending INTEGER NOT NULL DEFAULT 0,
+                in_progress INTEGER NOT NULL DEFAULT 0,
+                completed INTEGER NOT NULL DEFAULT 0,
+                failed INTEGER NOT NULL DEFAULT 0,
+                canceled INTEGER NOT NULL DEFAULT 0
+            );
+            """,
+            """--sql
+            CREATE TABLE IF NOT EXISTS session_queue_batch_counts (
+                queue_id TEXT NOT NULL,
+                batch_id TEXT NOT NULL,
+                origin TEXT,
+                destination TEXT,
+                pending INTEGER NOT NULL DEFAULT 0,
+                in_progress INTEGER NOT NULL DEFAULT 0,
+                completed INTEGER NOT NULL DEFAULT 0,
+                failed INTEGER NOT NULL DEFAULT 0,
+                canceled INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (queue_id, batch_id)
+            );
+            """,
+        ]
+
+        # SQLite evaluates comparisons to 0 or 1, so `(NEW.status = 'pending')` adds one to the matching counter only.
+        triggers = [
+            """--sql
+            CREATE TRIGGER IF NOT EXISTS tg_session_queue_counts_insert
+            AFTER INSERT ON session_queue
+            FOR EACH ROW
+            BEGIN
+                INSERT INTO session_queue_counts (queue_id) VALUES (NEW.queue_id)
+                ON CONFLICT (queue_id) DO NOTHING;
+                UPDATE session_queue_counts
+                SET
+                    pending = pending + (NEW.status = 'pending'),
+                    in_progress = in_progress + (NEW.status = 'in_progress'),
+                    completed = completed + (NEW.status = 'completed'),
+                    failed = failed + (NEW.status = 'failed'),
+                    canceled = canceled + (NEW.status = 'canceled')
+                WHERE queue_id = NEW.queue_id;
+                INSERT INTO session_queue_batch_counts (queue_id, batch_id, origin, destination)
+                VALUES (NEW.queue_id, NEW.batch_id, NEW.origin, NEW.destination)
+                ON CONFLICT (queue_id, batch_id) DO NOTHING;
+                UPDATE session_queue_batch_counts
+                SET
+                    pending = pending + (NEW.status = 'pending'),
+                    in_progress = in_progress + (NEW.status = 'in_progress'),
+                    completed = completed + (NEW.status = 'completed'),
+                    failed = failed + (NEW.status = 'failed'),
+                    canceled = canceled + (NEW.status = 'canceled')
+                WHERE queue_id = NEW.queue_id AND batch_id = NEW.batch_id;
+            END;
+            """,
+            """--sql
+            CREATE TRIGGER IF NOT EXISTS tg_session_queue_counts_update
+            AFTER UPDATE OF status ON session_queue
+            FOR EACH ROW
+            WHEN OLD.status != NEW.status
+            BEGIN
+                UPDATE session_queue_counts
+                SET
+                    pending = pending + (NEW.status = 'pending') - (OLD.status = 'pending'),
+                    in_progress = in_progress + (NEW.status = 'in_progress') - (OLD.status = 'in_progress'),
+                    completed = completed + (NEW.status = 'completed') - (OLD.status = 'completed'),
+                    failed = failed + (NEW.status = 'failed') - (OLD.status = 'failed'),
+                    canceled = canceled + (NEW.status = 'canceled') - (OLD.status = 'canceled')
+                WHERE queue_id = NEW.queue_id;
+                UPDATE session_queue_batch_counts
+                SET
+                    pending = pending + (NEW.status = 'pending') - (OLD.status = 'pending'),
+                    in_progress = in_progress + (NEW.status = 'in_progress') - (OLD.status = 'in_progress'),
+                    completed = completed + (NEW.status = 'completed') - (OLD.status = 'completed'),
+                    failed = failed + (NEW.status = 'failed') - (OLD.status = 'failed'),
+                    canceled = canceled + (NEW.status = 'canceled') - (OLD.status = 'canceled')
+                WHERE queue_id = NEW.queue_id AND batch_id = NEW.batch_id;
+            END;
+            """,
+            """--sql
+            CREATE TRIGGER IF NOT EXISTS tg_session_queue_counts_delete
+            AFTER DELETE ON session_queue
+            FOR EACH ROW
+            BEGIN
+                UPDATE session_queue_counts
+                SET
+                    pending = pending - (OLD.status = 'pending'),
+                    in_progress = in_progress - (OLD.status = 'in_progress'),
+                    completed = completed - (OLD.status = 'completed'),
+                    failed = failed - (OLD.status = 'failed'),
+                    canceled = canceled - (OLD.status = 'canceled')
+                WHERE queue_id = OLD.queue_id;
+                UPDATE session_queue_batch_counts
+                SET
+                    pending = pending - (OLD.status = 'pending'),
+                    in_progress = in_progress - (OLD.status = 'in_progress'),
+                    completed = completed - (OLD.status = 'completed'),
+                    failed = failed - (OLD.status = 'failed'),
+                    canceled = canceled - (OLD.status = 'canceled')
+                WHERE queue_id = OLD.queue_id AND batch_id = OLD.batch_id;
+                -- Batches with no remaining queue items are removed
+                DELETE FROM session_queue_batch_counts
+                WHERE
+                    queue_id = OLD.queue_id
+                    AND batch_id = OLD.batch_id
+                    AND pending + in_progress + completed + failed + canceled = 0;
+            END;
+            """,
+        ]
+
+        backfill = [
+            """--sql
+            INSERT INTO session_queue_counts (queue_id, pending, in_progress, completed, failed, canceled)
+            SELECT
+                queue_id,
+                SUM(status = 'pending'),
+                SUM(status = 'in_progress'),
+                SUM(status = 'completed'),
+                SUM(status = 'failed'),
+                SUM(status = 'canceled')
+            FROM session_queue
+            GROUP BY queue_id;
+            """,
+            """--sql
+            INSERT INTO session_queue_batch_counts (
+                queue_id, batch_id, origin, destination, pending, in_progress, completed, failed, canceled
+            )
+            SELECT
+                queue_id,
+                batch_id,
+                MAX(origin),
+                MAX(destination),
+                SUM(status = 'pending'),
+                SUM(status = 'in_progress'),
+                SUM(status = 'completed'),
+                SUM(status = 'failed'),
+                SUM(status = 'canceled')
+            FROM session_queue
+            GROUP BY queue_id, batch_id;
+            """,
+        ]
+
+        for stmt in tables + backfill + triggers:
+            cursor.execute(stmt)
+
+
+def build_migration_16() -> Migration:
+    """
+    Build the migration from database version 15 to 16.
+
+    This migration does the following:
+        - Adds a partial index over pending session queue items, used to dequeue.
+        - Adds the `session_queue_counts` and `session_queue_batch_counts` tables, which hold per-queue and per-batch
+          status counts.
+        - Adds triggers to keep the status counts in sync with the session queue.
+        - Backfills the status counts from the existing session queue items.
+    """
+    migration_16 = Migration(
+        from_version=15,
+        to_version=16,
+        callback=Migration16Callback(),
+    )
+
+    return migration_16
@@ -0,0 +1,211 @@
+import sqlite3
+from typing import Optional
+
+from invokeai.app.services.shared.sqlite_migrator.sqlite_migrator_common import Migration
+
+
+def _cover_image_query(board_id: str, exclude_image_name: Optional[str] = None) -> str:
+    """
+    Builds a subquery selecting a board's cover image - its most recent non-intermediate image, starred images first.
+    This must match the ordering of `get_most_recent_image_for_board`.
+    """
+    exclude = f"AND images.image_name != {exclude_image_name}" if exclude_image_name else ""
+    return f"""(
+        SELECT images.image_name
+        FROM board_images
+        JOIN images ON images.image_name = board_images.image_name
+        WHERE
+            board_images.board_id = {board_id}
+            AND images.is_intermediate = FALSE
+            {exclude}
+        ORDER BY images.starred DESC, images.created_at DESC
+        LIMIT 1
+    )"""
+
+
+def _image_count_query(board_id: str) -> str:
+    """Builds a subquery counting a board's non-intermediate images."""
+    return f"""(
+        SELECT COUNT(*)
+        FROM board_images
+        JOIN images ON images.image_name = board_images.image_name
+        WHERE
+            board_images.board_id = {board_id}
+            AND images.is_intermediate = FALSE
+    )"""
+
+
+def _sorts_before_cover(image_name: str) -> str:
+    """Builds a condition that is true if the image should replace the board summary's cover image."""
+    return f"""(
+        board_summaries.cover_image_name IS NULL
+        OR EXISTS (
+            SELECT 1
+            FROM images AS image, images AS cover
+            WHERE
+                image.image_name = {image_name}
+                AND cover.image_name = board_summaries.cover_image_name
+                AND (
+                    image.starred > cover.starred
+                    OR (image.starred = cover.starred AND image.created_at >= cover.created_at)
+                )
+        )
+    )"""
+
+
+class Migration17Callback:
+    def __call__(self, cursor: sqlite3.Cursor) -> None:
+        self._create_board_summaries(cursor)
+
+    def _create_board_summaries(self, cursor: sqlite3.Cursor) -> None:
+        """
+        Creates the `board_summaries` table, holding each board's image count and cover image.
+
+        The summaries are maintained by triggers on `boards`, `board_images` and `images`, in the same transaction as
+        the change. Adding an image to a board only compares it with the current cover. The cover is recomputed from the
+        board's images only when the current cover is removed, or when an image in the board is starred or unstarred.
+
+        When an image is deleted, the `board_images` row is deleted by `ON DELETE CASCADE` after the image row is gone.
+        The image's board is updated by a `BEFORE DELETE` trigger on `images` instead, while the image can still be read.
+        """
+
+        tables = [
+            """--sql
+            CREATE TABLE IF NOT EXISTS board_summaries (
+                board_id TEXT NOT NULL PRIMARY KEY,
+                image_count INTEGER NOT NULL DEFAULT 0,
+                cover_image_name TEXT,
+                FOREIGN KEY (board_id) REFERENCES boards (board_id) ON DELETE CASCADE
+            );
+            """,
+        ]
+
+        backfill = [
+            f"""--sql
+            INSERT INTO board_summaries (board_id, image_count, cover_image_name)
+            SELECT
+                boards.board_id,
+                {_image_count_query("boards.board_id")},
+                {_cover_image_query("boards.board_id")}
+            FROM boards;
+            """,
+        ]
+
+        triggers = [
+            """--sql
+            CREATE TRIGGER IF NOT EXISTS tg_board_summaries_board_insert
+            AFTER INSERT ON boards
+            FOR EACH ROW
+            BEGIN
+                INSERT INTO board_summaries (board_id) VALUES (NEW.board_id)
+                ON CONFLICT (board_id) DO NOTHING;
+            END;
+            """,
+            f"""--sql
+            CREATE TRIGGER IF NOT EXISTS tg_board_summaries_board_image_insert
+            AFTER INSERT ON board_images
+            FOR EACH ROW
+            WHEN EXISTS (SELECT 1 FROM images WHERE image_name = NEW.image_name AND is_intermediate = FALSE)
+            BEGIN
+                UPDATE board_summaries
+                SET
+                    image_count = image_count + 1,
+                    cover_image_name = CASE
+                        WHEN {_sorts_before_cover("NEW.image_name")} THEN NEW.image_name
+                        ELSE cover_image_name
+                    END
+                WHERE board_id = NEW.board_id;
+            END;
+            """,
+            # Images are moved between boards with an upsert, which updates the board_id
+            f"""--sql
+            CREATE TRIGGER IF NOT EXISTS tg_board_summaries_board_image_update
+            AFTER UPDATE OF board_id ON board_images
+            FOR EACH ROW
+            WHEN
+                OLD.board_id != NEW.board_id
+                AND EXISTS (SELECT 1 FROM images WHERE image_name = NEW.image_name AND is_intermediate = FALSE)
+            BEGIN
+                UPDATE board_summaries
+                SET image_count = image_count - 1
+                WHERE board_id = OLD.board_id;
+                UPDATE board_summaries
+                SET cover_image_name = {_cover_image_query("OLD.board_id")}
+                WHERE board_id = OLD.board_id AND cover_image_name = OLD.image_name;
+                UPDATE board_summaries
+                SET
+                    image_count = image_count + 1,
+                    cover_image_name = CASE
+                        WHEN {_sorts_before_cover("NEW.image_name")} THEN NEW.image_name
+                        ELSE cover_image_name
+                    END
+                WHERE board_id = NEW.board_id;
+            END;
+            """,
+            # Only handles images removed from a board. Deleted images are handled by the images delete trigger.
+            f"""--sql
+            CREATE TRIGGER IF NOT EXISTS tg_board_summaries_board_image_delete
+            AFTER DELETE ON board_images
+            FOR EACH ROW
+            WHEN EXISTS (SELECT 1 FROM images WHERE image_name = OLD.image_name AND is_intermediate = FALSE)
+            BEGIN
+                UPDATE board_summaries
+                SET image_count = image_count - 1
+                WHERE board_id = OLD.board_id;
+                UPDATE board_summaries
+                SET cover_image_name = {_cover_image_query("OLD.board_id")}
+                WHERE board_id = OLD.board_id AND cover_image_name = OLD.image_name;
+            END;
+            """,
+            f"""--sql
+            CREATE TRIGGER IF NOT EXISTS tg_board_summaries_image_delete
+            BEFORE DELETE ON images
+            FOR EACH ROW
+            WHEN OLD.is_intermediate = FALSE
+            BEGIN
+                UPDATE board_summaries
+                SET
+                    image_count = image_count - 1,
+                    cover_image_name = CASE
+                        WHEN cover_image_name = OLD.image_name
+                        THEN {_cover_image_query("board_summaries.board_id", exclude_image_name="OLD.image_name")}
+                        ELSE cover_image_name
+                    END
+                WHERE board_id = (SELECT board_id FROM board_images WHERE image_name = OLD.image_name);
+            END;
+            """,
+            f"""--sql
+            CREATE TRIGGER IF NOT EXISTS tg_board_summaries_image_update
+            AFTER UPDATE OF is_intermediate, starred ON images
+            FOR EACH ROW
+            WHEN OLD.is_intermediate IS NOT NEW.is_intermediate OR OLD.starred IS NOT NEW.starred
+            BEGIN
+                UPDATE board_summaries
+                SET
+                    image_count = image_count + (NEW.is_intermediate = FALSE) - (OLD.is_intermediate = FALSE),
+                    cover_image_name = {_cover_image_query("board_summaries.board_id")}
+                WHERE board_id = (SELECT board_id FROM board_images WHERE image_name = NEW.image_name);
+            END;
+            """,
+        ]
+
+        for stmt in tables + backfill + triggers:
+            cursor.execute(stmt)
+
+
+def build_migration_17() -> Migration:
+    """
+    Build the migration from database version 16 to 17.
+
+    This migration does the following:
+        - Adds the `board_summaries` table, which holds each board's image count and cover image.
+        - Adds triggers to keep the board summaries in sync with the boards, board images and images.
+        - Backfills the board summaries from the existing boards.
+    """
+    migration_17 = Migration(
+        from_version=16,
+        to_version=17,
+        callback=Migration17Callback(),
+    )
+
+    return migration_17
@@ -0,0 +1,110 @@
+import sqlite3
+
+from invokeai.app.services.shared.sqlite_migrator.sqlite_migrator_common import Migration
+
+
+class Migration18Callback:
+    def __call__(self, cursor: sqlite3.Cursor) -> None:
+        self._add_keyset_indexes(cursor)
+        self._create_table_versions(cursor)
+
+    def _add_keyset_indexes(self, cursor: sqlite3.Cursor) -> None:
+        """
+        Adds indexes matching the orderings of the image, workflow and queue listings, ending with a unique column, so
+        that a page after a cursor is read directly from the index.
+
+        The new image indexes start with the columns of `idx_images_starred` and `idx_images_created_at`, which are
+        dropped.
+        """
+
+        indexes = [
+            "CREATE INDEX IF NOT EXISTS idx_images_starred_created_at_image_name ON images(starred, created_at, image_name);",
+            "CREATE INDEX IF NOT EXISTS idx_images_created_at_image_name ON images(created_at, image_name);",
+            "DROP INDEX IF EXISTS idx_images_starred;",
+            "DROP INDEX IF EXISTS idx_images_created_at;",
+            "CREATE INDEX IF NOT EXISTS idx_workflow_library_category_created_at ON workflow_library(category, created_at, workflow_id);",
+            "CREATE INDEX IF NOT EXISTS idx_workflow_library_category_updated_at ON workflow_library(category, updated_at, workflow_id);",
+            "CREATE INDEX IF NOT EXISTS idx_workflow_library_category_opened_at ON workflow_library(category, opened_at, workflow_id);",
+            "CREATE INDEX IF NOT EXISTS idx_workflow_library_category_name ON workflow_library(category, name, workflow_id);",
+            "CREATE INDEX IF NOT EXISTS idx_session_queue_queue_id_priority_item_id ON session_queue(queue_id, priority DESC, item_id ASC);",
+        ]
+
+        for stmt in indexes:
+            cursor.execute(stmt)
+
+    def _create_table_versions(self, cursor: sqlite3.Cursor) -> None:
+        """
+        Creates the `table_versions` table, holding a version for each table with cached listing counts.
+
+        Triggers increment a table's version whenever a row is added or removed, or a column that listings filter on is
+        changed. Cached counts are only used while the table's version is unchanged. Changes to `board_images` change
+        the version of `images`, because the image listings filter by board.
+        """
+
+        tables = [
+            """--sql
+            CREATE TABLE IF NOT EXISTS table_versions (
+                table_name TEXT NOT NULL PRIMARY KEY,
+                version INTEGER NOT NULL DEFAULT 0
+            );
+            """,
+            "INSERT OR IGNORE INTO table_versions (table_name) VALUES ('images'), ('workflow_library');",
+        ]
+
+        # The changes that increment a table's version, as (trigger name, versioned table, changed table, event)
+        versioned_events = [
+            ("tg_table_versions_images_insert", "images", "images", "AFTER INSERT"),
+            ("tg_table_versions_images_delete", "images", "images", "AFTER DELETE"),
+            (
+                "tg_table_versions_images_update",
+                "images",
+                "images",
+                "AFTER UPDATE OF image_origin, image_category, is_intermediate, metadata",
+            ),
+            ("tg_table_versions_board_images_insert", "images", "board_images", "AFTER INSERT"),
+            ("tg_table_versions_board_images_delete", "images", "board_images", "AFTER DELETE"),
+            ("tg_table_versions_board_images_update", "images", "board_images", "AFTER UPDATE OF board_id"),
+            ("tg_table_versions_workflow_library_insert", "workflow_library", "workflow_library", "AFTER INSERT"),
+            ("tg_table_versions_workflow_library_delete", "workflow_library", "workflow_library", "AFTER DELETE"),
+            (
+                "tg_table_versions_workflow_library_update",
+                "workflow_library",
+                "workflow_library",
+                # The category, name and description are generated from the workflow column
+                "AFTER UPDATE OF workflow",
+            ),
+        ]
+
+        triggers = [
+            f"""--sql
+            CREATE TRIGGER IF NOT EXISTS {trigger_name}
+            {event} ON {table_name}
+            FOR EACH ROW
+            BEGIN
+                UPDATE table_versions SET version = version + 1 WHERE table_name = '{versioned_table}';
+            END;
+            """
+            for trigger_name, versioned_table, table_name, event in versioned_events
+        ]
+
+        for stmt in tables + triggers:
+            cursor.execute(stmt)
+
+
+def build_migration_18() -> Migration:
+    """
+    Build the migration from database version 17 to 18.
+
+    This migration does the following:
+        - Adds composite indexes for keyset pagination of images, workflows and queue items.
+        - Drops the `idx_images_starred` and `idx_images_created_at` indexes, which are covered by the new indexes.
+        - Adds the `table_versions` table, and triggers to increment the versions of `images` and `workflow_library`
+          when they change.
+    """
+    migration_18 = Migration(
+        from_version=17,
+        to_version=18,
+        callback=Migration18Callback(),
+    )
+
+    return migration_18
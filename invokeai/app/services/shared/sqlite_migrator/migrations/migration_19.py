@@ -0,0 +1,246 @@
+import sqlite3
+
+from invokeai.app.services.shared.sqlite_migrator.sqlite_migrator_common import Migration
+
+BACKFILL_BATCH_SIZE = 10_000
+
+
+def _image_search_values(metadata: str) -> str:
+    """
+    Builds the values of an `images_fts` row from an image's metadata JSON.
+
+    - `prompt`: The positive and negative prompts, and the style prompts.
+    - `model`: The name of every model in the metadata - the main model, LoRAs, VAE, etc.
+    - `seed`: The seed.
+    - `other`: Every other short text or number value, so that a search still matches any metadata value.
+
+    Images without metadata, or with invalid metadata JSON, get an empty row.
+    """
+    return f"""
+        CASE WHEN json_valid({metadata}) THEN (
+            SELECT group_concat(value, ' ') FROM json_tree({metadata})
+            WHERE type = 'text' AND key LIKE '%prompt%'
+        ) END,
+        CASE WHEN json_valid({metadata}) THEN (
+            SELECT group_concat(value, ' ') FROM json_tree({metadata})
+            WHERE type = 'text' AND key = 'name'
+        ) END,
+        CASE WHEN json_valid({metadata}) THEN json_extract({metadata}, '$.seed') END,
+        CASE WHEN json_valid({metadata}) THEN (
+            SELECT group_concat(value, ' ') FROM json_tree({metadata})
+            WHERE
+                type IN ('text', 'integer', 'real')
+                AND length(value) < 256
+                AND (key IS NULL OR (key NOT LIKE '%prompt%' AND key NOT IN ('name', 'seed')))
+        ) END
+    """
+
+
+def _workflow_search_values(workflow: str) -> str:
+    """Builds the values of a `workflow_library_fts` row from a workflow's JSON."""
+    return f"""
+        json_extract({workflow}, '$.name'),
+        json_extract({workflow}, '$.description'),
+        json_extract({workflow}, '$.tags')
+    """
+
+
+class Migration19Callback:
+    def __call__(self, cursor: sqlite3.Cursor) -> None:
+        self._create_images_fts(cursor)
+        self._create_workflow_library_fts(cursor)
+
+    def _create_images_fts(self, cursor: sqlite3.Cursor) -> None:
+        """
+        Creates the `images_fts` full-text search table over image metadata, kept in sync by triggers on `images`.
+
+        FTS rows are identified by integer rowids, but the rowids of `images` may change when the database is vacuumed,
+        because its primary key is the image name. `images_fts_rowids` gives each image a stable rowid instead.
+        """
+
+        tables = [
+            """--sql
+            CREATE TABLE IF NOT EXISTS images_fts_rowids (
+                rowid INTEGER PRIMARY KEY,
+                image_name TEXT NOT NULL UNIQUE
+            );
+            """,
+            """--sql
+            CREATE VIRTUAL TABLE IF NOT EXISTS images_fts USING fts5(
+                prompt,
+                model,
+                seed,
+                other,
+                tokenize = 'unicode61 remove_diacritics 2',
+                prefix = '2 3'
+            );
+            """,
+        ]
+
+        triggers = [
+            f"""--sql
+            CREATE TRIGGER IF NOT EXISTS tg_images_fts_insert
+            AFTER INSERT ON images
+            FOR EACH ROW
+            BEGIN
+                INSERT INTO images_fts_rowids (image_name) VALUES (NEW.image_name);
+                INSERT INTO images_fts (rowid, prompt, model, seed, other)
+                VALUES (
+                    (SELECT rowid FROM images_fts_rowids WHERE image_name = NEW.image_name),
+                    {_image_search_values("NEW.metadata")}
+                );
+            END;
+            """,
+            f"""--sql
+            CREATE TRIGGER IF NOT EXISTS tg_images_fts_update
+            AFTER UPDATE OF metadata ON images
+            FOR EACH ROW
+            BEGIN
+                DELETE FROM images_fts
+                WHERE rowid = (SELECT rowid FROM images_fts_rowids WHERE image_name = NEW.image_name);
+                INSERT INTO images_fts (rowid, prompt, model, seed, other)
+                VALUES (
+                    (SELECT rowid FROM images_fts_rowids WHERE image_name = NEW.image_name),
+                    {_image_search_values("NEW.metadata")}
+                );
+            END;
+            """,
+            """--sql
+            CREATE TRIGGER IF NOT EXISTS tg_images_fts_delete
+            AFTER DELETE ON images
+            FOR EACH ROW
+            BEGIN
+                DELETE FROM images_fts
+                WHERE rowid = (SELECT rowid FROM images_fts_rowids WHERE image_name = OLD.image_name);
+                DELETE FROM images_fts_rowids WHERE image_name = OLD.image_name;
+            END;
+            """,
+        ]
+
+        for stmt in tables + triggers:
+            cursor.execute(stmt)
+
+        cursor.execute("INSERT OR IGNORE INTO images_fts_rowids (image_name) SELECT image_name FROM images;")
+        self._backfill(
+            cursor,
+            "images_fts_rowids",
+            f"""--sql
+            INSERT INTO images_fts (rowid, prompt, model, seed, other)
+            SELECT images_fts_rowids.rowid, {_image_search_values("images.metadata")}
+            FROM images_fts_rowids
+            JOIN images ON images.image_name = images_fts_rowids.image_name
+            WHERE images_fts_rowids.rowid > ? AND images_fts_rowids.rowid <= ?;
+            """,
+        )
+
+    def _create_workflow_library_fts(self, cursor: sqlite3.Cursor) -> None:
+        """
+        Creates the `workflow_library_fts` full-text search table over workflow names, descriptions and tags, kept in
+        sync by triggers on `workflow_library`. Rowids are mapped like `images_fts`.
+        """
+
+        tables = [
+            """--sql
+            CREATE TABLE IF NOT EXISTS workflow_library_fts_rowids (
+                rowid INTEGER PRIMARY KEY,
+                workflow_id TEXT NOT NULL UNIQUE
+            );
+            """,
+            """--sql
+            CREATE VIRTUAL TABLE IF NOT EXISTS workflow_library_fts USING fts5(
+                name,
+                description,
+                tags,
+                tokenize = 'unicode61 remove_diacritics 2',
+                prefix = '2 3'
+            );
+            """,
+        ]
+
+        triggers = [
+            f"""--sql
+            CREATE TRIGGER IF NOT EXISTS tg_workflow_library_fts_insert
+            AFTER INSERT ON workflow_library
+            FOR EACH ROW
+            BEGIN
+                INSERT INTO workflow_library_fts_rowids (workflow_id) VALUES (NEW.workflow_id);
+                INSERT INTO workflow_library_fts (rowid, name, description, tags)
+                VALUES (
+                    (SELECT rowid FROM workflow_library_fts_rowids WHERE workflow_id = NEW.workflow_id),
+                    {_workflow_search_values("NEW.workflow")}
+                );
+            END;
+            """,
+            f"""--sql
+            CREATE TRIGGER IF NOT EXISTS tg_workflow_library_fts_update
+            AFTER UPDATE OF workflow ON workflow_library
+            FOR EACH ROW
+            BEGIN
+                DELETE FROM workflow_library_fts
+                WHERE rowid = (SELECT rowid FROM workflow_library_fts_rowids WHERE workflow_id = NEW.workflow_id);
+                INSERT INTO workflow_library_fts (rowid, name, description, tags)
+                VALUES (
+                    (SELECT rowid FROM workflow_library_fts_rowids WHERE workflow_id = NEW.workflow_id),
+                    {_workflow_search_values("NEW.workflow")}
+                );
+            END;
+            """,
+            """--sql
+            CREATE TRIGGER IF NOT EXISTS tg_workflow_library_fts_delete
+            AFTER DELETE ON workflow_library
+            FOR EACH ROW
+            BEGIN
+                DELETE FROM workflow_library_fts
+                WHERE rowid = (SELECT rowid FROM workflow_library_fts_rowids WHERE workflow_id = OLD.workflow_id);
+                DELETE FROM workflow_library_fts_rowids WHERE workflow_id = OLD.workflow_id;
+            END;
+            """,
+        ]
+
+        for stmt in tables + triggers:
+            cursor.execute(stmt)
+
+        cursor.execute(
+            "INSERT OR IGNORE INTO workflow_library_fts_rowids (workflow_id) SELECT workflow_id FROM workflow_library;"
+        )
+        self._backfill(
+            cursor,
+            "workflow_library_fts_rowids",
+            f"""--sql
+            INSERT INTO workflow_library_fts (rowid, name, description, tags)
+            SELECT workflow_library_fts_rowids.rowid, {_workflow_search_values("workflow_library.workflow")}
+            FROM workflow_library_fts_rowids
+            JOIN workflow_library ON workflow_library.workflow_id = workflow_library_fts_rowids.workflow_id
+            WHERE workflow_library_fts_rowids.rowid > ? AND workflow_library_fts_rowids.rowid <= ?;
+            """,
+        )
+
+    def _backfill(self, cursor: sqlite3.Cursor, rowids_table: str, insert_batch: str) -> None:
+        """
+        Backfills an FTS table in batches of rowids, so that each statement only extracts and tokenizes a bounded
+        number of rows. The `insert_batch` statement takes the exclusive start and inclusive end rowids of the batch.
+        """
+        cursor.execute(f"SELECT MAX(rowid) FROM {rowids_table};")
+        max_rowid = cursor.fetchone()[0] or 0
+        for start in range(0, max_rowid, BACKFILL_BATCH_SIZE):
+            cursor.execute(insert_batch, (start, start + BACKFILL_BATCH_SIZE))
+
+
+def build_migration_19() -> Migration:
+    """
+    Build the migration from database version 18 to 19.
+
+    This migration does the following:
+        - Adds the `images_fts` full-text search table over image metadata - prompts, model names, seeds and other
+          values - with triggers to keep it in sync with `images`.
+        - Adds the `workflow_library_fts` full-text search table over workflow names, descriptions and tags, with
+          triggers to keep it in sync with `workflow_library`.
+        - Backfills both tables in batches.
+    """
+    migration_19 = Migration(
+        from_version=18,
+        to_version=19,
+        callback=Migration19Callback(),
+    )
+
+    return migration_19
@@ -0,0 +1,68 @@
+import sqlite3
+
+from invokeai.app.services.shared.sqlite_migrator.sqlite_migrator_common import Migration
+
+
+class Migration20Callback:
+    def __call__(self, cursor: sqlite3.Cursor) -> None:
+        self._add_models_hash_index(cursor)
+        self._add_images_is_intermediate_index(cursor)
+        self._add_session_queue_indexes(cursor)
+
+    def _add_models_hash_index(self, cursor: sqlite3.Cursor) -> None:
+        """
+        Adds an index on the virtual `hash` column of `models`, so that models are looked up by hash without
+        extracting the hash from the config of every model.
+        """
+
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_models_hash ON models(hash);")
+
+    def _add_images_is_intermediate_index(self, cursor: sqlite3.Cursor) -> None:
+        """
+        Adds an index on the `is_intermediate` column of `images`. The gallery always excludes intermediate images, so
+        its image counts, and the intermediates count, are read from the index instead of the table.
+        """
+
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_images_is_intermediate ON images(is_intermediate);")
+
+    def _add_session_queue_indexes(self, cursor: sqlite3.Cursor) -> None:
+        """
+        Adds indexes for the queue item lookups by queue and status.
+
+        - `idx_session_queue_queue_id_status_priority_item_id` matches the ordering of the next pending item of a
+          queue, and of the queue item listing filtered by status.
+        - `idx_session_queue_in_progress` is a partial index over the in-progress items, of which there is at most one
+          per session processor worker. It is used to find the current item, and to cancel in-progress items on startup.
+
+        The single-column `status` and `priority` indexes are dropped. No query filters on either alone.
+        """
+
+        indexes = [
+            "CREATE INDEX IF NOT EXISTS idx_session_queue_queue_id_status_priority_item_id ON session_queue(queue_id, status, priority DESC, item_id ASC);",
+            "CREATE INDEX IF NOT EXISTS idx_session_queue_in_progress ON session_queue(queue_id, item_id) WHERE status = 'in_progress';",
+            "DROP INDEX IF EXISTS idx_session_queue_created_status;",
+            "DROP INDEX IF EXISTS idx_session_queue_created_priority;",
+        ]
+
+        for stmt in indexes:
+            cursor.execute(stmt)
+
+
+def build_migration_20() -> Migration:
+    """
+    Build the migration from database version 19 to 20.
+
+    This migration does the following:
+        - Adds an index on the `hash` column of `models`.
+        - Adds an index on the `is_intermediate` column of `images`.
+        - Adds a composite index on `session_queue` over the queue, status and dequeue ordering, and a partial index
+          over in-progress queue items.
+        - Drops the single-column `status` and `priority` indexes of `session_queue`.
+    """
+    migration_20 = Migration(
+        from_version=19,
+        to_version=20,
+        callback=Migration20Callback(),
+    )
+
+    return migration_20
@@ -0,0 +1,70 @@
+import sqlite3
+
+from invokeai.app.services.shared.sqlite_migrator.sqlite_migrator_common import Migration
+
+
+class Migration21Callback:
+    def __call__(self, cursor: sqlite3.Cursor) -> None:
+        self._create_session_queue_history(cursor)
+
+    def _create_session_queue_history(self, cursor: sqlite3.Cursor) -> None:
+        """
+        Creates the `session_queue_history` table, holding a summary of each archived queue item.
+
+        Finished queue items are moved here once they are past the queue history retention policy. The summary keeps
+        the status, timings, error and batch of the item, but not its session, workflow or field values.
+
+        The partial index over finished queue items lets the oldest of them be found without scanning the queue.
+        """
+
+        tables = [
+            """--sql
+            CREATE TABLE IF NOT EXISTS session_queue_history (
+                item_id INTEGER NOT NULL PRIMARY KEY, -- the item_id the item had in session_queue
+                batch_id TEXT NOT NULL,
+                queue_id TEXT NOT NULL,
+                session_id TEXT NOT NULL,
+                status TEXT NOT NULL,
+                priority INTEGER NOT NULL,
+                origin TEXT,
+                destination TEXT,
+                error_type TEXT,
+                error_message TEXT,
+                created_at DATETIME NOT NULL,
+                updated_at DATETIME NOT NULL,
+                started_at DATETIME,
+                completed_at DATETIME,
+                archived_at DATETIME NOT NULL DEFAULT(STRFTIME('%Y-%m-%d %H:%M:%f', 'NOW'))
+            );
+            """
+        ]
+
+        indices = [
+            "CREATE INDEX IF NOT EXISTS idx_session_queue_history_queue_id_item_id ON session_queue_history(queue_id, item_id);",
+            "CREATE INDEX IF NOT EXISTS idx_session_queue_history_batch_id ON session_queue_history(batch_id);",
+            """--sql
+            CREATE INDEX IF NOT EXISTS idx_session_queue_finished
+            ON session_queue(item_id, completed_at)
+            WHERE status IN ('completed', 'failed', 'canceled');
+            """,
+        ]
+
+        for stmt in tables + indices:
+            cursor.execute(stmt)
+
+
+def build_migration_21() -> Migration:
+    """
+    Build the migration from database version 20 to 21.
+
+    This migration does the following:
+        - Adds the `session_queue_history` table, holding summaries of archived queue items.
+        - Adds a partial index over finished queue items, ordered by item id.
+    """
+    migration_21 = Migration(
+        from_version=20,
+        to_version=21,
+        callback=Migration21Callback(),
+    )
+
+    return migration_21
@@ -1,7 +1,7 @@
 from abc import ABC, abstractmethod
 from typing import Optional
 
-from invokeai.app.services.shared.pagination import PaginatedResults
+from invokeai.app.services.shared.pagination import CursorPaginatedResults, PaginatedResults
 from invokeai.app.services.shared.sqlite.sqlite_common import SQLiteDirection
 from invokeai.app.services.workflow_records.workflow_records_common import (
     Workflow,
@@ -48,3 +48,16 @@ class WorkflowRecordsStorageBase(ABC):
     ) -> PaginatedResults[WorkflowRecordListItemDTO]:
         """Gets many workflows."""
         pass
+
+    @abstractmethod
+    def get_many_by_cursor(
+        self,
+        order_by: WorkflowRecordOrderBy,
+        direction: SQLiteDirection,
+        category: WorkflowCategory,
+        limit: int,
+        cursor: Optional[str],
+        query: Optional[str],
+    ) -> CursorPaginatedResults[WorkflowRecordListItemDTO]:
+        """Gets the page of workflows after the cursor. Raises a `ValueError` if the cursor is invalid."""
+        pass
@@ -1,9 +1,20 @@
+import sqlite3
 from pathlib import Path
-from typing import Optional
+from typing import Any, Optional, Union, cast
 
 from invokeai.app.services.invoker import Invoker
-from invokeai.app.services.shared.pagination import PaginatedResults
-from invokeai.app.services.shared.sqlite.sqlite_common import SQLiteDirection
+from invokeai.app.services.shared.pagination import (
+    CursorPaginatedResults,
+    PaginatedResults,
+    decode_cursor,
+    encode_cursor,
+)
+from invokeai.app.services.shared.sqlite.sqlite_common import (
+    SQLiteDirection,
+    VersionedCountCache,
+    build_fts_query,
+    build_keyset_condition,
+)
 from invokeai.app.services.shared.sqlite.sqlite_database import SqliteDatabase
 from invokeai.app.services.workflow_records.workflow_records_base import WorkflowRecordsStorageBase
 from invokeai.app.services.workflow_records.workflow_records_common import (
@@ -19,13 +30,17 @@ from invokeai.app.services.workflow_records.workflow_records_common import (
 )
 from invokeai.app.util.misc import uuid_string
 
+WORKFLOW_LIST_ITEM_COLS = "workflow_id, category, name, description, created_at, updated_at, opened_at"
+
 
 class SqliteWorkflowRecordsStorage(WorkflowRecordsStorageBase):
     def __init__(self, db: SqliteDatabase) -> None:
         super().__init__()
+        self._db = db
         self._lock = db.lock
         self._conn = db.conn
         self._cursor = self._conn.cursor()
+        self._counts = VersionedCountCache("workflow_library")
 
     def start(self, invoker: Invoker) -> None:
         self._invoker = invoker
@@ -123,6 +138,37 @@ class SqliteWorkflowRecordsStorage(WorkflowRecordsStorageBase):
             self._lock.release()
         return None
 
+    def _build_query_conditions(
+        self, category: WorkflowCategory, query: Optional[str]
+    ) -> tuple[str, list[Union[int, str]]]:
+        """Builds the conditions and params for the workflow listing filters."""
+        conditions = "WHERE category = ?"
+        params: list[Union[int, str]] = [category.value]
+
+        # The query is matched against the name, description and tags full-text search index
+        fts_query = build_fts_query(query) if query else None
+        if fts_query is not None:
+            conditions += """
+                AND workflow_id IN (
+                    SELECT workflow_library_fts_rowids.workflow_id
+                    FROM workflow_library_fts
+                    JOIN workflow_library_fts_rowids ON workflow_library_fts_rowids.rowid = workflow_library_fts.rowid
+                    WHERE workflow_library_fts MATCH ?
+                )
+                """
+            params.append(fts_query)
+
+        return conditions, params
+
+    def _count(self, cursor: sqlite3.Cursor, conditions: str, params: list[Union[int, str]]) -> int:
+        """Counts the workflows matching the conditions, reusing the last count if the workflows are unchanged."""
+
+        def count() -> int:
+            cursor.execute(f"SELECT COUNT(*) FROM workflow_library {conditions};", params)
+            return cast(int, cursor.fetchone()[0])
+
+        return self._counts.get_count(cursor, (conditions, tuple(params)), count)
+
     def get_many(
         self,
         order_by: WorkflowRecordOrderBy,
@@ -132,66 +178,87 @@ class SqliteWorkflowRecordsStorage(WorkflowRecordsStorageBase):
         per_page: Optional[int] = None,
         query: Optional[str] = None,
     ) -> PaginatedResults[WorkflowRecordListItemDTO]:
-        try:
-            self._lock.acquire()
-            # sanitize!
-            assert order_by in WorkflowRecordOrderBy
-            assert direction in SQLiteDirection
-            assert category in WorkflowCategory
-            count_query = "SELECT COUNT(*) FROM workflow_library WHERE category = ?"
-            main_query = """
-                SELECT
-                    workflow_id,
-                    category,
-                    name,
-                    description,
-                    created_at,
-                    updated_at,
-                    opened_at
-                FROM workflow_library
-                WHERE category = ?
-                """
-            main_params: list[int | str] = [category.value]
-            count_params: list[int | str] = [category.value]
+        # sanitize!
+        assert order_by in WorkflowRecordOrderBy
+        assert direction in SQLiteDirection
+        assert category in WorkflowCategory
+        conditions, params = self._build_query_conditions(category, query)
+        main_query = f"""
+            SELECT {WORKFLOW_LIST_ITEM_COLS}
+            FROM workflow_library
+            {conditions}
+            ORDER BY {order_by.value} {direction.value}, workflow_id {direction.value}
+            """
+        main_params = params.copy()
 
-            stripped_query = query.strip() if query else None
-            if stripped_query:
-                wildcard_query = "%" + stripped_query + "%"
-                main_query += " AND name LIKE ? OR description LIKE ? "
-                count_query += " AND name LIKE ? OR description LIKE ?;"
-                main_params.extend([wildcard_query, wildcard_query])
-                count_params.extend([wildcard_query, wildcard_query])
+        if per_page:
+            main_query += " LIMIT ? OFFSET ?"
+            main_params.extend([per_page, page * per_page])
 
-            main_query += f" ORDER BY {order_by.value} {direction.value}"
+        with self._db.read() as cursor:
+            cursor.execute(main_query, main_params)
+            rows = cursor.fetchall()
+            workflows = [WorkflowRecordListItemDTOValidator.validate_python(dict(row)) for row in rows]
+            total = self._count(cursor, conditions, params)
 
-            if per_page:
-                main_query += " LIMIT ? OFFSET ?"
-                main_params.extend([per_page, page * per_page])
+        if per_page:
+            pages = total // per_page + (total % per_page > 0)
+        else:
+            pages = 1  # If no pagination, there is only one page
 
-            self._cursor.execute(main_query, main_params)
-            rows = self._cursor.fetchall()
-            workflows = [WorkflowRecordListItemDTOValidator.validate_python(dict(row)) for row in rows]
+        return PaginatedResults(
+            items=workflows,
+            page=page,
+            per_page=per_page if per_page else total,
+            pages=pages,
+            total=total,
+        )
 
-            self._cursor.execute(count_query, count_params)
-            total = self._cursor.fetchone()[0]
+    def get_many_by_cursor(
+        self,
+        order_by: WorkflowRecordOrderBy,
+        direction: SQLiteDirection,
+        category: WorkflowCategory,
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        query: Optional[str] = None,
+    ) -> CursorPaginatedResults[WorkflowRecordListItemDTO]:
+        # sanitize!
+        assert order_by in WorkflowRecordOrderBy
+        assert direction in SQLiteDirection
+        assert category in WorkflowCategory
+        conditions, params = self._build_query_conditions(category, query)
+        # The workflow id is last, so that the order is total
+        order_columns = [(order_by.value, direction), ("workflow_id", direction)]
 
-            if per_page:
-                pages = total // per_page + (total % per_page > 0)
-            else:
-                pages = 1  # If no pagination, there is only one page
+        keyset_condition = ""
+        keyset_params: list[Any] = []
+        if cursor is not None:
+            condition, keyset_params = build_keyset_condition(order_columns, decode_cursor(cursor, len(order_columns)))
+            keyset_condition = f"AND {condition}"
 
-            return PaginatedResults(
-                items=workflows,
-                page=page,
-                per_page=per_page if per_page else total,
-                pages=pages,
-                total=total,
-            )
-        except Exception:
-            self._conn.rollback()
-            raise
-        finally:
-            self._lock.release()
+        main_query = f"""
+            SELECT {WORKFLOW_LIST_ITEM_COLS}
+            FROM workflow_library
+            {conditions}
+            {keyset_condition}
+            ORDER BY {order_by.value} {direction.value}, workflow_id {direction.value}
+            LIMIT ?
+            """
+
+        with self._db.read() as db_cursor:
+            # Get one extra row, to check if there are more
+            db_cursor.execute(main_query, [*params, *keyset_params, limit + 1])
+            rows = cast(list[sqlite3.Row], db_cursor.fetchall())
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+            workflows = [WorkflowRecordListItemDTOValidator.validate_python(dict(row)) for row in rows]
+            total = self._count(db_cursor, conditions, params)
+
+        next_cursor = encode_cursor([rows[-1][column] for column, _ in order_columns]) if has_more else None
+        return CursorPaginatedResults(
+            items=workflows, limit=limit, has_more=has_more, next_cursor=next_cursor, total=total
+        )
 
     def _sync_default_workflows(self) -> None:
         """Syncs default workflows to the database. Internal use only."""
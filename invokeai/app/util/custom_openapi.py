@@ -1,3 +1,8 @@
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
 from typing import Any, Callable, Optional
 
 from fastapi import FastAPI
@@ -9,6 +14,8 @@ from invokeai.app.invocations.fields import InputFieldJSONSchemaExtra, OutputFie
 from invokeai.app.invocations.model import ModelIdentifierField
 from invokeai.app.services.events.events_common import EventBase
 from invokeai.app.services.session_processor.session_processor_common import ProgressImage
+from invokeai.backend.util.logging import InvokeAILogger
+from invokeai.version.invokeai_version import __version__
 
 
 def move_defs_to_top_level(openapi_schema: dict[str, Any], component_schema: dict[str, Any]) -> None:
@@ -23,8 +30,44 @@ def move_defs_to_top_level(openapi_schema: dict[str, Any], component_schema: dic
         openapi_schema["components"]["schemas"][schema_key] = json_schema
 
 
+def get_openapi_cache_key() -> str:
+    """Gets a key identifying the OpenAPI schema for the installed app and nodes.
+
+    The key changes when the app version or the set of nodes changes, or when any source file of the app or of a custom
+    node pack changes. Source files are identified by their modification time and size, which is much faster than
+    hashing their contents.
+    """
+
+    hasher = hashlib.sha256()
+    hasher.update(__version__.encode())
+
+    classes = [*BaseInvocation.get_invocations(), *BaseInvocationOutput.get_outputs()]
+    for cls in classes:
+        version = getattr(getattr(cls, "UIConfig", None), "version", None)
+        hasher.update(f"{cls.__module__}.{cls.__name__}:{version}".encode())
+
+    # The app itself and every custom node pack are the top-level packages that define nodes
+    packages = {cls.__module__.split(".")[0] for cls in classes}
+    source_files: list[tuple[str, int, int]] = []
+    for name, module in list(sys.modules.items()):
+        file = getattr(module, "__file__", None)
+        if file is None or name.split(".")[0] not in packages:
+            continue
+        try:
+            stat = os.stat(file)
+        except OSError:
+            continue
+        source_files.append((file, stat.st_mtime_ns, stat.st_size))
+    for file, mtime_ns, size in sorted(source_files):
+        hasher.update(f"{file}:{mtime_ns}:{size}".encode())
+
+    return hasher.hexdigest()[:16]
+
+
 def get_openapi_func(
-    app: FastAPI, post_transform: Optional[Callable[[dict[str, Any]], dict[str, Any]]] = None
+    app: FastAPI,
+    post_transform: Optional[Callable[[dict[str, Any]], dict[str, Any]]] = None,
+    cache_dir: Optional[Path] = None,
 ) -> Callable[[], dict[str, Any]]:
     """Gets the OpenAPI schema generator function.
 
@@ -32,6 +75,9 @@ def get_openapi_func(
         app (FastAPI): The FastAPI app to generate the schema for.
         post_transform (Optional[Callable[[dict[str, Any]], dict[str, Any]]], optional): A function to apply to the
             generated schema before returning it. Defaults to None.
+        cache_dir (Optional[Path], optional): A directory to cache the generated schema in, keyed by
+            `get_openapi_cache_key()`. Generating the schema for all nodes is slow, so this speeds up the first request
+            for the schema after a restart. Defaults to None, which disables the on-disk cache.
 
     Returns:
         Callable[[], dict[str, Any]]: The OpenAPI schema generator function. When first called, the generated schema is
@@ -43,6 +89,15 @@ def get_openapi_func(
         if app.openapi_schema:
             return app.openapi_schema
 
+        cache_path = cache_dir / f"openapi_{get_openapi_cache_key()}.json" if cache_dir else None
+        if cache_path is not None and cache_path.exists():
+            try:
+                app.openapi_schema = json.loads(cache_path.read_text())
+                return app.openapi_schema
+            except (OSError, json.JSONDecodeError):
+                # A corrupt cache entry is regenerated
+                pass
+
         openapi_schema = get_openapi(
             title=app.title,
             description="An API for invoking AI image operations",
@@ -111,6 +166,25 @@ def get_openapi_func(
         openapi_schema["components"]["schemas"] = dict(sorted(openapi_schema["components"]["schemas"].items()))
 
         app.openapi_schema = openapi_schema
+        if cache_path is not None:
+            try:
+                write_openapi_cache(cache_path, openapi_schema)
+            except OSError as e:
+                # The cache only speeds up the next startup, so failing to write it must not fail the request
+                InvokeAILogger.get_logger().warning(f"Failed to cache the OpenAPI schema at {cache_path}: {e}")
         return app.openapi_schema
 
     return openapi
+
+
+def write_openapi_cache(cache_path: Path, openapi_schema: dict[str, Any]) -> None:
+    """Writes the schema to the cache, replacing any schemas cached for other keys."""
+
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    for stale_path in cache_path.parent.glob("openapi_*.json"):
+        if stale_path != cache_path:
+            stale_path.unlink(missing_ok=True)
+    # Write to a temporary file first, so that a concurrent reader never sees a partial schema
+    tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+    tmp_path.write_text(json.dumps(openapi_schema))
+    os.replace(tmp_path, cache_path)
@@ -0,0 +1,154 @@
+import builtins
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import partial
+from logging import Logger
+from typing import Any, Callable, Iterator, Optional
+
+
+class StartupProfiler:
+    """
+    Breaks down app startup time into phases, module imports and node registration.
+
+    Imports are timed by wrapping `builtins.__import__`, on the thread that started the profiler. Each import's own
+    time excludes the time spent in the imports it triggers, and is attributed to the module's top-level package.
+    Node modules are registered by importing them, so each node module's registration time includes the dependencies
+    it imports first.
+
+    Usage
+    ```
+      startup_profiler.start()
+      with startup_profiler.phase("import app"):
+          import app
+      startup_profiler.stop()
+      startup_profiler.log_report(logger)
+    ```
+    """
+
+    NODE_MODULE_PREFIX = "invokeai.app.invocations."
+
+    def __init__(self) -> None:
+        self._original_import: Optional[Any] = None
+        self._thread_id: Optional[int] = None
+        self._started_at = 0.0
+        self._stopped_at = 0.0
+        self._phases: list[tuple[str, float]] = []
+        # The time spent in the imports triggered by each import in progress
+        self._children_stack: list[float] = []
+        self._package_times: defaultdict[str, float] = defaultdict(float)
+        self._node_module_times: dict[str, float] = {}
+
+    @property
+    def is_running(self) -> bool:
+        return self._original_import is not None
+
+    def start(self) -> None:
+        if self.is_running:
+            return
+        self._thread_id = threading.get_ident()
+        self._started_at = time.perf_counter()
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._timed_import
+
+    def stop(self) -> None:
+        if not self.is_running:
+            return
+        builtins.__import__ = self._original_import
+        self._original_import = None
+        self._stopped_at = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Times a phase of startup. Does nothing if the profiler is not running."""
+        if not self.is_running:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._phases.append((name, time.perf_counter() - start))
+
+    def _timed_import(
+        self,
+        name: str,
+        globals: Optional[dict[str, Any]] = None,
+        locals: Optional[dict[str, Any]] = None,
+        fromlist: tuple[str, ...] = (),
+        level: int = 0,
+    ) -> Any:
+        original_import = self._original_import
+        assert original_import is not None
+        if threading.get_ident() != self._thread_id:
+            return original_import(name, globals, locals, fromlist, level)
+
+        if level > 0:
+            package = (globals or {}).get("__package__") or ""
+            base = package.rsplit(".", level - 1)[0]
+            name = f"{base}.{name}" if name else base
+            level = 0
+
+        # Already imported modules are only looked up, which is not worth timing
+        if name not in sys.modules:
+            self._time_import(name, partial(original_import, name, globals, locals, (), 0))
+
+        # Submodules in the fromlist, like the node modules in `from invokeai.app.invocations import *`, are imported by
+        # the import system without calling `__import__`. Import them first, so that they are timed too.
+        module = sys.modules.get(name)
+        if fromlist and module is not None and hasattr(module, "__path__"):
+            items = getattr(module, "__all__", []) if "*" in fromlist else fromlist
+            for item in items:
+                submodule_name = f"{name}.{item}"
+                if hasattr(module, item) or submodule_name in sys.modules:
+                    continue
+                try:
+                    self._time_import(submodule_name, partial(original_import, submodule_name, globals, locals, (), 0))
+                except ModuleNotFoundError:
+                    # Not a submodule. The import below raises if the name does not exist.
+                    pass
+
+        return original_import(name, globals, locals, fromlist, level)
+
+    def _time_import(self, name: str, do_import: Callable[[], Any]) -> None:
+        start = time.perf_counter()
+        self._children_stack.append(0.0)
+        try:
+            do_import()
+        finally:
+            elapsed = time.perf_counter() - start
+            children = self._children_stack.pop()
+            if self._children_stack:
+                self._children_stack[-1] += elapsed
+            self._package_times[name.split(".")[0]] += elapsed - children
+            if name.startswith(self.NODE_MODULE_PREFIX):
+                self._node_module_times[name] = elapsed
+
+    def get_report(self, top: int = 15) -> str:
+        """Gets the startup report, listing the `top` slowest packages and node modules."""
+        stopped_at = self._stopped_at if not self.is_running else time.perf_counter()
+        lines = [f"Startup profile (total {stopped_at - self._started_at:.2f}s):", "  Phases:"]
+        lines.extend(f"    {name:<40} {elapsed:>7.2f}s" for name, elapsed in self._phases)
+
+        lines.append(f"  Imports by package (excluding the packages they import, top {top}):")
+        package_times = sorted(self._package_times.items(), key=lambda p: p[1], reverse=True)
+        lines.extend(f"    {name:<40} {elapsed:>7.2f}s" for name, elapsed in package_times[:top])
+
+        node_module_times = sorted(self._node_module_times.items(), key=lambda m: m[1], reverse=True)
+        lines.append(
+            f"  Node registration ({len(node_module_times)} modules, top {top}, including the dependencies they load):"
+        )
+        lines.extend(
+            f"    {name.removeprefix(self.NODE_MODULE_PREFIX):<40} {elapsed:>7.2f}s"
+            for name, elapsed in node_module_times[:top]
+        )
+        return "\n".join(lines)
+
+    def log_report(self, logger: Logger, top: int = 15) -> None:
+        logger.info(self.get_report(top=top))
+
+
+startup_profiler = StartupProfiler()
+"""The app's startup profiler, started by the `--profile-startup` CLI arg."""
@@ -8,13 +8,13 @@ import torch
 import torch.nn as nn
 
 from invokeai.backend.flux.controlnet.zero_module import zero_module
+from invokeai.backend.flux.embedding_cache import FluxEmbeddingCache, embed_timesteps
 from invokeai.backend.flux.model import FluxParams
 from invokeai.backend.flux.modules.layers import (
     DoubleStreamBlock,
     EmbedND,
     MLPEmbedder,
     SingleStreamBlock,
-    timestep_embedding,
 )
 
 
@@ -115,6 +115,7 @@ class InstantXControlNetFlux(torch.nn.Module):
         timesteps: torch.Tensor,
         y: torch.Tensor,
         guidance: torch.Tensor | None = None,
+        embedding_cache: FluxEmbeddingCache | None = None,
     ) -> InstantXControlNetFluxOutput:
         if img.ndim != 3 or txt.ndim != 3:
             raise ValueError("Input img and txt tensors must have 3 dimensions.")
@@ -124,12 +125,13 @@ class InstantXControlNetFlux(torch.nn.Module):
         # Add controlnet_cond embedding.
         img = img + self.controlnet_x_embedder(controlnet_cond)
 
-        vec = self.time_in(timestep_embedding(timesteps, 256))
-        if self.params.guidance_embed:
-            if guidance is None:
-                raise ValueError("Didn't get guidance strength for guidance distilled model.")
-            vec = vec + self.guidance_in(timestep_embedding(guidance, 256))
+        guidance_in = self.guidance_in if self.params.guidance_embed else None
+        if embedding_cache is not None:
+            vec = embedding_cache.get_vec(self.time_in, guidance_in, timesteps, guidance)
+        else:
+            vec = embed_timesteps(self.time_in, guidance_in, timesteps, guidance)
         vec = vec + self.vector_in(y)
+        pe = embedding_cache.get_pe(self.pe_embedder, txt_ids, img_ids) if embedding_cache is not None else None
         txt = self.txt_in(txt)
 
         # If this is a union ControlNet, then concat the control mode embedding to the T5 text embedding.
@@ -143,11 +145,14 @@ class InstantXControlNetFlux(torch.nn.Module):
                 controlnet_mode_emb = self.controlnet_mode_embedder(controlnet_mode)
             txt = torch.cat([controlnet_mode_emb, txt], dim=1)
             txt_ids = torch.cat([txt_ids[:, :1, :], txt_ids], dim=1)
+            if pe is not None:
+                # The control mode embedding has the position of the first text token.
+                pe = torch.cat([pe[:, :, :1], pe], dim=2)
         else:
             assert controlnet_mode is None
 
-        ids = torch.cat((txt_ids, img_ids), dim=1)
-        pe = self.pe_embedder(ids)
+        if pe is None:
+            pe = self.pe_embedder(torch.cat((txt_ids, img_ids), dim=1))
 
         double_block_samples: list[torch.Tensor] = []
         for block in self.double_blocks:
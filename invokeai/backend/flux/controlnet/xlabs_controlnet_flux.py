@@ -8,8 +8,9 @@ import torch
 from einops import rearrange
 
 from invokeai.backend.flux.controlnet.zero_module import zero_module
+from invokeai.backend.flux.embedding_cache import FluxEmbeddingCache, embed_timesteps
 from invokeai.backend.flux.model import FluxParams
-from invokeai.backend.flux.modules.layers import DoubleStreamBlock, EmbedND, MLPEmbedder, timestep_embedding
+from invokeai.backend.flux.modules.layers import DoubleStreamBlock, EmbedND, MLPEmbedder
 
 
 @dataclass
@@ -95,6 +96,7 @@ class XLabsControlNetFlux(torch.nn.Module):
         timesteps: torch.Tensor,
         y: torch.Tensor,
         guidance: torch.Tensor | None = None,
+        embedding_cache: FluxEmbeddingCache | None = None,
     ) -> XLabsControlNetFluxOutput:
         if img.ndim != 3 or txt.ndim != 3:
             raise ValueError("Input img and txt tensors must have 3 dimensions.")
@@ -105,16 +107,18 @@ class XLabsControlNetFlux(torch.nn.Module):
         controlnet_cond = rearrange(controlnet_cond, "b c (h ph) (w pw) -> b (h w) (c ph pw)", ph=2, pw=2)
         controlnet_cond = self.pos_embed_input(controlnet_cond)
         img = img + controlnet_cond
-        vec = self.time_in(timestep_embedding(timesteps, 256))
-        if self.params.guidance_embed:
-            if guidance is None:
-                raise ValueError("Didn't get guidance strength for guidance distilled model.")
-            vec = vec + self.guidance_in(timestep_embedding(guidance, 256))
+        guidance_in = self.guidance_in if self.params.guidance_embed else None
+        if embedding_cache is not None:
+            vec = embedding_cache.get_vec(self.time_in, guidance_in, timesteps, guidance)
+        else:
+            vec = embed_timesteps(self.time_in, guidance_in, timesteps, guidance)
         vec = vec + self.vector_in(y)
         txt = self.txt_in(txt)
 
-        ids = torch.cat((txt_ids, img_ids), dim=1)
-        pe = self.pe_embedder(ids)
+        if embedding_cache is not None:
+            pe = embedding_cache.get_pe(self.pe_embedder, txt_ids, img_ids)
+        else:
+            pe = self.pe_embedder(torch.cat((txt_ids, img_ids), dim=1))
 
         block_res_samples: list[torch.Tensor] = []
 
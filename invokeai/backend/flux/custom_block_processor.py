@@ -5,6 +5,7 @@ from invokeai.backend.flux.extensions.regional_prompting_extension import Region
 from invokeai.backend.flux.extensions.xlabs_ip_adapter_extension import XLabsIPAdapterExtension
 from invokeai.backend.flux.math import attention
 from invokeai.backend.flux.modules.layers import DoubleStreamBlock, SingleStreamBlock
+from invokeai.backend.flux.segmented_attention import SegmentedAttnMask
 
 
 class CustomDoubleStreamBlockProcessor:
@@ -19,7 +20,7 @@ class CustomDoubleStreamBlockProcessor:
         txt: torch.Tensor,
         vec: torch.Tensor,
         pe: torch.Tensor,
-        attn_mask: torch.Tensor | None = None,
+        attn_mask: torch.Tensor | SegmentedAttnMask | None = None,
     ) -> tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
         """This function is a direct copy of DoubleStreamBlock.forward(), but it returns some of the intermediate
         values.
@@ -104,7 +105,7 @@ class CustomSingleStreamBlockProcessor:
         x: torch.Tensor,
         vec: torch.Tensor,
         pe: torch.Tensor,
-        attn_mask: torch.Tensor | None = None,
+        attn_mask: torch.Tensor | SegmentedAttnMask | None = None,
     ) -> torch.Tensor:
         """This function is a direct copy of SingleStreamBlock.forward()."""
         mod, _ = block.modulation(vec)
@@ -1,13 +1,16 @@
 import math
+from dataclasses import dataclass
 from typing import Callable
 
 import torch
 from tqdm import tqdm
 
 from invokeai.backend.flux.controlnet.controlnet_flux_output import ControlNetFluxOutput, sum_controlnet_flux_outputs
+from invokeai.backend.flux.embedding_cache import FluxEmbeddingCache
 from invokeai.backend.flux.extensions.inpaint_extension import InpaintExtension
 from invokeai.backend.flux.extensions.instantx_controlnet_extension import InstantXControlNetExtension
 from invokeai.backend.flux.extensions.regional_prompting_extension import RegionalPromptingExtension
+from invokeai.backend.flux.extensions.step_cache_extension import StepCacheExtension
 from invokeai.backend.flux.extensions.xlabs_controlnet_extension import XLabsControlNetExtension
 from invokeai.backend.flux.extensions.xlabs_ip_adapter_extension import XLabsIPAdapterExtension
 from invokeai.backend.flux.model import Flux
@@ -32,7 +35,19 @@ def denoise(
     neg_ip_adapter_extensions: list[XLabsIPAdapterExtension],
     # extra img tokens
     img_cond: torch.Tensor | None,
+    batched_cfg: bool = False,
+    step_cache_extension: StepCacheExtension | None = None,
 ):
+    """Run the FLUX denoising loop.
+
+    If `batched_cfg` is set, the positive and negative predictions of the steps that use CFG are run in a single
+    forward pass with a batch size of 2. This is faster, as the weights are only streamed once per step, but the
+    activations use twice the memory.
+
+    If `step_cache_extension` is set, the transformer blocks are skipped on the steps where it reuses their output.
+
+    The RoPE tables and the timestep embeddings are computed once and shared by all of the model calls that use them.
+    """
     # step 0 is the initial state
     total_steps = len(timesteps) - 1
     step_callback(
@@ -46,8 +61,28 @@ def denoise(
     )
     # guidance_vec is ignored for schnell.
     guidance_vec = torch.full((img.shape[0],), guidance, device=img.device, dtype=img.dtype)
+
+    embedding_cache = FluxEmbeddingCache()
+
+    # The positive and negative conditioning, combined for batched CFG.
+    batched_regional_prompting_extension: RegionalPromptingExtension | None = None
+    batched_ip_adapter_extensions: list[XLabsIPAdapterExtension] = []
+    batched_img_ids = img_ids
+    batched_guidance_vec = guidance_vec
+    if batched_cfg and neg_regional_prompting_extension is not None:
+        batched_img_ids = torch.cat((img_ids, img_ids))
+        batched_guidance_vec = torch.cat((guidance_vec, guidance_vec))
+        batched_regional_prompting_extension = RegionalPromptingExtension.concat_batch(
+            [pos_regional_prompting_extension, neg_regional_prompting_extension], img_seq_len=img.shape[1]
+        )
+        batched_ip_adapter_extensions = [
+            XLabsIPAdapterExtension.concat_batch([pos_ext, neg_ext])
+            for pos_ext, neg_ext in zip(pos_ip_adapter_extensions, neg_ip_adapter_extensions, strict=True)
+        ]
+
     for step_index, (t_curr, t_prev) in tqdm(list(enumerate(zip(timesteps[:-1], timesteps[1:], strict=True)))):
         t_vec = torch.full((img.shape[0],), t_curr, dtype=img.dtype, device=img.device)
+        embedding_cache.start_step(step_index)
 
         # Run ControlNet models.
         controlnet_residuals: list[ControlNetFluxOutput] = []
@@ -63,6 +98,7 @@ def denoise(
                     y=pos_regional_prompting_extension.regional_text_conditioning.clip_embeddings,
                     timesteps=t_vec,
                     guidance=guidance_vec,
+                    embedding_cache=embedding_cache,
                 )
             )
 
@@ -72,32 +108,60 @@ def denoise(
         # tensors. Calculating the sum materializes each tensor into its own instance.
         merged_controlnet_residuals = sum_controlnet_flux_outputs(controlnet_residuals)
         pred_img = torch.cat((img, img_cond), dim=-1) if img_cond is not None else img
-        pred = model(
-            img=pred_img,
-            img_ids=img_ids,
-            txt=pos_regional_prompting_extension.regional_text_conditioning.t5_embeddings,
-            txt_ids=pos_regional_prompting_extension.regional_text_conditioning.t5_txt_ids,
-            y=pos_regional_prompting_extension.regional_text_conditioning.clip_embeddings,
-            timesteps=t_vec,
-            guidance=guidance_vec,
-            timestep_index=step_index,
-            total_num_timesteps=total_steps,
-            controlnet_double_block_residuals=merged_controlnet_residuals.double_block_residuals,
-            controlnet_single_block_residuals=merged_controlnet_residuals.single_block_residuals,
-            ip_adapter_extensions=pos_ip_adapter_extensions,
-            regional_prompting_extension=pos_regional_prompting_extension,
-        )
 
         step_cfg_scale = cfg_scale[step_index]
 
         # If step_cfg_scale, is 1.0, then we don't need to run the negative prediction.
-        if not math.isclose(step_cfg_scale, 1.0):
-            # TODO(ryand): Add option to run positive and negative predictions in a single batch for better performance
-            # on systems with sufficient VRAM.
+        use_cfg = not math.isclose(step_cfg_scale, 1.0)
+        if use_cfg and neg_regional_prompting_extension is None:
+            raise ValueError("Negative text conditioning is required when cfg_scale is not 1.0.")
 
-            if neg_regional_prompting_extension is None:
-                raise ValueError("Negative text conditioning is required when cfg_scale is not 1.0.")
+        neg_pred: torch.Tensor | None = None
+        if use_cfg and batched_regional_prompting_extension is not None:
+            # Run the positive and negative predictions in a single batch.
+            batched_pred = model(
+                img=torch.cat((pred_img, pred_img)),
+                img_ids=batched_img_ids,
+                txt=batched_regional_prompting_extension.regional_text_conditioning.t5_embeddings,
+                txt_ids=batched_regional_prompting_extension.regional_text_conditioning.t5_txt_ids,
+                y=batched_regional_prompting_extension.regional_text_conditioning.clip_embeddings,
+                timesteps=torch.cat((t_vec, t_vec)),
+                guidance=batched_guidance_vec,
+                timestep_index=step_index,
+                total_num_timesteps=total_steps,
+                controlnet_double_block_residuals=_pad_residuals_for_batched_cfg(
+                    merged_controlnet_residuals.double_block_residuals
+                ),
+                controlnet_single_block_residuals=_pad_residuals_for_batched_cfg(
+                    merged_controlnet_residuals.single_block_residuals
+                ),
+                ip_adapter_extensions=batched_ip_adapter_extensions,
+                regional_prompting_extension=batched_regional_prompting_extension,
+                step_cache_extension=step_cache_extension,
+                embedding_cache=embedding_cache,
+            )
+            pred, neg_pred = batched_pred.chunk(2)
+        else:
+            pred = model(
+                img=pred_img,
+                img_ids=img_ids,
+                txt=pos_regional_prompting_extension.regional_text_conditioning.t5_embeddings,
+                txt_ids=pos_regional_prompting_extension.regional_text_conditioning.t5_txt_ids,
+                y=pos_regional_prompting_extension.regional_text_conditioning.clip_embeddings,
+                timesteps=t_vec,
+                guidance=guidance_vec,
+                timestep_index=step_index,
+                total_num_timesteps=total_steps,
+                controlnet_double_block_residuals=merged_controlnet_residuals.double_block_residuals,
+                controlnet_single_block_residuals=merged_controlnet_residuals.single_block_residuals,
+                ip_adapter_extensions=pos_ip_adapter_extensions,
+                regional_prompting_extension=pos_regional_prompting_extension,
+                step_cache_extension=step_cache_extension,
+                embedding_cache=embedding_cache,
+            )
 
+        if use_cfg and neg_pred is None:
+            assert neg_regional_prompting_extension is not None
             neg_pred = model(
                 img=img,
                 img_ids=img_ids,
@@ -112,7 +176,11 @@ def denoise(
                 controlnet_single_block_residuals=None,
                 ip_adapter_extensions=neg_ip_adapter_extensions,
                 regional_prompting_extension=neg_regional_prompting_extension,
+                step_cache_extension=step_cache_extension,
+                embedding_cache=embedding_cache,
             )
+
+        if neg_pred is not None:
             pred = neg_pred + step_cfg_scale * (pred - neg_pred)
 
         preview_img = img - t_curr * pred
@@ -133,3 +201,192 @@ def denoise(
         )
 
     return img
+
+
+def _pad_residuals_for_batched_cfg(residuals: list[torch.Tensor] | None) -> list[torch.Tensor] | None:
+    """ControlNets only apply to the positive prediction, so their residuals are padded with zeros for the negative
+    prediction of a batched CFG step.
+    """
+    if residuals is None:
+        return None
+    return [torch.cat((r, torch.zeros_like(r))) for r in residuals]
+
+
+@dataclass
+class DenoiseBatchItem:
+    """The inputs of one of the images denoised by `denoise_batch()`."""
+
+    img: torch.Tensor
+    img_ids: torch.Tensor
+    pos_regional_prompting_extension: RegionalPromptingExtension
+    neg_regional_prompting_extension: RegionalPromptingExtension | None
+    step_callback: Callable[[PipelineIntermediateState], None]
+    inpaint_extension: InpaintExtension | None
+    img_cond: torch.Tensor | None
+
+
+def denoise_batch(
+    model: Flux,
+    items: list[DenoiseBatchItem],
+    # sampling parameters
+    timesteps: list[float],
+    guidance: float,
+    cfg_scale: list[float],
+    batched_cfg: bool = False,
+    step_cache_extension: StepCacheExtension | None = None,
+) -> list[torch.Tensor | Exception]:
+    """Run the FLUX denoising loop for several images at once, with a single forward pass per step (or two, for the
+    steps that use CFG, unless `batched_cfg` is set).
+
+    The images must have the same size, and either all or none of them must have negative conditioning and image
+    conditioning. Their text conditioning may differ in length.
+
+    Each image gets its own step callbacks. If a step callback raises an exception (e.g. because its session was
+    canceled), the image is dropped from the batch and the exception is returned as its result.
+
+    Returns:
+        The denoised latents or the exception raised by the step callback of each image, in order.
+    """
+    results: list[torch.Tensor | Exception | None] = [None] * len(items)
+    imgs = [item.img for item in items]
+    img_seq_len = imgs[0].shape[1]
+    total_steps = len(timesteps) - 1
+    embedding_cache = FluxEmbeddingCache()
+
+    def run_step_callbacks(active: list[int], states: dict[int, PipelineIntermediateState]) -> list[int]:
+        """Runs the step callbacks of the active images, returning the images that are still active."""
+        still_active: list[int] = []
+        for i in active:
+            try:
+                items[i].step_callback(states[i])
+                still_active.append(i)
+            except Exception as e:
+                results[i] = e
+        return still_active
+
+    def run_model(
+        img: torch.Tensor,
+        img_ids: torch.Tensor,
+        t_vec: torch.Tensor,
+        guidance_vec: torch.Tensor,
+        extension: RegionalPromptingExtension,
+        step_index: int,
+    ) -> torch.Tensor:
+        return model(
+            img=img,
+            img_ids=img_ids,
+            txt=extension.regional_text_conditioning.t5_embeddings,
+            txt_ids=extension.regional_text_conditioning.t5_txt_ids,
+            y=extension.regional_text_conditioning.clip_embeddings,
+            timesteps=t_vec,
+            guidance=guidance_vec,
+            timestep_index=step_index,
+            total_num_timesteps=total_steps,
+            controlnet_double_block_residuals=None,
+            controlnet_single_block_residuals=None,
+            ip_adapter_extensions=[],
+            regional_prompting_extension=extension,
+            step_cache_extension=step_cache_extension,
+            embedding_cache=embedding_cache,
+        )
+
+    # step 0 is the initial state
+    active = run_step_callbacks(
+        list(range(len(items))),
+        {
+            i: PipelineIntermediateState(
+                step=0, order=1, total_steps=total_steps, timestep=int(timesteps[0]), latents=imgs[i]
+            )
+            for i in range(len(items))
+        },
+    )
+
+    # The conditioning of the active images. It is rebuilt when images are dropped from the batch.
+    conditioning_for: list[int] | None = None
+    pos_extension: RegionalPromptingExtension | None = None
+    neg_extension: RegionalPromptingExtension | None = None
+    img_ids = batched_img_ids = guidance_vec = batched_guidance_vec = torch.empty(0)
+    for step_index, (t_curr, t_prev) in tqdm(list(enumerate(zip(timesteps[:-1], timesteps[1:], strict=True)))):
+        if not active:
+            break
+
+        step_cfg_scale = cfg_scale[step_index]
+        # If step_cfg_scale, is 1.0, then we don't need to run the negative prediction.
+        use_cfg = not math.isclose(step_cfg_scale, 1.0)
+        if use_cfg and any(items[i].neg_regional_prompting_extension is None for i in active):
+            raise ValueError("Negative text conditioning is required when cfg_scale is not 1.0.")
+
+        if conditioning_for != active:
+            pos_extensions = [items[i].pos_regional_prompting_extension for i in active]
+            neg_extensions = [items[i].neg_regional_prompting_extension for i in active]
+            pos_extension = RegionalPromptingExtension.concat_batch(pos_extensions, img_seq_len=img_seq_len)
+            # With batched CFG, the negative conditioning follows the positive conditioning in a batch of twice the
+            # size.
+            neg_extension = None
+            if all(ext is not None for ext in neg_extensions):
+                neg_extension = RegionalPromptingExtension.concat_batch(
+                    (pos_extensions if batched_cfg else []) + neg_extensions,  # type: ignore
+                    img_seq_len=img_seq_len,
+                )
+            img_ids = torch.cat([items[i].img_ids for i in active])
+            batched_img_ids = torch.cat((img_ids, img_ids))
+            # guidance_vec is ignored for schnell.
+            batch_size = sum(imgs[i].shape[0] for i in active)
+            guidance_vec = torch.full((batch_size,), guidance, device=imgs[0].device, dtype=imgs[0].dtype)
+            batched_guidance_vec = torch.cat((guidance_vec, guidance_vec))
+            conditioning_for = active
+        assert pos_extension is not None
+
+        img = torch.cat([imgs[i] for i in active])
+        pred_img = torch.cat(
+            [
+                torch.cat((imgs[i], items[i].img_cond), dim=-1) if items[i].img_cond is not None else imgs[i]
+                for i in active
+            ]
+        )
+        t_vec = torch.full((img.shape[0],), t_curr, dtype=img.dtype, device=img.device)
+        embedding_cache.start_step(step_index)
+
+        if use_cfg and batched_cfg:
+            # Run the positive and negative predictions of all of the images in a single batch.
+            assert neg_extension is not None
+            pred, neg_pred = run_model(
+                torch.cat((pred_img, pred_img)),
+                batched_img_ids,
+                torch.cat((t_vec, t_vec)),
+                batched_guidance_vec,
+                neg_extension,
+                step_index,
+            ).chunk(2)
+            pred = neg_pred + step_cfg_scale * (pred - neg_pred)
+        else:
+            pred = run_model(pred_img, img_ids, t_vec, guidance_vec, pos_extension, step_index)
+            if use_cfg:
+                assert neg_extension is not None
+                neg_pred = run_model(img, img_ids, t_vec, guidance_vec, neg_extension, step_index)
+                pred = neg_pred + step_cfg_scale * (pred - neg_pred)
+
+        states: dict[int, PipelineIntermediateState] = {}
+        for i, item_pred in zip(active, pred.split([imgs[i].shape[0] for i in active]), strict=True):
+            preview_img = imgs[i] - t_curr * item_pred
+            imgs[i] = imgs[i] + (t_prev - t_curr) * item_pred
+
+            inpaint_extension = items[i].inpaint_extension
+            if inpaint_extension is not None:
+                imgs[i] = inpaint_extension.merge_intermediate_latents_with_init_latents(imgs[i], t_prev)
+                preview_img = inpaint_extension.merge_intermediate_latents_with_init_latents(preview_img, 0.0)
+
+            states[i] = PipelineIntermediateState(
+                step=step_index + 1,
+                order=1,
+                total_steps=total_steps,
+                timestep=int(t_curr),
+                latents=preview_img,
+            )
+        active = run_step_callbacks(active, states)
+
+    for i in active:
+        results[i] = imgs[i]
+    # Every image is either still active or was dropped with an exception.
+    assert all(result is not None for result in results)
+    return results  # type: ignore
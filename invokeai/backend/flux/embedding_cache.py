@@ -0,0 +1,71 @@
+import torch
+from torch import Tensor, nn
+
+from invokeai.backend.flux.modules.layers import EmbedND, timestep_embedding
+
+
+def embed_timesteps(
+    time_in: nn.Module, guidance_in: nn.Module | None, timesteps: Tensor, guidance: Tensor | None
+) -> Tensor:
+    """Embeds the timesteps and, for guidance distilled models, the guidance strength.
+
+    Args:
+        time_in: The timestep embedding MLP.
+        guidance_in: The guidance embedding MLP, or None if the model is not guidance distilled.
+        timesteps: The timesteps, one per batch element.
+        guidance: The guidance strengths, one per batch element.
+    """
+    vec = time_in(timestep_embedding(timesteps, 256))
+    if guidance_in is not None:
+        if guidance is None:
+            raise ValueError("Didn't get guidance strength for guidance distilled model.")
+        vec = vec + guidance_in(timestep_embedding(guidance, 256))
+    return vec
+
+
+class FluxEmbeddingCache:
+    """Caches the embeddings of the inputs of the FLUX transformer and ControlNet models that do not change during a
+    denoise run, so that they are computed once instead of on every model call.
+
+    - The RoPE tables only depend on the position ids, which are the same on every step. They are cached by the id
+        tensors, and shared by all models with the same RoPE parameters.
+    - The timestep and guidance embeddings are the same for all model calls of a step (the positive and negative
+        predictions, and the ControlNets). They are cached by embedding module until the next step.
+
+    The id, timestep and guidance tensors are matched by identity, so callers must pass the same tensor objects to
+    reuse the embeddings.
+    """
+
+    def __init__(self):
+        # The cached RoPE tables. The id tensors are kept with them, so that their ids are not reused.
+        self._pe: dict[tuple[int, tuple[int, ...], int, int], tuple[Tensor, Tensor, Tensor]] = {}
+        self._vec: dict[tuple[int, int, int, int], tuple[Tensor, Tensor | None, Tensor]] = {}
+        self._step_index: int | None = None
+
+    def start_step(self, step_index: int) -> None:
+        """Marks the start of a denoising step. The timestep embeddings of earlier steps are dropped."""
+        if step_index != self._step_index:
+            self._step_index = step_index
+            self._vec.clear()
+
+    def get_pe(self, pe_embedder: EmbedND, txt_ids: Tensor, img_ids: Tensor) -> Tensor:
+        """Gets the RoPE table for the concatenated text and image position ids."""
+        key = (pe_embedder.theta, tuple(pe_embedder.axes_dim), id(txt_ids), id(img_ids))
+        entry = self._pe.get(key)
+        if entry is None:
+            pe = pe_embedder(torch.cat((txt_ids, img_ids), dim=1))
+            entry = (txt_ids, img_ids, pe)
+            self._pe[key] = entry
+        return entry[2]
+
+    def get_vec(
+        self, time_in: nn.Module, guidance_in: nn.Module | None, timesteps: Tensor, guidance: Tensor | None
+    ) -> Tensor:
+        """Gets the timestep and guidance embedding. See `embed_timesteps()`."""
+        key = (id(time_in), id(guidance_in), id(timesteps), id(guidance))
+        entry = self._vec.get(key)
+        if entry is None:
+            vec = embed_timesteps(time_in, guidance_in, timesteps, guidance)
+            entry = (timesteps, guidance, vec)
+            self._vec[key] = entry
+        return entry[2]
@@ -5,6 +5,7 @@ from typing import List, Union
 import torch
 
 from invokeai.backend.flux.controlnet.controlnet_flux_output import ControlNetFluxOutput
+from invokeai.backend.flux.embedding_cache import FluxEmbeddingCache
 
 
 class BaseControlNetExtension(ABC):
@@ -42,4 +43,5 @@ class BaseControlNetExtension(ABC):
         y: torch.Tensor,
         timesteps: torch.Tensor,
         guidance: torch.Tensor | None,
+        embedding_cache: FluxEmbeddingCache | None = None,
     ) -> ControlNetFluxOutput: ...
@@ -12,6 +12,7 @@ from invokeai.backend.flux.controlnet.instantx_controlnet_flux import (
     InstantXControlNetFlux,
     InstantXControlNetFluxOutput,
 )
+from invokeai.backend.flux.embedding_cache import FluxEmbeddingCache
 from invokeai.backend.flux.extensions.base_controlnet_extension import BaseControlNetExtension
 from invokeai.backend.flux.sampling_utils import pack
 from invokeai.backend.model_manager.load.load_base import LoadedModel
@@ -166,6 +167,7 @@ class InstantXControlNetExtension(BaseControlNetExtension):
         y: torch.Tensor,
         timesteps: torch.Tensor,
         guidance: torch.Tensor | None,
+        embedding_cache: FluxEmbeddingCache | None = None,
     ) -> ControlNetFluxOutput:
         weight = self._get_weight(timestep_index=timestep_index, total_num_timesteps=total_num_timesteps)
         if weight < 1e-6:
@@ -187,6 +189,7 @@ class InstantXControlNetExtension(BaseControlNetExtension):
             timesteps=timesteps,
             y=y,
             guidance=guidance,
+            embedding_cache=embedding_cache,
         )
 
         controlnet_output = self._instantx_output_to_controlnet_output(instantx_output)
@@ -3,6 +3,7 @@ from typing import Optional
 import torch
 import torchvision
 
+from invokeai.backend.flux.segmented_attention import SegmentedAttnMask
 from invokeai.backend.flux.text_conditioning import FluxRegionalTextConditioning, FluxTextConditioning
 from invokeai.backend.stable_diffusion.diffusion.conditioning_data import Range
 from invokeai.backend.util.devices import TorchDevice
@@ -19,16 +20,35 @@ class RegionalPromptingExtension:
         self,
         regional_text_conditioning: FluxRegionalTextConditioning,
         restricted_attn_mask: torch.Tensor | None = None,
+        txt_padding_attn_mask: torch.Tensor | None = None,
     ):
         self.regional_text_conditioning = regional_text_conditioning
         self.restricted_attn_mask = restricted_attn_mask
+        # Masks attention to the padding of the txt embeddings, when prompts of different lengths are batched. Used in
+        # the blocks that do not use the restricted attention mask (which already masks the padding).
+        self.txt_padding_attn_mask = txt_padding_attn_mask
+
+        # The masks are passed to attention in their segmented form when possible, so that attention does not need the
+        # dense masks. They are prepared once, and reused by all of the blocks on all of the steps.
+        self._restricted_attn_mask_for_attention = self._prepare_mask_for_attention(restricted_attn_mask)
+        self._txt_padding_attn_mask_for_attention = (
+            self._restricted_attn_mask_for_attention
+            if txt_padding_attn_mask is restricted_attn_mask
+            else self._prepare_mask_for_attention(txt_padding_attn_mask)
+        )
+
+    @staticmethod
+    def _prepare_mask_for_attention(attn_mask: torch.Tensor | None) -> torch.Tensor | SegmentedAttnMask | None:
+        if attn_mask is None:
+            return None
+        return SegmentedAttnMask.from_dense(attn_mask) or attn_mask
 
-    def get_double_stream_attn_mask(self, block_index: int) -> torch.Tensor | None:
-        order = [self.restricted_attn_mask, None]
+    def get_double_stream_attn_mask(self, block_index: int) -> torch.Tensor | SegmentedAttnMask | None:
+        order = [self._restricted_attn_mask_for_attention, self._txt_padding_attn_mask_for_attention]
         return order[block_index % len(order)]
 
-    def get_single_stream_attn_mask(self, block_index: int) -> torch.Tensor | None:
-        order = [self.restricted_attn_mask, None]
+    def get_single_stream_attn_mask(self, block_index: int) -> torch.Tensor | SegmentedAttnMask | None:
+        order = [self._restricted_attn_mask_for_attention, self._txt_padding_attn_mask_for_attention]
         return order[block_index % len(order)]
 
     @classmethod
@@ -48,6 +68,71 @@ class RegionalPromptingExtension:
             restricted_attn_mask=attn_mask_with_restricted_img_self_attn,
         )
 
+    @classmethod
+    def concat_batch(cls, extensions: list["RegionalPromptingExtension"], img_seq_len: int):
+        """Combine the extensions of several prompts into one extension for a batch, where the i-th batch element uses
+        the i-th prompt (e.g. the positive and negative prompts for CFG, or the prompts of several images).
+
+        The txt embeddings are right-padded to the longest txt sequence. Attention to the padding is masked, so the
+        predictions match those of running each prompt on its own. The attention masks have a mask per batch element.
+
+        The image masks and embedding ranges of the prompts are only needed to prepare the attention masks, so the
+        combined conditioning does not keep them.
+
+        Args:
+            extensions (list[RegionalPromptingExtension]): The extensions of the prompts, with a batch size of 1 each.
+            img_seq_len (int): The image sequence length (i.e. packed_height * packed_width).
+        """
+        txt_seq_lens = [e.regional_text_conditioning.t5_embeddings.shape[1] for e in extensions]
+        max_txt_seq_len = max(txt_seq_lens)
+        seq_len = max_txt_seq_len + img_seq_len
+        t5_embeddings = torch.cat(
+            [
+                torch.nn.functional.pad(e.regional_text_conditioning.t5_embeddings, (0, 0, 0, max_txt_seq_len - n))
+                for e, n in zip(extensions, txt_seq_lens, strict=True)
+            ]
+        )
+        device = t5_embeddings.device
+
+        # Queries never attend to padding keys. The padding queries still attend to the other keys, so that their
+        # (unused) outputs stay finite.
+        txt_padding_attn_mask: torch.Tensor | None = None
+        if any(n != max_txt_seq_len for n in txt_seq_lens):
+            txt_padding_attn_mask = torch.ones((len(extensions), 1, seq_len, seq_len), dtype=torch.bool, device=device)
+            for i, n in enumerate(txt_seq_lens):
+                txt_padding_attn_mask[i, :, :, n:max_txt_seq_len] = False
+
+        restricted_attn_mask = txt_padding_attn_mask
+        if any(e.restricted_attn_mask is not None for e in extensions):
+            restricted_attn_mask = (
+                txt_padding_attn_mask.clone()
+                if txt_padding_attn_mask is not None
+                else torch.ones((len(extensions), 1, seq_len, seq_len), dtype=torch.bool, device=device)
+            )
+            for i, (e, n) in enumerate(zip(extensions, txt_seq_lens, strict=True)):
+                if e.restricted_attn_mask is None:
+                    continue
+                # The positions of the prompt's txt and img tokens in the padded sequence.
+                idx = torch.cat([torch.arange(n), torch.arange(max_txt_seq_len, seq_len)]).to(device)
+                restricted_attn_mask[i, 0, idx[:, None], idx[None, :]] = e.restricted_attn_mask
+
+        regional_text_conditioning = FluxRegionalTextConditioning(
+            t5_embeddings=t5_embeddings,
+            clip_embeddings=torch.cat([e.regional_text_conditioning.clip_embeddings for e in extensions]),
+            t5_txt_ids=torch.zeros(
+                (len(extensions), max_txt_seq_len, 3),
+                dtype=extensions[0].regional_text_conditioning.t5_txt_ids.dtype,
+                device=extensions[0].regional_text_conditioning.t5_txt_ids.device,
+            ),
+            image_masks=[],
+            t5_embedding_ranges=[],
+        )
+        return cls(
+            regional_text_conditioning=regional_text_conditioning,
+            restricted_attn_mask=restricted_attn_mask,
+            txt_padding_attn_mask=txt_padding_attn_mask,
+        )
+
     # Keeping _prepare_unrestricted_attn_mask for reference as an alternative masking strategy:
     #
     # @classmethod
@@ -130,6 +215,7 @@ class RegionalPromptingExtension:
             return None
 
         device = TorchDevice.choose_torch_device()
+        background_region_mask = background_region_mask.view(img_seq_len).to(device) > 0.5
 
         # Infer txt_seq_len from the t5_embeddings tensor.
         txt_seq_len = regional_text_conditioning.t5_embeddings.shape[1]
@@ -142,35 +228,31 @@ class RegionalPromptingExtension:
         # 3. regional img attends to corresponding txt
         # 4. regional img attends to itself
 
-        # Initialize empty attention mask.
+        # Initialize empty attention mask. It is built directly as a boolean mask, to keep its memory footprint small.
         regional_attention_mask = torch.zeros(
-            (txt_seq_len + img_seq_len, txt_seq_len + img_seq_len), device=device, dtype=torch.float16
+            (txt_seq_len + img_seq_len, txt_seq_len + img_seq_len), device=device, dtype=torch.bool
         )
+        img_self_attention_mask = regional_attention_mask[txt_seq_len:, txt_seq_len:]
 
         for image_mask, t5_embedding_range in zip(
             regional_text_conditioning.image_masks, regional_text_conditioning.t5_embedding_ranges, strict=True
         ):
+            txt_range = slice(t5_embedding_range.start, t5_embedding_range.end)
+
             # 1. txt attends to itself
-            regional_attention_mask[
-                t5_embedding_range.start : t5_embedding_range.end, t5_embedding_range.start : t5_embedding_range.end
-            ] = 1.0
+            regional_attention_mask[txt_range, txt_range] = True
 
             if image_mask is not None:
+                image_mask = image_mask.view(img_seq_len).to(device) > 0.5
+
                 # 2. txt attends to corresponding regional img
-                # Note that we reshape to (1, img_seq_len) to ensure broadcasting works as desired.
-                regional_attention_mask[t5_embedding_range.start : t5_embedding_range.end, txt_seq_len:] = (
-                    image_mask.view(1, img_seq_len)
-                )
+                regional_attention_mask[txt_range, txt_seq_len:] = image_mask.view(1, img_seq_len)
 
                 # 3. regional img attends to corresponding txt
-                # Note that we reshape to (img_seq_len, 1) to ensure broadcasting works as desired.
-                regional_attention_mask[txt_seq_len:, t5_embedding_range.start : t5_embedding_range.end] = (
-                    image_mask.view(img_seq_len, 1)
-                )
+                regional_attention_mask[txt_seq_len:, txt_range] = image_mask.view(img_seq_len, 1)
 
                 # 4. regional img attends to itself
-                image_mask = image_mask.view(img_seq_len, 1)
-                regional_attention_mask[txt_seq_len:, txt_seq_len:] += image_mask @ image_mask.T
+                img_self_attention_mask |= image_mask.view(img_seq_len, 1) & image_mask.view(1, img_seq_len)
             else:
                 # We don't allow attention between non-background image regions and global prompts. This helps to ensure
                 # that regions focus on their local prompts. We do, however, allow attention between background regions
@@ -178,23 +260,14 @@ class RegionalPromptingExtension:
                 # embeddings, which we found experimentally to cause artifacts.
 
                 # 2. global txt attends to background region
-                # Note that we reshape to (1, img_seq_len) to ensure broadcasting works as desired.
-                regional_attention_mask[t5_embedding_range.start : t5_embedding_range.end, txt_seq_len:] = (
-                    background_region_mask.view(1, img_seq_len)
-                )
+                regional_attention_mask[txt_range, txt_seq_len:] = background_region_mask.view(1, img_seq_len)
 
                 # 3. background region attends to global txt
-                # Note that we reshape to (img_seq_len, 1) to ensure broadcasting works as desired.
-                regional_attention_mask[txt_seq_len:, t5_embedding_range.start : t5_embedding_range.end] = (
-                    background_region_mask.view(img_seq_len, 1)
-                )
+                regional_attention_mask[txt_seq_len:, txt_range] = background_region_mask.view(img_seq_len, 1)
 
         # Allow background regions to attend to themselves.
-        regional_attention_mask[txt_seq_len:, txt_seq_len:] += background_region_mask.view(img_seq_len, 1)
-        regional_attention_mask[txt_seq_len:, txt_seq_len:] += background_region_mask.view(1, img_seq_len)
-
-        # Convert attention mask to boolean.
-        regional_attention_mask = regional_attention_mask > 0.5
+        img_self_attention_mask |= background_region_mask.view(img_seq_len, 1)
+        img_self_attention_mask |= background_region_mask.view(1, img_seq_len)
 
         return regional_attention_mask
 
@@ -0,0 +1,50 @@
+from typing import Optional
+
+import torch
+
+from invokeai.backend.flux.modules.layers import DoubleStreamBlock
+from invokeai.backend.util.step_cache import StepCache
+
+
+class StepCacheExtension:
+    """A class for reusing the output of the FLUX transformer blocks on some steps, as in TeaCache.
+
+    On the steps where the step cache is reused, the double and single stream blocks are skipped. Instead, the residual
+    that they added to the image tokens on the last step on which they were computed is added again. The probe is the
+    modulated input of the first double stream block, which is cheap to compute and tracks how much the output of the
+    blocks changes between steps.
+    """
+
+    def __init__(self, step_cache: StepCache):
+        self._step_cache = step_cache
+
+    def get_cached_residual(
+        self,
+        timestep_index: int,
+        first_block: DoubleStreamBlock,
+        img: torch.Tensor,
+        vec: torch.Tensor,
+        num_blocks: int,
+    ) -> Optional[torch.Tensor]:
+        """Gets the residual to add to the image tokens instead of running the blocks, if the current step reuses the
+        cache. Must be called once per transformer call. If it returns None, the blocks must be run and their residual
+        passed to `cache_residual()`.
+
+        Args:
+            timestep_index: The index of the current step.
+            first_block: The first double stream block.
+            img: The image tokens, as input to the first block.
+            vec: The modulation vector.
+            num_blocks: The number of blocks that are skipped if the cache is reused.
+        """
+        self._step_cache.start_call(timestep_index)
+        img_mod1, _ = first_block.img_mod(vec)
+        self._probe = (1 + img_mod1.scale) * first_block.img_norm1(img) + img_mod1.shift
+        residual = self._step_cache.lookup(self._probe)
+        if residual is not None:
+            self._step_cache.stats.skipped_blocks += num_blocks
+        return residual
+
+    def cache_residual(self, residual: torch.Tensor) -> None:
+        """Caches the residual that the blocks added to the image tokens in the current transformer call."""
+        self._step_cache.store(self._probe, residual)
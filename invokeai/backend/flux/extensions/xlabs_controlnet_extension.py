@@ -7,6 +7,7 @@ from invokeai.app.invocations.constants import LATENT_SCALE_FACTOR
 from invokeai.app.util.controlnet_utils import CONTROLNET_RESIZE_VALUES, prepare_control_image
 from invokeai.backend.flux.controlnet.controlnet_flux_output import ControlNetFluxOutput
 from invokeai.backend.flux.controlnet.xlabs_controlnet_flux import XLabsControlNetFlux, XLabsControlNetFluxOutput
+from invokeai.backend.flux.embedding_cache import FluxEmbeddingCache
 from invokeai.backend.flux.extensions.base_controlnet_extension import BaseControlNetExtension
 
 
@@ -129,6 +130,7 @@ class XLabsControlNetExtension(BaseControlNetExtension):
         y: torch.Tensor,
         timesteps: torch.Tensor,
         guidance: torch.Tensor | None,
+        embedding_cache: FluxEmbeddingCache | None = None,
     ) -> ControlNetFluxOutput:
         weight = self._get_weight(timestep_index=timestep_index, total_num_timesteps=total_num_timesteps)
         if weight < 1e-6:
@@ -143,6 +145,7 @@ class XLabsControlNetExtension(BaseControlNetExtension):
             timesteps=timesteps,
             y=y,
             guidance=guidance,
+            embedding_cache=embedding_cache,
         )
 
         controlnet_output = self._xlabs_output_to_controlnet_output(xlabs_output)
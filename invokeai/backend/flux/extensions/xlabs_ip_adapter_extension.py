@@ -28,6 +28,36 @@ class XLabsIPAdapterExtension:
 
         self._image_proj: torch.Tensor | None = None
 
+    @classmethod
+    def concat_batch(cls, extensions: list["XLabsIPAdapterExtension"]) -> "XLabsIPAdapterExtension":
+        """Combine extensions that differ only in their image prompt into one extension for a batch, where the i-th
+        batch element uses the image prompt of the i-th extension (e.g. the positive and negative image prompts for
+        CFG). `run_image_proj()` must have been called on each extension.
+        """
+        first = extensions[0]
+        for e in extensions[1:]:
+            if (
+                e._model is not first._model
+                or e._weight != first._weight
+                or e._begin_step_percent != first._begin_step_percent
+                or e._end_step_percent != first._end_step_percent
+            ):
+                raise ValueError("Only IP-Adapter extensions that differ in their image prompt can be batched.")
+
+        image_projs = [e._image_proj for e in extensions]
+        if any(image_proj is None for image_proj in image_projs):
+            raise ValueError("run_image_proj() must be called before IP-Adapter extensions are batched.")
+
+        extension = cls(
+            model=first._model,
+            image_prompt_clip_embed=torch.cat([e._image_prompt_clip_embed for e in extensions]),
+            weight=first._weight,
+            begin_step_percent=first._begin_step_percent,
+            end_step_percent=first._end_step_percent,
+        )
+        extension._image_proj = torch.cat(image_projs)  # type: ignore
+        return extension
+
     def _get_weight(self, timestep_index: int, total_num_timesteps: int) -> float:
         first_step = math.floor(self._begin_step_percent * total_num_timesteps)
         last_step = math.ceil(self._end_step_percent * total_num_timesteps)
@@ -4,11 +4,18 @@ import torch
 from einops import rearrange
 from torch import Tensor
 
+from invokeai.backend.flux.segmented_attention import SegmentedAttnMask
 
-def attention(q: Tensor, k: Tensor, v: Tensor, pe: Tensor, attn_mask: Tensor | None = None) -> Tensor:
+
+def attention(
+    q: Tensor, k: Tensor, v: Tensor, pe: Tensor, attn_mask: Tensor | SegmentedAttnMask | None = None
+) -> Tensor:
     q, k = apply_rope(q, k, pe)
 
-    x = torch.nn.functional.scaled_dot_product_attention(q, k, v, attn_mask=attn_mask)
+    if isinstance(attn_mask, SegmentedAttnMask):
+        x = attn_mask.attention(q, k, v)
+    else:
+        x = torch.nn.functional.scaled_dot_product_attention(q, k, v, attn_mask=attn_mask)
     x = rearrange(x, "B H L D -> B L (H D)")
 
     return x
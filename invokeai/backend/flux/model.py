@@ -10,7 +10,9 @@ from invokeai.backend.flux.custom_block_processor import (
     CustomDoubleStreamBlockProcessor,
     CustomSingleStreamBlockProcessor,
 )
+from invokeai.backend.flux.embedding_cache import FluxEmbeddingCache, embed_timesteps
 from invokeai.backend.flux.extensions.regional_prompting_extension import RegionalPromptingExtension
+from invokeai.backend.flux.extensions.step_cache_extension import StepCacheExtension
 from invokeai.backend.flux.extensions.xlabs_ip_adapter_extension import XLabsIPAdapterExtension
 from invokeai.backend.flux.modules.layers import (
     DoubleStreamBlock,
@@ -18,7 +20,6 @@ from invokeai.backend.flux.modules.layers import (
     LastLayer,
     MLPEmbedder,
     SingleStreamBlock,
-    timestep_embedding,
 )
 
 
@@ -102,22 +103,39 @@ class Flux(nn.Module):
         controlnet_single_block_residuals: list[Tensor] | None,
         ip_adapter_extensions: list[XLabsIPAdapterExtension],
         regional_prompting_extension: RegionalPromptingExtension,
+        step_cache_extension: StepCacheExtension | None = None,
+        embedding_cache: FluxEmbeddingCache | None = None,
     ) -> Tensor:
         if img.ndim != 3 or txt.ndim != 3:
             raise ValueError("Input img and txt tensors must have 3 dimensions.")
 
         # running on sequences img
         img = self.img_in(img)
-        vec = self.time_in(timestep_embedding(timesteps, 256))
-        if self.params.guidance_embed:
-            if guidance is None:
-                raise ValueError("Didn't get guidance strength for guidance distilled model.")
-            vec = vec + self.guidance_in(timestep_embedding(guidance, 256))
+        guidance_in = self.guidance_in if self.params.guidance_embed else None
+        if embedding_cache is not None:
+            vec = embedding_cache.get_vec(self.time_in, guidance_in, timesteps, guidance)
+        else:
+            vec = embed_timesteps(self.time_in, guidance_in, timesteps, guidance)
         vec = vec + self.vector_in(y)
         txt = self.txt_in(txt)
 
-        ids = torch.cat((txt_ids, img_ids), dim=1)
-        pe = self.pe_embedder(ids)
+        # If the blocks' output is reused from an earlier step, skip them.
+        if step_cache_extension is not None:
+            cached_residual = step_cache_extension.get_cached_residual(
+                timestep_index=timestep_index,
+                first_block=self.double_blocks[0],
+                img=img,
+                vec=vec,
+                num_blocks=len(self.double_blocks) + len(self.single_blocks),
+            )
+            if cached_residual is not None:
+                return self.final_layer(img + cached_residual, vec)
+        blocks_input_img = img
+
+        if embedding_cache is not None:
+            pe = embedding_cache.get_pe(self.pe_embedder, txt_ids, img_ids)
+        else:
+            pe = self.pe_embedder(torch.cat((txt_ids, img_ids), dim=1))
 
         # Validate double_block_residuals shape.
         if controlnet_double_block_residuals is not None:
@@ -163,6 +181,8 @@ class Flux(nn.Module):
                 img[:, txt.shape[1] :, ...] += controlnet_single_block_residuals[block_index]
 
         img = img[:, txt.shape[1] :, ...]
+        if step_cache_extension is not None:
+            step_cache_extension.cache_residual(img - blocks_input_img)
 
         img = self.final_layer(img, vec)  # (N, T, patch_size ** 2 * out_channels)
         return img
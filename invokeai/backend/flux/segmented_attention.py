@@ -0,0 +1,94 @@
+from dataclasses import dataclass
+
+import torch
+
+
+@dataclass
+class AttnSegment:
+    """A set of queries that attend to the same keys."""
+
+    query_idx: torch.Tensor | None
+    """The indices of the queries, or None for all queries."""
+    key_idx: torch.Tensor | None
+    """The indices of the keys that the queries attend to, or None for all keys."""
+
+
+class SegmentedAttnMask:
+    """A block-structured representation of a boolean attention mask.
+
+    The queries are grouped into segments of queries that attend to the same keys. Attention is then run once per
+    segment, without a mask, on the gathered keys and values of the segment. This lets scaled_dot_product_attention use
+    its fused kernels, and skips the masked-out parts of the attention matrix entirely.
+
+    This is efficient for the masks used by regional prompting, where the queries fall into a handful of segments (one
+    per region, plus the txt tokens of each prompt).
+    """
+
+    def __init__(self, segments: list[list[AttnSegment]]):
+        """
+        Args:
+            segments: The segments of each batch element. If there is a single list of segments, it applies to all
+                batch elements.
+        """
+        self.segments = segments
+
+    @classmethod
+    def from_dense(cls, attn_mask: torch.Tensor, max_segments: int = 32) -> "SegmentedAttnMask | None":
+        """Builds a SegmentedAttnMask from a dense boolean attention mask.
+
+        Args:
+            attn_mask: The boolean attention mask. Shape: (seq_len, seq_len) or (batch_size, 1, seq_len, seq_len).
+            max_segments: The maximum number of segments per batch element. If a mask has more segments, None is
+                returned, as attention with the dense mask is likely faster.
+
+        Returns:
+            The SegmentedAttnMask, or None if the mask has too many segments.
+        """
+        masks = [attn_mask] if attn_mask.ndim == 2 else [m[0] for m in attn_mask]
+        segments: list[list[AttnSegment]] = []
+        for mask in masks:
+            # Group the queries by the row of the mask, i.e. by the keys that they attend to.
+            rows, query_segment_ids = torch.unique(mask, dim=0, return_inverse=True)
+            if rows.shape[0] > max_segments:
+                return None
+            batch_segments: list[AttnSegment] = []
+            for segment_id, row in enumerate(rows):
+                query_idx = None if rows.shape[0] == 1 else torch.nonzero(query_segment_ids == segment_id)[:, 0]
+                key_idx = None if bool(row.all()) else torch.nonzero(row)[:, 0]
+                batch_segments.append(AttnSegment(query_idx=query_idx, key_idx=key_idx))
+            segments.append(batch_segments)
+        return cls(segments)
+
+    def attention(self, q: torch.Tensor, k: torch.Tensor, v: torch.Tensor) -> torch.Tensor:
+        """Runs masked scaled dot product attention.
+
+        Args:
+            q, k, v: The queries, keys and values. Shape: (batch_size, num_heads, seq_len, head_dim).
+
+        Returns:
+            The attention output. Shape: (batch_size, num_heads, seq_len, head_dim).
+        """
+        if len(self.segments) == 1:
+            return self._attention(self.segments[0], q, k, v)
+        if len(self.segments) != q.shape[0]:
+            raise ValueError(f"Expected a batch size of {len(self.segments)}, got {q.shape[0]}.")
+        return torch.cat(
+            [
+                self._attention(segments, q[i : i + 1], k[i : i + 1], v[i : i + 1])
+                for i, segments in enumerate(self.segments)
+            ]
+        )
+
+    @staticmethod
+    def _attention(segments: list[AttnSegment], q: torch.Tensor, k: torch.Tensor, v: torch.Tensor) -> torch.Tensor:
+        out = None if len(segments) == 1 and segments[0].query_idx is None else torch.empty_like(q)
+        for segment in segments:
+            segment_q = q if segment.query_idx is None else q[:, :, segment.query_idx]
+            segment_k = k if segment.key_idx is None else k[:, :, segment.key_idx]
+            segment_v = v if segment.key_idx is None else v[:, :, segment.key_idx]
+            segment_out = torch.nn.functional.scaled_dot_product_attention(segment_q, segment_k, segment_v)
+            if out is None:
+                return segment_out
+            out[:, :, segment.query_idx] = segment_out
+        assert out is not None
+        return out
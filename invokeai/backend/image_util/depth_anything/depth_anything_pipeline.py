@@ -1,19 +1,21 @@
 import pathlib
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 
 import torch
 from PIL import Image
-from transformers import pipeline
-from transformers.pipelines import DepthEstimationPipeline
 
 from invokeai.backend.raw_model import RawModel
 
+if TYPE_CHECKING:
+    # transformers pipelines are slow to import. This module is imported at startup by the model manager.
+    from transformers.pipelines import DepthEstimationPipeline
+
 
 class DepthAnythingPipeline(RawModel):
     """Custom wrapper for the Depth Estimation pipeline from transformers adding compatibility
     for Invoke's Model Management System"""
 
-    def __init__(self, pipeline: DepthEstimationPipeline) -> None:
+    def __init__(self, pipeline: "DepthEstimationPipeline") -> None:
         self._pipeline = pipeline
 
     def generate_depth(self, image: Image.Image) -> Image.Image:
@@ -35,6 +37,8 @@ class DepthAnythingPipeline(RawModel):
     @classmethod
     def load_model(cls, model_path: pathlib.Path):
         """Load the model from the given path and return a DepthAnythingPipeline instance."""
+        from transformers import pipeline
+        from transformers.pipelines import DepthEstimationPipeline
 
         depth_anything_pipeline = pipeline(model=str(model_path), task="depth-estimation", local_files_only=True)
         assert isinstance(depth_anything_pipeline, DepthEstimationPipeline)
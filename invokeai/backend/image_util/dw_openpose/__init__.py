@@ -5,7 +5,6 @@ import huggingface_hub
 import numpy as np
 import onnxruntime as ort
 import torch
-from controlnet_aux.util import resize_image
 from PIL import Image
 
 from invokeai.backend.image_util.dw_openpose.onnxdet import inference_detector
@@ -53,6 +52,9 @@ def draw_pose(
         assert isinstance(hands, np.ndarray)
         canvas = draw_facepose(canvas, faces)  # type: ignore
 
+    # controlnet_aux is slow to import, so it is only imported when a pose is drawn.
+    from controlnet_aux.util import resize_image
+
     dwpose_image: Image.Image = resize_image(
         canvas,
         resolution,
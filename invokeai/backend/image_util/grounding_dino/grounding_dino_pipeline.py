@@ -1,19 +1,22 @@
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 
 import torch
 from PIL import Image
-from transformers.pipelines import ZeroShotObjectDetectionPipeline
 
 from invokeai.backend.image_util.grounding_dino.detection_result import DetectionResult
 from invokeai.backend.raw_model import RawModel
 
+if TYPE_CHECKING:
+    # transformers pipelines are slow to import. This module is imported at startup by the model manager.
+    from transformers.pipelines import ZeroShotObjectDetectionPipeline
+
 
 class GroundingDinoPipeline(RawModel):
     """A wrapper class for a ZeroShotObjectDetectionPipeline that makes it compatible with the model manager's memory
     management system.
     """
 
-    def __init__(self, pipeline: ZeroShotObjectDetectionPipeline):
+    def __init__(self, pipeline: "ZeroShotObjectDetectionPipeline"):
         self._pipeline = pipeline
 
     def detect(self, image: Image.Image, candidate_labels: list[str], threshold: float = 0.1) -> list[DetectionResult]:
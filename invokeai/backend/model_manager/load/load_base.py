@@ -7,7 +7,7 @@ from abc import ABC, abstractmethod
 from contextlib import contextmanager
 from logging import Logger
 from pathlib import Path
-from typing import Any, Dict, Generator, Optional, Tuple
+from typing import Any, Dict, Generator, Hashable, Optional, Tuple
 
 import torch
 
@@ -83,6 +83,20 @@ class LoadedModelWithoutConfig:
         """Return the model without locking it."""
         return self._cache_record.cached_model.model
 
+    def get_patched_weights(self, patches_key: Hashable) -> Optional[Dict[str, torch.Tensor]]:
+        """Return the cached weights of the model after a stack of patches was applied, if they exist.
+
+        See `ModelCache.get_patched_weights()`.
+        """
+        return self._cache.get_patched_weights(self._cache_record.key, patches_key)
+
+    def put_patched_weights(self, patches_key: Hashable, weights: Dict[str, torch.Tensor]) -> None:
+        """Cache the weights of the model after a stack of patches was applied.
+
+        See `ModelCache.put_patched_weights()`.
+        """
+        self._cache.put_patched_weights(self._cache_record.key, patches_key, weights)
+
 
 class LoadedModel(LoadedModelWithoutConfig):
     """Context manager object that mediates transfer from RAM<->VRAM."""
@@ -15,9 +15,10 @@ from invokeai.backend.model_manager import (
 from invokeai.backend.model_manager.config import DiffusersConfigBase
 from invokeai.backend.model_manager.load.load_base import LoadedModel, ModelLoaderBase
 from invokeai.backend.model_manager.load.model_cache.cache_record import CacheRecord
-from invokeai.backend.model_manager.load.model_cache.model_cache import ModelCache, get_model_cache_key
+from invokeai.backend.model_manager.load.model_cache.model_cache import GB, ModelCache, get_model_cache_key
 from invokeai.backend.model_manager.load.model_util import calc_model_size_by_fs
 from invokeai.backend.model_manager.load.optimizations import skip_torch_weight_init
+from invokeai.backend.model_manager.load.prepared_weights_cache import PreparedWeightsCache
 from invokeai.backend.util.devices import TorchDevice
 
 
@@ -35,6 +36,11 @@ class ModelLoader(ModelLoaderBase):
         self._app_config = app_config
         self._logger = logger
         self._ram_cache = ram_cache
+        self._prepared_weights_cache = PreparedWeightsCache(
+            cache_path=app_config.prepared_weights_cache_path,
+            max_size=int(app_config.prepared_weights_cache_gb * GB),
+            logger=logger,
+        )
         self._torch_dtype = TorchDevice.choose_torch_dtype()
         self._torch_device = TorchDevice.choose_torch_device()
 
@@ -1,4 +1,5 @@
-from dataclasses import dataclass
+import threading
+from dataclasses import dataclass, field
 
 from invokeai.backend.model_manager.load.model_cache.cached_model.cached_model_only_full_load import (
     CachedModelOnlyFullLoad,
@@ -17,15 +18,20 @@ class CacheRecord:
     # Model in memory.
     cached_model: CachedModelWithPartialLoad | CachedModelOnlyFullLoad
     _locks: int = 0
+    # Held by the thread that has locked this record. Models may be patched in place while locked (e.g. with LoRAs), so
+    # a model must only be used by one session processor worker at a time. Locking is re-entrant within a thread.
+    _owner: threading.RLock = field(default_factory=threading.RLock, repr=False, compare=False)
 
     def lock(self) -> None:
-        """Lock this record."""
+        """Lock this record. Blocks if the record is locked by another thread."""
+        self._owner.acquire()
         self._locks += 1
 
     def unlock(self) -> None:
         """Unlock this record."""
         self._locks -= 1
         assert self._locks >= 0
+        self._owner.release()
 
     @property
     def is_locked(self) -> bool:
@@ -1,3 +1,5 @@
+import functools
+
 import torch
 
 from invokeai.backend.model_manager.load.model_cache.torch_module_autocast.custom_modules.custom_module_mixin import (
@@ -7,6 +9,37 @@ from invokeai.backend.util.calc_tensor_size import calc_tensor_size
 from invokeai.backend.util.logging import InvokeAILogger
 
 
+@functools.lru_cache(maxsize=32)
+def find_keys_in_modules_that_do_not_support_autocast(
+    state_dict_keys: tuple[str, ...], modules_that_support_autocast: frozenset[str]
+) -> frozenset[str]:
+    """Find the state dict keys that are not in (or under) a module that supports autocasting. These weights must be
+    on the compute device to run the model.
+
+    Each key is looked up by the path of the module that it belongs to, and the paths of that module's ancestors, so
+    this takes time linear in the number of keys. The result only depends on the model's architecture, so it is
+    memoized for repeat loads of models of the same family.
+
+    Args:
+        state_dict_keys: The keys of the model's state dict.
+        modules_that_support_autocast: The names of the modules that support autocasting.
+    """
+    if "" in modules_that_support_autocast:
+        # The root module supports autocasting, so all of its weights do.
+        return frozenset()
+
+    keys_in_modules_that_do_not_support_autocast: set[str] = set()
+    for key in state_dict_keys:
+        module_name = key
+        while "." in module_name:
+            module_name = module_name.rsplit(".", 1)[0]
+            if module_name in modules_that_support_autocast:
+                break
+        else:
+            keys_in_modules_that_do_not_support_autocast.add(key)
+    return frozenset(keys_in_modules_that_do_not_support_autocast)
+
+
 class CachedModelWithPartialLoad:
     """A wrapper around a PyTorch model to handle partial loads and unloads between the CPU and the compute device.
 
@@ -34,8 +67,8 @@ class CachedModelWithPartialLoad:
         self._cur_vram_bytes: int | None = None
 
         self._modules_that_support_autocast = self._find_modules_that_support_autocast()
-        self._keys_in_modules_that_do_not_support_autocast = self._find_keys_in_modules_that_do_not_support_autocast(
-            model_state_dict
+        self._keys_in_modules_that_do_not_support_autocast = find_keys_in_modules_that_do_not_support_autocast(
+            tuple(model_state_dict.keys()), frozenset(self._modules_that_support_autocast.keys())
         )
         self._state_dict_keys_by_module_prefix = self._group_state_dict_keys_by_module_prefix(model_state_dict)
 
@@ -43,16 +76,6 @@ class CachedModelWithPartialLoad:
         """Find all modules that support autocasting."""
         return {n: m for n, m in self._model.named_modules() if isinstance(m, CustomModuleMixin)}  # type: ignore
 
-    def _find_keys_in_modules_that_do_not_support_autocast(self, state_dict: dict[str, torch.Tensor]) -> set[str]:
-        keys_in_modules_that_do_not_support_autocast: set[str] = set()
-        for key in state_dict.keys():
-            for module_name in self._modules_that_support_autocast.keys():
-                if key.startswith(module_name):
-                    break
-            else:
-                keys_in_modules_that_do_not_support_autocast.add(key)
-        return keys_in_modules_that_do_not_support_autocast
-
     def _group_state_dict_keys_by_module_prefix(self, state_dict: dict[str, torch.Tensor]) -> dict[str, list[str]]:
         """A helper function that groups state dict keys by module prefix.
 
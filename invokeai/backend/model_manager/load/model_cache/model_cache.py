@@ -1,8 +1,11 @@
 import gc
 import logging
+import threading
 import time
+from collections import OrderedDict
+from functools import wraps
 from logging import Logger
-from typing import Dict, List, Optional
+from typing import Any, Callable, Dict, Hashable, List, Optional, TypeVar
 
 import psutil
 import torch
@@ -21,6 +24,8 @@ from invokeai.backend.model_manager.load.model_cache.torch_module_autocast.torch
     apply_custom_layers_to_model,
 )
 from invokeai.backend.model_manager.load.model_util import calc_model_size_by_data
+from invokeai.backend.quantization.gguf.dequantized_weight_cache import DequantizedWeightCache
+from invokeai.backend.util.calc_tensor_size import calc_tensors_size
 from invokeai.backend.util.devices import TorchDevice
 from invokeai.backend.util.logging import InvokeAILogger
 from invokeai.backend.util.prefix_logger_adapter import PrefixedLoggerAdapter
@@ -32,6 +37,21 @@ GB = 2**30
 MB = 2**20
 
 
+T = TypeVar("T")
+
+
+def synchronized(method: Callable[..., T]) -> Callable[..., T]:
+    """Decorator for ModelCache methods that must hold the cache lock, as the cache may be shared by multiple session
+    processor workers."""
+
+    @wraps(method)
+    def wrapper(self: "ModelCache", *args: Any, **kwargs: Any) -> T:
+        with self._lock:
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
+
 # TODO(ryand): Where should this go? The ModelCache shouldn't be concerned with submodels.
 def get_model_cache_key(model_key: str, submodel_type: Optional[SubModelType] = None) -> str:
     """Get the cache key for a model based on the optional submodel type."""
@@ -85,6 +105,8 @@ class ModelCache:
         storage_device: torch.device | str = "cpu",
         log_memory_usage: bool = False,
         logger: Optional[Logger] = None,
+        cache_patched_weights: bool = False,
+        dequantized_weights_cache_gb: float = 0,
     ):
         """Initialize the model RAM cache.
 
@@ -104,6 +126,12 @@ class ModelCache:
             snapshots, so it is recommended to disable this feature unless you are actively inspecting the model cache's
             behaviour.
         :param logger: InvokeAILogger to use (otherwise creates one)
+        :param cache_patched_weights: Whether to keep the weights of models patched with a stack of patches (e.g.
+            LoRAs), so that the same stack can be applied again by copying the weights. Patched weights only use RAM
+            that is not used by models.
+        :param dequantized_weights_cache_gb: The maximum amount of memory to use for caching the dequantized weights of
+            GGUF-quantized models, in GB. The cached weights are kept on the execution device, and are dropped before
+            any models when memory is needed. Set to 0 to disable the cache.
         """
         self._enable_partial_loading = enable_partial_loading
         self._keep_ram_copy_of_weights = keep_ram_copy_of_weights
@@ -118,23 +146,56 @@ class ModelCache:
             logger or InvokeAILogger.get_logger(self.__class__.__name__), "MODEL CACHE"
         )
         self._log_memory_usage = log_memory_usage
-        self._stats: Optional[CacheStats] = None
+        # Stats are collected per session, so each session processor worker thread has its own stats object.
+        self._thread_local = threading.local()
+        # The stats most recently set on any thread, e.g. for the API to report.
+        self._latest_stats: Optional[CacheStats] = None
+        self._stats_lock = threading.Lock()
+        self._lock = threading.RLock()
 
         self._cached_models: Dict[str, CacheRecord] = {}
         self._cache_stack: List[str] = []
 
+        self._cache_patched_weights = cache_patched_weights
+        # The weights of patched models, by model key and patches key, in least recently used order.
+        self._patched_weights: OrderedDict[tuple[str, Hashable], dict[str, torch.Tensor]] = OrderedDict()
+        self._patched_weights_bytes = 0
+
+        self._dequantized_weights_cache: DequantizedWeightCache | None = None
+        if dequantized_weights_cache_gb > 0:
+            self._dequantized_weights_cache = DequantizedWeightCache(int(dequantized_weights_cache_gb * GB))
+
         self._ram_cache_size_bytes = self._calc_ram_available_to_model_cache()
 
     @property
     def stats(self) -> Optional[CacheStats]:
-        """Return collected CacheStats object."""
-        return self._stats
+        """Return the most recently set CacheStats object, from any thread."""
+        with self._stats_lock:
+            return self._latest_stats
 
     @stats.setter
     def stats(self, stats: CacheStats) -> None:
-        """Set the CacheStats object for collecting cache statistics."""
-        self._stats = stats
+        """Set the CacheStats object for collecting cache statistics on the calling thread."""
+        self._thread_local.stats = stats
+        with self._stats_lock:
+            self._latest_stats = stats
 
+    @property
+    def _thread_stats(self) -> Optional[CacheStats]:
+        """The CacheStats object that collects the statistics of the calling thread."""
+        return getattr(self._thread_local, "stats", None)
+
+    @property
+    def dequantized_weights_cache(self) -> DequantizedWeightCache | None:
+        """Return the cache of dequantized GGUF weights, if enabled."""
+        return self._dequantized_weights_cache
+
+    @property
+    def execution_device(self) -> torch.device:
+        """Return the device that models in this cache are executed on."""
+        return self._execution_device
+
+    @synchronized
     def put(self, key: str, model: AnyModel) -> None:
         """Add a model to the cache."""
         if key in self._cached_models:
@@ -149,6 +210,8 @@ class ModelCache:
         # Inject custom modules into the model.
         if isinstance(model, torch.nn.Module):
             apply_custom_layers_to_model(model)
+            if self._dequantized_weights_cache is not None:
+                self._dequantized_weights_cache.attach_to_model(model)
 
         # Partial loading only makes sense on CUDA.
         # - When running on CPU, there is no 'loading' to do.
@@ -173,6 +236,7 @@ class ModelCache:
             f"Added model {key} (Type: {model.__class__.__name__}, Wrap mode: {wrapped_model.__class__.__name__}, Model size: {size/MB:.2f}MB)"
         )
 
+    @synchronized
     def get(self, key: str, stats_name: Optional[str] = None) -> CacheRecord:
         """Retrieve a model from the cache.
 
@@ -181,24 +245,25 @@ class ModelCache:
 
         Raises IndexError if the model is not in the cache.
         """
+        stats = self._thread_stats
         if key in self._cached_models:
-            if self.stats:
-                self.stats.hits += 1
+            if stats:
+                stats.hits += 1
         else:
-            if self.stats:
-                self.stats.misses += 1
+            if stats:
+                stats.misses += 1
             self._logger.debug(f"Cache miss: {key}")
             raise IndexError(f"The model with key {key} is not in the cache.")
 
         cache_entry = self._cached_models[key]
 
         # more stats
-        if self.stats:
+        if stats:
             stats_name = stats_name or key
-            self.stats.high_watermark = max(self.stats.high_watermark, self._get_ram_in_use())
-            self.stats.in_cache = len(self._cached_models)
-            self.stats.loaded_model_sizes[stats_name] = max(
-                self.stats.loaded_model_sizes.get(stats_name, 0), cache_entry.cached_model.total_bytes()
+            stats.high_watermark = max(stats.high_watermark, self._get_ram_in_use())
+            stats.in_cache = len(self._cached_models)
+            stats.loaded_model_sizes[stats_name] = max(
+                stats.loaded_model_sizes.get(stats_name, 0), cache_entry.cached_model.total_bytes()
             )
 
         # This moves the entry to the top (right end) of the stack.
@@ -208,6 +273,53 @@ class ModelCache:
         self._logger.debug(f"Cache hit: {key} (Type: {cache_entry.cached_model.model.__class__.__name__})")
         return cache_entry
 
+    @synchronized
+    def get_patched_weights(self, key: str, patches_key: Hashable) -> Optional[dict[str, torch.Tensor]]:
+        """Get the weights of a model's parameters after a stack of patches was applied, or None if they are not cached.
+
+        :param key: The cache key of the model.
+        :param patches_key: Identifies the stack of patches, e.g. by the key and weight of each patch in order.
+        """
+        weights = self._patched_weights.get((key, patches_key))
+        if weights is not None:
+            self._patched_weights.move_to_end((key, patches_key))
+        return weights
+
+    @synchronized
+    def put_patched_weights(self, key: str, patches_key: Hashable, weights: dict[str, torch.Tensor]) -> None:
+        """Cache the weights of a model's parameters after a stack of patches was applied.
+
+        Patched weights only use RAM that is not used by models. Older patched weights are dropped to make room for
+        them, but models are not. The patched weights of a model are dropped with the model.
+
+        :param key: The cache key of the model.
+        :param patches_key: Identifies the stack of patches, e.g. by the key and weight of each patch in order.
+        :param weights: The patched weights, by parameter key. Only the parameters changed by the patches are needed.
+        """
+        if not self._cache_patched_weights or key not in self._cached_models:
+            return
+
+        self._drop_patched_weights((key, patches_key))
+        size = calc_tensors_size(list(weights.values()))
+        if self._get_ram_available() + self._patched_weights_bytes < size:
+            self._logger.debug(f"Not caching {size/MB:.2f}MB of patched weights for {key}, as RAM is full.")
+            return
+        while self._get_ram_available() < size:
+            self._drop_patched_weights(next(iter(self._patched_weights)))
+
+        self._patched_weights[(key, patches_key)] = weights
+        self._patched_weights_bytes += size
+        self._logger.debug(f"Cached {size/MB:.2f}MB of patched weights for {key}.")
+
+    def _drop_patched_weights(self, patched_weights_key: tuple[str, Hashable]) -> int:
+        """Drop cached patched weights, if they exist. Returns the number of bytes freed."""
+        weights = self._patched_weights.pop(patched_weights_key, None)
+        if weights is None:
+            return 0
+        size = calc_tensors_size(list(weights.values()))
+        self._patched_weights_bytes -= size
+        return size
+
     def lock(self, cache_entry: CacheRecord, working_mem_bytes: Optional[int]) -> None:
         """Lock a model for use and move it into VRAM."""
         if cache_entry.key not in self._cached_models:
@@ -218,6 +330,7 @@ class ModelCache:
                 "(See https://github.com/invoke-ai/InvokeAI/issues/7513)."
             )
         # cache_entry = self._cached_models[key]
+        # This blocks while another thread has the model locked. The cache lock must not be held while waiting.
         cache_entry.lock()
 
         self._logger.debug(
@@ -228,20 +341,21 @@ class ModelCache:
             # Models don't need to be loaded into VRAM if we're running on CPU.
             return
 
-        try:
-            self._load_locked_model(cache_entry, working_mem_bytes)
-            self._logger.debug(
-                f"Finished locking model {cache_entry.key} (Type: {cache_entry.cached_model.model.__class__.__name__})"
-            )
-        except torch.cuda.OutOfMemoryError:
-            self._logger.warning("Insufficient GPU memory to load model. Aborting")
-            cache_entry.unlock()
-            raise
-        except Exception:
-            cache_entry.unlock()
-            raise
+        with self._lock:
+            try:
+                self._load_locked_model(cache_entry, working_mem_bytes)
+                self._logger.debug(
+                    f"Finished locking model {cache_entry.key} (Type: {cache_entry.cached_model.model.__class__.__name__})"
+                )
+            except torch.cuda.OutOfMemoryError:
+                self._logger.warning("Insufficient GPU memory to load model. Aborting")
+                cache_entry.unlock()
+                raise
+            except Exception:
+                cache_entry.unlock()
+                raise
 
-        self._log_cache_state()
+            self._log_cache_state()
 
     def unlock(self, cache_entry: CacheRecord) -> None:
         """Unlock a model."""
@@ -253,7 +367,8 @@ class ModelCache:
                 "(See https://github.com/invoke-ai/InvokeAI/issues/7513)."
             )
         # cache_entry = self._cached_models[key]
-        cache_entry.unlock()
+        with self._lock:
+            cache_entry.unlock()
         self._logger.debug(
             f"Unlocked model {cache_entry.key} (Type: {cache_entry.cached_model.model.__class__.__name__})"
         )
@@ -382,7 +497,7 @@ class ModelCache:
     def _get_vram_in_use(self) -> int:
         """Get the amount of VRAM currently in use by the cache."""
         if self._execution_device.type == "cuda":
-            return torch.cuda.memory_allocated()
+            return torch.cuda.memory_allocated(self._execution_device)
         elif self._execution_device.type == "mps":
             return torch.mps.current_allocated_memory()
         else:
@@ -467,7 +582,11 @@ class ModelCache:
 
     def _get_ram_in_use(self) -> int:
         """Get the amount of RAM currently in use."""
-        return sum(ce.cached_model.total_bytes() for ce in self._cached_models.values())
+        ram_in_use = sum(ce.cached_model.total_bytes() for ce in self._cached_models.values())
+        ram_in_use += self._patched_weights_bytes
+        if self._dequantized_weights_cache is not None:
+            ram_in_use += self._dequantized_weights_cache.cached_bytes(self._storage_device)
+        return ram_in_use
 
     def _get_ram_available(self) -> int:
         """Get the amount of RAM available for the cache to use."""
@@ -499,6 +618,13 @@ class ModelCache:
             f"Offloading unlocked models with goal of making room for {vram_bytes_required/MB:.2f}MB of VRAM."
         )
         vram_bytes_freed = 0
+        # Dequantized weights are cheaper to recreate than models, so they are dropped first. When running on the CPU,
+        # they are accounted for as RAM.
+        if self._dequantized_weights_cache is not None and self._execution_device.type != "cpu":
+            vram_bytes_to_free = vram_bytes_required - self._get_vram_available(working_mem_bytes)
+            if vram_bytes_to_free > 0:
+                vram_bytes_freed += self._dequantized_weights_cache.evict(vram_bytes_to_free, self._execution_device)
+
         # TODO(ryand): Give more thought to the offloading policy used here.
         cache_entries_increasing_size = sorted(self._cached_models.values(), key=lambda x: x.cached_model.total_bytes())
         for cache_entry in cache_entries_increasing_size:
@@ -563,6 +689,16 @@ class ModelCache:
         if torch.cuda.is_available():
             log += "  {:<30} {:.1f} MB\n".format("CUDA Memory Allocated:", torch.cuda.memory_allocated() / MB)
         log += "  {:<30} {}\n".format("Total models:", len(self._cached_models))
+        if self._patched_weights:
+            log += "  {:<30} {} ({:.1f} MB)\n".format(
+                "Patched weights:", len(self._patched_weights), self._patched_weights_bytes / MB
+            )
+        if self._dequantized_weights_cache is not None:
+            log += "  {:<30} {:.1f} MB. {}\n".format(
+                "Dequantized weights:",
+                self._dequantized_weights_cache.cached_bytes() / MB,
+                self._dequantized_weights_cache.stats.summary(),
+            )
 
         if include_entry_details and len(self._cached_models) > 0:
             log += "  Models:\n"
@@ -588,6 +724,7 @@ class ModelCache:
 
         self._logger.debug(log)
 
+    @synchronized
     def make_room(self, bytes_needed: int) -> None:
         """Make enough room in the cache to accommodate a new model of indicated size.
 
@@ -602,6 +739,14 @@ class ModelCache:
         ram_bytes_to_free = max(0, bytes_needed - ram_bytes_available)
 
         ram_bytes_freed = 0
+        # Patched weights are cheaper to recreate than models, so they are dropped first.
+        while ram_bytes_freed < ram_bytes_to_free and self._patched_weights:
+            ram_bytes_freed += self._drop_patched_weights(next(iter(self._patched_weights)))
+        if ram_bytes_freed < ram_bytes_to_free and self._dequantized_weights_cache is not None:
+            ram_bytes_freed += self._dequantized_weights_cache.evict(
+                ram_bytes_to_free - ram_bytes_freed, self._storage_device
+            )
+
         pos = 0
         models_cleared = 0
         while ram_bytes_freed < ram_bytes_to_free and pos < len(self._cache_stack):
@@ -631,8 +776,9 @@ class ModelCache:
             #
             # Keep in mind that gc is only responsible for handling reference cycles. Most objects should be cleaned up
             # immediately when their reference count hits 0.
-            if self.stats:
-                self.stats.cleared = models_cleared
+            stats = self._thread_stats
+            if stats:
+                stats.cleared = models_cleared
             gc.collect()
 
         TorchDevice.empty_cache()
@@ -643,3 +789,5 @@ class ModelCache:
         """Delete cache_entry from the cache if it exists. No exception is thrown if it doesn't exist."""
         self._cache_stack = [key for key in self._cache_stack if key != cache_entry.key]
         self._cached_models.pop(cache_entry.key, None)
+        for patched_weights_key in [k for k in self._patched_weights if k[0] == cache_entry.key]:
+            self._drop_patched_weights(patched_weights_key)
@@ -6,7 +6,6 @@ from typing import Optional
 
 import accelerate
 import torch
-from safetensors.torch import load_file
 from transformers import AutoConfig, AutoModelForTextEncoding, CLIPTextModel, CLIPTokenizer, T5EncoderModel, T5Tokenizer
 
 from invokeai.app.services.config.config_default import get_config
@@ -48,7 +47,9 @@ from invokeai.backend.model_manager.config import (
     VAECheckpointConfig,
 )
 from invokeai.backend.model_manager.load.load_default import ModelLoader
+from invokeai.backend.model_manager.load.model_cache.model_cache import get_model_cache_key
 from invokeai.backend.model_manager.load.model_loader_registry import ModelLoaderRegistry
+from invokeai.backend.model_manager.load.safetensors_loader import load_safetensors, load_safetensors_into_module
 from invokeai.backend.model_manager.util.model_util import (
     convert_bundle_to_flux_transformer_checkpoint,
 )
@@ -82,8 +83,7 @@ class FluxVAELoader(ModelLoader):
 
         with accelerate.init_empty_weights():
             model = AutoEncoder(ae_params[config.config_path])
-        sd = load_file(model_path)
-        model.load_state_dict(sd, assign=True)
+        load_safetensors_into_module(model, model_path)
         # VAE is broken in float16, which mps defaults to
         if self._torch_dtype == torch.float16:
             try:
@@ -146,7 +146,7 @@ class BnbQuantizedLlmInt8bCheckpointModel(ModelLoader):
                     model = quantize_model_llm_int8(model, modules_to_not_convert=set())
 
                 state_dict_path = te2_model_path / "bnb_llm_int8_model.safetensors"
-                state_dict = load_file(state_dict_path)
+                state_dict = load_safetensors(state_dict_path)
                 self._load_state_dict_into_t5(model, state_dict)
 
                 return model
@@ -222,14 +222,21 @@ class FluxCheckpointModel(ModelLoader):
         with accelerate.init_empty_weights():
             model = Flux(params[config.config_path])
 
-        sd = load_file(model_path)
+        cache_key = get_model_cache_key(config.key, SubModelType.Transformer)
+        sd = self._prepared_weights_cache.get_state_dict(cache_key, config.hash, torch.bfloat16)
+        if sd is not None:
+            self._ram_cache.make_room(sum([ten.nelement() * ten.element_size() for ten in sd.values()]))
+            model.load_state_dict(sd, assign=True)
+            return model
+
+        # We need to cast to bfloat16 due to it being the only currently supported dtype for inference. Tensors are
+        # cast as they are read, so the checkpoint is never held in memory in its original dtype.
+        sd = load_safetensors(model_path, dtype=torch.bfloat16)
         if "model.diffusion_model.double_blocks.0.img_attn.norm.key_norm.scale" in sd:
             sd = convert_bundle_to_flux_transformer_checkpoint(sd)
         new_sd_size = sum([ten.nelement() * torch.bfloat16.itemsize for ten in sd.values()])
         self._ram_cache.make_room(new_sd_size)
-        for k in sd.keys():
-            # We need to cast to bfloat16 due to it being the only currently supported dtype for inference
-            sd[k] = sd[k].to(torch.bfloat16)
+        self._prepared_weights_cache.put_state_dict(cache_key, config.hash, torch.bfloat16, sd)
         model.load_state_dict(sd, assign=True)
         return model
 
@@ -315,7 +322,7 @@ class FluxBnbQuantizednf4bCheckpointModel(ModelLoader):
             with accelerate.init_empty_weights():
                 model = Flux(params[config.config_path])
                 model = quantize_model_nf4(model, modules_to_not_convert=set(), compute_dtype=torch.bfloat16)
-            sd = load_file(model_path)
+            sd = load_safetensors(model_path)
             if "model.diffusion_model.double_blocks.0.img_attn.norm.key_norm.scale" in sd:
                 sd = convert_bundle_to_flux_transformer_checkpoint(sd)
             model.load_state_dict(sd, assign=True)
@@ -340,7 +347,7 @@ class FluxControlnetModel(ModelLoader):
         else:
             raise ValueError(f"Unexpected ControlNet model config type: {type(config)}")
 
-        sd = load_file(model_path)
+        sd = load_safetensors(model_path)
 
         # Detect the FLUX ControlNet model type from the state dict.
         if is_state_dict_xlabs_controlnet(sd):
@@ -382,7 +389,7 @@ class FluxIpAdapterModel(ModelLoader):
         if not isinstance(config, IPAdapterCheckpointConfig):
             raise ValueError(f"Unexpected model config type: {type(config)}.")
 
-        sd = load_file(Path(config.path))
+        sd = load_safetensors(Path(config.path))
 
         params = infer_xlabs_ip_adapter_params_from_state_dict(sd)
 
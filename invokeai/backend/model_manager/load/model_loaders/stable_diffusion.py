@@ -5,6 +5,7 @@ from pathlib import Path
 from typing import Optional
 
 from diffusers import (
+    DiffusionPipeline,
     StableDiffusionInpaintPipeline,
     StableDiffusionPipeline,
     StableDiffusionXLInpaintPipeline,
@@ -121,9 +122,25 @@ class StableDiffusionDiffusersModel(GenericDiffusersLoader):
         # Some weights of the model checkpoint were not used when initializing CLIPTextModelWithProjection:
         # ['text_model.embeddings.position_ids']
 
+        # Checkpoints that were converted before are loaded from the converted pipeline, one submodel at a time
+        prepared_path = self._prepared_weights_cache.get(config.key, config.hash, self._torch_dtype)
+        if prepared_path is not None:
+            try:
+                with SilenceWarnings():
+                    return self._load_prepared_pipeline(prepared_path, load_class, submodel_type)
+            except OSError as e:
+                self._logger.warning(f"Failed to load prepared weights for model {config.key}, converting it: {e}")
+
         with SilenceWarnings():
             pipeline = load_class.from_single_file(config.path, torch_dtype=self._torch_dtype)
 
+        self._prepared_weights_cache.put(
+            config.key,
+            config.hash,
+            self._torch_dtype,
+            lambda path: pipeline.save_pretrained(path, safe_serialization=True),
+        )
+
         if not submodel_type:
             return pipeline
 
@@ -135,3 +152,19 @@ class StableDiffusionDiffusersModel(GenericDiffusersLoader):
             if submodel := getattr(pipeline, subtype.value, None):
                 self._ram_cache.put(get_model_cache_key(config.key, subtype), model=submodel)
         return getattr(pipeline, submodel_type.value)
+
+    def _load_prepared_pipeline(
+        self,
+        prepared_path: Path,
+        load_class: type[DiffusionPipeline],
+        submodel_type: Optional[SubModelType] = None,
+    ) -> AnyModel:
+        """Load a pipeline, or one of its submodels, from a checkpoint that was converted to the diffusers format."""
+        if not submodel_type:
+            pipeline: AnyModel = load_class.from_pretrained(prepared_path, torch_dtype=self._torch_dtype)
+            return pipeline
+        submodel_class = self.get_hf_load_class(prepared_path, submodel_type)
+        submodel: AnyModel = submodel_class.from_pretrained(
+            prepared_path / submodel_type.value, torch_dtype=self._torch_dtype
+        )
+        return submodel
@@ -0,0 +1,206 @@
+# Copyright (c) 2024 The InvokeAI Development Team
+"""An on-disk cache of model weights that have already been converted and cast for loading."""
+
+import json
+import mmap
+import os
+import re
+import shutil
+import tempfile
+from logging import Logger
+from pathlib import Path
+from typing import Callable, Optional
+
+import torch
+from safetensors.torch import save_file
+
+from invokeai.backend.model_manager.load.safetensors_loader import read_safetensors_header
+
+# Increment this when a change to the model conversion code would change the prepared weights, so that weights prepared
+# by an older version are discarded.
+PREPARED_WEIGHTS_VERSION = 1
+
+STATE_DICT_FILE = "model.safetensors"
+"""The name of the state dict file in a cache entry written with `put_state_dict()`."""
+
+_METADATA_FILE = "prepared.json"
+_TMP_PREFIX = ".tmp_"
+
+
+def load_mmapped_state_dict(path: Path) -> dict[str, torch.Tensor]:
+    """Load a safetensors file without reading it into memory.
+
+    The tensors share memory with a copy-on-write mmap of the file, so pages are only read from disk when a tensor is
+    used, and in-place changes to a tensor are never written back to the file.
+    """
+    entries = read_safetensors_header(path)
+    with open(path, "rb") as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    state_dict: dict[str, torch.Tensor] = {}
+    for entry in entries:
+        if entry.nbytes == 0:
+            state_dict[entry.key] = torch.empty(entry.shape, dtype=entry.dtype)
+            continue
+        count = entry.nbytes // entry.dtype.itemsize
+        state_dict[entry.key] = torch.frombuffer(buffer, dtype=entry.dtype, count=count, offset=entry.offset).reshape(
+            entry.shape
+        )
+    return state_dict
+
+
+class PreparedWeightsCache:
+    """An on-disk cache of model weights that have been converted and cast for loading.
+
+    Loading a single-file model converts its weights to the layout of the model class and casts them to the inference
+    dtype every time the model is loaded. This cache stores the result per model key and dtype, so that the next load
+    reads it directly.
+
+    Each entry is a directory named by the model key and dtype, holding the prepared weights and a metadata file with
+    the hash of the model they were prepared from. An entry is discarded when the model's hash changes. Entries are
+    evicted in least recently used order when the cache is over its size budget. A cache with a size budget of 0 is
+    disabled, and never stores anything.
+    """
+
+    def __init__(self, cache_path: Path, max_size: int, logger: Logger):
+        """Initialize the cache.
+
+        :param cache_path: The directory of the cache.
+        :param max_size: The size budget of the cache, in bytes.
+        :param logger: The logger.
+        """
+        self._cache_path = cache_path
+        self._max_size = max_size
+        self._logger = logger
+
+    @property
+    def enabled(self) -> bool:
+        """Whether the cache stores prepared weights."""
+        return self._max_size > 0
+
+    def get(self, key: str, model_hash: str, dtype: torch.dtype) -> Optional[Path]:
+        """Get the directory of the prepared weights of a model, or None if they are not cached.
+
+        :param key: The key of the model, with the submodel type if the weights are for a submodel.
+        :param model_hash: The hash of the model. Weights prepared from a model with a different hash are discarded.
+        :param dtype: The dtype the weights were cast to.
+        """
+        if not self.enabled:
+            return None
+        entry_path = self._get_entry_path(key, dtype)
+        try:
+            metadata = json.loads((entry_path / _METADATA_FILE).read_text())
+        except (OSError, ValueError):
+            return None
+        if metadata != self._get_metadata(model_hash, dtype):
+            self._logger.info(f"Discarding stale prepared weights for model {key}")
+            shutil.rmtree(entry_path, ignore_errors=True)
+            return None
+        # The modification time of the metadata file is used to evict the least recently used entries
+        try:
+            os.utime(entry_path / _METADATA_FILE)
+        except OSError:
+            return None
+        return entry_path
+
+    def put(self, key: str, model_hash: str, dtype: torch.dtype, write: Callable[[Path], None]) -> None:
+        """Store the prepared weights of a model.
+
+        :param key: The key of the model, with the submodel type if the weights are for a submodel.
+        :param model_hash: The hash of the model the weights were prepared from.
+        :param dtype: The dtype the weights were cast to.
+        :param write: A function that writes the prepared weights into the directory it is given.
+        """
+        if not self.enabled:
+            return
+        entry_path = self._get_entry_path(key, dtype)
+        self._cache_path.mkdir(parents=True, exist_ok=True)
+        # The entry is written to a temporary directory and then moved into place, so that a partially written entry
+        # is never read.
+        tmp_path = Path(tempfile.mkdtemp(prefix=_TMP_PREFIX, dir=self._cache_path))
+        try:
+            write(tmp_path)
+            size = self._get_size(tmp_path)
+            if size > self._max_size:
+                self._logger.info(
+                    f"Not caching prepared weights for model {key}, as they are larger than the prepared weights cache"
+                )
+                return
+            (tmp_path / _METADATA_FILE).write_text(json.dumps(self._get_metadata(model_hash, dtype)))
+            shutil.rmtree(entry_path, ignore_errors=True)
+            try:
+                tmp_path.rename(entry_path)
+            except OSError:
+                # Another loader stored the same entry first
+                return
+        except Exception as e:
+            self._logger.warning(f"Failed to cache prepared weights for model {key}: {e}")
+            return
+        finally:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+        self._make_room(keep=entry_path)
+
+    def get_state_dict(self, key: str, model_hash: str, dtype: torch.dtype) -> Optional[dict[str, torch.Tensor]]:
+        """Get the prepared state dict of a model, as mmapped tensors, or None if it is not cached.
+
+        See `get()` for the arguments.
+        """
+        entry_path = self.get(key, model_hash, dtype)
+        if entry_path is None:
+            return None
+        try:
+            return load_mmapped_state_dict(entry_path / STATE_DICT_FILE)
+        except (OSError, ValueError, KeyError):
+            # The entry was evicted or is corrupt
+            return None
+
+    def put_state_dict(
+        self, key: str, model_hash: str, dtype: torch.dtype, state_dict: dict[str, torch.Tensor]
+    ) -> None:
+        """Store the prepared state dict of a model.
+
+        See `put()` for the arguments.
+        """
+        if not self.enabled:
+            return
+        size = sum(t.nelement() * t.element_size() for t in state_dict.values())
+        if size > self._max_size:
+            self._logger.info(
+                f"Not caching prepared weights for model {key}, as they are larger than the prepared weights cache"
+            )
+            return
+        self.put(key, model_hash, dtype, lambda path: save_file(state_dict, path / STATE_DICT_FILE))
+
+    def _make_room(self, keep: Path) -> None:
+        """Evict the least recently used entries until the cache is within its size budget."""
+        entries: list[tuple[float, int, Path]] = []
+        for entry_path in self._cache_path.iterdir():
+            if entry_path.name.startswith(_TMP_PREFIX) or not entry_path.is_dir():
+                continue
+            try:
+                last_used = (entry_path / _METADATA_FILE).stat().st_mtime
+            except OSError:
+                continue
+            entries.append((last_used, self._get_size(entry_path), entry_path))
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, entry_path in sorted(entries):
+            if total_size <= self._max_size:
+                break
+            if entry_path == keep:
+                continue
+            self._logger.info(f"Evicting prepared weights {entry_path.name} from the prepared weights cache")
+            shutil.rmtree(entry_path, ignore_errors=True)
+            total_size -= size
+
+    def _get_entry_path(self, key: str, dtype: torch.dtype) -> Path:
+        dtype_name = str(dtype).removeprefix("torch.")
+        return self._cache_path / re.sub(r"[^\w\-]", "_", f"{key}_{dtype_name}")
+
+    @staticmethod
+    def _get_metadata(model_hash: str, dtype: torch.dtype) -> dict[str, object]:
+        return {"version": PREPARED_WEIGHTS_VERSION, "hash": model_hash, "dtype": str(dtype)}
+
+    @staticmethod
+    def _get_size(path: Path) -> int:
+        return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
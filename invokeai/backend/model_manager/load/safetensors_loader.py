@@ -0,0 +1,259 @@
+# Copyright (c) 2024 The InvokeAI Development Team
+"""A parallel loader for safetensors files.
+
+`safetensors.torch.load_file()` reads one tensor at a time on one thread, which only uses a fraction of the bandwidth
+of fast disks. This loader reads the tensors with a pool of threads, in large reads aligned to the file, directly into
+the memory of the tensors. Tensors are yielded as they are read, so they can be assigned into a module without holding
+a second copy of the state dict.
+"""
+
+import json
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import BinaryIO, Iterator, NamedTuple, Optional, Union
+
+import torch
+from safetensors.torch import load_file
+
+MB = 2**20
+
+DEFAULT_NUM_THREADS = min(8, os.cpu_count() or 1)
+
+_READ_SIZE = 16 * MB
+"""The maximum size of a single read. Reads of large tensors are split at multiples of this size in the file."""
+
+_SAFETENSORS_DTYPE_NAMES = {
+    "F64": "float64",
+    "F32": "float32",
+    "F16": "float16",
+    "BF16": "bfloat16",
+    "I64": "int64",
+    "I32": "int32",
+    "I16": "int16",
+    "I8": "int8",
+    "U64": "uint64",
+    "U32": "uint32",
+    "U16": "uint16",
+    "U8": "uint8",
+    "BOOL": "bool",
+    "F8_E4M3": "float8_e4m3fn",
+    "F8_E5M2": "float8_e5m2",
+    "F8_E8M0": "float8_e8m0fnu",
+    "C64": "complex64",
+}
+
+SAFETENSORS_DTYPES: dict[str, torch.dtype] = {
+    name: getattr(torch, torch_name)
+    for name, torch_name in _SAFETENSORS_DTYPE_NAMES.items()
+    if hasattr(torch, torch_name)
+}
+"""The torch dtypes of the safetensors dtypes, for those that the installed version of torch supports."""
+
+
+class UnknownSafetensorsDtypeError(Exception):
+    """Raised when a safetensors file has a tensor of a dtype that is not in `SAFETENSORS_DTYPES`."""
+
+
+class SafetensorsEntry(NamedTuple):
+    """The location of a tensor in a safetensors file."""
+
+    key: str
+    dtype: torch.dtype
+    shape: list[int]
+    offset: int
+    """The offset of the tensor's data from the start of the file."""
+    nbytes: int
+
+
+def read_safetensors_header(path: Union[str, Path]) -> list[SafetensorsEntry]:
+    """Read the tensor entries of a safetensors file, in the order of their data in the file."""
+    with open(path, "rb") as f:
+        header_size = int.from_bytes(f.read(8), "little")
+        header = json.loads(f.read(header_size))
+    data_start = 8 + header_size
+    for key, info in header.items():
+        if key != "__metadata__" and info["dtype"] not in SAFETENSORS_DTYPES:
+            raise UnknownSafetensorsDtypeError(f"Tensor {key} in {path} has an unknown dtype {info['dtype']}")
+    entries = [
+        SafetensorsEntry(
+            key=key,
+            dtype=SAFETENSORS_DTYPES[info["dtype"]],
+            shape=info["shape"],
+            offset=data_start + info["data_offsets"][0],
+            nbytes=info["data_offsets"][1] - info["data_offsets"][0],
+        )
+        for key, info in header.items()
+        if key != "__metadata__"
+    ]
+    return sorted(entries, key=lambda e: e.offset)
+
+
+class _FileReader:
+    """Reads ranges of a file into buffers. Safe to use from multiple threads."""
+
+    def __init__(self, path: Union[str, Path]):
+        self._path = path
+        # Positional reads do not share a file position, so one file descriptor serves all threads. Where they are not
+        # available (Windows), each thread opens the file.
+        self._fd: Optional[int] = os.open(path, os.O_RDONLY) if hasattr(os, "preadv") else None
+        self._local = threading.local()
+        self._files: list[BinaryIO] = []
+        self._files_lock = threading.Lock()
+
+    def read_into(self, buffer: memoryview, offset: int) -> None:
+        if self._fd is not None:
+            while len(buffer) > 0:
+                n = os.preadv(self._fd, [buffer], offset)
+                if n == 0:
+                    raise EOFError(f"Unexpected end of file in {self._path}")
+                buffer = buffer[n:]
+                offset += n
+            return
+
+        f: Optional[BinaryIO] = getattr(self._local, "file", None)
+        if f is None:
+            f = open(self._path, "rb", buffering=0)
+            self._local.file = f
+            with self._files_lock:
+                self._files.append(f)
+        f.seek(offset)
+        while len(buffer) > 0:
+            n = f.readinto(buffer)
+            if not n:
+                raise EOFError(f"Unexpected end of file in {self._path}")
+            buffer = buffer[n:]
+
+    def close(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+        for f in self._files:
+            f.close()
+
+
+def iter_safetensors(
+    path: Union[str, Path],
+    num_threads: int = DEFAULT_NUM_THREADS,
+    pin_memory: bool = False,
+    dtype: Optional[torch.dtype] = None,
+) -> Iterator[tuple[str, torch.Tensor]]:
+    """Read the tensors of a safetensors file with a pool of threads, yielding each tensor once it is read.
+
+    Tensors are yielded in the order of their data in the file. Only a bounded number of bytes is read ahead of the
+    tensor being yielded, so the memory held by the loader stays small, whatever the size of the file.
+
+    :param path: The safetensors file.
+    :param num_threads: The number of threads reading the file.
+    :param pin_memory: Whether to read the tensors into pinned (page-locked) host memory, so that they are copied to
+        the GPU faster. Ignored if CUDA is not available.
+    :param dtype: If set, floating point tensors are cast to this dtype as they are read.
+    """
+    try:
+        entries = read_safetensors_header(path)
+    except UnknownSafetensorsDtypeError:
+        # safetensors may know dtypes that this loader doesn't, so the file is loaded with it instead.
+        for key, tensor in load_file(path).items():
+            yield key, _cast(tensor, dtype)
+        return
+
+    pin_memory = pin_memory and torch.cuda.is_available()
+    max_read_ahead = 2 * num_threads * _READ_SIZE
+    reader = _FileReader(path)
+    pending: deque[tuple[SafetensorsEntry, torch.Tensor, list[Future[None]]]] = deque()
+    read_ahead = 0
+
+    def finish() -> tuple[str, torch.Tensor]:
+        nonlocal read_ahead
+        entry, buffer, futures = pending.popleft()
+        for future in futures:
+            future.result()
+        read_ahead -= entry.nbytes
+        return entry.key, _cast(buffer.view(entry.dtype).reshape(entry.shape), dtype)
+
+    pool = ThreadPoolExecutor(max_workers=num_threads, thread_name_prefix="safetensors_loader")
+    try:
+        for entry in entries:
+            buffer = torch.empty(entry.nbytes, dtype=torch.uint8, pin_memory=pin_memory)
+            view = memoryview(buffer.numpy())
+            # Reads are split at multiples of the read size in the file, so that most reads are aligned
+            futures: list[Future[None]] = []
+            start = entry.offset
+            end = entry.offset + entry.nbytes
+            while start < end:
+                read_end = min(end, (start // _READ_SIZE + 1) * _READ_SIZE)
+                futures.append(
+                    pool.submit(reader.read_into, view[start - entry.offset : read_end - entry.offset], start)
+                )
+                start = read_end
+            pending.append((entry, buffer, futures))
+            read_ahead += entry.nbytes
+            while read_ahead > max_read_ahead and len(pending) > 1:
+                yield finish()
+        while pending:
+            yield finish()
+    finally:
+        # If reading failed, or the caller stopped early, the remaining reads are canceled
+        pool.shutdown(wait=True, cancel_futures=True)
+        reader.close()
+
+
+def _cast(tensor: torch.Tensor, dtype: Optional[torch.dtype]) -> torch.Tensor:
+    if dtype is not None and tensor.is_floating_point() and tensor.dtype != dtype:
+        return tensor.to(dtype)
+    return tensor
+
+
+def load_safetensors(
+    path: Union[str, Path],
+    num_threads: int = DEFAULT_NUM_THREADS,
+    pin_memory: bool = False,
+    dtype: Optional[torch.dtype] = None,
+) -> dict[str, torch.Tensor]:
+    """Load a safetensors file with a pool of threads. A drop-in replacement for `safetensors.torch.load_file()`.
+
+    See `iter_safetensors()` for the arguments.
+    """
+    return dict(iter_safetensors(path, num_threads=num_threads, pin_memory=pin_memory, dtype=dtype))
+
+
+def load_safetensors_into_module(
+    module: torch.nn.Module,
+    path: Union[str, Path],
+    num_threads: int = DEFAULT_NUM_THREADS,
+    pin_memory: bool = False,
+    dtype: Optional[torch.dtype] = None,
+    strict: bool = True,
+) -> None:
+    """Load a safetensors file into a module, assigning each tensor to the module as it is read.
+
+    This is equivalent to `module.load_state_dict(load_file(path), strict=strict, assign=True)`, but the state dict is
+    never held in memory as a whole, so the peak memory use is about the size of the module. The module would usually
+    be created with `accelerate.init_empty_weights()`.
+
+    See `iter_safetensors()` for the other arguments.
+
+    :param strict: Whether to raise an error if the keys of the file and the module do not match.
+    """
+    expected_keys = set(module.state_dict().keys())
+    unexpected_keys: list[str] = []
+    for key, tensor in iter_safetensors(path, num_threads=num_threads, pin_memory=pin_memory, dtype=dtype):
+        if key not in expected_keys:
+            unexpected_keys.append(key)
+            continue
+        module_name, _, name = key.rpartition(".")
+        submodule = module.get_submodule(module_name)
+        if name in submodule._parameters:
+            param = submodule._parameters[name]
+            requires_grad = param.requires_grad if param is not None else False
+            submodule._parameters[name] = torch.nn.Parameter(tensor, requires_grad=requires_grad)
+        else:
+            submodule._buffers[name] = tensor
+        expected_keys.remove(key)
+
+    if strict and (expected_keys or unexpected_keys):
+        raise RuntimeError(
+            f"Error loading {path} into {module.__class__.__name__}: missing keys {sorted(expected_keys)}, unexpected"
+            f" keys {unexpected_keys}"
+        )
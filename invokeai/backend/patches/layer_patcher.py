@@ -1,5 +1,5 @@
 from contextlib import contextmanager
-from typing import Dict, Iterable, Optional, Tuple
+from typing import Dict, Hashable, Iterable, Optional, Protocol, Tuple
 
 import torch
 
@@ -11,6 +11,14 @@ from invokeai.backend.util.devices import TorchDevice
 from invokeai.backend.util.original_weights_storage import OriginalWeightsStorage
 
 
+class PatchedWeightsCache(Protocol):
+    """A cache of the weights of a model after a stack of patches was applied, e.g. a `LoadedModel`."""
+
+    def get_patched_weights(self, patches_key: Hashable) -> Optional[Dict[str, torch.Tensor]]: ...
+
+    def put_patched_weights(self, patches_key: Hashable, weights: Dict[str, torch.Tensor]) -> None: ...
+
+
 class LayerPatcher:
     @staticmethod
     @torch.no_grad()
@@ -23,28 +31,61 @@ class LayerPatcher:
         cached_weights: Optional[Dict[str, torch.Tensor]] = None,
         force_direct_patching: bool = False,
         force_sidecar_patching: bool = False,
+        patched_weights_cache: Optional[PatchedWeightsCache] = None,
+        patches_key: Optional[Hashable] = None,
     ):
         """Apply 'smart' model patching that chooses whether to use direct patching or a sidecar wrapper for each
         module.
+
+        If a `patched_weights_cache` and a `patches_key` identifying the patches (e.g. the key and weight of each patch,
+        in order) are given, the weights of a model that was fully patched directly are cached. The next time the same
+        patches are applied, the cached weights are copied into the model, without computing the patches. The patches
+        are not iterated in that case, so they can be loaded lazily.
         """
 
         # original_weights are stored for unpatching layers that are directly patched.
         original_weights = OriginalWeightsStorage(cached_weights)
         # original_modules are stored for unpatching layers that are wrapped.
         original_modules: dict[str, torch.nn.Module] = {}
+        use_patched_weights_cache = (
+            patched_weights_cache is not None and patches_key is not None and not force_sidecar_patching
+        )
         try:
-            for patch, patch_weight in patches:
-                LayerPatcher.apply_smart_model_patch(
-                    model=model,
-                    prefix=prefix,
-                    patch=patch,
-                    patch_weight=patch_weight,
-                    original_weights=original_weights,
-                    original_modules=original_modules,
-                    dtype=dtype,
-                    force_direct_patching=force_direct_patching,
-                    force_sidecar_patching=force_sidecar_patching,
-                )
+            patched_weights = None
+            if use_patched_weights_cache:
+                assert patched_weights_cache is not None
+                patched_weights = patched_weights_cache.get_patched_weights((prefix, patches_key))
+                if patched_weights is not None and not LayerPatcher._can_apply_patched_weights(
+                    model, patched_weights, force_direct_patching
+                ):
+                    patched_weights = None
+
+            if patched_weights is not None:
+                LayerPatcher._apply_patched_weights(model, patched_weights, original_weights)
+            else:
+                for patch, patch_weight in patches:
+                    LayerPatcher.apply_smart_model_patch(
+                        model=model,
+                        prefix=prefix,
+                        patch=patch,
+                        patch_weight=patch_weight,
+                        original_weights=original_weights,
+                        original_modules=original_modules,
+                        dtype=dtype,
+                        force_direct_patching=force_direct_patching,
+                        force_sidecar_patching=force_sidecar_patching,
+                    )
+
+                # Only models that were fully patched directly are cached. Sidecar patches are applied on the fly.
+                if use_patched_weights_cache and len(original_modules) == 0:
+                    assert patched_weights_cache is not None
+                    patched_weights_cache.put_patched_weights(
+                        (prefix, patches_key),
+                        {
+                            param_key: model.get_parameter(param_key).detach().to(TorchDevice.CPU_DEVICE, copy=True)
+                            for param_key, _ in original_weights.get_changed_weights()
+                        },
+                    )
 
             yield
         finally:
@@ -104,19 +145,7 @@ class LayerPatcher:
             # and that the caller will set force_sidecar_patching=True if the layer is quantized.
             # TODO(ryand): Handle the case where we are running without a GPU. Should we set a config flag that allows
             # forcing full patching even on the CPU?
-            use_sidecar_patching = False
-            if force_direct_patching and force_sidecar_patching:
-                raise ValueError("Cannot force both direct and sidecar patching.")
-            elif force_direct_patching:
-                use_sidecar_patching = False
-            elif force_sidecar_patching:
-                use_sidecar_patching = True
-            elif module.get_num_patches() > 0:
-                use_sidecar_patching = True
-            elif LayerPatcher._is_any_part_of_layer_on_cpu(module):
-                use_sidecar_patching = True
-
-            if use_sidecar_patching:
+            if LayerPatcher._use_sidecar_patching(module, force_direct_patching, force_sidecar_patching):
                 LayerPatcher._apply_model_layer_wrapper_patch(
                     module_to_patch=module,
                     module_to_patch_key=module_key,
@@ -134,10 +163,67 @@ class LayerPatcher:
                     original_weights=original_weights,
                 )
 
+    @staticmethod
+    def _use_sidecar_patching(
+        module: torch.nn.Module, force_direct_patching: bool, force_sidecar_patching: bool
+    ) -> bool:
+        if force_direct_patching and force_sidecar_patching:
+            raise ValueError("Cannot force both direct and sidecar patching.")
+        elif force_direct_patching:
+            return False
+        elif force_sidecar_patching:
+            return True
+        elif module.get_num_patches() > 0:
+            return True
+        elif LayerPatcher._is_any_part_of_layer_on_cpu(module):
+            return True
+        return False
+
     @staticmethod
     def _is_any_part_of_layer_on_cpu(layer: torch.nn.Module) -> bool:
         return any(p.device.type == "cpu" for p in layer.parameters())
 
+    @staticmethod
+    def _can_apply_patched_weights(
+        model: torch.nn.Module, patched_weights: Dict[str, torch.Tensor], force_direct_patching: bool
+    ) -> bool:
+        """Check that cached patched weights can be applied to a model, i.e. that every module they patch would be
+        patched directly. This may not be the case if the model has been partially unloaded since they were cached.
+        """
+        for param_key in patched_weights:
+            module_key, _ = LayerPatcher._split_parent_key(param_key)
+            module = model.get_submodule(module_key)
+            if LayerPatcher._use_sidecar_patching(module, force_direct_patching, force_sidecar_patching=False):
+                return False
+        return True
+
+    @staticmethod
+    @torch.no_grad()
+    def _apply_patched_weights(
+        model: torch.nn.Module, patched_weights: Dict[str, torch.Tensor], original_weights: OriginalWeightsStorage
+    ):
+        """Copy cached patched weights into a model."""
+        for param_key, weight in patched_weights.items():
+            module_key, param_name = LayerPatcher._split_parent_key(param_key)
+            module = model.get_submodule(module_key)
+            module_param = module.get_parameter(param_name)
+
+            # Save original weight
+            original_weights.save(param_key, module_param)
+
+            # Patches that change the shape of a layer (e.g. FLUX control LoRAs) replace the parameter.
+            if module_param.shape != weight.shape:
+                setattr(
+                    module,
+                    param_name,
+                    torch.nn.Parameter(
+                        weight.to(device=module_param.device, dtype=module_param.dtype, copy=True),
+                        requires_grad=module_param.requires_grad,
+                    ),
+                )
+            else:
+                module_param.copy_(weight)
+
     @staticmethod
     @torch.no_grad()
     def _apply_model_layer_patch(
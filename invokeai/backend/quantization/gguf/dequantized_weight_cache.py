@@ -0,0 +1,235 @@
+import itertools
+import threading
+import weakref
+from dataclasses import dataclass
+from typing import Callable
+
+import torch
+
+from invokeai.backend.quantization.gguf.ggml_tensor import GGMLTensor
+from invokeai.backend.util.calc_tensor_size import calc_tensor_size
+
+
+@dataclass
+class DequantizedWeightCacheStats:
+    """Counts how often a `DequantizedWeightCache` was used."""
+
+    hits: int = 0
+    """The number of dequantizations that were served from the cache."""
+    misses: int = 0
+    """The number of dequantizations that had to be computed."""
+    evictions: int = 0
+    """The number of cached weights that were evicted to make room for others, or to free memory."""
+
+    @property
+    def hit_rate(self) -> float:
+        """The fraction of dequantizations that were served from the cache."""
+        total = self.hits + self.misses
+        return self.hits / total if total > 0 else 0.0
+
+    def summary(self) -> str:
+        """Formats the stats for logging."""
+        return (
+            f"Dequantized weight cache hit rate: {self.hit_rate:.1%} ({self.hits} hits, {self.misses} misses, "
+            f"{self.evictions} evictions)"
+        )
+
+
+@dataclass
+class _TensorRecord:
+    # A weak reference to the quantized tensor. Its callback drops the record when the tensor is garbage collected.
+    ref: weakref.ref
+    # The number of times that the tensor was dequantized (with exponential decay, see `_age()`).
+    frequency: float
+    # The dequantized tensor, if it is cached.
+    value: torch.Tensor | None = None
+    nbytes: int = 0
+
+    @property
+    def score(self) -> float:
+        return self.frequency / max(self.nbytes, 1)
+
+
+class DequantizedWeightCache:
+    """Caches the dequantized weights of GGMLTensors under a memory budget.
+
+    Without a cache, a GGMLTensor is dequantized every time that it is used in an op, i.e. every layer of a model is
+    dequantized on every step of a denoise run (and on every CFG pass). With the cache, the dequantized weights are kept
+    for as long as there is room for them.
+
+    When the cache is full, weights are kept based on their size-weighted frequency: the number of times that they
+    were dequantized, divided by their dequantized size. This favours the weights that save the most dequantization
+    work per cached byte. The frequencies decay over time, so that the cache adapts when other models are used.
+
+    Quantized tensors are tracked by identity. GGMLTensors that are moved to another device are new objects, and the
+    entries of tensors that are garbage collected are dropped.
+
+    The cache is thread-safe.
+    """
+
+    # The frequencies are halved after this many dequantizations per tracked tensor.
+    _AGING_PERIOD = 8
+
+    def __init__(self, max_bytes: int):
+        """
+        Args:
+            max_bytes: The maximum number of bytes of dequantized weights to keep.
+        """
+        self._max_bytes = max_bytes
+        self._records: dict[int, _TensorRecord] = {}
+        # The number of cached bytes by device type.
+        self._cached_bytes: dict[str, int] = {}
+        self._accesses_since_aging = 0
+        # Re-entrant, as the weak reference callbacks may run on any allocation, including while the lock is held.
+        self._lock = threading.RLock()
+        self.stats = DequantizedWeightCacheStats()
+
+    @property
+    def max_bytes(self) -> int:
+        return self._max_bytes
+
+    def cached_bytes(self, device: torch.device | None = None) -> int:
+        """Returns the number of bytes of cached weights, on the given device or in total."""
+        with self._lock:
+            if device is None:
+                return sum(self._cached_bytes.values())
+            return self._cached_bytes.get(device.type, 0)
+
+    def attach_to_model(self, model: torch.nn.Module) -> int:
+        """Makes the GGMLTensors of a model use this cache.
+
+        Returns:
+            The number of GGMLTensors that the cache was attached to.
+        """
+        num_tensors = 0
+        for tensor in itertools.chain(model.parameters(), model.buffers()):
+            if isinstance(tensor, GGMLTensor):
+                tensor.dequantized_weight_cache = self
+                num_tensors += 1
+        return num_tensors
+
+    def get(self, tensor: GGMLTensor, dequantize: Callable[[], torch.Tensor]) -> torch.Tensor:
+        """Returns the dequantized weight of `tensor`, calling `dequantize()` if it is not cached."""
+        key = id(tensor)
+        with self._lock:
+            record = self._records.get(key)
+            if record is None or record.ref() is not tensor:
+                record = _TensorRecord(ref=weakref.ref(tensor, self._make_finalizer(key)), frequency=0.0)
+                self._records[key] = record
+            record.frequency += 1
+            self._age()
+            if record.value is not None:
+                self.stats.hits += 1
+                return record.value
+            self.stats.misses += 1
+
+        value = dequantize()
+
+        with self._lock:
+            # The record was dropped if the tensor was garbage collected in the meantime. This can't happen while the
+            # caller holds a reference to it, but be defensive about it.
+            if self._records.get(key) is record and record.value is None:
+                record.nbytes = calc_tensor_size(value)
+                if self._make_room(record.nbytes, record.score):
+                    record.value = value
+                    device_type = value.device.type
+                    self._cached_bytes[device_type] = self._cached_bytes.get(device_type, 0) + record.nbytes
+        return value
+
+    def evict(self, bytes_to_free: int, device: torch.device | None = None) -> int:
+        """Evicts the cached weights with the lowest scores until `bytes_to_free` bytes are freed.
+
+        Args:
+            bytes_to_free: The number of bytes to free.
+            device: Only evict the weights that are cached on this device. If None, weights on any device are evicted.
+
+        Returns:
+            The number of bytes freed.
+        """
+        with self._lock:
+            bytes_freed = 0
+            for record in self._eviction_candidates(device):
+                if bytes_freed >= bytes_to_free:
+                    break
+                bytes_freed += self._drop_value(record)
+                self.stats.evictions += 1
+            return bytes_freed
+
+    def clear(self) -> None:
+        """Drops all cached weights."""
+        with self._lock:
+            for record in self._records.values():
+                self._drop_value(record)
+
+    def _make_room(self, nbytes: int, score: float) -> bool:
+        """Evicts cached weights with a lower score than `score` to make room for `nbytes` bytes. Nothing is evicted if
+        there is no way to make enough room.
+
+        Returns:
+            Whether there is room for the weight.
+        """
+        if nbytes > self._max_bytes:
+            return False
+        bytes_to_free = sum(self._cached_bytes.values()) + nbytes - self._max_bytes
+        if bytes_to_free <= 0:
+            return True
+
+        victims: list[_TensorRecord] = []
+        for record in self._eviction_candidates(None):
+            if bytes_to_free <= 0:
+                break
+            if record.score >= score:
+                return False
+            victims.append(record)
+            bytes_to_free -= record.nbytes
+        if bytes_to_free > 0:
+            return False
+
+        for record in victims:
+            self._drop_value(record)
+            self.stats.evictions += 1
+        return True
+
+    def _eviction_candidates(self, device: torch.device | None) -> list[_TensorRecord]:
+        """Returns the cached records, lowest score first."""
+        records = [
+            r
+            for r in self._records.values()
+            if r.value is not None and (device is None or r.value.device.type == device.type)
+        ]
+        return sorted(records, key=lambda r: r.score)
+
+    def _drop_value(self, record: _TensorRecord) -> int:
+        """Drops the cached weight of a record, and returns the number of bytes freed."""
+        if record.value is None:
+            return 0
+        self._cached_bytes[record.value.device.type] -= record.nbytes
+        nbytes = record.nbytes
+        record.value = None
+        record.nbytes = 0
+        return nbytes
+
+    def _age(self) -> None:
+        self._accesses_since_aging += 1
+        if self._accesses_since_aging < self._AGING_PERIOD * len(self._records):
+            return
+        self._accesses_since_aging = 0
+        for record in self._records.values():
+            record.frequency /= 2
+
+    def _make_finalizer(self, key: int) -> Callable[[weakref.ref], None]:
+        # Hold a weak reference to the cache, so that tensors don't keep the cache alive.
+        cache_ref = weakref.ref(self)
+
+        def finalize(ref: weakref.ref) -> None:
+            cache = cache_ref()
+            if cache is None:
+                return
+            with cache._lock:
+                record = cache._records.get(key)
+                # The key may have been reused by a new tensor already.
+                if record is not None and record.ref is ref:
+                    cache._drop_value(record)
+                    del cache._records[key]
+
+        return finalize
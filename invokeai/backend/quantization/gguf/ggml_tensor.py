@@ -1,14 +1,18 @@
-from typing import overload
+from typing import TYPE_CHECKING, overload
 
 import gguf
 import torch
 
+from invokeai.backend.quantization.gguf.quantized_matmul import can_use_quantized_linear, quantized_linear
 from invokeai.backend.quantization.gguf.utils import (
     DEQUANTIZE_FUNCTIONS,
     TORCH_COMPATIBLE_QTYPES,
     dequantize,
 )
 
+if TYPE_CHECKING:
+    from invokeai.backend.quantization.gguf.dequantized_weight_cache import DequantizedWeightCache
+
 
 def dequantize_and_run(func, args, kwargs):
     """A helper function for running math ops on GGMLTensor inputs.
@@ -39,9 +43,15 @@ def apply_to_quantized_tensor(func, args, kwargs):
         # This is intended to catch calls such as `.to(dtype-torch.float32)`, which are not supported on GGMLTensors.
         raise ValueError("Operation changed the dtype of GGMLTensor unexpectedly.")
 
-    return GGMLTensor(
+    new_tensor = GGMLTensor(
         new_data, ggml_tensor._ggml_quantization_type, ggml_tensor.tensor_shape, ggml_tensor.compute_dtype
     )
+    new_tensor.dequantized_weight_cache = ggml_tensor.dequantized_weight_cache
+    return new_tensor
+
+
+def _get_linear_args(input: torch.Tensor, weight: torch.Tensor, bias: torch.Tensor | None = None):
+    return input, weight, bias
 
 
 GGML_TENSOR_OP_TABLE = {
@@ -101,6 +111,9 @@ class GGMLTensor(torch.Tensor):
         # The dequantized shape of the tensor.
         self.tensor_shape = tensor_shape
         self.compute_dtype = compute_dtype
+        # An optional cache for the dequantized tensor. It is passed on to the tensors derived from this one (e.g. by
+        # `.to(device)`).
+        self.dequantized_weight_cache: DequantizedWeightCache | None = None
 
     def __repr__(self, *, tensor_contents=None):
         return f"GGMLTensor(type={self._ggml_quantization_type.name}, dequantized_shape=({self.tensor_shape})"
@@ -136,9 +149,14 @@ class GGMLTensor(torch.Tensor):
     def get_dequantized_tensor(self):
         """Return the dequantized tensor.
 
-        Args:
-            dtype: The dtype of the dequantized tensor.
+        Tensors of quantized types are served from the `dequantized_weight_cache`, if set. The tensors of
+        torch-compatible types only need a cast, so they are not cached.
         """
+        if self.dequantized_weight_cache is not None and self._ggml_quantization_type not in TORCH_COMPATIBLE_QTYPES:
+            return self.dequantized_weight_cache.get(self, self._dequantize)
+        return self._dequantize()
+
+    def _dequantize(self) -> torch.Tensor:
         if self._ggml_quantization_type in TORCH_COMPATIBLE_QTYPES:
             return self.quantized_data.to(self.compute_dtype)
         elif self._ggml_quantization_type in DEQUANTIZE_FUNCTIONS:
@@ -151,6 +169,21 @@ class GGMLTensor(torch.Tensor):
             new = gguf.quants.dequantize(self.quantized_data.cpu().numpy(), self._ggml_quantization_type)
             return torch.from_numpy(new).to(self.quantized_data.device, dtype=self.compute_dtype)
 
+    @classmethod
+    def __torch_function__(cls, func, types, args=(), kwargs=None):
+        kwargs = kwargs or {}
+        # On the CPU, linear ops with block-quantized weights are run on the quantized blocks. Other devices have the
+        # memory bandwidth to dequantize the whole weight first. If the dequantized weight is cached, it is used instead.
+        if func is torch.nn.functional.linear:
+            input, weight, bias = _get_linear_args(*args, **kwargs)
+            if (
+                isinstance(weight, GGMLTensor)
+                and weight.dequantized_weight_cache is None
+                and can_use_quantized_linear(input, weight, bias)
+            ):
+                return quantized_linear(input, weight, bias)
+        return torch._C._disabled_torch_function_impl(func, types, args, kwargs)
+
     @classmethod
     def __torch_dispatch__(cls, func, types, args, kwargs):
         # We will likely hit cases here in the future where a new op is encountered that is not yet supported.
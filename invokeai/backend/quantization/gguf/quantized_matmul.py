@@ -0,0 +1,108 @@
+from typing import TYPE_CHECKING, Callable, NamedTuple, Optional
+
+import gguf
+import torch
+
+from invokeai.backend.quantization.gguf.utils import K_SCALE_SIZE, get_scale_min, split_block_dims
+
+if TYPE_CHECKING:
+    from invokeai.backend.quantization.gguf.ggml_tensor import GGMLTensor
+
+# The target size of the dequantized weight tiles. Small enough for a tile to stay in the CPU cache while it is
+# multiplied with the input, large enough for the matmuls to be efficient with many input tokens.
+TILE_BYTES = 8 * 2**20
+
+
+class WeightTile(NamedTuple):
+    """A tile of rows of a dequantized weight: `weight - group_offsets`, with each offset broadcast over a group of
+    consecutive input features.
+    """
+
+    weight: torch.Tensor
+    """The scaled weight. Shape: (rows, in_features)."""
+    group_offsets: Optional[torch.Tensor]
+    """The offsets of each group of input features, or None. Shape: (rows, in_features // group_size)."""
+
+
+def dequantize_tile_Q8_0(rows: torch.Tensor, dtype: torch.dtype) -> WeightTile:
+    n_rows = rows.shape[0]
+    _, type_size = gguf.GGML_QUANT_SIZES[gguf.GGMLQuantizationType.Q8_0]
+    blocks = rows.reshape((n_rows, -1, type_size))
+    d, x = torch.split(blocks, [2, type_size - 2], dim=-1)
+    d = d.contiguous().view(torch.float16).to(dtype)
+    return WeightTile(weight=(x.view(torch.int8) * d).reshape((n_rows, -1)), group_offsets=None)
+
+
+def dequantize_tile_Q4_K(rows: torch.Tensor, dtype: torch.dtype) -> WeightTile:
+    n_rows = rows.shape[0]
+    _, type_size = gguf.GGML_QUANT_SIZES[gguf.GGMLQuantizationType.Q4_K]
+    blocks = rows.reshape((-1, type_size))
+    n_blocks = blocks.shape[0]
+
+    d, dmin, scales, qs = split_block_dims(blocks, 2, 2, K_SCALE_SIZE)
+    d = d.contiguous().view(torch.float16).to(dtype)
+    dmin = dmin.contiguous().view(torch.float16).to(dtype)
+    sc, m = get_scale_min(scales)
+
+    d = (d * sc).reshape((n_blocks, -1, 1))
+    qs = qs.reshape((n_blocks, -1, 1, 32)) >> torch.tensor([0, 4], device=d.device, dtype=torch.uint8).reshape(
+        (1, 1, 2, 1)
+    )
+    qs = (qs & 0x0F).reshape((n_blocks, -1, 32))
+
+    # Each sub-block of 32 values has an offset of `dmin * m`. Rather than subtracting it from every value, it is
+    # applied to the sums of the input features of each sub-block.
+    return WeightTile(weight=(d * qs).reshape((n_rows, -1)), group_offsets=(dmin * m).reshape((n_rows, -1)))
+
+
+QUANTIZED_LINEAR_FUNCTIONS: dict[gguf.GGMLQuantizationType, Callable[[torch.Tensor, torch.dtype], WeightTile]] = {
+    gguf.GGMLQuantizationType.Q8_0: dequantize_tile_Q8_0,
+    gguf.GGMLQuantizationType.Q4_K: dequantize_tile_Q4_K,
+}
+
+
+def can_use_quantized_linear(input: torch.Tensor, weight: "GGMLTensor", bias: Optional[torch.Tensor]) -> bool:
+    """Whether `quantized_linear()` supports the given linear op."""
+    return (
+        weight._ggml_quantization_type in QUANTIZED_LINEAR_FUNCTIONS
+        and len(weight.tensor_shape) == 2
+        and weight.device.type == "cpu"
+        and input.device.type == "cpu"
+        and input.dtype == weight.compute_dtype
+        and not input.requires_grad
+        and (bias is None or bias.device.type == "cpu")
+    )
+
+
+def quantized_linear(input: torch.Tensor, weight: "GGMLTensor", bias: Optional[torch.Tensor] = None) -> torch.Tensor:
+    """Runs a linear op with a block-quantized GGMLTensor weight on the CPU, without dequantizing the whole weight.
+
+    The weight is processed in tiles of rows. Each tile is dequantized into a small buffer that stays in the CPU cache
+    while it is multiplied with the input, so the full-precision weight is never written to (and read back from) RAM.
+
+    Check `can_use_quantized_linear()` before calling this function.
+    """
+    dequantize_tile = QUANTIZED_LINEAR_FUNCTIONS[weight._ggml_quantization_type]
+    out_features, in_features = weight.tensor_shape
+    dtype = weight.compute_dtype
+
+    x = input.reshape((-1, in_features))
+    rows = weight.quantized_data.view(torch.uint8).reshape((out_features, -1))
+    out = torch.empty((x.shape[0], out_features), dtype=dtype, device=x.device)
+    group_sums: dict[int, torch.Tensor] = {}
+
+    tile_rows = max(1, TILE_BYTES // (in_features * dtype.itemsize))
+    for start in range(0, out_features, tile_rows):
+        tile = dequantize_tile(rows[start : start + tile_rows], dtype)
+        out_tile = x @ tile.weight.t()
+        if tile.group_offsets is not None:
+            group_size = in_features // tile.group_offsets.shape[1]
+            if group_size not in group_sums:
+                group_sums[group_size] = x.reshape((x.shape[0], -1, group_size)).sum(dim=-1)
+            out_tile = torch.addmm(out_tile, group_sums[group_size], tile.group_offsets.t(), alpha=-1)
+        out[:, start : start + tile_rows] = out_tile
+
+    if bias is not None:
+        # GGUF models usually keep their biases unquantized, as F32 GGMLTensors.
+        out += bias.get_dequantized_tensor() if hasattr(bias, "get_dequantized_tensor") else bias
+    return out.reshape((*input.shape[:-1], out_features))
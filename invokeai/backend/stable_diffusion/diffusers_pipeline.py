@@ -111,6 +111,19 @@ class T2IAdapterData:
     end_step_percent: float = Field(default=1.0)
 
 
+@dataclass
+class DenoiseBatchItem:
+    """The inputs of one of the images denoised by `StableDiffusionGeneratorPipeline.latents_from_embeddings_batch()`."""
+
+    latents: torch.Tensor
+    noise: Optional[torch.Tensor]
+    conditioning_data: TextConditioningData
+    # Each image needs its own scheduler, as schedulers keep state (e.g. the step index and previous model outputs).
+    scheduler: SchedulerMixin
+    scheduler_step_kwargs: dict[str, Any]
+    callback: Callable[[PipelineIntermediateState], None]
+
+
 class StableDiffusionGeneratorPipeline(StableDiffusionPipeline):
     r"""
     Pipeline for text-to-image generation using Stable Diffusion.
@@ -431,6 +444,117 @@ class StableDiffusionGeneratorPipeline(StableDiffusionPipeline):
 
         return latents
 
+    @torch.inference_mode()
+    def latents_from_embeddings_batch(
+        self,
+        items: list[DenoiseBatchItem],
+        timesteps: torch.Tensor,
+        init_timestep: torch.Tensor,
+    ) -> list[torch.Tensor | Exception]:
+        """Denoise the latents of several images at once, with a single UNet pass per step.
+
+        This supports plain text-to-image and image-to-image denoising, without ControlNets, T2I-Adapters, IP-Adapters,
+        regional prompts or inpainting. The images must have the same size, timesteps and guidance scale, and their
+        text embeddings must have the same shapes. See `latents_from_embeddings()` for the arguments.
+
+        Each image gets its own scheduler and callbacks. If a callback raises an exception (e.g. because its session was
+        canceled), the image is dropped from the batch and the exception is returned as its result.
+
+        Returns:
+            The denoised latents or the exception raised by the callback of each image, in order.
+        """
+        if init_timestep.shape[0] == 0:
+            return [item.latents for item in items]
+
+        results: list[torch.Tensor | Exception | None] = [None] * len(items)
+        latents: list[torch.Tensor] = []
+        for item in items:
+            item_latents = item.latents
+            if item.noise is not None:
+                item_latents = item.scheduler.add_noise(
+                    item_latents, item.noise, init_timestep.expand(item_latents.shape[0])
+                )
+            latents.append(item_latents)
+
+        self._adjust_memory_efficient_attention(torch.cat(latents))
+
+        def run_callbacks(active: list[int], states: dict[int, PipelineIntermediateState]) -> list[int]:
+            """Runs the callbacks of the active images, returning the images that are still active."""
+            still_active: list[int] = []
+            for i in active:
+                try:
+                    items[i].callback(states[i])
+                    still_active.append(i)
+                except Exception as e:
+                    results[i] = e
+            return still_active
+
+        active = run_callbacks(
+            list(range(len(items))),
+            {
+                i: PipelineIntermediateState(
+                    step=0,  # initial latents
+                    order=item.scheduler.order,
+                    total_steps=len(timesteps),
+                    timestep=item.scheduler.config.num_train_timesteps,
+                    latents=latents[i],
+                )
+                for i, item in enumerate(items)
+            },
+        )
+
+        # The conditioning of the active images. It is rebuilt when images are dropped from the batch.
+        conditioning_for: list[int] | None = None
+        conditioning_data: TextConditioningData | None = None
+        for step_index, t in enumerate(self.progress_bar(timesteps)):
+            if not active:
+                break
+
+            if conditioning_for != active:
+                conditioning_data = TextConditioningData.concat_batch([items[i].conditioning_data for i in active])
+                conditioning_for = active
+            assert conditioning_data is not None
+
+            latent_model_input = torch.cat([items[i].scheduler.scale_model_input(latents[i], t) for i in active])
+            uc_noise_pred, c_noise_pred = self.invokeai_diffuser.do_unet_step(
+                sample=latent_model_input,
+                timestep=t.expand(latent_model_input.shape[0]),
+                step_index=step_index,
+                total_step_count=len(timesteps),
+                conditioning_data=conditioning_data,
+                ip_adapter_data=None,
+            )
+
+            guidance_scale = conditioning_data.guidance_scale
+            if isinstance(guidance_scale, list):
+                guidance_scale = guidance_scale[step_index]
+
+            noise_pred = self.invokeai_diffuser._combine(uc_noise_pred, c_noise_pred, guidance_scale)
+            guidance_rescale_multiplier = conditioning_data.guidance_rescale_multiplier
+            if guidance_rescale_multiplier > 0:
+                noise_pred = self._rescale_cfg(noise_pred, c_noise_pred, guidance_rescale_multiplier)
+
+            states: dict[int, PipelineIntermediateState] = {}
+            for i, item_noise_pred in zip(active, noise_pred.split([latents[i].shape[0] for i in active]), strict=True):
+                item = items[i]
+                step_output = item.scheduler.step(item_noise_pred, t, latents[i], **item.scheduler_step_kwargs)
+                latents[i] = step_output.prev_sample
+                states[i] = PipelineIntermediateState(
+                    step=step_index + 1,  # final latents
+                    order=item.scheduler.order,
+                    total_steps=len(timesteps),
+                    timestep=int(t),
+                    latents=latents[i],
+                    predicted_original=getattr(step_output, "pred_original_sample", None),
+                )
+            active = run_callbacks(active, states)
+
+        for i in active:
+            results[i] = latents[i]
+        # Every image is either still active or was dropped with an exception.
+        assert all(result is not None for result in results)
+        return results  # type: ignore
+
     @torch.inference_mode()
     def step(
         self,
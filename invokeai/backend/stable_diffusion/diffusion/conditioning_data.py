@@ -165,11 +165,72 @@ class TextConditioningData:
         # For models trained using zero-terminal SNR ("ztsnr"), it's suggested to use guidance_rescale_multiplier of 0.7.
         # See [Common Diffusion Noise Schedules and Sample Steps are Flawed](https://arxiv.org/pdf/2305.08891.pdf).
         self.guidance_rescale_multiplier = guidance_rescale_multiplier
+        # The RegionalPromptData of the conditioning batches that have been used, so that it is only built once per
+        # denoise run.
+        self._regional_prompt_data: dict[tuple[object, ...], RegionalPromptData] = {}
+
+    def get_regional_prompt_data(
+        self,
+        conditionings: list[Union[BasicConditioningInfo, SDXLConditioningInfo]],
+        regions: list[Optional[TextConditioningRegions]],
+        latent_height: int,
+        latent_width: int,
+        device: torch.device,
+        dtype: torch.dtype,
+    ) -> RegionalPromptData:
+        """Gets the RegionalPromptData for a batch of conditionings. The conditionings without regions apply to the whole
+        image.
+
+        The RegionalPromptData is built on the first call, and then reused on the following denoising steps along with
+        the attention masks that it caches.
+        """
+        key = (
+            tuple(id(c) for c in conditionings),
+            tuple(id(r) for r in regions),
+            latent_height,
+            latent_width,
+            device,
+            dtype,
+        )
+        regional_prompt_data = self._regional_prompt_data.get(key)
+        if regional_prompt_data is None:
+            batch_regions: list[TextConditioningRegions] = []
+            for c, r in zip(conditionings, regions, strict=True):
+                if r is None:
+                    # Create a dummy mask and range for text conditioning that doesn't have region masks.
+                    r = TextConditioningRegions(
+                        masks=torch.ones((1, 1, latent_height, latent_width), dtype=dtype),
+                        ranges=[Range(start=0, end=c.embeds.shape[1])],
+                    )
+                batch_regions.append(r)
+            regional_prompt_data = RegionalPromptData(regions=batch_regions, device=device, dtype=dtype)
+            self._regional_prompt_data[key] = regional_prompt_data
+        return regional_prompt_data
 
     def is_sdxl(self):
         assert isinstance(self.uncond_text, SDXLConditioningInfo) == isinstance(self.cond_text, SDXLConditioningInfo)
         return isinstance(self.cond_text, SDXLConditioningInfo)
 
+    @classmethod
+    def concat_batch(cls, conditioning_data: list[TextConditioningData]) -> TextConditioningData:
+        """Concatenates the text conditioning of several images along the batch dimension, so that they can be denoised
+        in a single UNet pass.
+
+        The conditionings must not have regions, and their embeddings must have the same shapes. The guidance scale and
+        rescale multiplier of the first conditioning are used for the whole batch.
+        """
+        if any(c.uncond_regions is not None or c.cond_regions is not None for c in conditioning_data):
+            raise ValueError("Text conditioning with regions can't be batched.")
+        first = conditioning_data[0]
+        return cls(
+            uncond_text=_concat_conditioning_infos([c.uncond_text for c in conditioning_data]),
+            cond_text=_concat_conditioning_infos([c.cond_text for c in conditioning_data]),
+            uncond_regions=None,
+            cond_regions=None,
+            guidance_scale=first.guidance_scale,
+            guidance_rescale_multiplier=first.guidance_rescale_multiplier,
+        )
+
     def to_unet_kwargs(self, unet_kwargs: UNetKwargs, conditioning_mode: ConditioningMode):
         """Fills unet arguments with data from provided conditionings.
 
@@ -210,20 +271,18 @@ class TextConditioningData:
             unet_kwargs.added_cond_kwargs = added_cond_kwargs
 
         if any(r is not None for r in c_regions):
-            tmp_regions = []
-            for c, r in zip(conditionings, c_regions, strict=True):
-                if r is None:
-                    r = TextConditioningRegions(
-                        masks=torch.ones((1, 1, h, w), dtype=dtype),
-                        ranges=[Range(start=0, end=c.embeds.shape[1])],
-                    )
-                tmp_regions.append(r)
-
             if unet_kwargs.cross_attention_kwargs is None:
                 unet_kwargs.cross_attention_kwargs = {}
 
             unet_kwargs.cross_attention_kwargs.update(
-                regional_prompt_data=RegionalPromptData(regions=tmp_regions, device=device, dtype=dtype),
+                regional_prompt_data=self.get_regional_prompt_data(
+                    conditionings=conditionings,
+                    regions=c_regions,
+                    latent_height=h,
+                    latent_width=w,
+                    device=device,
+                    dtype=dtype,
+                ),
             )
 
     @staticmethod
@@ -280,3 +339,19 @@ class TextConditioningData:
             encoder_attention_mask = torch.cat(encoder_attention_masks)
 
         return torch.cat(conditionings), encoder_attention_mask
+
+
+def _concat_conditioning_infos(
+    infos: list[Union[BasicConditioningInfo, SDXLConditioningInfo]],
+) -> Union[BasicConditioningInfo, SDXLConditioningInfo]:
+    embeds = torch.cat([info.embeds for info in infos])
+    sdxl_infos = [info for info in infos if isinstance(info, SDXLConditioningInfo)]
+    if len(sdxl_infos) == len(infos):
+        return SDXLConditioningInfo(
+            embeds=embeds,
+            pooled_embeds=torch.cat([info.pooled_embeds for info in sdxl_infos]),
+            add_time_ids=torch.cat([info.add_time_ids for info in sdxl_infos]),
+        )
+    if sdxl_infos:
+        raise ValueError("SD and SDXL text conditioning can't be batched together.")
+    return BasicConditioningInfo(embeds=embeds)
@@ -39,6 +39,9 @@ class RegionalPromptData:
             regions, max_downscale_factor
         )
         self._negative_cross_attn_mask_score = -10000.0
+        # The cross-attention masks, by (query_seq_len, key_seq_len). They are the same for all of the attention layers
+        # at a given downscaling level, so they are only built once.
+        self._cross_attn_masks: dict[tuple[int, int], torch.Tensor] = {}
 
     def _prepare_spatial_masks(
         self, regions: list[TextConditioningRegions], max_downscale_factor: int = 8
@@ -86,25 +89,33 @@ class RegionalPromptData:
                 shape: (batch_size, query_seq_len, key_seq_len).
                 dtype: float
         """
-        batch_size = len(self._spatial_masks_by_seq_len)
-        batch_spatial_masks = [self._spatial_masks_by_seq_len[b][query_seq_len] for b in range(batch_size)]
-
-        # Create an empty attention mask with the correct shape.
-        attn_mask = torch.zeros((batch_size, query_seq_len, key_seq_len), dtype=self._dtype, device=self._device)
+        attn_mask = self._cross_attn_masks.get((query_seq_len, key_seq_len))
+        if attn_mask is None:
+            attn_mask = self._prepare_cross_attn_mask(query_seq_len, key_seq_len)
+            self._cross_attn_masks[(query_seq_len, key_seq_len)] = attn_mask
+        return attn_mask
 
+    def _prepare_cross_attn_mask(self, query_seq_len: int, key_seq_len: int) -> torch.Tensor:
+        batch_size = len(self._spatial_masks_by_seq_len)
+        batch_sample_attn_masks: list[torch.Tensor] = []
         for batch_idx in range(batch_size):
-            batch_sample_spatial_masks = batch_spatial_masks[batch_idx]
-            batch_sample_regions = self._regions[batch_idx]
-
-            # Flatten the spatial dimensions of the mask by reshaping to (1, num_prompts, query_seq_len, 1).
+            batch_sample_spatial_masks = self._spatial_masks_by_seq_len[batch_idx][query_seq_len]
             _, num_prompts, _, _ = batch_sample_spatial_masks.shape
-            batch_sample_query_masks = batch_sample_spatial_masks.view((1, num_prompts, query_seq_len, 1))
-
-            for prompt_idx, embedding_range in enumerate(batch_sample_regions.ranges):
-                batch_sample_query_scores = batch_sample_query_masks[0, prompt_idx, :, :].clone()
-                batch_sample_query_mask = batch_sample_query_scores > 0.5
-                batch_sample_query_scores[batch_sample_query_mask] = 0.0
-                batch_sample_query_scores[~batch_sample_query_mask] = self._negative_cross_attn_mask_score
-                attn_mask[batch_idx, :, embedding_range.start : embedding_range.end] = batch_sample_query_scores
-
-        return attn_mask
+            # Shape: (num_prompts, query_seq_len).
+            query_masks = batch_sample_spatial_masks.view((num_prompts, query_seq_len)) > 0.5
+
+            # Map each key to the index of the prompt whose embedding range it is in, or to -1 if it is in none. If
+            # ranges overlap, the later prompt takes precedence.
+            key_prompt_idx = torch.full((key_seq_len,), -1, dtype=torch.long, device=self._device)
+            for prompt_idx, embedding_range in enumerate(self._regions[batch_idx].ranges):
+                key_prompt_idx[embedding_range.start : embedding_range.end] = prompt_idx
+
+            # A query attends to a key if the query is in the region of the key's prompt. Keys that do not belong to a
+            # prompt are attended to by all queries.
+            # Shape: (query_seq_len, key_seq_len).
+            allowed = torch.where(key_prompt_idx >= 0, query_masks[key_prompt_idx.clamp(min=0)].T, True)
+            batch_sample_attn_masks.append(
+                torch.where(allowed, 0.0, self._negative_cross_attn_mask_score).to(dtype=self._dtype)
+            )
+
+        return torch.stack(batch_sample_attn_masks)
@@ -9,12 +9,9 @@ from typing_extensions import TypeAlias
 from invokeai.app.services.config.config_default import get_config
 from invokeai.backend.stable_diffusion.diffusion.conditioning_data import (
     IPAdapterData,
-    Range,
     TextConditioningData,
-    TextConditioningRegions,
 )
 from invokeai.backend.stable_diffusion.diffusion.regional_ip_data import RegionalIPData
-from invokeai.backend.stable_diffusion.diffusion.regional_prompt_data import RegionalPromptData
 
 ModelForwardCallback: TypeAlias = Union[
     # x, t, conditioning, Optional[cross-attention kwargs]
@@ -313,27 +310,14 @@ class InvokeAIDiffuserComponent:
             }
 
         if conditioning_data.cond_regions is not None or conditioning_data.uncond_regions is not None:
-            # TODO(ryand): We currently initialize RegionalPromptData for every denoising step. The text conditionings
-            # and masks are not changing from step-to-step, so this really only needs to be done once. While this seems
-            # painfully inefficient, the time spent is typically negligible compared to the forward inference pass of
-            # the UNet. The main reason that this hasn't been moved up to eliminate redundancy is that it is slightly
-            # awkward to handle both standard conditioning and sequential conditioning further up the stack.
-            regions = []
-            for c, r in [
-                (conditioning_data.uncond_text, conditioning_data.uncond_regions),
-                (conditioning_data.cond_text, conditioning_data.cond_regions),
-            ]:
-                if r is None:
-                    # Create a dummy mask and range for text conditioning that doesn't have region masks.
-                    _, _, h, w = x.shape
-                    r = TextConditioningRegions(
-                        masks=torch.ones((1, 1, h, w), dtype=x.dtype),
-                        ranges=[Range(start=0, end=c.embeds.shape[1])],
-                    )
-                regions.append(r)
-
-            cross_attention_kwargs["regional_prompt_data"] = RegionalPromptData(
-                regions=regions, device=x.device, dtype=x.dtype
+            _, _, h, w = x.shape
+            cross_attention_kwargs["regional_prompt_data"] = conditioning_data.get_regional_prompt_data(
+                conditionings=[conditioning_data.uncond_text, conditioning_data.cond_text],
+                regions=[conditioning_data.uncond_regions, conditioning_data.cond_regions],
+                latent_height=h,
+                latent_width=w,
+                device=x.device,
+                dtype=x.dtype,
             )
             cross_attention_kwargs["percent_through"] = step_index / total_step_count
 
@@ -423,8 +407,14 @@ class InvokeAIDiffuserComponent:
 
         # Prepare prompt regions for the unconditioned pass.
         if conditioning_data.uncond_regions is not None:
-            cross_attention_kwargs["regional_prompt_data"] = RegionalPromptData(
-                regions=[conditioning_data.uncond_regions], device=x.device, dtype=x.dtype
+            _, _, h, w = x.shape
+            cross_attention_kwargs["regional_prompt_data"] = conditioning_data.get_regional_prompt_data(
+                conditionings=[conditioning_data.uncond_text],
+                regions=[conditioning_data.uncond_regions],
+                latent_height=h,
+                latent_width=w,
+                device=x.device,
+                dtype=x.dtype,
             )
             cross_attention_kwargs["percent_through"] = step_index / total_step_count
 
@@ -471,8 +461,14 @@ class InvokeAIDiffuserComponent:
 
         # Prepare prompt regions for the conditioned pass.
         if conditioning_data.cond_regions is not None:
-            cross_attention_kwargs["regional_prompt_data"] = RegionalPromptData(
-                regions=[conditioning_data.cond_regions], device=x.device, dtype=x.dtype
+            _, _, h, w = x.shape
+            cross_attention_kwargs["regional_prompt_data"] = conditioning_data.get_regional_prompt_data(
+                conditionings=[conditioning_data.cond_text],
+                regions=[conditioning_data.cond_regions],
+                latent_height=h,
+                latent_width=w,
+                device=x.device,
+                dtype=x.dtype,
             )
             cross_attention_kwargs["percent_through"] = step_index / total_step_count
 
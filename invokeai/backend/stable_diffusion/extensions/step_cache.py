@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Callable
+
+import torch
+from diffusers import UNet2DConditionModel
+
+from invokeai.backend.stable_diffusion.extensions.base import ExtensionBase
+from invokeai.backend.util.step_cache import StepCache
+
+if TYPE_CHECKING:
+    from invokeai.backend.util.original_weights_storage import OriginalWeightsStorage
+
+
+class StepCacheExt(ExtensionBase):
+    """Reuses the outputs of the deep UNet blocks on some steps, as in DeepCache.
+
+    The first `shallow_blocks` down blocks and the last `shallow_blocks` up blocks are computed on every step. The
+    other down blocks, the mid block and the other up blocks are skipped on the steps where the step cache is reused,
+    and return their outputs from the last step on which they were computed. The input of the first deep block is the
+    step cache's probe.
+    """
+
+    def __init__(self, step_cache: StepCache, shallow_blocks: int = 1):
+        super().__init__()
+        self._step_cache = step_cache
+        self._shallow_blocks = shallow_blocks
+
+    @contextmanager
+    def patch_unet(self, unet: UNet2DConditionModel, original_weights: OriginalWeightsStorage):
+        with self.static_patch_model(unet, self._step_cache, self._shallow_blocks):
+            yield
+
+    @staticmethod
+    @contextmanager
+    def static_patch_model(model: UNet2DConditionModel, step_cache: StepCache, shallow_blocks: int = 1):
+        if not step_cache.enabled:
+            yield
+            return
+
+        num_up_blocks = len(model.up_blocks)
+        deep_blocks: list[torch.nn.Module] = [
+            *model.down_blocks[shallow_blocks:],
+            *([model.mid_block] if model.mid_block is not None else []),
+            *model.up_blocks[: num_up_blocks - shallow_blocks],
+        ]
+        # The outputs of the deep blocks in the current UNet call, by block index, and whether they are reused.
+        outputs: dict[int, Any] = {}
+        reuse_outputs = False
+
+        # The UNet is called with the timestep as a keyword or as its second positional argument.
+        def on_unet_call(module: torch.nn.Module, args: tuple[Any, ...], kwargs: dict[str, Any]) -> None:
+            timestep = kwargs["timestep"] if "timestep" in kwargs else args[1]
+            if isinstance(timestep, torch.Tensor):
+                timestep = tuple(timestep.flatten().tolist())
+            step_cache.start_call(timestep)
+
+        def wrap_forward(forward: Callable[..., Any], block_index: int) -> Callable[..., Any]:
+            def wrapped_forward(*args: Any, **kwargs: Any) -> Any:
+                nonlocal outputs, reuse_outputs
+                if block_index == 0:
+                    probe = args[0] if args else kwargs["hidden_states"]
+                    cached_outputs = step_cache.lookup(probe)
+                    reuse_outputs = cached_outputs is not None
+                    if cached_outputs is not None:
+                        outputs = cached_outputs
+                        step_cache.stats.skipped_blocks += len(deep_blocks)
+                    else:
+                        outputs = {}
+                        step_cache.store(probe, outputs)
+
+                if reuse_outputs:
+                    return outputs[block_index]
+                output = forward(*args, **kwargs)
+                outputs[block_index] = output
+                return output
+
+            return wrapped_forward
+
+        hook = model.register_forward_pre_hook(on_unet_call, with_kwargs=True)
+        try:
+            for block_index, block in enumerate(deep_blocks):
+                block.forward = wrap_forward(block.forward, block_index)
+            yield
+        finally:
+            hook.remove()
+            for block in deep_blocks:
+                # Removing the instance attribute restores the class's forward.
+                block.__dict__.pop("forward", None)
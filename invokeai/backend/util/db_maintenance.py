@@ -6,12 +6,14 @@
 import argparse
 import datetime
 import enum
-import glob
 import locale
 import os
 import shutil
 import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Iterable, Iterator, Optional
 
 import PIL
 import PIL.ImageOps
@@ -169,30 +171,20 @@ class DatabaseMapper:
         self.connection = sqlite3.connect(self.database_path)
         self.cursor = self.connection.cursor()
 
-    def get_all_image_files(self):
-        """Get the full list of image file names from the database."""
-        sql_get_image_by_name = "SELECT image_name FROM images"
-        self.cursor.execute(sql_get_image_by_name)
-        rows = self.cursor.fetchall()
-        db_files = []
-        for row in rows:
-            db_files.append(row[0])
-        return db_files
-
-    def remove_image_file_record(self, filename: str):
-        """Remove an image file reference from the database by filename."""
-        sanitized_filename = str.replace(filename, "'", "''")  # prevent injection
-        sql_command = f"DELETE FROM images WHERE image_name='{sanitized_filename}'"
-        self.cursor.execute(sql_command)
-        self.connection.commit()
-
-    def does_image_exist(self, image_filename):
-        """Check database if a image name already exists and return a boolean."""
-        sanitized_filename = str.replace(image_filename, "'", "''")  # prevent injection
-        sql_get_image_by_name = f"SELECT image_name FROM images WHERE image_name='{sanitized_filename}'"
-        self.cursor.execute(sql_get_image_by_name)
-        rows = self.cursor.fetchall()
-        return True if len(rows) > 0 else False
+    def get_all_image_files(self) -> set[str]:
+        """Get the set of all image file names in the database."""
+        self.cursor.execute("SELECT image_name FROM images")
+        return {row[0] for row in self.cursor.fetchall()}
+
+    def remove_image_file_records(self, filenames: Iterable[str], batch_size: int = 1000) -> Iterator[list[str]]:
+        """Remove image file references from the database, one transaction per batch. Yields each batch once it is
+        committed."""
+        filenames = sorted(filenames)
+        for start in range(0, len(filenames), batch_size):
+            batch = filenames[start : start + batch_size]
+            with self.connection:
+                self.cursor.executemany("DELETE FROM images WHERE image_name = ?", [(f,) for f in batch])
+            yield batch
 
     def disconnect(self):
         """Disconnect from the db, cleaning up connections and cursors."""
@@ -228,46 +220,54 @@ class PhysicalFileMapper:
     def get_image_path_for_image_name(self, image_filename):  # noqa D102
         return os.path.join(self.outputs_path, image_filename)
 
-    def image_file_exists(self, image_filename):  # noqa D102
-        return os.path.exists(self.get_image_path_for_image_name(image_filename))
+    def get_thumbnail_name_for_image(self, image_filename):  # noqa D102
+        return os.path.splitext(image_filename)[0] + ".webp"
 
     def get_thumbnail_path_for_image(self, image_filename):  # noqa D102
-        return os.path.join(self.thumbnails_path, os.path.splitext(image_filename)[0]) + ".webp"
+        return os.path.join(self.thumbnails_path, self.get_thumbnail_name_for_image(image_filename))
 
-    def get_image_name_from_thumbnail_path(self, thumbnail_path):  # noqa D102
-        return os.path.splitext(os.path.basename(thumbnail_path))[0] + ".png"
-
-    def thumbnail_exists_for_filename(self, image_filename):  # noqa D102
-        return os.path.exists(self.get_thumbnail_path_for_image(image_filename))
+    def get_image_name_from_thumbnail_name(self, thumbnail_filename):  # noqa D102
+        return os.path.splitext(thumbnail_filename)[0] + ".png"
 
     def archive_image(self, image_filename):  # noqa D102
-        if self.image_file_exists(image_filename):
-            image_path = self.get_image_path_for_image_name(image_filename)
-            shutil.move(image_path, self.archive_path)
+        shutil.move(self.get_image_path_for_image_name(image_filename), self.archive_path)
 
     def archive_thumbnail_by_image_filename(self, image_filename):  # noqa D102
-        if self.thumbnail_exists_for_filename(image_filename):
-            thumbnail_path = self.get_thumbnail_path_for_image(image_filename)
-            shutil.move(thumbnail_path, self.thumbnails_archive_path)
-
-    def get_all_png_filenames_in_directory(self, directory_path):  # noqa D102
-        filepaths = glob.glob(directory_path + "/*.png", recursive=False)
-        filenames = []
-        for filepath in filepaths:
-            filenames.append(os.path.basename(filepath))
-        return filenames
-
-    def get_all_thumbnails_with_full_path(self, thumbnails_directory):  # noqa D102
-        return glob.glob(thumbnails_directory + "/*.webp", recursive=False)
-
-    def generate_thumbnail_for_image_name(self, image_filename):  # noqa D102
-        # create thumbnail
-        file_path = self.get_image_path_for_image_name(image_filename)
-        thumb_path = self.get_thumbnail_path_for_image(image_filename)
-        thumb_size = 256, 256
+        shutil.move(self.get_thumbnail_path_for_image(image_filename), self.thumbnails_archive_path)
+
+    def get_all_filenames_in_directory(self, directory_path, extension: Optional[str] = None) -> set[str]:
+        """List the names of the files in a directory with a single directory scan, optionally by extension."""
+        if not os.path.isdir(directory_path):
+            return set()
+        with os.scandir(directory_path) as entries:
+            return {
+                entry.name
+                for entry in entries
+                if entry.is_file() and (extension is None or entry.name.endswith(extension))
+            }
+
+    def get_all_png_filenames_in_directory(self, directory_path) -> set[str]:  # noqa D102
+        return self.get_all_filenames_in_directory(directory_path, ".png")
+
+    def get_all_thumbnail_filenames(self) -> set[str]:  # noqa D102
+        return self.get_all_filenames_in_directory(self.thumbnails_path, ".webp")
+
+    def get_images_missing_thumbnails(self, image_filenames: Iterable[str]) -> list[str]:
+        """Get the image files without a thumbnail, diffing against a single listing of the thumbnails directory."""
+        thumbnail_filenames = self.get_all_thumbnail_filenames()
+        return sorted(f for f in image_filenames if self.get_thumbnail_name_for_image(f) not in thumbnail_filenames)
+
+
+def generate_thumbnail(file_path: str, thumb_path: str) -> Optional[str]:
+    """Generate a thumbnail for an image. Returns an error message on failure, so it can be run in a process pool."""
+    thumb_size = 256, 256
+    try:
         with PIL.Image.open(file_path) as source_image:
             source_image.thumbnail(thumb_size)
             source_image.save(thumb_path, "webp")
+    except Exception as ex:
+        return f"{os.path.basename(file_path)}: {ex}"
+    return None
 
 
 class MaintenanceOperation(str, enum.Enum):
@@ -285,12 +285,25 @@ class InvokeAIDatabaseMaintenanceApp:
 
     _operation: MaintenanceOperation
     _headless: bool = False
-    __stats: MaintenanceStats = MaintenanceStats()
-
-    def __init__(self, operation: MaintenanceOperation = MaintenanceOperation.Ask):
+    _dry_run: bool = False
+    _workers: int = 1
+    __stats: MaintenanceStats
+
+    def __init__(
+        self,
+        operation: MaintenanceOperation = MaintenanceOperation.Ask,
+        dry_run: bool = False,
+        workers: Optional[int] = None,
+    ):
         """Initialize maintenance app."""
         self._operation = MaintenanceOperation(operation)
         self._headless = operation != MaintenanceOperation.Ask
+        self._dry_run = dry_run
+        self._workers = max(1, workers or os.cpu_count() or 1)
+        self.__stats = MaintenanceStats()
+        self._operation_times: list[tuple[str, float]] = []
+        # In a dry run, the thumbnails that would have been archived by an earlier operation are still on disk
+        self._dry_run_archived_thumbnails: set[str] = set()
 
     def ask_for_operation(self) -> MaintenanceOperation:
         """Ask user to choose the operation to perform."""
@@ -366,25 +379,48 @@ class InvokeAIDatabaseMaintenanceApp:
             if not self.ask_to_continue():
                 raise KeyboardInterrupt
 
-        file_mapper.create_archive_directories()
-        db_mapper.backup(config.TIMESTAMP_STRING)
+        time_start = time.perf_counter()
+        if not self._dry_run:
+            file_mapper.create_archive_directories()
+            db_mapper.backup(config.TIMESTAMP_STRING)
         db_mapper.connect()
         db_files = db_mapper.get_all_image_files()
-        for db_file in db_files:
+        phys_files = file_mapper.get_all_filenames_in_directory(config.outputs_path)
+        orphaned_db_files = db_files - phys_files
+        thumbnail_files = file_mapper.get_all_thumbnail_filenames()
+        orphaned_thumbnails = sorted(
+            f for f in orphaned_db_files if file_mapper.get_thumbnail_name_for_image(f) in thumbnail_files
+        )
+        print(
+            f"Found {len(orphaned_db_files)} orphaned db entries out of {len(db_files)}, with {len(orphaned_thumbnails)}"
+            " thumbnails to archive."
+        )
+
+        if self._dry_run:
+            self.__stats.count_orphaned_db_entries_cleaned += len(orphaned_db_files)
+            self._dry_run_archived_thumbnails.update(
+                file_mapper.get_thumbnail_name_for_image(f) for f in orphaned_thumbnails
+            )
+        else:
+            removed_db_files: set[str] = set()
             try:
-                if not file_mapper.image_file_exists(db_file):
-                    print(f"Found orphaned image db entry {db_file}. Cleaning ...", end="")
-                    db_mapper.remove_image_file_record(db_file)
-                    print("Cleaned!")
-                    if file_mapper.thumbnail_exists_for_filename(db_file):
-                        print("A thumbnail was found, archiving ...", end="")
-                        file_mapper.archive_thumbnail_by_image_filename(db_file)
-                        print("Archived!")
-                    self.__stats.count_orphaned_db_entries_cleaned += 1
+                for batch in db_mapper.remove_image_file_records(orphaned_db_files):
+                    removed_db_files.update(batch)
             except Exception as ex:
-                print("An error occurred cleaning db entry, error was:")
+                print("An error occurred cleaning db entries, error was:")
                 print(ex)
                 self.__stats.count_errors += 1
+            self.__stats.count_orphaned_db_entries_cleaned += len(removed_db_files)
+            # The thumbnails of entries that are still in the db, because their delete failed, are kept
+            for db_file in (f for f in orphaned_thumbnails if f in removed_db_files):
+                try:
+                    file_mapper.archive_thumbnail_by_image_filename(db_file)
+                except Exception as ex:
+                    print(f"An error occurred archiving the thumbnail for {db_file}, error was:")
+                    print(ex)
+                    self.__stats.count_errors += 1
+
+        self._operation_times.append(("Clean orphaned db entries", time.perf_counter() - time_start))
 
     def clean_orphaned_disk_files(
         self, config: ConfigMapper, file_mapper: PhysicalFileMapper, db_mapper: DatabaseMapper
@@ -421,43 +457,58 @@ class InvokeAIDatabaseMaintenanceApp:
 
             print()
 
-        file_mapper.create_archive_directories()
-        db_mapper.backup(config.TIMESTAMP_STRING)
+        time_start = time.perf_counter()
+        if not self._dry_run:
+            file_mapper.create_archive_directories()
+            db_mapper.backup(config.TIMESTAMP_STRING)
         db_mapper.connect()
+        db_files = db_mapper.get_all_image_files()
         phys_files = file_mapper.get_all_png_filenames_in_directory(config.outputs_path)
-        for phys_file in phys_files:
+        thumbnail_files = file_mapper.get_all_thumbnail_filenames() - self._dry_run_archived_thumbnails
+        orphaned_phys_files = sorted(phys_files - db_files)
+        print(f"Found {len(orphaned_phys_files)} orphaned image files out of {len(phys_files)}.")
+
+        remaining_phys_files = set(phys_files)
+        for phys_file in orphaned_phys_files:
+            thumbnail_file = file_mapper.get_thumbnail_name_for_image(phys_file)
+            if self._dry_run:
+                remaining_phys_files.discard(phys_file)
+                thumbnail_files.discard(thumbnail_file)
+                self.__stats.count_orphaned_disk_files_cleaned += 1
+                continue
             try:
-                if not db_mapper.does_image_exist(phys_file):
-                    print(f"Found orphaned file {phys_file}, archiving...", end="")
-                    file_mapper.archive_image(phys_file)
-                    print("Archived!")
-                    if file_mapper.thumbnail_exists_for_filename(phys_file):
-                        print("Related thumbnail exists, archiving...", end="")
-                        file_mapper.archive_thumbnail_by_image_filename(phys_file)
-                        print("Archived!")
-                    else:
-                        print("No matching thumbnail existed to be cleaned.")
-                    self.__stats.count_orphaned_disk_files_cleaned += 1
+                file_mapper.archive_image(phys_file)
+                remaining_phys_files.discard(phys_file)
+                if thumbnail_file in thumbnail_files:
+                    file_mapper.archive_thumbnail_by_image_filename(phys_file)
+                    thumbnail_files.discard(thumbnail_file)
+                self.__stats.count_orphaned_disk_files_cleaned += 1
             except Exception as ex:
-                print("Error found trying to archive file or thumbnail, error was:")
+                print(f"Error found trying to archive {phys_file} or its thumbnail, error was:")
                 print(ex)
                 self.__stats.count_errors += 1
 
-        thumb_filepaths = file_mapper.get_all_thumbnails_with_full_path(config.thumbnails_path)
         # archive any remaining orphaned thumbnails
-        for thumb_filepath in thumb_filepaths:
+        orphaned_thumbnails = sorted(
+            f for f in thumbnail_files if file_mapper.get_image_name_from_thumbnail_name(f) not in remaining_phys_files
+        )
+        print(f"Found {len(orphaned_thumbnails)} remaining orphaned thumbnails.")
+        for thumbnail_file in orphaned_thumbnails:
+            if self._dry_run:
+                self.__stats.count_orphaned_thumbnails_cleaned += 1
+                continue
             try:
-                thumb_src_image_name = file_mapper.get_image_name_from_thumbnail_path(thumb_filepath)
-                if not file_mapper.image_file_exists(thumb_src_image_name):
-                    print(f"Found orphaned thumbnail {thumb_filepath}, archiving...", end="")
-                    file_mapper.archive_thumbnail_by_image_filename(thumb_src_image_name)
-                    print("Archived!")
-                    self.__stats.count_orphaned_thumbnails_cleaned += 1
+                file_mapper.archive_thumbnail_by_image_filename(
+                    file_mapper.get_image_name_from_thumbnail_name(thumbnail_file)
+                )
+                self.__stats.count_orphaned_thumbnails_cleaned += 1
             except Exception as ex:
-                print("Error found trying to archive thumbnail, error was:")
+                print(f"Error found trying to archive thumbnail {thumbnail_file}, error was:")
                 print(ex)
                 self.__stats.count_errors += 1
 
+        self._operation_times.append(("Archive orphaned disk files", time.perf_counter() - time_start))
+
     def regenerate_thumbnails(self, config: ConfigMapper, file_mapper: PhysicalFileMapper, *args):
         """Create missing thumbnails for any valid general images both in the db and on disk."""
         if self._headless:
@@ -487,17 +538,37 @@ class InvokeAIDatabaseMaintenanceApp:
 
             print()
 
+        time_start = time.perf_counter()
         phys_files = file_mapper.get_all_png_filenames_in_directory(config.outputs_path)
-        for phys_file in phys_files:
-            try:
-                if not file_mapper.thumbnail_exists_for_filename(phys_file):
-                    print(f"Found file without thumbnail {phys_file}...Regenerating Thumbnail...", end="")
-                    file_mapper.generate_thumbnail_for_image_name(phys_file)
-                    print("Done!")
-                    self.__stats.count_thumbnails_regenerated += 1
-            except Exception as ex:
-                print("Error found trying to regenerate thumbnail, error was:")
-                print(ex)
+        missing_thumbnails = file_mapper.get_images_missing_thumbnails(phys_files)
+        print(f"Found {len(missing_thumbnails)} image files without a thumbnail out of {len(phys_files)}.")
+
+        if self._dry_run:
+            self.__stats.count_thumbnails_regenerated += len(missing_thumbnails)
+        elif missing_thumbnails:
+            os.makedirs(config.thumbnails_path, exist_ok=True)
+            file_paths = [file_mapper.get_image_path_for_image_name(f) for f in missing_thumbnails]
+            thumb_paths = [file_mapper.get_thumbnail_path_for_image(f) for f in missing_thumbnails]
+            workers = min(self._workers, len(missing_thumbnails))
+            if workers == 1:
+                errors = map(generate_thumbnail, file_paths, thumb_paths)
+                self.__count_thumbnail_results(errors)
+            else:
+                print(f"Regenerating thumbnails with {workers} worker processes...")
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    # Images are dispatched in chunks, so the per-task IPC overhead is amortized
+                    chunksize = max(1, min(256, len(missing_thumbnails) // (workers * 4)))
+                    errors = executor.map(generate_thumbnail, file_paths, thumb_paths, chunksize=chunksize)
+                    self.__count_thumbnail_results(errors)
+
+        self._operation_times.append(("Regenerate thumbnails", time.perf_counter() - time_start))
+
+    def __count_thumbnail_results(self, errors: Iterable[Optional[str]]):
+        for error in errors:
+            if error is None:
+                self.__stats.count_thumbnails_regenerated += 1
+            else:
+                print(f"Error found trying to regenerate thumbnail {error}")
                 self.__stats.count_errors += 1
 
     def main(self):  # noqa D107
@@ -531,17 +602,32 @@ class InvokeAIDatabaseMaintenanceApp:
         if op in [MaintenanceOperation.ReGenerateThumbnails, MaintenanceOperation.All]:
             operations_to_perform.append(self.regenerate_thumbnails)
 
-        for operation in operations_to_perform:
-            operation(config_mapper, file_mapper, db_mapper)
+        try:
+            for operation in operations_to_perform:
+                operation(config_mapper, file_mapper, db_mapper)
+        finally:
+            db_mapper.disconnect()
+
+        self.print_report()
 
+    def print_report(self):
+        """Print the counts and timings of the operations performed, or that would be performed in a dry run."""
+        verb = "that would be " if self._dry_run else ""
         print("\n===============================================================================")
+        if self._dry_run:
+            print("= Dry Run Complete - no changes were made")
         print(f"= Maintenance Complete - Elapsed Time: {MaintenanceStats.get_elapsed_time_string()}")
         print()
-        print(f"Orphaned db entries cleaned             : {self.__stats.count_orphaned_db_entries_cleaned}")
-        print(f"Orphaned disk files archived            : {self.__stats.count_orphaned_disk_files_cleaned}")
-        print(f"Orphaned thumbnail files archived       : {self.__stats.count_orphaned_thumbnails_cleaned}")
-        print(f"Thumbnails regenerated                  : {self.__stats.count_thumbnails_regenerated}")
-        print(f"Errors during operation                 : {self.__stats.count_errors}")
+        for name, elapsed in self._operation_times:
+            print(f"{name:<48}: {elapsed:.2f} second(s)")
+        print()
+        print(f"Orphaned db entries {verb}cleaned".ljust(48) + f": {self.__stats.count_orphaned_db_entries_cleaned}")
+        print(f"Orphaned disk files {verb}archived".ljust(48) + f": {self.__stats.count_orphaned_disk_files_cleaned}")
+        print(
+            f"Orphaned thumbnail files {verb}archived".ljust(48) + f": {self.__stats.count_orphaned_thumbnails_cleaned}"
+        )
+        print(f"Thumbnails {verb}regenerated".ljust(48) + f": {self.__stats.count_thumbnails_regenerated}")
+        print("Errors during operation".ljust(48) + f": {self.__stats.count_errors}")
 
         print()
 
@@ -562,10 +648,21 @@ def main():  # noqa D107
     parser.add_argument(
         "--operation", default="ask", choices=[x.value for x in MaintenanceOperation], help="Operation to perform."
     )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Report what the operation would do, with counts and timing, without changing anything.",
+    )
+    parser.add_argument(
+        "--workers",
+        default=None,
+        type=int,
+        help="Number of processes used to regenerate thumbnails. Defaults to the number of CPUs.",
+    )
     args = parser.parse_args()
     try:
         os.chdir(args.root)
-        app = InvokeAIDatabaseMaintenanceApp(args.operation)
+        app = InvokeAIDatabaseMaintenanceApp(args.operation, dry_run=args.dry_run, workers=args.workers)
         app.main()
     except KeyboardInterrupt:
         print("\n\nUser cancelled execution.")
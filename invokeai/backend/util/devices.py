@@ -1,3 +1,4 @@
+import threading
 from typing import Dict, Literal, Optional, Union
 
 import torch
@@ -46,9 +47,15 @@ class TorchDevice:
     CUDA_DEVICE = torch.device("cuda")
     MPS_DEVICE = torch.device("mps")
 
+    # Per-thread device overrides, used to pin session processor workers to a device.
+    _thread_local = threading.local()
+
     @classmethod
     def choose_torch_device(cls) -> torch.device:
         """Return the torch.device to use for accelerated inference."""
+        thread_device: Optional[torch.device] = getattr(cls._thread_local, "device", None)
+        if thread_device is not None:
+            return thread_device
         app_config = get_config()
         if app_config.device != "auto":
             device = torch.device(app_config.device)
@@ -60,6 +67,14 @@ class TorchDevice:
             device = CPU_DEVICE
         return cls.normalize(device)
 
+    @classmethod
+    def set_thread_device(cls, device: Optional[Union[str, torch.device]]) -> None:
+        """Set the torch.device used by `choose_torch_device()` on the calling thread.
+
+        Pass None to clear the override and fall back to the configured device.
+        """
+        cls._thread_local.device = cls.normalize(device) if device is not None else None
+
     @classmethod
     def choose_torch_dtype(cls, device: Optional[torch.device] = None) -> torch.dtype:
         """Return the precision to use for accelerated inference."""
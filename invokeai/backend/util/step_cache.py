@@ -0,0 +1,136 @@
+from dataclasses import dataclass
+from typing import Any, Hashable, Optional
+
+import torch
+
+
+@dataclass
+class StepCacheStats:
+    """Counts how often a `StepCache` was used."""
+
+    computed_calls: int = 0
+    """The number of model calls that computed the cached blocks."""
+    cached_calls: int = 0
+    """The number of model calls that reused the cached blocks."""
+    skipped_blocks: int = 0
+    """The number of block evaluations that were skipped by reusing the cache."""
+
+    def summary(self) -> str:
+        """Formats the stats for logging."""
+        total_calls = self.computed_calls + self.cached_calls
+        return (
+            f"Step cache reused the cached blocks in {self.cached_calls} of {total_calls} model calls, skipping "
+            f"{self.skipped_blocks} block evaluations"
+        )
+
+
+@dataclass
+class _CacheEntry:
+    probe_shape: torch.Size
+    value: Any
+
+
+class StepCache:
+    """Caches the output of the expensive blocks of a denoising model on some steps, and reuses it on the following
+    steps instead of computing the blocks again (as in DeepCache and TeaCache).
+
+    The features computed by the deep blocks change little between neighbouring steps, so reusing them trades a little
+    quality for speed. Which steps reuse the cache is decided by one of:
+    - An interval: the blocks are computed every `interval` steps, and reused in between.
+    - An adaptive threshold: the relative L1 distance between the inputs of the blocks (the "probe") on consecutive
+        steps is accumulated, and the blocks are computed again once it reaches `threshold`.
+
+    The model may be called more than once per step (e.g. for the positive and negative conditioning). Each call of a
+    step gets its own cache entry, but the decision is made once per step, on its first call.
+
+    Usage, on each model call:
+    ```py
+    step_cache.start_call(step)
+    value = step_cache.lookup(probe)
+    if value is None:
+        value = compute_blocks()
+        step_cache.store(probe, value)
+    ```
+    """
+
+    def __init__(self, interval: int = 1, threshold: float = 0.0):
+        """
+        Args:
+            interval: Compute the blocks every `interval` steps. 1 computes them on every step. Ignored if `threshold`
+                is set.
+            threshold: Compute the blocks when the accumulated relative L1 distance of the probe since they were last
+                computed reaches this value. 0 disables the adaptive threshold.
+        """
+        if interval < 1:
+            raise ValueError(f"interval must be at least 1, got {interval}")
+        if threshold < 0:
+            raise ValueError(f"threshold must not be negative, got {threshold}")
+        self._interval = interval
+        self._threshold = threshold
+        self.stats = StepCacheStats()
+
+        self._entries: dict[int, _CacheEntry] = {}
+        self._step: Optional[Hashable] = None
+        self._call_index = 0
+        self._reuse = False
+        self._prev_probe: Optional[torch.Tensor] = None
+        self._steps_since_compute = 0
+        self._accumulated_distance = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        """Whether the cache is ever reused."""
+        return self._threshold > 0 or self._interval > 1
+
+    def start_call(self, step: Hashable) -> None:
+        """Marks the start of a model call.
+
+        Args:
+            step: Identifies the current denoising step, e.g. its index or timestep.
+        """
+        if step != self._step:
+            self._step = step
+            self._call_index = 0
+        else:
+            self._call_index += 1
+
+    def lookup(self, probe: torch.Tensor) -> Optional[Any]:
+        """Gets the cached value to reuse in the current call, if the current step reuses the cache.
+
+        Args:
+            probe: A cheap-to-compute input of the cached blocks.
+
+        Returns:
+            The value cached for the current call, or None if the blocks must be computed.
+        """
+        if self._call_index == 0:
+            self._reuse = self._should_reuse(probe)
+        entry = self._entries.get(self._call_index)
+        if not self._reuse or entry is None or entry.probe_shape != probe.shape:
+            return None
+        self.stats.cached_calls += 1
+        return entry.value
+
+    def store(self, probe: torch.Tensor, value: Any) -> None:
+        """Caches the value computed in the current call."""
+        self._entries[self._call_index] = _CacheEntry(probe_shape=probe.shape, value=value)
+        self.stats.computed_calls += 1
+
+    def _should_reuse(self, probe: torch.Tensor) -> bool:
+        prev_probe = self._prev_probe
+        self._prev_probe = probe.detach()
+        if prev_probe is None or prev_probe.shape != probe.shape:
+            reuse = False
+        elif self._threshold > 0:
+            distance = (probe - prev_probe).abs().mean() / prev_probe.abs().mean().clamp(min=1e-8)
+            self._accumulated_distance += distance.item()
+            reuse = self._accumulated_distance < self._threshold
+        else:
+            reuse = self._steps_since_compute + 1 < self._interval
+
+        if reuse:
+            self._steps_since_compute += 1
+        else:
+            self._steps_since_compute = 0
+            self._accumulated_distance = 0.0
+        return reuse
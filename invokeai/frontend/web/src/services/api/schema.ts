@@ -2573,6 +2573,12 @@ export type components = {
              * @description The name of the bulk image download item
              */
             bulk_download_item_name: string;
+            /**
+             * Streamed
+             * @description Whether the archive is streamed to the client that requested it, rather than prepared for download
+             * @default false
+             */
+            streamed?: boolean;
         };
         /**
          * BulkDownloadErrorEvent
@@ -2599,6 +2605,12 @@ export type components = {
              * @description The name of the bulk image download item
              */
             bulk_download_item_name: string;
+            /**
+             * Streamed
+             * @description Whether the archive is streamed to the client that requested it, rather than prepared for download
+             * @default false
+             */
+            streamed?: boolean;
             /**
              * Error
              * @description The error message
@@ -2630,6 +2642,12 @@ export type components = {
              * @description The name of the bulk image download item
              */
             bulk_download_item_name: string;
+            /**
+             * Streamed
+             * @description Whether the archive is streamed to the client that requested it, rather than prepared for download
+             * @default false
+             */
+            streamed?: boolean;
         };
         /**
          * CLIPEmbedDiffusersConfig
@@ -440,7 +440,12 @@ export const setEventListeners = ({ socket, store, setIsConnected }: SetEventLis
 
   socket.on('bulk_download_complete', (data) => {
     log.debug({ data }, 'Bulk gallery download ready');
-    const { bulk_download_item_name } = data;
+    const { bulk_download_item_name, streamed } = data;
+
+    if (streamed) {
+      // Streamed archives are downloaded by the request that started them; there is nothing to link to.
+      return;
+    }
 
     // TODO(psyche): This URL may break in in some environments (e.g. Nvidia workbench) but we need to test it first
     const url = `/api/v1/images/download/${bulk_download_item_name}`;
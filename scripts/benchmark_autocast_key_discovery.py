@@ -0,0 +1,112 @@
+"""
+Benchmarks finding the weights of a model that are not in modules that support autocasting, which is done when a model
+is added to the model cache with partial loading enabled.
+
+Compares checking every state dict key against every module name with the module path lookup of
+`find_keys_in_modules_that_do_not_support_autocast()`, on a synthetic module tree shaped like a transformer.
+
+Usage:
+    python scripts/benchmark_autocast_key_discovery.py
+    python scripts/benchmark_autocast_key_discovery.py --blocks 19 38 76 --layers-per-block 24
+"""
+
+import argparse
+import time
+from typing import Callable
+
+import torch
+
+from invokeai.backend.model_manager.load.model_cache.cached_model.cached_model_with_partial_load import (
+    find_keys_in_modules_that_do_not_support_autocast,
+)
+from invokeai.backend.model_manager.load.model_cache.torch_module_autocast.custom_modules.custom_module_mixin import (
+    CustomModuleMixin,
+)
+from invokeai.backend.model_manager.load.model_cache.torch_module_autocast.torch_module_autocast import (
+    apply_custom_layers_to_model,
+)
+
+
+def make_model(num_blocks: int, layers_per_block: int) -> torch.nn.Module:
+    """Make a model with nested blocks of tiny layers. Only the number of weights and modules matters."""
+
+    def make_block() -> torch.nn.Module:
+        return torch.nn.ModuleDict(
+            {
+                "attn": torch.nn.ModuleDict(
+                    {f"proj_{i}": torch.nn.Linear(1, 1) for i in range(layers_per_block // 2)}
+                    | {"norm_q": torch.nn.LayerNorm(1), "norm_k": torch.nn.LayerNorm(1)}
+                ),
+                "mlp": torch.nn.Sequential(*[torch.nn.Linear(1, 1) for _ in range(layers_per_block // 2)]),
+            }
+        )
+
+    with torch.device("meta"):
+        model = torch.nn.ModuleDict({"blocks": torch.nn.ModuleList(make_block() for _ in range(num_blocks))})
+    apply_custom_layers_to_model(model)
+    return model
+
+
+def find_keys_by_checking_every_module(state_dict_keys: tuple[str, ...], module_names: frozenset[str]) -> set[str]:
+    """The previous implementation, which checked every key against every module name."""
+    keys: set[str] = set()
+    for key in state_dict_keys:
+        for module_name in module_names:
+            if key.startswith(module_name):
+                break
+        else:
+            keys.add(key)
+    return keys
+
+
+def find_keys_without_memoization(state_dict_keys: tuple[str, ...], module_names: frozenset[str]) -> frozenset[str]:
+    find_keys_in_modules_that_do_not_support_autocast.cache_clear()
+    return find_keys_in_modules_that_do_not_support_autocast(state_dict_keys, module_names)
+
+
+def timed(fn: Callable[[], object], repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark finding the weights that don't support autocasting.")
+    parser.add_argument("--blocks", type=int, nargs="+", default=[19, 38, 57], help="The numbers of blocks.")
+    parser.add_argument("--layers-per-block", type=int, default=16, help="The number of linear layers per block.")
+    parser.add_argument("--repeat", type=int, default=3, help="The number of times to run each benchmark.")
+    args = parser.parse_args()
+
+    print(f"  {'keys':>6} {'modules':>8} {'every module':>13} {'module paths':>13} {'memoized':>9}")
+    for num_blocks in args.blocks:
+        model = make_model(num_blocks, args.layers_per_block)
+        state_dict_keys = tuple(model.state_dict().keys())
+        module_names = frozenset(n for n, m in model.named_modules() if isinstance(m, CustomModuleMixin))
+        expected = find_keys_by_checking_every_module(state_dict_keys, module_names)
+        assert find_keys_in_modules_that_do_not_support_autocast(state_dict_keys, module_names) == expected
+
+        every_module_time = timed(
+            lambda keys=state_dict_keys, names=module_names: find_keys_by_checking_every_module(keys, names),
+            args.repeat,
+        )
+        module_paths_time = timed(
+            lambda keys=state_dict_keys, names=module_names: find_keys_without_memoization(keys, names), args.repeat
+        )
+        # A repeat load of the same architecture passes equal (but not identical) arguments.
+        memoized_time = timed(
+            lambda keys=state_dict_keys, names=module_names: find_keys_in_modules_that_do_not_support_autocast(
+                (*keys,), frozenset(list(names))
+            ),
+            args.repeat,
+        )
+        print(
+            f"  {len(state_dict_keys):>6} {len(module_names):>8} {every_module_time * 1000:>11.1f}ms "
+            f"{module_paths_time * 1000:>11.1f}ms {memoized_time * 1000:>7.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Benchmarks listing boards and images against a large database.
+
+Seeds a new database with the given number of images and boards, then compares the per-board and per-image queries
+that were used to build board and image DTOs with the denormalized board summaries and the board id joined into the
+image records query.
+
+Usage:
+    python scripts/benchmark_board_listing.py --images 1000000 --boards 1000
+"""
+
+import argparse
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Iterator
+
+from invokeai.app.services.board_image_records.board_image_records_sqlite import SqliteBoardImageRecordStorage
+from invokeai.app.services.board_records.board_records_common import BoardRecordOrderBy
+from invokeai.app.services.board_records.board_records_sqlite import SqliteBoardRecordStorage
+from invokeai.app.services.config.config_default import InvokeAIAppConfig
+from invokeai.app.services.image_records.image_records_sqlite import SqliteImageRecordStorage
+from invokeai.app.services.shared.sqlite.sqlite_common import SQLiteDirection
+from invokeai.app.services.shared.sqlite.sqlite_database import SqliteDatabase
+from invokeai.app.services.shared.sqlite.sqlite_util import init_db
+from invokeai.backend.util.logging import InvokeAILogger
+
+
+def generate_images(num_images: int) -> Iterator[tuple[str, str, bool, bool]]:
+    start = datetime(2023, 1, 1)
+    for i in range(num_images):
+        created_at = (start + timedelta(seconds=i)).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+        yield (f"{i:08d}.png", created_at, random.random() < 0.05, random.random() < 0.01)
+
+
+def seed(db: SqliteDatabase, num_images: int, num_boards: int, in_board_ratio: float) -> None:
+    conn = db.conn
+    start = time.perf_counter()
+    conn.executemany(
+        """--sql
+        INSERT INTO images (image_name, image_origin, image_category, width, height, created_at, is_intermediate, starred)
+        VALUES (?, 'internal', 'general', 512, 512, ?, ?, ?);
+        """,
+        generate_images(num_images),
+    )
+    conn.commit()
+    print(f"Seeded {num_images} images in {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    board_ids = [f"board_{i:05d}" for i in range(num_boards)]
+    conn.executemany("INSERT INTO boards (board_id, board_name) VALUES (?, ?);", ((b, b) for b in board_ids))
+    conn.executemany(
+        "INSERT INTO board_images (board_id, image_name) VALUES (?, ?);",
+        ((random.choice(board_ids), f"{i:08d}.png") for i in range(num_images) if random.random() < in_board_ratio),
+    )
+    conn.commit()
+    print(f"Seeded {num_boards} boards, and added images to them, in {time.perf_counter() - start:.2f}s")
+
+
+def timed(label: str, fn: Callable[[], int], repeat: int) -> None:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        num_queries = fn()
+        times.append(time.perf_counter() - start)
+    print(f"  {label:<50} {min(times) * 1000:>10.1f}ms {num_queries:>8} queries")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark listing boards and images against a large database.")
+    parser.add_argument("--images", type=int, default=1_000_000, help="The number of images to seed.")
+    parser.add_argument("--boards", type=int, default=1_000, help="The number of boards to seed.")
+    parser.add_argument("--in-board-ratio", type=float, default=0.8, help="The ratio of images that are in a board.")
+    parser.add_argument("--page-size", type=int, default=100, help="The number of images in a page of images.")
+    parser.add_argument("--repeat", type=int, default=3, help="The number of times to run each benchmark.")
+    parser.add_argument("--seed", type=int, default=0, help="The random seed.")
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        config = InvokeAIAppConfig(use_memory_db=False)
+        config._root = Path(tmpdir)
+        logger = InvokeAILogger.get_logger()
+        db = init_db(config=config, logger=logger, image_files=None)  # type: ignore
+        seed(db, args.images, args.boards, args.in_board_ratio)
+
+        image_records = SqliteImageRecordStorage(db)
+        board_records = SqliteBoardRecordStorage(db)
+        board_image_records = SqliteBoardImageRecordStorage(db)
+
+        def boards_per_board_queries() -> int:
+            boards = board_records.get_all(BoardRecordOrderBy.CreatedAt, SQLiteDirection.Descending)
+            cursor = db.conn.cursor()
+            for board in boards:
+                image_records.get_most_recent_image_for_board(board.board_id)
+                cursor.execute(
+                    """--sql
+                    SELECT COUNT(*)
+                    FROM board_images
+                    INNER JOIN images ON board_images.image_name = images.image_name
+                    WHERE images.is_intermediate = FALSE
+                    AND board_images.board_id = ?;
+                    """,
+                    (board.board_id,),
+                )
+                cursor.fetchone()
+            return 1 + 2 * len(boards)
+
+        def boards_summaries() -> int:
+            boards = board_records.get_all(BoardRecordOrderBy.CreatedAt, SQLiteDirection.Descending)
+            board_image_records.get_board_summaries([b.board_id for b in boards])
+            return 1 + -(-len(boards) // SqliteBoardImageRecordStorage._SUMMARIES_BATCH_SIZE)
+
+        def images_per_image_queries() -> int:
+            results = image_records.get_many(limit=args.page_size)
+            for r in results.items:
+                board_image_records.get_board_for_image(r.image_name)
+            return 2 + len(results.items)
+
+        def images_joined() -> int:
+            image_records.get_many(limit=args.page_size)
+            return 2
+
+        print(f"Listing all boards ({args.boards} boards):")
+        timed("cover image and count queries per board", boards_per_board_queries, args.repeat)
+        timed("board summaries", boards_summaries, args.repeat)
+        print(f"Listing a page of images ({args.page_size} images):")
+        timed("board query per image", images_per_image_queries, args.repeat)
+        timed("board id joined into the images query", images_joined, args.repeat)
+
+        db.conn.close()
+
+
+if __name__ == "__main__":
+    main()
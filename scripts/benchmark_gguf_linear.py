@@ -0,0 +1,96 @@
+"""
+Benchmarks linear layers with GGUF-quantized weights on the CPU.
+
+Compares dequantizing the whole weight and then running a matmul (the default path for GGMLTensors) with
+`quantized_linear()`, which runs the matmul on tiles of the quantized weight. The weights are random quantized blocks
+with the shapes of the FLUX transformer's linear layers.
+
+Usage:
+    python scripts/benchmark_gguf_linear.py
+    python scripts/benchmark_gguf_linear.py --tokens 1 512 4608 --dtype bfloat16 --threads 8
+"""
+
+import argparse
+import time
+from typing import Callable
+
+import gguf
+import torch
+
+from invokeai.backend.quantization.gguf.ggml_tensor import GGMLTensor
+from invokeai.backend.quantization.gguf.quantized_matmul import QUANTIZED_LINEAR_FUNCTIONS, quantized_linear
+
+# The (out_features, in_features) of the FLUX transformer's linear layers.
+SHAPES = [(3072, 3072), (9216, 3072), (12288, 3072), (3072, 12288)]
+
+
+def make_quantized_weight(
+    out_features: int, in_features: int, qtype: gguf.GGMLQuantizationType, dtype: torch.dtype
+) -> GGMLTensor:
+    """Make a weight of random quantized blocks with small, finite scales."""
+    block_size, type_size = gguf.GGML_QUANT_SIZES[qtype]
+    n_blocks = out_features * in_features // block_size
+    blocks = torch.randint(0, 256, (n_blocks, type_size), dtype=torch.uint8)
+    # Q8_0 blocks start with a float16 scale, Q4_K blocks with a float16 scale and minimum.
+    num_scales = 2 if qtype == gguf.GGMLQuantizationType.Q4_K else 1
+    blocks[:, : 2 * num_scales] = (torch.rand((n_blocks, num_scales)) * 0.01).to(torch.float16).view(torch.uint8)
+    return GGMLTensor(
+        blocks.reshape((out_features, -1)), qtype, torch.Size((out_features, in_features)), compute_dtype=dtype
+    )
+
+
+def timed(fn: Callable[[], object], repeat: int) -> float:
+    fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+@torch.no_grad()
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark linear layers with GGUF-quantized weights on the CPU.")
+    parser.add_argument(
+        "--qtypes",
+        nargs="+",
+        default=[qtype.name for qtype in QUANTIZED_LINEAR_FUNCTIONS],
+        choices=[qtype.name for qtype in QUANTIZED_LINEAR_FUNCTIONS],
+        help="The quantization types to benchmark.",
+    )
+    parser.add_argument("--tokens", type=int, nargs="+", default=[1, 256, 1024], help="The numbers of input tokens.")
+    parser.add_argument("--dtype", choices=["float32", "bfloat16"], default="float32", help="The compute dtype.")
+    parser.add_argument("--threads", type=int, help="The number of threads for torch to use.")
+    parser.add_argument("--repeat", type=int, default=5, help="The number of times to run each benchmark.")
+    args = parser.parse_args()
+    if args.threads is not None:
+        torch.set_num_threads(args.threads)
+    dtype = getattr(torch, args.dtype)
+
+    print(f"Compute dtype: {dtype}, threads: {torch.get_num_threads()}")
+    print(
+        f"  {'type':<6} {'shape':<14} {'tokens':>6} {'dequantize+matmul':>18} {'quantized_linear':>17} {'speedup':>8}"
+    )
+    for qtype_name in args.qtypes:
+        qtype = gguf.GGMLQuantizationType[qtype_name]
+        for out_features, in_features in SHAPES:
+            weight = make_quantized_weight(out_features, in_features, qtype, dtype)
+            for num_tokens in args.tokens:
+                input = torch.randn((num_tokens, in_features), dtype=dtype)
+                dequantize_time = timed(
+                    lambda input=input, weight=weight: torch.nn.functional.linear(
+                        input, weight.get_dequantized_tensor()
+                    ),
+                    args.repeat,
+                )
+                quantized_time = timed(lambda input=input, weight=weight: quantized_linear(input, weight), args.repeat)
+                shape = f"{out_features}x{in_features}"
+                print(
+                    f"  {qtype_name:<6} {shape:<14} {num_tokens:>6} {dequantize_time * 1000:>16.1f}ms "
+                    f"{quantized_time * 1000:>15.1f}ms {dequantize_time / quantized_time:>7.2f}x"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Benchmarks loading a large safetensors file.
+
+Compares `safetensors.torch.load_file()` with the parallel loader, with different numbers of threads and with pinned
+memory, and loading into a module created with `accelerate.init_empty_weights()`. A synthetic file of the given size is
+written if no file is given.
+
+Once a file has been read, it is usually in the OS page cache, and later reads of it are much faster than reads from
+disk. With `--cold`, the file is evicted from the page cache before each run, where the OS supports it.
+
+Usage:
+    python scripts/benchmark_safetensors_loading.py --size-gb 4 --cold
+    python scripts/benchmark_safetensors_loading.py --file /path/to/model.safetensors --threads 1 4 8 16
+"""
+
+import argparse
+import gc
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable
+
+import accelerate
+import torch
+from safetensors.torch import load_file, save_file
+
+from invokeai.backend.model_manager.load.safetensors_loader import (
+    load_safetensors,
+    load_safetensors_into_module,
+    read_safetensors_header,
+)
+
+GB = 2**30
+
+
+def write_synthetic_file(path: Path, size: int) -> None:
+    """Write a file of bfloat16 tensors of mixed sizes, like the weights of a transformer."""
+    start = time.perf_counter()
+    state_dict: dict[str, torch.Tensor] = {}
+    written = 0
+    i = 0
+    while written < size:
+        shape = (3072, 3072) if i % 4 else (3072, 12288)
+        state_dict[f"blocks.{i}.weight"] = torch.randn(shape, dtype=torch.bfloat16)
+        state_dict[f"blocks.{i}.bias"] = torch.randn(shape[0], dtype=torch.bfloat16)
+        written += (shape[0] * shape[1] + shape[0]) * 2
+        i += 1
+    save_file(state_dict, path)
+    print(f"Wrote {written / GB:.2f}GB to {path} in {time.perf_counter() - start:.2f}s")
+
+
+class _Weights(torch.nn.Module):
+    """A module with a parameter for each tensor of a safetensors file."""
+
+    def __init__(self, path: Path):
+        super().__init__()
+        self.params = torch.nn.ParameterDict()
+        for entry in read_safetensors_header(path):
+            self.params[entry.key.replace(".", "_")] = torch.nn.Parameter(torch.empty(entry.shape, dtype=entry.dtype))
+
+
+def touch(tensors: dict[str, torch.Tensor]) -> dict[str, torch.Tensor]:
+    """Read a byte of each page of the tensors.
+
+    `load_file()` maps the file into memory, so its data is only read from disk when it is used. Every benchmark reads
+    all of the data, so that they are compared fairly.
+    """
+    for tensor in tensors.values():
+        if tensor.nelement() > 0:
+            tensor.view(-1).view(torch.uint8)[::4096].sum()
+    return tensors
+
+
+def evict(path: Path) -> None:
+    """Evict a file from the OS page cache."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+
+
+def timed(label: str, fn: Callable[[], object], size: int, repeat: int, cold_paths: list[Path]) -> None:
+    times = []
+    for _ in range(repeat):
+        for path in filter(Path.exists, cold_paths):
+            evict(path)
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+        del result
+        gc.collect()
+    best = min(times)
+    print(f"  {label:<50} {best:>8.2f}s {size / GB / best:>8.2f}GB/s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark loading a large safetensors file.")
+    parser.add_argument("--file", type=Path, help="The safetensors file to load. A synthetic file is used if not set.")
+    parser.add_argument("--size-gb", type=float, default=2.0, help="The size of the synthetic file.")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4, 8], help="The numbers of threads to use.")
+    parser.add_argument("--repeat", type=int, default=3, help="The number of times to run each benchmark.")
+    parser.add_argument("--cold", action="store_true", help="Evict the file from the page cache before each run.")
+    args = parser.parse_args()
+    if args.cold and not hasattr(os, "posix_fadvise"):
+        parser.error("--cold is not supported on this OS")
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path: Path = args.file
+        if path is None:
+            path = Path(tmpdir) / "model.safetensors"
+            write_synthetic_file(path, int(args.size_gb * GB))
+        size = path.stat().st_size
+        module_path = Path(tmpdir) / "module.safetensors"
+        cold_paths = [path, module_path] if args.cold else []
+
+        print(f"Loading {path} ({size / GB:.2f}GB):")
+        timed("safetensors.torch.load_file", lambda: touch(load_file(path)), size, args.repeat, cold_paths)
+        for num_threads in args.threads:
+            timed(
+                f"load_safetensors, {num_threads} threads",
+                lambda num_threads=num_threads: touch(load_safetensors(path, num_threads)),
+                size,
+                args.repeat,
+                cold_paths,
+            )
+        if torch.cuda.is_available():
+            for num_threads in args.threads:
+                timed(
+                    f"load_safetensors, {num_threads} threads, pinned",
+                    lambda num_threads=num_threads: touch(load_safetensors(path, num_threads, pin_memory=True)),
+                    size,
+                    args.repeat,
+                    cold_paths,
+                )
+
+        # Loading into a module requires the keys of the file to match the module's, so the file is renamed into a
+        # flat module. This is not timed.
+        state_dict = {k.replace(".", "_"): v for k, v in load_file(path).items()}
+        save_file({f"params.{k}": v for k, v in state_dict.items()}, module_path)
+        del state_dict
+
+        def load_file_into_module() -> torch.nn.Module:
+            with accelerate.init_empty_weights():
+                module = _Weights(path)
+            module.load_state_dict(load_file(module_path), assign=True)
+            touch(module.state_dict())
+            return module
+
+        def load_safetensors_streaming() -> torch.nn.Module:
+            with accelerate.init_empty_weights():
+                module = _Weights(path)
+            load_safetensors_into_module(module, module_path)
+            touch(module.state_dict())
+            return module
+
+        print("Loading into an empty module:")
+        timed("load_state_dict(load_file())", load_file_into_module, size, args.repeat, cold_paths)
+        timed("load_safetensors_into_module", load_safetensors_streaming, size, args.repeat, cold_paths)
+
+
+if __name__ == "__main__":
+    main()
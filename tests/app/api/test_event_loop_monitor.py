@@ -0,0 +1,25 @@
+import asyncio
+import time
+
+from invokeai.app.api.event_loop_monitor import EventLoopLagMonitor
+
+
+def test_monitor_measures_blocked_loop():
+    monitor = EventLoopLagMonitor(interval=0.02, warn_threshold=0.1)
+
+    async def run():
+        monitor.start()
+        await asyncio.sleep(0.1)
+        # Blocking work on the loop delays the monitor's timer
+        time.sleep(0.3)
+        await asyncio.sleep(0.1)
+        monitor.stop()
+
+    asyncio.run(run())
+
+    stats = monitor.get_stats()
+    assert stats.samples >= 3
+    assert stats.blocked_count == 1
+    assert stats.max_ms >= 250
+    assert stats.max_ever_ms == stats.max_ms
+    assert stats.mean_ms < stats.max_ms
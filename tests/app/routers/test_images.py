@@ -1,4 +1,6 @@
+import io
 import os
+import zipfile
 from pathlib import Path
 from typing import Any
 
@@ -9,6 +11,13 @@ from fastapi.testclient import TestClient
 from invokeai.app.api.dependencies import ApiDependencies
 from invokeai.app.api_app import app
 from invokeai.app.services.board_records.board_records_common import BoardRecord
+from invokeai.app.services.events.events_common import BulkDownloadCompleteEvent, BulkDownloadStartedEvent
+from invokeai.app.services.image_records.image_records_common import (
+    ImageCategory,
+    ImageRecordNotFoundException,
+    ResourceOrigin,
+)
+from invokeai.app.services.images.images_common import ImageDTO
 from invokeai.app.services.invoker import Invoker
 
 
@@ -117,3 +126,175 @@ def test_get_bulk_download_image_image_deleted_after_response(
     client.get("/api/v1/images/download/test.zip")
 
     assert not (tmp_path / "test.zip").exists()
+
+
+def test_get_image_full_streams_file_with_etag(
+    tmp_path: Path, monkeypatch: Any, mock_invoker: Invoker, client: TestClient
+) -> None:
+    mock_file: Path = tmp_path / "test.png"
+    mock_file.write_bytes(b"image contents")
+
+    monkeypatch.setattr(mock_invoker.services.images, "get_path", lambda *args, **kwargs: str(mock_file))
+    monkeypatch.setattr("invokeai.app.api.routers.images.ApiDependencies", MockApiDependencies(mock_invoker))
+
+    response = client.get("/api/v1/images/i/test.png/full")
+    assert response.status_code == 200
+    assert response.content == b"image contents"
+    assert response.headers["content-type"] == "image/png"
+    assert response.headers["content-disposition"] == 'inline; filename="test.png"'
+    etag = response.headers["etag"]
+
+    # The client's cached copy is still valid
+    response = client.get("/api/v1/images/i/test.png/full", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+    # The file changed since the client cached it
+    mock_file.write_bytes(b"new image contents")
+    response = client.get("/api/v1/images/i/test.png/thumbnail", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.content == b"new image contents"
+    assert response.headers["etag"] != etag
+
+
+def test_get_image_full_not_found(monkeypatch: Any, mock_invoker: Invoker, client: TestClient) -> None:
+    monkeypatch.setattr(mock_invoker.services.images, "get_path", lambda *args, **kwargs: "/does/not/exist.png")
+    monkeypatch.setattr("invokeai.app.api.routers.images.ApiDependencies", MockApiDependencies(mock_invoker))
+
+    assert client.get("/api/v1/images/i/test.png/full").status_code == 404
+    assert client.head("/api/v1/images/i/test.png/full").status_code == 404
+
+
+def test_list_image_dtos_by_cursor_invalid_cursor(monkeypatch: Any, mock_invoker: Invoker, client: TestClient) -> None:
+    def mock_get_many_by_cursor(*args: Any, **kwargs: Any) -> None:
+        raise ValueError("Invalid cursor")
+
+    monkeypatch.setattr(mock_invoker.services.images, "get_many_by_cursor", mock_get_many_by_cursor)
+    monkeypatch.setattr("invokeai.app.api.routers.images.ApiDependencies", MockApiDependencies(mock_invoker))
+
+    assert client.get("/api/v1/images/cursor", params={"cursor": "not a cursor"}).status_code == 400
+
+
+def prepare_stream_images_test(monkeypatch: Any, mock_invoker: Invoker, tmp_path: Path) -> dict[str, bytes]:
+    """Writes synthetic images to disk and mocks the image service to return them."""
+    prepare_download_images_test(monkeypatch, mock_invoker)
+    mock_invoker.services.bulk_download.start(mock_invoker)
+
+    image_contents = {f"image_{i}.png": os.urandom(1000 * (i + 1)) for i in range(3)}
+    for image_name, contents in image_contents.items():
+        (tmp_path / image_name).write_bytes(contents)
+
+    def mock_get_dto(image_name: str) -> ImageDTO:
+        return ImageDTO(
+            image_name=image_name,
+            board_id=None,
+            image_url="None",
+            width=100,
+            height=100,
+            thumbnail_url="None",
+            image_origin=ResourceOrigin.INTERNAL,
+            image_category=ImageCategory.GENERAL,
+            created_at="None",
+            updated_at="None",
+            starred=False,
+            has_workflow=False,
+            is_intermediate=False,
+        )
+
+    monkeypatch.setattr(mock_invoker.services.images, "get_dto", mock_get_dto)
+    monkeypatch.setattr(mock_invoker.services.images, "get_path", lambda image_name: str(tmp_path / image_name))
+    return image_contents
+
+
+def assert_zip_contains_images(data: bytes, image_contents: dict[str, bytes]) -> None:
+    with zipfile.ZipFile(io.BytesIO(data)) as zip_file:
+        assert zip_file.testzip() is None
+        assert zip_file.namelist() == [f"general/{image_name}" for image_name in image_contents]
+        for image_name, contents in image_contents.items():
+            assert zip_file.read(f"general/{image_name}") == contents
+
+
+def test_stream_images_download(monkeypatch: Any, mock_invoker: Invoker, client: TestClient, tmp_path: Path) -> None:
+    image_contents = prepare_stream_images_test(monkeypatch, mock_invoker, tmp_path)
+
+    response = client.post("/api/v1/images/download/stream", json={"image_names": list(image_contents)})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/zip"
+    assert response.headers["x-bulk-download-item-name"] == "test.zip"
+    assert int(response.headers["content-length"]) == len(response.content)
+    assert "accept-ranges" not in response.headers
+    assert_zip_contains_images(response.content, image_contents)
+
+    events = mock_invoker.services.events.events
+    assert [type(event) for event in events] == [BulkDownloadStartedEvent, BulkDownloadCompleteEvent]
+    # Nothing is written to disk.
+    assert not any(Path(mock_invoker.services.bulk_download._bulk_downloads_folder).iterdir())
+
+
+def test_stream_images_download_resumable(
+    monkeypatch: Any, mock_invoker: Invoker, client: TestClient, tmp_path: Path
+) -> None:
+    image_contents = prepare_stream_images_test(monkeypatch, mock_invoker, tmp_path)
+
+    response = client.post(
+        "/api/v1/images/download/stream", json={"image_names": list(image_contents), "resumable": True}
+    )
+    assert response.status_code == 200
+    assert response.headers["accept-ranges"] == "bytes"
+    etag = response.headers["etag"]
+    data = response.content
+    assert_zip_contains_images(data, image_contents)
+
+    # The whole archive was sent, so it can't be resumed.
+    response = client.get("/api/v1/images/download/stream/test.zip", headers={"Range": "bytes=2500-"})
+    assert response.status_code == 404
+
+    def interrupt_download() -> None:
+        """Prepare the archive again, as if its download was interrupted before its last byte was sent."""
+        mock_invoker.services.bulk_download.stream(list(image_contents), None, "test", resumable=True)
+
+    # Resume the download as if it was interrupted after 2500 bytes, in two ranges.
+    interrupt_download()
+    resumed = client.get(
+        "/api/v1/images/download/stream/test.zip", headers={"Range": "bytes=2500-2999", "If-Range": etag}
+    )
+    assert resumed.status_code == 206
+    assert resumed.headers["content-range"] == f"bytes 2500-2999/{len(data)}"
+    response = client.get("/api/v1/images/download/stream/test.zip", headers={"Range": f"bytes={len(data)}-"})
+    assert response.status_code == 416
+    rest = client.get("/api/v1/images/download/stream/test.zip", headers={"Range": "bytes=3000-", "If-Range": etag})
+    assert rest.status_code == 206
+    assert rest.headers["content-range"] == f"bytes 3000-{len(data) - 1}/{len(data)}"
+    assert data[:2500] + resumed.content + rest.content == data
+
+    # The whole archive is sent if the client's partial download is of another archive.
+    interrupt_download()
+    response = client.get(
+        "/api/v1/images/download/stream/test.zip", headers={"Range": "bytes=2500-", "If-Range": '"x"'}
+    )
+    assert response.status_code == 200
+    assert response.content == data
+
+    # If an image changed, the download can't be resumed.
+    interrupt_download()
+    (tmp_path / "image_0.png").write_bytes(b"changed")
+    response = client.get("/api/v1/images/download/stream/test.zip", headers={"Range": "bytes=2500-"})
+    assert response.status_code == 412
+
+
+def test_stream_images_download_not_found(monkeypatch: Any, mock_invoker: Invoker, client: TestClient) -> None:
+    prepare_download_images_test(monkeypatch, mock_invoker)
+    mock_invoker.services.bulk_download.start(mock_invoker)
+
+    def mock_get_dto(image_name: str) -> ImageDTO:
+        raise ImageRecordNotFoundException
+
+    monkeypatch.setattr(mock_invoker.services.images, "get_dto", mock_get_dto)
+
+    response = client.post("/api/v1/images/download/stream", json={"image_names": ["missing.png"]})
+    assert response.status_code == 404
+    response = client.post("/api/v1/images/download/stream", json={})
+    assert response.status_code == 400
+    response = client.get("/api/v1/images/download/stream/missing.zip")
+    assert response.status_code == 404
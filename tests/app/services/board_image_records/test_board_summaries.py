@@ -0,0 +1,158 @@
+import sqlite3
+from typing import Optional
+
+import pytest
+
+from invokeai.app.services.board_image_records.board_image_records_sqlite import SqliteBoardImageRecordStorage
+from invokeai.app.services.board_records.board_records_sqlite import SqliteBoardRecordStorage
+from invokeai.app.services.config.config_default import InvokeAIAppConfig
+from invokeai.app.services.image_records.image_records_common import (
+    ImageCategory,
+    ImageRecordChanges,
+    ResourceOrigin,
+)
+from invokeai.app.services.image_records.image_records_sqlite import SqliteImageRecordStorage
+from invokeai.app.services.shared.sqlite.sqlite_database import SqliteDatabase
+from invokeai.app.services.shared.sqlite_migrator.migrations.migration_17 import Migration17Callback
+from invokeai.backend.util.logging import InvokeAILogger
+from tests.fixtures.sqlite_database import create_mock_sqlite_database
+
+
+class Stores:
+    def __init__(self, db: SqliteDatabase) -> None:
+        self.db = db
+        self.images = SqliteImageRecordStorage(db)
+        self.boards = SqliteBoardRecordStorage(db)
+        self.board_images = SqliteBoardImageRecordStorage(db)
+        self._image_count = 0
+
+    def save_image(self, is_intermediate: bool = False, starred: bool = False) -> str:
+        # Images are given distinct, increasing created_at times, so that the cover image is deterministic
+        self._image_count += 1
+        image_name = f"image_{self._image_count:03d}.png"
+        self.images.save(
+            image_name=image_name,
+            image_origin=ResourceOrigin.INTERNAL,
+            image_category=ImageCategory.GENERAL,
+            width=64,
+            height=64,
+            has_workflow=False,
+            is_intermediate=is_intermediate,
+            starred=starred,
+        )
+        self.db.conn.execute(
+            "UPDATE images SET created_at = ? WHERE image_name = ?;",
+            (f"2024-01-01 00:00:{self._image_count:02d}.000", image_name),
+        )
+        self.db.conn.commit()
+        return image_name
+
+    def get_expected_summary(self, board_id: str) -> tuple[int, Optional[str]]:
+        """Gets a board's image count and cover image without the summaries table."""
+        cursor = self.db.conn.cursor()
+        cursor.execute(
+            """--sql
+            SELECT COUNT(*)
+            FROM board_images
+            INNER JOIN images ON board_images.image_name = images.image_name
+            WHERE images.is_intermediate = FALSE
+            AND board_images.board_id = ?;
+            """,
+            (board_id,),
+        )
+        count = cursor.fetchone()[0]
+        cover_image = self.images.get_most_recent_image_for_board(board_id)
+        return count, cover_image.image_name if cover_image else None
+
+    def assert_summaries_match(self, board_ids: list[str]) -> None:
+        summaries = self.board_images.get_board_summaries(board_ids)
+        assert set(summaries) == set(board_ids)
+        for board_id in board_ids:
+            summary = summaries[board_id]
+            assert (summary.image_count, summary.cover_image_name) == self.get_expected_summary(board_id)
+            assert self.board_images.get_image_count_for_board(board_id) == summary.image_count
+
+
+@pytest.fixture
+def stores() -> Stores:
+    db = create_mock_sqlite_database(InvokeAIAppConfig(use_memory_db=True), InvokeAILogger.get_logger())
+    return Stores(db)
+
+
+def test_new_board_has_empty_summary(stores: Stores):
+    board = stores.boards.save("board")
+    summary = stores.board_images.get_board_summaries([board.board_id])[board.board_id]
+    assert summary.image_count == 0
+    assert summary.cover_image_name is None
+
+
+def test_summaries_track_board_and_image_changes(stores: Stores):
+    board_a = stores.boards.save("a").board_id
+    board_b = stores.boards.save("b").board_id
+    boards = [board_a, board_b]
+
+    images = [stores.save_image() for _ in range(4)]
+    intermediate = stores.save_image(is_intermediate=True)
+    for image_name in images + [intermediate]:
+        stores.board_images.add_image_to_board(board_a, image_name)
+    stores.assert_summaries_match(boards)
+    assert stores.board_images.get_board_summaries([board_a])[board_a].cover_image_name == images[-1]
+
+    # Starring an older image makes it the cover, and unstarring it restores the most recent image
+    stores.images.update(images[0], ImageRecordChanges(starred=True))
+    stores.assert_summaries_match(boards)
+    assert stores.board_images.get_board_summaries([board_a])[board_a].cover_image_name == images[0]
+    stores.images.update(images[0], ImageRecordChanges(starred=False))
+    stores.assert_summaries_match(boards)
+
+    # Moving the cover image to another board
+    stores.board_images.add_image_to_board(board_b, images[-1])
+    stores.assert_summaries_match(boards)
+
+    # Removing the cover image from a board
+    stores.board_images.remove_image_from_board(images[-2])
+    stores.assert_summaries_match(boards)
+
+    # Changing an image's intermediate flag changes the count and may change the cover
+    stores.images.update(intermediate, ImageRecordChanges(is_intermediate=False))
+    stores.assert_summaries_match(boards)
+    stores.images.update(intermediate, ImageRecordChanges(is_intermediate=True))
+    stores.assert_summaries_match(boards)
+
+    # Deleting images, including the cover image, and an image that is not in a board
+    stores.images.delete(images[1])
+    stores.images.delete_many([images[-1], images[-2]])
+    stores.assert_summaries_match(boards)
+    stores.images.delete_intermediates()
+    stores.assert_summaries_match(boards)
+
+    stores.boards.delete(board_b)
+    assert stores.board_images.get_board_summaries(boards) == stores.board_images.get_board_summaries([board_a])
+    stores.assert_summaries_match([board_a])
+
+
+def test_migration_backfills_summaries(stores: Stores):
+    board_ids = [stores.boards.save(f"board {i}").board_id for i in range(3)]
+    for i, board_id in enumerate(board_ids):
+        for j in range(i + 1):
+            stores.board_images.add_image_to_board(board_id, stores.save_image(starred=j == 0))
+        stores.board_images.add_image_to_board(board_id, stores.save_image(is_intermediate=True))
+
+    stores.db.conn.execute("DROP TABLE board_summaries;")
+    cursor = stores.db.conn.cursor()
+    Migration17Callback()(cursor)
+    stores.db.conn.commit()
+
+    stores.assert_summaries_match(board_ids)
+
+
+def test_get_board_summaries_batches_large_requests(stores: Stores, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(SqliteBoardImageRecordStorage, "_SUMMARIES_BATCH_SIZE", 2)
+    board_ids = [stores.boards.save(f"board {i}").board_id for i in range(5)]
+    summaries = stores.board_images.get_board_summaries(board_ids + ["missing"])
+    assert set(summaries) == set(board_ids)
+
+
+def test_board_summaries_require_a_board(stores: Stores):
+    with pytest.raises(sqlite3.IntegrityError):
+        stores.db.conn.execute("INSERT INTO board_summaries (board_id) VALUES ('not a board');")
@@ -7,7 +7,10 @@ from zipfile import ZipFile
 import pytest
 
 from invokeai.app.services.board_records.board_records_common import BoardRecord, BoardRecordNotFoundException
-from invokeai.app.services.bulk_download.bulk_download_common import BulkDownloadTargetException
+from invokeai.app.services.bulk_download.bulk_download_common import (
+    BulkDownloadChangedException,
+    BulkDownloadTargetException,
+)
 from invokeai.app.services.bulk_download.bulk_download_default import BulkDownloadService
 from invokeai.app.services.events.events_common import (
     BulkDownloadCompleteEvent,
@@ -358,6 +361,121 @@ def execute_handler_test_on_error(
     assert event_bus.events[1].error == error.__str__()
 
 
+@pytest.mark.parametrize("resumable", [True, False])
+def test_stream(tmp_path: Path, monkeypatch: Any, mock_image_dto: ImageDTO, mock_invoker: Invoker, resumable: bool):
+    """Test that a streamed zip archive is valid and the events are emitted, without writing the archive to disk."""
+
+    expected_zip_path, expected_image_path, mock_image_contents = prepare_handler_test(
+        tmp_path, monkeypatch, mock_image_dto, mock_invoker
+    )
+
+    bulk_download_service = BulkDownloadService()
+    bulk_download_service.start(mock_invoker)
+    zip_stream = bulk_download_service.stream([mock_image_dto.image_name], None, "test", resumable)
+    assert zip_stream.supports_ranges == resumable
+    manifest_path = tmp_path / "bulk_downloads" / "test.manifest.json"
+    assert manifest_path.exists() == resumable
+    expected_zip_path.write_bytes(b"".join(bulk_download_service.iter_stream(zip_stream, "test.zip")))
+
+    assert_handler_success(
+        expected_zip_path, expected_image_path, mock_image_contents, tmp_path, mock_invoker.services.events
+    )
+    assert all(event.streamed for event in mock_invoker.services.events.events)
+    # The manifest of a completed download is deleted.
+    assert not manifest_path.exists()
+    assert bulk_download_service._started_streams == set()
+
+
+def test_get_stream(tmp_path: Path, monkeypatch: Any, mock_image_dto: ImageDTO, mock_invoker: Invoker):
+    """Test that a resumable download is rebuilt from its manifest, unless its images changed."""
+
+    _, _, mock_image_contents = prepare_handler_test(tmp_path, monkeypatch, mock_image_dto, mock_invoker)
+
+    bulk_download_service = BulkDownloadService()
+    bulk_download_service.start(mock_invoker)
+    zip_stream = bulk_download_service.stream([mock_image_dto.image_name], None, "test", resumable=True)
+    data = b"".join(zip_stream.iter_bytes())
+
+    resumed_zip_stream = bulk_download_service.get_stream("test.zip")
+    assert resumed_zip_stream.etag == zip_stream.etag
+    assert b"".join(bulk_download_service.iter_stream(resumed_zip_stream, "test.zip", 10, 20)) == data[10:20]
+
+    with pytest.raises(BulkDownloadTargetException):
+        bulk_download_service.get_stream("missing.zip")
+
+    mock_image_path = tmp_path / mock_image_dto.image_name
+    mock_image_path.write_text(mock_image_contents + " that changed")
+    with pytest.raises(BulkDownloadChangedException):
+        bulk_download_service.get_stream("test.zip")
+
+
+def test_stream_events_are_emitted_once_per_archive(
+    tmp_path: Path, monkeypatch: Any, mock_image_dto: ImageDTO, mock_invoker: Invoker
+):
+    """Test that resuming a stream doesn't emit the events again, and that a client disconnecting is not an error."""
+
+    prepare_handler_test(tmp_path, monkeypatch, mock_image_dto, mock_invoker)
+
+    bulk_download_service = BulkDownloadService()
+    bulk_download_service.start(mock_invoker)
+    zip_stream = bulk_download_service.stream([mock_image_dto.image_name], None, "test", resumable=True)
+    event_bus: TestEventService = mock_invoker.services.events
+
+    # The client stops reading the stream after the first chunk.
+    stream = bulk_download_service.iter_stream(zip_stream, "test.zip")
+    next(stream)
+    stream.close()
+    assert [type(event) for event in event_bus.events] == [BulkDownloadStartedEvent]
+
+    # The download is resumed in two ranges, after the second of which it is complete.
+    for start, end in [(10, 20), (20, None)]:
+        b"".join(
+            bulk_download_service.iter_stream(bulk_download_service.get_stream("test.zip"), "test.zip", start, end)
+        )
+    assert [type(event) for event in event_bus.events] == [BulkDownloadStartedEvent, BulkDownloadCompleteEvent]
+    with pytest.raises(BulkDownloadTargetException):
+        bulk_download_service.get_stream("test.zip")
+
+
+def test_stop_deletes_manifests(tmp_path: Path, monkeypatch: Any, mock_image_dto: ImageDTO, mock_invoker: Invoker):
+    """Test that the manifests of downloads that were never completed are deleted when the service stops."""
+
+    prepare_handler_test(tmp_path, monkeypatch, mock_image_dto, mock_invoker)
+
+    bulk_download_service = BulkDownloadService()
+    bulk_download_service.start(mock_invoker)
+    zip_stream = bulk_download_service.stream([mock_image_dto.image_name], None, "test", resumable=True)
+    b"".join(bulk_download_service.iter_stream(zip_stream, "test.zip", 0, 10))
+    assert bulk_download_service._started_streams == {"test.zip"}
+
+    bulk_download_service.stop()
+    assert bulk_download_service._started_streams == set()
+    assert not (tmp_path / "bulk_downloads" / "test.manifest.json").exists()
+
+
+def test_stream_on_image_not_found(tmp_path: Path, monkeypatch: Any, mock_image_dto: ImageDTO, mock_invoker: Invoker):
+    """Test that preparing a stream emits an error event when the image is not found."""
+
+    exception: Exception = ImageRecordNotFoundException("Image not found")
+
+    def mock_get_dto(*args, **kwargs):
+        raise exception
+
+    monkeypatch.setattr(mock_invoker.services.images, "get_dto", mock_get_dto)
+
+    bulk_download_service = BulkDownloadService()
+    bulk_download_service.start(mock_invoker)
+    with pytest.raises(ImageRecordNotFoundException):
+        bulk_download_service.stream([mock_image_dto.image_name], None, "test")
+
+    event_bus: TestEventService = mock_invoker.services.events
+
+    assert len(event_bus.events) == 2
+    assert isinstance(event_bus.events[0], BulkDownloadStartedEvent)
+    assert isinstance(event_bus.events[1], BulkDownloadErrorEvent)
+    assert event_bus.events[1].error == exception.__str__()
+
+
 def test_delete(tmp_path: Path):
     """Test that the delete method removes the bulk download file."""
 
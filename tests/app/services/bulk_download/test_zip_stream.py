@@ -0,0 +1,81 @@
+import io
+import os
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from invokeai.app.services.bulk_download.bulk_download_common import BulkDownloadException
+from invokeai.app.services.bulk_download.zip_stream import ZipStream, ZipStreamEntry
+
+
+@pytest.fixture
+def image_files(tmp_path: Path) -> dict[str, bytes]:
+    """Write files of different sizes (including an empty one, and one larger than a read chunk) to disk."""
+    contents = {
+        "general/a.png": b"\x89PNG" + bytes(range(256)) * 3,
+        "general/empty.png": b"",
+        "user/b.png": bytes(range(7, 256)) * 4500,
+        "general/ünïcode.png": b"unicode",
+    }
+    for i, data in enumerate(contents.values()):
+        (tmp_path / f"{i}.png").write_bytes(data)
+    return contents
+
+
+def make_entries(tmp_path: Path, contents: dict[str, bytes], compute_crc32: bool) -> list[ZipStreamEntry]:
+    return [
+        ZipStreamEntry.from_path(arcname, tmp_path / f"{i}.png", compute_crc32=compute_crc32)
+        for i, arcname in enumerate(contents)
+    ]
+
+
+def assert_valid_archive(data: bytes, contents: dict[str, bytes]) -> None:
+    with zipfile.ZipFile(io.BytesIO(data)) as zip_file:
+        assert zip_file.testzip() is None
+        assert zip_file.namelist() == list(contents)
+        for info in zip_file.infolist():
+            assert info.compress_type == zipfile.ZIP_STORED
+            assert zip_file.read(info) == contents[info.filename]
+
+
+@pytest.mark.parametrize("compute_crc32", [True, False])
+def test_zip_stream_is_a_valid_archive(tmp_path: Path, image_files: dict[str, bytes], compute_crc32: bool):
+    zip_stream = ZipStream(make_entries(tmp_path, image_files, compute_crc32))
+    assert zip_stream.supports_ranges == compute_crc32
+
+    data = b"".join(zip_stream.iter_bytes())
+    assert len(data) == zip_stream.size
+    assert_valid_archive(data, image_files)
+
+
+def test_zip_stream_ranges(tmp_path: Path, image_files: dict[str, bytes]):
+    zip_stream = ZipStream(make_entries(tmp_path, image_files, compute_crc32=True))
+    data = b"".join(zip_stream.iter_bytes())
+
+    # Ranges that start and end inside headers, inside files and inside the central directory.
+    for start, end in [(0, 10), (5, 900), (900, 20000), (1000, zip_stream.size), (zip_stream.size - 3, None)]:
+        assert b"".join(zip_stream.iter_bytes(start, end)) == data[start:end]
+
+    # A download that is resumed from any offset produces the same archive.
+    resumed = b"".join(zip_stream.iter_bytes(0, 12345)) + b"".join(zip_stream.iter_bytes(12345))
+    assert resumed == data
+
+
+def test_zip_stream_ranges_need_crc32s(tmp_path: Path, image_files: dict[str, bytes]):
+    zip_stream = ZipStream(make_entries(tmp_path, image_files, compute_crc32=False))
+    assert zip_stream.etag is None
+    with pytest.raises(ValueError):
+        next(zip_stream.iter_bytes(10))
+    with pytest.raises(ValueError):
+        next(zip_stream.iter_bytes(0, zip_stream.size - 1))
+
+
+def test_zip_stream_detects_changed_files(tmp_path: Path, image_files: dict[str, bytes]):
+    entries = make_entries(tmp_path, image_files, compute_crc32=True)
+    (tmp_path / "0.png").write_bytes(b"x" * len(image_files["general/a.png"]))
+    os.utime(tmp_path / "0.png", (entries[0].mtime + 10, entries[0].mtime + 10))
+    assert not entries[0].is_unchanged()
+
+    with pytest.raises(BulkDownloadException):
+        b"".join(ZipStream(entries).iter_bytes())
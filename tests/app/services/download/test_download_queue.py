@@ -1,8 +1,12 @@
 """Test the queued download facility"""
 
+import os
 import re
+import threading
 import time
 from contextlib import contextmanager
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 from typing import Any, Generator, Optional
 
@@ -11,8 +15,9 @@ from pydantic.networks import AnyHttpUrl
 from requests.sessions import Session
 from requests_testadapter import TestAdapter
 
+import invokeai.app.services.download.download_default as download_default
 from invokeai.app.services.config import get_config
-from invokeai.app.services.config.config_default import URLRegexTokenPair
+from invokeai.app.services.config.config_default import InvokeAIAppConfig, URLRegexTokenPair
 from invokeai.app.services.download import DownloadJob, DownloadJobStatus, DownloadQueueService, MultiFileDownloadJob
 from invokeai.app.services.events.events_common import (
     DownloadCancelledEvent,
@@ -356,3 +361,163 @@ def test_tokens(tmp_path: Path, mm2_session: Session):
         assert job1.access_token == "cv_12345"
         assert job2.access_token is None
         queue.stop()
+
+
+@dataclass
+class RangeServer:
+    """A local HTTP server for a single file, with the range request support of a CDN."""
+
+    url: str
+    data: bytes
+    accept_ranges: bool = True
+    etag: str = '"v1"'
+    # The ETag of the file after the first request, as if it changed on the server.
+    changed_etag: Optional[str] = None
+    # Each connection is throttled, like the per-connection bandwidth of a remote server.
+    bytes_per_second: float = 2 * 2**20
+    # The start offsets of ranges whose first response is cut off halfway through.
+    fail_once: set[int] = field(default_factory=set)
+    # The Range header of each request, or None.
+    requests: list[Optional[str]] = field(default_factory=list)
+
+
+@pytest.fixture
+def range_server() -> Generator[RangeServer, None, None]:
+    server_state = RangeServer(url="", data=os.urandom(1_000_000))
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            data = server_state.data
+            range_header = self.headers.get("Range")
+            with lock:
+                server_state.requests.append(range_header)
+                etag = server_state.etag
+                server_state.etag = server_state.changed_etag or etag
+            start, end = 0, len(data)
+            if range_header and server_state.accept_ranges and self.headers.get("If-Range") in (None, etag):
+                first, last = range_header.removeprefix("bytes=").split("-")
+                start, end = int(first), int(last) + 1
+                self.send_response(206)
+                self.send_header("Content-Range", f"bytes {start}-{end - 1}/{len(data)}")
+            else:
+                self.send_response(200)
+            if server_state.accept_ranges:
+                self.send_header("Accept-Ranges", "bytes")
+            self.send_header("ETag", etag)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(end - start))
+            self.end_headers()
+
+            with lock:
+                fail = start in server_state.fail_once
+                server_state.fail_once.discard(start)
+            if fail:
+                end = start + (end - start) // 2
+            chunk_size = 32 * 1024
+            try:
+                for offset in range(start, end, chunk_size):
+                    chunk = data[offset : min(offset + chunk_size, end)]
+                    self.wfile.write(chunk)
+                    time.sleep(len(chunk) / server_state.bytes_per_second)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # The client stopped reading the initial response after the first range.
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    server_state.url = f"http://127.0.0.1:{server.server_address[1]}/model.safetensors"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server_state
+    server.shutdown()
+    server.server_close()
+
+
+def download_from_range_server(
+    tmp_path: Path, range_server: RangeServer, download_segments: int, event_bus: Optional[TestEventService] = None
+) -> DownloadJob:
+    """Download the file of the range server, and return the job."""
+    queue = DownloadQueueService(app_config=InvokeAIAppConfig(download_segments=download_segments), event_bus=event_bus)
+    queue.start()
+    job = queue.download(source=AnyHttpUrl(range_server.url), dest=tmp_path / f"{download_segments}_segments")
+    queue.join()
+    queue.stop()
+    return job
+
+
+@pytest.mark.timeout(timeout=30, method="thread")
+def test_segmented_download(tmp_path: Path, range_server: RangeServer, monkeypatch: Any) -> None:
+    monkeypatch.setattr(download_default, "SEGMENT_MIN_SIZE", 100_000)
+
+    # Segmented downloads are off by default.
+    job = download_from_range_server(tmp_path, range_server, download_segments=InvokeAIAppConfig().download_segments)
+    assert job.complete
+    assert job.download_path is not None
+    assert job.download_path.read_bytes() == range_server.data
+    assert range_server.requests == [None]
+
+    range_server.requests.clear()
+    event_bus = TestEventService()
+    job = download_from_range_server(tmp_path, range_server, download_segments=4, event_bus=event_bus)
+    assert job.complete, job.error
+    assert job.download_path is not None
+    assert job.download_path.read_bytes() == range_server.data
+    # The initial request is used for the first range.
+    assert sorted(range_server.requests, key=str) == [
+        None,
+        "bytes=250000-499999",
+        "bytes=500000-749999",
+        "bytes=750000-999999",
+    ]
+
+    # Progress is reported for the whole file.
+    progress = [event.current_bytes for event in event_bus.events if isinstance(event, DownloadProgressEvent)]
+    assert progress == sorted(progress)
+    assert progress[-1] == len(range_server.data)
+    assert isinstance(event_bus.events[-1], DownloadCompleteEvent)
+
+
+@pytest.mark.timeout(timeout=30, method="thread")
+def test_segmented_download_retries_failed_range(tmp_path: Path, range_server: RangeServer, monkeypatch: Any) -> None:
+    monkeypatch.setattr(download_default, "SEGMENT_MIN_SIZE", 100_000)
+    range_server.fail_once = {500_000}
+
+    job = download_from_range_server(tmp_path, range_server, download_segments=4)
+    assert job.complete, job.error
+    assert job.download_path is not None
+    assert job.download_path.read_bytes() == range_server.data
+    assert job.bytes == len(range_server.data)
+    # Only the failed range is requested again, from where its first response was cut off.
+    retried_ranges = [r for r in range_server.requests if r is not None and r.endswith("-749999")]
+    assert len(range_server.requests) == 5
+    assert len(retried_ranges) == 2
+    retry_start = min(int(r.removeprefix("bytes=").split("-")[0]) for r in retried_ranges if r != "bytes=500000-749999")
+    assert 500_000 < retry_start <= 625_000
+
+
+@pytest.mark.timeout(timeout=30, method="thread")
+def test_segmented_download_fails_if_file_changes(tmp_path: Path, range_server: RangeServer, monkeypatch: Any) -> None:
+    monkeypatch.setattr(download_default, "SEGMENT_MIN_SIZE", 100_000)
+    range_server.changed_etag = '"v2"'
+
+    job = download_from_range_server(tmp_path, range_server, download_segments=4)
+    assert job.status == DownloadJobStatus.ERROR
+    assert job.error_type is not None
+    assert job.error_type.startswith("DownloadFileChangedException")
+    # The ranges of the changed file are not requested again.
+    assert len(range_server.requests) <= 4
+
+
+@pytest.mark.timeout(timeout=30, method="thread")
+def test_download_without_range_support(tmp_path: Path, range_server: RangeServer, monkeypatch: Any) -> None:
+    monkeypatch.setattr(download_default, "SEGMENT_MIN_SIZE", 100_000)
+    range_server.accept_ranges = False
+
+    job = download_from_range_server(tmp_path, range_server, download_segments=4)
+    assert job.complete, job.error
+    assert job.download_path is not None
+    assert job.download_path.read_bytes() == range_server.data
+    assert range_server.requests == [None]
@@ -0,0 +1,161 @@
+from typing import Optional
+
+import pytest
+
+from invokeai.app.services.board_image_records.board_image_records_sqlite import SqliteBoardImageRecordStorage
+from invokeai.app.services.board_records.board_records_sqlite import SqliteBoardRecordStorage
+from invokeai.app.services.config.config_default import InvokeAIAppConfig
+from invokeai.app.services.image_records.image_records_common import (
+    ImageCategory,
+    ImageRecordChanges,
+    ResourceOrigin,
+)
+from invokeai.app.services.image_records.image_records_sqlite import SqliteImageRecordStorage
+from invokeai.app.services.shared.pagination import encode_cursor
+from invokeai.app.services.shared.sqlite.sqlite_common import (
+    SQLiteDirection,
+    VersionedCountCache,
+    build_keyset_condition,
+)
+from invokeai.app.services.shared.sqlite.sqlite_database import SqliteDatabase
+from invokeai.backend.util.logging import InvokeAILogger
+from tests.fixtures.sqlite_database import create_mock_sqlite_database
+
+
+@pytest.fixture
+def db() -> SqliteDatabase:
+    return create_mock_sqlite_database(InvokeAIAppConfig(use_memory_db=True), InvokeAILogger.get_logger())
+
+
+@pytest.fixture
+def image_records(db: SqliteDatabase) -> SqliteImageRecordStorage:
+    return SqliteImageRecordStorage(db)
+
+
+def save_images(db: SqliteDatabase, image_records: SqliteImageRecordStorage, count: int) -> list[str]:
+    image_names = []
+    for i in range(count):
+        image_name = f"image_{i:03d}.png"
+        image_records.save(
+            image_name=image_name,
+            image_origin=ResourceOrigin.INTERNAL,
+            image_category=ImageCategory.GENERAL,
+            width=64,
+            height=64,
+            has_workflow=False,
+            is_intermediate=i % 5 == 0,
+            starred=i % 7 == 0,
+        )
+        image_names.append(image_name)
+    # Images share created_at times in pairs, so that the image name breaks ties
+    db.conn.executemany(
+        "UPDATE images SET created_at = ? WHERE image_name = ?;",
+        [(f"2024-01-01 00:00:{i // 2:02d}.000", n) for i, n in enumerate(image_names)],
+    )
+    db.conn.commit()
+    return image_names
+
+
+def test_build_keyset_condition():
+    condition, params = build_keyset_condition(
+        [
+            ("starred", SQLiteDirection.Descending),
+            ("created_at", SQLiteDirection.Ascending),
+            ("name", SQLiteDirection.Ascending),
+        ],
+        [1, "2024", "a"],
+    )
+    assert condition == "(starred < ? OR (starred = ? AND (created_at > ? OR (created_at = ? AND name > ?))))"
+    assert params == [1, 1, "2024", "2024", "a"]
+
+    with pytest.raises(ValueError):
+        build_keyset_condition([("name", SQLiteDirection.Ascending)], ["a", "b"])
+
+
+@pytest.mark.parametrize("starred_first", [True, False])
+@pytest.mark.parametrize("order_dir", [SQLiteDirection.Descending, SQLiteDirection.Ascending])
+@pytest.mark.parametrize("is_intermediate", [None, False])
+def test_cursor_pages_match_offset_listing(
+    db: SqliteDatabase,
+    image_records: SqliteImageRecordStorage,
+    starred_first: bool,
+    order_dir: SQLiteDirection,
+    is_intermediate: Optional[bool],
+):
+    save_images(db, image_records, 23)
+    expected = image_records.get_many(
+        offset=0, limit=100, starred_first=starred_first, order_dir=order_dir, is_intermediate=is_intermediate
+    )
+
+    image_names: list[str] = []
+    cursor: Optional[str] = None
+    while True:
+        page = image_records.get_many_by_cursor(
+            limit=4, cursor=cursor, starred_first=starred_first, order_dir=order_dir, is_intermediate=is_intermediate
+        )
+        assert page.total == expected.total
+        image_names.extend(r.image_name for r in page.items)
+        if not page.has_more:
+            assert page.next_cursor is None
+            break
+        cursor = page.next_cursor
+
+    assert image_names == [r.image_name for r in expected.items]
+
+
+def test_invalid_cursor_raises(image_records: SqliteImageRecordStorage):
+    with pytest.raises(ValueError):
+        image_records.get_many_by_cursor(cursor="not a cursor")
+    with pytest.raises(ValueError):
+        # The default order has three columns
+        image_records.get_many_by_cursor(cursor=encode_cursor(["2024-01-01", "a.png"]))
+
+
+def test_cached_counts_are_invalidated_by_changes(db: SqliteDatabase, image_records: SqliteImageRecordStorage):
+    boards = SqliteBoardRecordStorage(db)
+    board_images = SqliteBoardImageRecordStorage(db)
+    image_names = save_images(db, image_records, 10)
+    board_id = boards.save("board").board_id
+
+    def count(**kwargs) -> int:
+        total = image_records.get_many(**kwargs).total
+        assert image_records.get_many_by_cursor(**kwargs).total == total
+        return total
+
+    assert count() == 10
+    assert count(is_intermediate=False) == 8
+    assert count(board_id=board_id) == 0
+    assert count(board_id="none") == 10
+
+    board_images.add_image_to_board(board_id, image_names[1])
+    assert count(board_id=board_id) == 1
+    assert count(board_id="none") == 9
+
+    image_records.update(image_names[1], ImageRecordChanges(is_intermediate=True))
+    assert count(is_intermediate=False) == 7
+
+    image_records.delete(image_names[1])
+    assert count() == 9
+    assert count(board_id=board_id) == 0
+    assert count(categories=[ImageCategory.GENERAL]) == 9
+    assert count(categories=[ImageCategory.MASK]) == 0
+
+
+def test_counts_are_cached_while_unchanged(db: SqliteDatabase, image_records: SqliteImageRecordStorage):
+    save_images(db, image_records, 3)
+    counts = VersionedCountCache("images")
+    calls = 0
+
+    def count() -> int:
+        nonlocal calls
+        calls += 1
+        return calls
+
+    cursor = db.conn.cursor()
+    assert counts.get_count(cursor, "key", count) == 1
+    assert counts.get_count(cursor, "key", count) == 1
+    image_records.update("image_000.png", ImageRecordChanges(starred=True))
+    # Starring an image does not change the counts
+    assert counts.get_count(cursor, "key", count) == 1
+    image_records.update("image_000.png", ImageRecordChanges(is_intermediate=False))
+    assert counts.get_count(cursor, "key", count) == 2
@@ -0,0 +1,132 @@
+import json
+from typing import Any, Optional
+
+import pytest
+
+from invokeai.app.services.config.config_default import InvokeAIAppConfig
+from invokeai.app.services.image_records.image_records_common import ImageCategory, ResourceOrigin
+from invokeai.app.services.image_records.image_records_sqlite import SqliteImageRecordStorage
+from invokeai.app.services.shared.sqlite.sqlite_common import build_fts_query
+from invokeai.app.services.shared.sqlite.sqlite_database import SqliteDatabase
+from invokeai.app.services.shared.sqlite_migrator.migrations import migration_19
+from invokeai.backend.util.logging import InvokeAILogger
+from tests.fixtures.sqlite_database import create_mock_sqlite_database
+
+
+@pytest.fixture
+def db() -> SqliteDatabase:
+    return create_mock_sqlite_database(InvokeAIAppConfig(use_memory_db=True), InvokeAILogger.get_logger())
+
+
+@pytest.fixture
+def image_records(db: SqliteDatabase) -> SqliteImageRecordStorage:
+    return SqliteImageRecordStorage(db)
+
+
+def save_image(image_records: SqliteImageRecordStorage, image_name: str, metadata: Optional[Any]) -> None:
+    image_records.save(
+        image_name=image_name,
+        image_origin=ResourceOrigin.INTERNAL,
+        image_category=ImageCategory.GENERAL,
+        width=64,
+        height=64,
+        has_workflow=False,
+        metadata=json.dumps(metadata) if isinstance(metadata, dict) else metadata,
+    )
+
+
+def search(image_records: SqliteImageRecordStorage, query: str) -> list[str]:
+    return [r.image_name for r in image_records.search(query, limit=100).items]
+
+
+def listing(image_records: SqliteImageRecordStorage, search_term: str) -> set[str]:
+    results = image_records.get_many(limit=100, search_term=search_term)
+    assert results.total == len(results.items)
+    return {r.image_name for r in results.items}
+
+
+@pytest.fixture
+def images(image_records: SqliteImageRecordStorage) -> None:
+    save_image(
+        image_records,
+        "fox.png",
+        {
+            "positive_prompt": "a red fox in the snow",
+            "negative_prompt": "blurry",
+            "model": {"name": "Juggernaut XL", "key": "abc"},
+            "loras": [{"model": {"name": "pixel art"}, "weight": 0.75}],
+            "seed": 123456,
+            "scheduler": "dpmpp_2m",
+        },
+    )
+    # Mentions "fox" only in a LoRA name, so it ranks below the prompt match
+    save_image(
+        image_records,
+        "lora.png",
+        {"positive_prompt": "a landscape", "loras": [{"model": {"name": "fox style"}}], "seed": 1},
+    )
+    save_image(image_records, "empty.png", None)
+    save_image(image_records, "invalid.png", "{not json")
+    # Unrelated images, so that matching terms are rare enough to rank by
+    for i in range(6):
+        save_image(image_records, f"cat_{i}.png", {"positive_prompt": "a cat", "model": {"name": "SD 1.5"}, "seed": i})
+
+
+def test_build_fts_query():
+    assert build_fts_query('red "a fox" ban') == '"red"* "a fox" "ban"*'
+    assert build_fts_query('say "hi') == '"say"* "hi"'
+    assert build_fts_query('a"b NEAR(x)') == '"a""b"* "NEAR(x)"*'
+    assert build_fts_query("   ") is None
+
+
+@pytest.mark.usefixtures("images")
+def test_search_matches_prefixes_phrases_and_fields(image_records: SqliteImageRecordStorage):
+    assert search(image_records, "fox") == ["fox.png", "lora.png"]
+    assert search(image_records, "snow fo") == ["fox.png"]
+    assert search(image_records, '"red fox"') == ["fox.png"]
+    assert search(image_records, '"fox red"') == []
+    assert search(image_records, "juggernaut") == ["fox.png"]
+    assert search(image_records, "123456") == ["fox.png"]
+    assert search(image_records, "dpmpp") == ["fox.png"]
+    assert search(image_records, "BLURRY") == ["fox.png"]
+    assert search(image_records, "") == []
+    assert image_records.search("fox", limit=1).total == 2
+
+    assert listing(image_records, "fox") == {"fox.png", "lora.png"}
+    assert listing(image_records, '"pixel art"') == {"fox.png"}
+
+
+@pytest.mark.usefixtures("images")
+def test_search_index_follows_changes(db: SqliteDatabase, image_records: SqliteImageRecordStorage):
+    db.conn.execute(
+        "UPDATE images SET metadata = ? WHERE image_name = 'empty.png';",
+        (json.dumps({"positive_prompt": "an arctic fox"}),),
+    )
+    db.conn.commit()
+    assert search(image_records, "arctic") == ["empty.png"]
+    assert listing(image_records, "fox") == {"fox.png", "lora.png", "empty.png"}
+
+    image_records.delete("fox.png")
+    assert search(image_records, "snow") == []
+    assert listing(image_records, "fox") == {"lora.png", "empty.png"}
+    assert db.conn.execute("SELECT COUNT(*) FROM images_fts;").fetchone()[0] == 9
+    assert db.conn.execute("SELECT COUNT(*) FROM images_fts_rowids;").fetchone()[0] == 9
+
+
+@pytest.mark.usefixtures("images")
+def test_migration_backfills_in_batches(
+    db: SqliteDatabase, image_records: SqliteImageRecordStorage, monkeypatch: pytest.MonkeyPatch
+):
+    for stmt in [
+        "DROP TABLE images_fts;",
+        "DROP TABLE images_fts_rowids;",
+        "DROP TABLE workflow_library_fts;",
+        "DROP TABLE workflow_library_fts_rowids;",
+    ]:
+        db.conn.execute(stmt)
+    monkeypatch.setattr(migration_19, "BACKFILL_BATCH_SIZE", 1)
+    migration_19.Migration19Callback()(db.conn.cursor())
+    db.conn.commit()
+
+    assert search(image_records, "fox") == ["fox.png", "lora.png"]
+    assert db.conn.execute("SELECT COUNT(*) FROM images_fts;").fetchone()[0] == 10
@@ -0,0 +1,83 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Sequence
+
+import pytest
+
+from invokeai.app.services.session_processor.micro_batcher import MicroBatcher
+
+
+class BatchRecorder:
+    def __init__(self):
+        self.batches: list[list[int]] = []
+
+    def __call__(self, items: list[int]) -> Sequence[int | Exception]:
+        self.batches.append(items)
+        return [ValueError(f"odd {item}") if item % 2 else item * 10 for item in items]
+
+
+def submit_concurrently(batcher: MicroBatcher[int, int], keys_and_items: list[tuple[str, int]], run_batch):
+    barrier = threading.Barrier(len(keys_and_items))
+
+    def submit(key: str, item: int) -> int | Exception:
+        barrier.wait()
+        try:
+            return batcher.run(key, item, run_batch)
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(len(keys_and_items)) as executor:
+        futures = [executor.submit(submit, key, item) for key, item in keys_and_items]
+        return [future.result() for future in futures]
+
+
+def test_compatible_items_are_batched():
+    batcher: MicroBatcher[int, int] = MicroBatcher(max_batch_size=4, max_wait=5)
+    run_batch = BatchRecorder()
+    results = submit_concurrently(batcher, [("a", 0), ("a", 2), ("a", 4), ("a", 6)], run_batch)
+    assert results == [0, 20, 40, 60]
+    assert len(run_batch.batches) == 1
+    assert sorted(run_batch.batches[0]) == [0, 2, 4, 6]
+
+
+def test_incompatible_items_are_not_batched():
+    batcher: MicroBatcher[int, int] = MicroBatcher(max_batch_size=2, max_wait=5)
+    run_batch = BatchRecorder()
+    results = submit_concurrently(batcher, [("a", 0), ("b", 2), ("a", 4), ("b", 6)], run_batch)
+    assert results == [0, 20, 40, 60]
+    assert sorted(sorted(batch) for batch in run_batch.batches) == [[0, 4], [2, 6]]
+
+
+def test_item_exceptions_are_raised_for_their_item_only():
+    batcher: MicroBatcher[int, int] = MicroBatcher(max_batch_size=2, max_wait=5)
+    results = submit_concurrently(batcher, [("a", 1), ("a", 2)], BatchRecorder())
+    assert isinstance(results[0], ValueError)
+    assert results[1] == 20
+
+
+def test_batch_exceptions_are_raised_for_all_items():
+    batcher: MicroBatcher[int, int] = MicroBatcher(max_batch_size=2, max_wait=5)
+
+    def run_batch(items: list[int]) -> list[int]:
+        raise RuntimeError("out of memory")
+
+    results = submit_concurrently(batcher, [("a", 1), ("a", 2)], run_batch)
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_batch_runs_after_max_wait():
+    batcher: MicroBatcher[int, int] = MicroBatcher(max_batch_size=2, max_wait=0.05)
+    run_batch = BatchRecorder()
+    assert batcher.run("a", 2, run_batch) == 20
+    assert run_batch.batches == [[2]]
+
+
+@pytest.mark.parametrize("max_batch_size,get_max_batch_size", [(1, None), (4, lambda: 1)])
+def test_batch_does_not_wait_for_items_that_cannot_arrive(max_batch_size: int, get_max_batch_size):
+    batcher: MicroBatcher[int, int] = MicroBatcher(
+        max_batch_size=max_batch_size, max_wait=60, get_max_batch_size=get_max_batch_size
+    )
+    start = time.monotonic()
+    assert batcher.run("a", 2, BatchRecorder()) == 20
+    assert time.monotonic() - start < 5
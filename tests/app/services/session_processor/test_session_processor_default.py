@@ -0,0 +1,126 @@
+import threading
+from threading import Event
+from typing import Callable, Optional
+
+import pytest
+import torch
+
+from invokeai.app.invocations.baseinvocation import BaseInvocation
+from invokeai.app.services.invocation_services import InvocationServices
+from invokeai.app.services.invoker import Invoker
+from invokeai.app.services.session_processor.session_processor_base import SessionRunnerBase
+from invokeai.app.services.session_processor.session_processor_default import DefaultSessionProcessor
+from invokeai.app.services.session_queue.session_queue_common import DEFAULT_QUEUE_ID, Batch, SessionQueueItem
+from invokeai.app.services.session_queue.session_queue_sqlite import SqliteSessionQueue
+from invokeai.app.services.shared.graph import Graph
+from invokeai.app.util.profiler import Profiler
+from invokeai.backend.util.devices import TorchDevice
+from invokeai.backend.util.logging import InvokeAILogger
+from tests.fixtures.sqlite_database import create_mock_sqlite_database
+from tests.test_nodes import PromptTestInvocation, wait_until
+
+
+class ConcurrentSessionRunner(SessionRunnerBase):
+    """A session runner that only completes its queue item once `parties` sessions are running at the same time."""
+
+    def __init__(self, parties: int):
+        self.barrier = threading.Barrier(parties)
+        self.runs: list[tuple[str, int, torch.device]] = []
+        self.errors: list[Exception] = []
+
+    def start(self, services: InvocationServices, cancel_event: Event, profiler: Optional[Profiler] = None) -> None:
+        self._services = services
+        self._cancel_event = cancel_event
+
+    def run(self, queue_item: SessionQueueItem) -> None:
+        self.runs.append((threading.current_thread().name, queue_item.item_id, TorchDevice.choose_torch_device()))
+        try:
+            self.barrier.wait(timeout=5)
+        except threading.BrokenBarrierError as e:
+            self.errors.append(e)
+        self._services.session_queue.complete_queue_item(queue_item.item_id)
+
+    def run_node(self, invocation: BaseInvocation, queue_item: SessionQueueItem) -> None:
+        pass
+
+
+@pytest.fixture
+def session_queue(mock_invoker: Invoker) -> SqliteSessionQueue:
+    db = create_mock_sqlite_database(mock_invoker.services.configuration, InvokeAILogger.get_logger())
+    session_queue = SqliteSessionQueue(db=db)
+    mock_invoker.services.session_queue = session_queue
+    session_queue.start(mock_invoker)
+    return session_queue
+
+
+def run_processor(processor: DefaultSessionProcessor, invoker: Invoker, session_queue: SqliteSessionQueue, runs: int):
+    g = Graph()
+    g.add_node(PromptTestInvocation(id="1", prompt="Banana sushi"))
+    processor.start(invoker)
+    try:
+        session_queue.enqueue_batch(DEFAULT_QUEUE_ID, Batch(graph=g, runs=runs), prepend=False)
+        wait_until(lambda: session_queue.get_queue_status(DEFAULT_QUEUE_ID).completed == runs)
+    finally:
+        processor.stop()
+        for worker in processor._workers:
+            assert worker.thread is not None
+            worker.thread.join(timeout=5)
+
+
+def test_workers_process_items_concurrently(mock_invoker: Invoker, session_queue: SqliteSessionQueue):
+    runner = ConcurrentSessionRunner(parties=2)
+    processor = DefaultSessionProcessor(session_runner=runner, thread_limit=2)
+    run_processor(processor, mock_invoker, session_queue, runs=4)
+
+    # Each pair of items is only completed once both workers are running an item at the same time
+    assert runner.errors == []
+    assert len(runner.runs) == 4
+    assert len({item_id for _, item_id, _ in runner.runs}) == 4
+    assert {thread_name for thread_name, _, _ in runner.runs} == {"session_processor_0", "session_processor_1"}
+    assert not processor.get_status().is_processing
+
+
+def test_workers_are_assigned_devices(mock_invoker: Invoker, session_queue: SqliteSessionQueue):
+    runner = ConcurrentSessionRunner(parties=2)
+    processor = DefaultSessionProcessor(session_runner=runner, thread_limit=2, devices=["cpu", "meta"])
+    run_processor(processor, mock_invoker, session_queue, runs=2)
+
+    assert runner.errors == []
+    devices_by_thread = {thread_name: device for thread_name, _, device in runner.runs}
+    assert devices_by_thread == {
+        "session_processor_0": torch.device("cpu"),
+        "session_processor_1": torch.device("meta"),
+    }
+
+
+class BatchingSessionRunner(ConcurrentSessionRunner):
+    """A session runner that runs each queue item's id through the session processor's micro-batcher, once two
+    sessions are running at the same time."""
+
+    def __init__(self, processor: Callable[[], DefaultSessionProcessor]):
+        super().__init__(parties=2)
+        self.processor = processor
+        self.batches: list[list[int]] = []
+
+    def run(self, queue_item: SessionQueueItem) -> None:
+        def run_batch(item_ids: list[int]) -> list[int]:
+            self.batches.append(item_ids)
+            return item_ids
+
+        try:
+            self.barrier.wait(timeout=5)
+            assert self.processor().run_batched("key", queue_item.item_id, run_batch) == queue_item.item_id
+        except Exception as e:
+            self.errors.append(e)
+        self._services.session_queue.complete_queue_item(queue_item.item_id)
+
+
+def test_workers_run_compatible_items_in_batches(mock_invoker: Invoker, session_queue: SqliteSessionQueue):
+    runner = BatchingSessionRunner(processor=lambda: processor)
+    processor = DefaultSessionProcessor(session_runner=runner, thread_limit=2, micro_batch_size=2, micro_batch_wait=5)
+    assert processor.supports_batching
+    assert not DefaultSessionProcessor(micro_batch_size=1).supports_batching
+    run_processor(processor, mock_invoker, session_queue, runs=4)
+
+    assert runner.errors == []
+    assert sorted(sorted(batch) for batch in runner.batches) == [[1, 2], [3, 4]]
@@ -0,0 +1,164 @@
+import multiprocessing
+import os
+import threading
+from pathlib import Path
+
+import pytest
+
+from invokeai.app.services.invoker import Invoker
+from invokeai.app.services.session_processor.session_processor_common import SessionProcessorStatus
+from invokeai.app.services.session_processor.session_processor_default import DefaultSessionProcessor
+from invokeai.app.services.session_processor.session_processor_process import (
+    CancelSession,
+    ProcessSessionRunner,
+    ServiceCall,
+    ServiceCallResult,
+    ServiceProxy,
+    SessionJob,
+    SessionWorkerClient,
+    StopWorker,
+    WorkerSessionProcessor,
+)
+from invokeai.app.services.session_queue.session_queue_common import DEFAULT_QUEUE_ID, Batch
+from invokeai.app.services.session_queue.session_queue_sqlite import SqliteSessionQueue
+from invokeai.app.services.shared.graph import Graph
+from invokeai.backend.util.logging import InvokeAILogger
+from tests.fixtures.sqlite_database import create_mock_sqlite_database
+from tests.test_nodes import ErrorInvocation, PromptTestInvocation, TestEventService, wait_until
+
+
+@pytest.fixture
+def session_queue(mock_invoker: Invoker) -> SqliteSessionQueue:
+    db = create_mock_sqlite_database(mock_invoker.services.configuration, InvokeAILogger.get_logger())
+    session_queue = SqliteSessionQueue(db=db)
+    mock_invoker.services.session_queue = session_queue
+    session_queue.start(mock_invoker)
+    return session_queue
+
+
+def test_worker_process_runs_sessions(mock_invoker: Invoker, session_queue: SqliteSessionQueue, tmp_path: Path):
+    mock_invoker.services.configuration._root = tmp_path
+    runner = ProcessSessionRunner()
+    processor = DefaultSessionProcessor(session_runner=runner)
+
+    g = Graph()
+    g.add_node(PromptTestInvocation(id="1", prompt="Banana sushi"))
+    error_graph = Graph()
+    error_graph.add_node(ErrorInvocation(id="1"))
+
+    processor.start(mock_invoker)
+    try:
+        session_queue.enqueue_batch(DEFAULT_QUEUE_ID, Batch(graph=g, runs=2), prepend=False)
+        session_queue.enqueue_batch(DEFAULT_QUEUE_ID, Batch(graph=error_graph), prepend=False)
+        wait_until(lambda: session_queue.get_queue_status(DEFAULT_QUEUE_ID).pending == 0, timeout=120)
+        wait_until(lambda: not processor.get_status().is_processing)
+
+        assert runner._process is not None
+        assert runner._process.pid != os.getpid()
+    finally:
+        processor.stop()
+        for worker in processor._workers:
+            assert worker.thread is not None
+            worker.thread.join(timeout=30)
+
+    # The worker process is stopped with its worker thread
+    assert runner._process is None
+
+    queue_status = session_queue.get_queue_status(DEFAULT_QUEUE_ID)
+    assert (queue_status.completed, queue_status.failed) == (2, 1)
+
+    # The queue items were updated via the API process
+    completed = session_queue.get_queue_item(1)
+    assert completed.session.is_complete()
+    failed = session_queue.get_queue_item(3)
+    assert failed.error_type == "Exception"
+
+    # Events from the worker process were dispatched by the API process
+    events = mock_invoker.services.events
+    assert isinstance(events, TestEventService)
+    event_names = [e.__event_name__ for e in events.events]
+    assert event_names.count("invocation_complete") == 2
+    assert event_names.count("invocation_error") == 1
+
+
+def test_worker_client_keeps_cancel_that_follows_job():
+    conn, worker_conn = multiprocessing.Pipe()
+    client = SessionWorkerClient(worker_conn)
+
+    conn.send(SessionJob(queue_item=None))  # type: ignore
+    conn.send(CancelSession())
+    assert client.next_job() is not None
+    wait_until(client.cancel_event.is_set)
+
+    # The next job starts out not canceled
+    conn.send(SessionJob(queue_item=None))  # type: ignore
+    assert client.next_job() is not None
+    assert not client.cancel_event.is_set()
+
+    conn.send(StopWorker())
+    assert client.next_job() is None
+
+
+def test_service_proxy_forwards_calls():
+    conn, worker_conn = multiprocessing.Pipe()
+    client = SessionWorkerClient(worker_conn)
+    proxy = ServiceProxy(client, "session_queue")
+    calls: list[ServiceCall] = []
+
+    def api_process():
+        for result in (ServiceCallResult(value="queue item"), ServiceCallResult(error=KeyError("missing"))):
+            calls.append(conn.recv())
+            conn.send(result)
+
+    thread = threading.Thread(target=api_process)
+    thread.start()
+    assert proxy.get_queue_item(1) == "queue item"
+    with pytest.raises(KeyError):
+        proxy.get_queue_item(item_id=2)
+    thread.join()
+
+    assert [(c.service, c.method, c.args, c.kwargs) for c in calls] == [
+        ("session_queue", "get_queue_item", (1,), {}),
+        ("session_queue", "get_queue_item", (), {"item_id": 2}),
+    ]
+
+
+def test_worker_session_processor_forwards_to_api_process():
+    conn, worker_conn = multiprocessing.Pipe()
+    processor = WorkerSessionProcessor(SessionWorkerClient(worker_conn))
+    status = SessionProcessorStatus(is_started=True, is_processing=False)
+    calls: list[ServiceCall] = []
+
+    def api_process():
+        calls.append(conn.recv())
+        conn.send(ServiceCallResult(value=status))
+
+    thread = threading.Thread(target=api_process)
+    thread.start()
+    assert processor.get_status() == status
+    thread.join()
+
+    assert [(c.service, c.method) for c in calls] == [("session_processor", "get_status")]
+
+
+def test_worker_process_runs_nodes(mock_invoker: Invoker, session_queue: SqliteSessionQueue, tmp_path: Path):
+    mock_invoker.services.configuration._root = tmp_path
+    runner = ProcessSessionRunner()
+    runner.start(services=mock_invoker.services, cancel_event=threading.Event())
+
+    g = Graph()
+    g.add_node(PromptTestInvocation(id="1", prompt="Banana sushi"))
+    session_queue.enqueue_batch(DEFAULT_QUEUE_ID, Batch(graph=g), prepend=False)
+    queue_item = session_queue.dequeue()
+    assert queue_item is not None
+    invocation = queue_item.session.next()
+    assert invocation is not None
+
+    try:
+        runner.run_node(invocation=invocation, queue_item=queue_item)
+    finally:
+        runner.stop()
+
+    # Only the given node was run, and the queue item's session has its output
+    assert queue_item.session.is_complete()
+    assert queue_item.session.results[invocation.id].prompt == "Banana sushi"  # type: ignore
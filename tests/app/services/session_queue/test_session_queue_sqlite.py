@@ -0,0 +1,257 @@
+import threading
+
+import pytest
+
+from invokeai.app.services.config.config_default import InvokeAIAppConfig
+from invokeai.app.services.invoker import Invoker
+from invokeai.app.services.session_queue.session_queue_common import (
+    DEFAULT_QUEUE_ID,
+    Batch,
+    SessionQueueItemNotFoundError,
+)
+from invokeai.app.services.session_queue.session_queue_sqlite import SqliteSessionQueue
+from invokeai.app.services.shared.graph import Graph
+from invokeai.app.services.shared.sqlite.sqlite_database import SqliteDatabase
+from invokeai.backend.util.logging import InvokeAILogger
+from tests.fixtures.sqlite_database import create_mock_sqlite_database
+from tests.test_nodes import PromptTestInvocation, TestEventService
+
+
+@pytest.fixture
+def db() -> SqliteDatabase:
+    config = InvokeAIAppConfig(use_memory_db=True)
+    logger = InvokeAILogger.get_logger()
+    return create_mock_sqlite_database(config, logger)
+
+
+@pytest.fixture
+def session_queue(db: SqliteDatabase, mock_invoker: Invoker) -> SqliteSessionQueue:
+    session_queue = SqliteSessionQueue(db=db)
+    session_queue.start(mock_invoker)
+    return session_queue
+
+
+def make_batch(runs: int = 1, origin: str | None = None, destination: str | None = None) -> Batch:
+    g = Graph()
+    g.add_node(PromptTestInvocation(id="1", prompt="Banana sushi"))
+    return Batch(graph=g, runs=runs, origin=origin, destination=destination)
+
+
+def count_by_status(db: SqliteDatabase, queue_id: str, batch_id: str | None = None) -> dict[str, int]:
+    """Counts queue items by status the slow way, to compare with the counters."""
+    query = "SELECT status, count(*) FROM session_queue WHERE queue_id = ?"
+    params = [queue_id]
+    if batch_id is not None:
+        query += " AND batch_id = ?"
+        params.append(batch_id)
+    query += " GROUP BY status"
+    return dict(db.conn.execute(query, params).fetchall())
+
+
+def assert_counts_match(session_queue: SqliteSessionQueue, db: SqliteDatabase, batch_id: str) -> None:
+    queue_status = session_queue.get_queue_status(DEFAULT_QUEUE_ID)
+    batch_status = session_queue.get_batch_status(DEFAULT_QUEUE_ID, batch_id)
+    for status, counts in (
+        (queue_status, count_by_status(db, DEFAULT_QUEUE_ID)),
+        (batch_status, count_by_status(db, DEFAULT_QUEUE_ID, batch_id)),
+    ):
+        assert status.pending == counts.get("pending", 0)
+        assert status.in_progress == counts.get("in_progress", 0)
+        assert status.completed == counts.get("completed", 0)
+        assert status.failed == counts.get("failed", 0)
+        assert status.canceled == counts.get("canceled", 0)
+        assert status.total == sum(counts.values())
+
+
+def test_counts_follow_status_transitions(session_queue: SqliteSessionQueue, db: SqliteDatabase):
+    batch = make_batch(runs=5, origin="canvas", destination="gallery")
+    session_queue.enqueue_batch(DEFAULT_QUEUE_ID, batch, prepend=False)
+    assert_counts_match(session_queue, db, batch.batch_id)
+    assert session_queue.get_queue_status(DEFAULT_QUEUE_ID).pending == 5
+
+    first = session_queue.dequeue()
+    assert first is not None
+    assert_counts_match(session_queue, db, batch.batch_id)
+    assert session_queue.get_queue_status(DEFAULT_QUEUE_ID).item_id == first.item_id
+
+    session_queue.complete_queue_item(first.item_id)
+    second = session_queue.dequeue()
+    assert second is not None
+    session_queue.fail_queue_item(second.item_id, "TestError", "test error", "traceback")
+    session_queue.cancel_by_batch_ids(DEFAULT_QUEUE_ID, [batch.batch_id])
+    assert_counts_match(session_queue, db, batch.batch_id)
+
+    batch_status = session_queue.get_batch_status(DEFAULT_QUEUE_ID, batch.batch_id)
+    assert batch_status.origin == "canvas"
+    assert batch_status.destination == "gallery"
+    assert (batch_status.completed, batch_status.failed, batch_status.canceled) == (1, 1, 3)
+
+
+def test_status_changed_events_use_counts(session_queue: SqliteSessionQueue, mock_invoker: Invoker):
+    batch = make_batch(runs=2)
+    session_queue.enqueue_batch(DEFAULT_QUEUE_ID, batch, prepend=False)
+    queue_item = session_queue.dequeue()
+    assert queue_item is not None
+
+    events = mock_invoker.services.events
+    assert isinstance(events, TestEventService)
+    event = events.events[-1]
+    assert event.__event_name__ == "queue_item_status_changed"
+    assert event.status == "in_progress"
+    assert event.batch_status.pending == 1
+    assert event.batch_status.in_progress == 1
+    assert event.queue_status.pending == 1
+    assert event.queue_status.in_progress == 1
+
+
+def test_counts_after_prune_and_clear(session_queue: SqliteSessionQueue, db: SqliteDatabase):
+    batch = make_batch(runs=3)
+    session_queue.enqueue_batch(DEFAULT_QUEUE_ID, batch, prepend=False)
+    queue_item = session_queue.dequeue()
+    assert queue_item is not None
+    session_queue.complete_queue_item(queue_item.item_id)
+
+    assert session_queue.prune(DEFAULT_QUEUE_ID).deleted == 1
+    assert_counts_match(session_queue, db, batch.batch_id)
+    assert not session_queue.is_empty(DEFAULT_QUEUE_ID).is_empty
+
+    assert session_queue.clear(DEFAULT_QUEUE_ID).deleted == 2
+    assert_counts_match(session_queue, db, batch.batch_id)
+    assert session_queue.is_empty(DEFAULT_QUEUE_ID).is_empty
+    # Batches with no remaining items are removed from the counters
+    assert db.conn.execute("SELECT count(*) FROM session_queue_batch_counts").fetchone()[0] == 0
+
+
+def test_dequeue_order_and_pending_index(session_queue: SqliteSessionQueue, db: SqliteDatabase):
+    first = make_batch(runs=2)
+    prepended = make_batch(runs=1)
+    session_queue.enqueue_batch(DEFAULT_QUEUE_ID, first, prepend=False)
+    session_queue.enqueue_batch(DEFAULT_QUEUE_ID, prepended, prepend=True)
+
+    next_item = session_queue.get_next(DEFAULT_QUEUE_ID)
+    dequeued = session_queue.dequeue()
+    assert next_item is not None and dequeued is not None
+    assert dequeued.item_id == next_item.item_id
+    assert dequeued.batch_id == prepended.batch_id
+
+    # The planner picks the indexes that match the pending item ordering without hints, so no sort is needed
+    for query, index in [
+        (
+            "SELECT item_id FROM session_queue WHERE status = 'pending' ORDER BY priority DESC, item_id ASC LIMIT 1",
+            "idx_session_queue_pending",
+        ),
+        (
+            "SELECT * FROM session_queue WHERE queue_id = ? AND status = 'pending' "
+            "ORDER BY priority DESC, item_id ASC LIMIT 1",
+            "idx_session_queue_queue_id_status_priority_item_id",
+        ),
+        (
+            "SELECT MAX(priority) FROM session_queue WHERE queue_id = ? AND status = 'pending'",
+            "idx_session_queue_queue_id_status_priority_item_id",
+        ),
+    ]:
+        plan = [
+            row[-1] for row in db.conn.execute(f"EXPLAIN QUERY PLAN {query}", (DEFAULT_QUEUE_ID,) * query.count("?"))
+        ]
+        assert any(index in detail for detail in plan), plan
+        assert not any("TEMP B-TREE" in detail for detail in plan), plan
+
+
+def test_concurrent_dequeue_claims_each_item_once(session_queue: SqliteSessionQueue):
+    session_queue.enqueue_batch(DEFAULT_QUEUE_ID, make_batch(runs=40), prepend=False)
+    claimed: list[int] = []
+    claimed_lock = threading.Lock()
+
+    def worker():
+        while (queue_item := session_queue.dequeue()) is not None:
+            with claimed_lock:
+                claimed.append(queue_item.item_id)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(claimed) == 40
+    assert len(set(claimed)) == 40
+    assert session_queue.get_queue_status(DEFAULT_QUEUE_ID).in_progress == 40
+
+
+def test_cancel_by_queue_id_cancels_all_in_progress_items(session_queue: SqliteSessionQueue, mock_invoker: Invoker):
+    session_queue.enqueue_batch(DEFAULT_QUEUE_ID, make_batch(runs=3), prepend=False)
+    first = session_queue.dequeue()
+    second = session_queue.dequeue()
+    assert first is not None and second is not None
+
+    assert session_queue.cancel_by_queue_id(DEFAULT_QUEUE_ID).canceled == 3
+
+    # A status changed event is emitted for each in-progress item, so that each worker can stop processing its item
+    events = mock_invoker.services.events
+    assert isinstance(events, TestEventService)
+    canceled_item_ids = {
+        e.item_id for e in events.events if e.__event_name__ == "queue_item_status_changed" and e.status == "canceled"
+    }
+    assert canceled_item_ids == {first.item_id, second.item_id}
+
+
+def test_list_queue_items_cursor_respects_filters(session_queue: SqliteSessionQueue):
+    session_queue.enqueue_batch(DEFAULT_QUEUE_ID, make_batch(runs=3), prepend=False)
+    # The other queue's items have the same priority and later item ids, so they would match the cursor alone
+    session_queue.enqueue_batch("other_queue", make_batch(runs=3), prepend=False)
+
+    first_page = session_queue.list_queue_items(DEFAULT_QUEUE_ID, limit=1, priority=0, status="pending")
+    assert first_page.has_more
+    last = first_page.items[-1]
+    second_page = session_queue.list_queue_items(
+        DEFAULT_QUEUE_ID, limit=10, priority=last.priority, cursor=last.item_id, status="pending"
+    )
+    # The cursor condition must not bypass the queue and status filters
+    assert not second_page.has_more
+    assert len(second_page.items) == 2
+    assert all(i.queue_id == DEFAULT_QUEUE_ID and i.status == "pending" for i in second_page.items)
+
+
+def test_stop_without_start(db: SqliteDatabase):
+    # The service is stopped on shutdown even if the app failed to start it
+    SqliteSessionQueue(db=db).stop()
+
+
+def test_archive_history_keeps_recent_items(
+    session_queue: SqliteSessionQueue, db: SqliteDatabase, mock_invoker: Invoker, monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setattr(mock_invoker.services.configuration, "queue_history_keep_items", 3)
+    monkeypatch.setattr(mock_invoker.services.configuration, "queue_history_keep_days", 1)
+    # Archive in several batches
+    monkeypatch.setattr(session_queue, "_ARCHIVE_BATCH_SIZE", 2)
+    batch = make_batch(runs=12, destination="gallery")
+    session_queue.enqueue_batch(DEFAULT_QUEUE_ID, batch, prepend=False)
+    finished: list[int] = []
+    for _ in range(10):
+        queue_item = session_queue.dequeue()
+        assert queue_item is not None
+        session_queue.complete_queue_item(queue_item.item_id)
+        finished.append(queue_item.item_id)
+    failed = session_queue.get_queue_item(finished[0])
+    session_queue.fail_queue_item(failed.item_id, "TestError", "test error", "traceback")
+
+    # Only the first 8 finished items are old enough to be archived
+    db.conn.executemany(
+        "UPDATE session_queue SET completed_at = '2000-01-01 00:00:00.000' WHERE item_id = ?;",
+        [(item_id,) for item_id in finished[:8]],
+    )
+    db.conn.commit()
+
+    # The last 3 finished items are kept, though one of them is old
+    assert session_queue.archive_history().archived == 7
+    assert session_queue.archive_history().archived == 0
+    assert_counts_match(session_queue, db, batch.batch_id)
+    queue_status = session_queue.get_queue_status(DEFAULT_QUEUE_ID)
+    assert (queue_status.pending, queue_status.completed) == (2, 3)
+
+    history = db.conn.execute("SELECT item_id, status, destination, error_type FROM session_queue_history").fetchall()
+    assert [tuple(row) for row in history] == [(finished[0], "failed", "gallery", "TestError")] + [
+        (item_id, "completed", "gallery", None) for item_id in finished[1:7]
+    ]
+    with pytest.raises(SessionQueueItemNotFoundError):
+        session_queue.get_queue_item(finished[0])
@@ -0,0 +1,181 @@
+"""
+Query plan regression tests for the hot database queries.
+
+Each test runs a service method while recording the statements it executes, then runs `EXPLAIN QUERY PLAN` for each
+statement and fails if any table is fully scanned. A scan of an index, e.g. to read rows in the order of a listing, is
+allowed.
+"""
+
+import re
+from contextlib import contextmanager
+from typing import Callable, Iterator, NamedTuple
+
+import pytest
+
+from invokeai.app.services.board_image_records.board_image_records_sqlite import SqliteBoardImageRecordStorage
+from invokeai.app.services.board_records.board_records_sqlite import SqliteBoardRecordStorage
+from invokeai.app.services.config.config_default import InvokeAIAppConfig
+from invokeai.app.services.image_records.image_records_common import ImageCategory, ResourceOrigin
+from invokeai.app.services.image_records.image_records_sqlite import SqliteImageRecordStorage
+from invokeai.app.services.invoker import Invoker
+from invokeai.app.services.model_records.model_records_base import UnknownModelException
+from invokeai.app.services.model_records.model_records_sql import ModelRecordServiceSQL
+from invokeai.app.services.session_queue.session_queue_common import DEFAULT_QUEUE_ID, Batch
+from invokeai.app.services.session_queue.session_queue_sqlite import SqliteSessionQueue
+from invokeai.app.services.shared.graph import Graph
+from invokeai.app.services.shared.sqlite.sqlite_common import SQLiteDirection
+from invokeai.app.services.shared.sqlite.sqlite_database import SqliteDatabase
+from invokeai.app.services.workflow_records.workflow_records_common import (
+    WorkflowCategory,
+    WorkflowRecordOrderBy,
+)
+from invokeai.app.services.workflow_records.workflow_records_sqlite import SqliteWorkflowRecordsStorage
+from invokeai.backend.util.logging import InvokeAILogger
+from tests.fixtures.sqlite_database import create_mock_sqlite_database
+from tests.test_nodes import PromptTestInvocation
+
+# A full scan of a table is reported as `SCAN <table>`, while scans of an index are reported as
+# `SCAN <table> USING [COVERING] INDEX <index>`, and scans of a virtual table as `SCAN <table> VIRTUAL TABLE ...`.
+FULL_SCAN = re.compile(r"^SCAN (\w+)$")
+
+
+class Stores(NamedTuple):
+    images: SqliteImageRecordStorage
+    boards: SqliteBoardRecordStorage
+    board_images: SqliteBoardImageRecordStorage
+    workflows: SqliteWorkflowRecordsStorage
+    models: ModelRecordServiceSQL
+    session_queue: SqliteSessionQueue
+    board_id: str
+
+
+@pytest.fixture
+def db() -> SqliteDatabase:
+    return create_mock_sqlite_database(InvokeAIAppConfig(use_memory_db=True), InvokeAILogger.get_logger())
+
+
+@pytest.fixture
+def stores(db: SqliteDatabase, mock_invoker: Invoker) -> Stores:
+    session_queue = SqliteSessionQueue(db=db)
+    session_queue.start(mock_invoker)
+    g = Graph()
+    g.add_node(PromptTestInvocation(id="1", prompt="Banana sushi"))
+    session_queue.enqueue_batch(DEFAULT_QUEUE_ID, Batch(graph=g, runs=3, destination="canvas"), prepend=False)
+
+    images = SqliteImageRecordStorage(db)
+    boards = SqliteBoardRecordStorage(db)
+    board_images = SqliteBoardImageRecordStorage(db)
+    board_id = boards.save("board").board_id
+    for i in range(3):
+        images.save(
+            image_name=f"image_{i}.png",
+            image_origin=ResourceOrigin.INTERNAL,
+            image_category=ImageCategory.GENERAL,
+            width=64,
+            height=64,
+            has_workflow=False,
+            metadata='{"positive_prompt": "banana sushi"}',
+        )
+        board_images.add_image_to_board(board_id, f"image_{i}.png")
+
+    return Stores(
+        images=images,
+        boards=boards,
+        board_images=board_images,
+        workflows=SqliteWorkflowRecordsStorage(db),
+        models=ModelRecordServiceSQL(db, InvokeAILogger.get_logger()),
+        session_queue=session_queue,
+        board_id=board_id,
+    )
+
+
+@contextmanager
+def record_statements(db: SqliteDatabase) -> Iterator[list[str]]:
+    """Records the statements executed on the database, with their parameters bound."""
+    statements: list[str] = []
+    db.conn.set_trace_callback(statements.append)
+    try:
+        yield statements
+    finally:
+        db.conn.set_trace_callback(None)
+
+
+def get_full_scans(db: SqliteDatabase, statement: str) -> list[str]:
+    """Gets the tables that are fully scanned by a statement."""
+    plan = db.conn.execute(f"EXPLAIN QUERY PLAN {statement}").fetchall()
+    return [m.group(1) for row in plan if (m := FULL_SCAN.match(row[-1]))]
+
+
+def is_query(statement: str) -> bool:
+    """Whether a statement reads from tables. Statements run by triggers are reported as comments, and are skipped."""
+    lines = [line for line in statement.strip().splitlines() if not line.strip().startswith("--")]
+    return bool(lines) and lines[0].split()[0].upper() in ("SELECT", "UPDATE", "DELETE", "WITH")
+
+
+def get_model_by_hash(stores: Stores) -> None:
+    with pytest.raises(UnknownModelException):
+        stores.models.get_model_by_hash("ABC123")
+
+
+HOT_PATHS: dict[str, Callable[[Stores], object]] = {
+    "models.get_model_by_hash": get_model_by_hash,
+    "models.search_by_hash": lambda s: s.models.search_by_hash("ABC123"),
+    "session_queue.dequeue": lambda s: s.session_queue.dequeue(),
+    "session_queue.get_next": lambda s: s.session_queue.get_next(DEFAULT_QUEUE_ID),
+    "session_queue.get_current": lambda s: s.session_queue.get_current(DEFAULT_QUEUE_ID),
+    "session_queue.get_queue_status": lambda s: s.session_queue.get_queue_status(DEFAULT_QUEUE_ID),
+    "session_queue.list_queue_items": lambda s: s.session_queue.list_queue_items(
+        DEFAULT_QUEUE_ID, limit=10, priority=0, cursor=1
+    ),
+    "session_queue.list_queue_items_by_status": lambda s: s.session_queue.list_queue_items(
+        DEFAULT_QUEUE_ID, limit=10, priority=0, cursor=1, status="pending"
+    ),
+    "session_queue.get_counts_by_destination": lambda s: s.session_queue.get_counts_by_destination(
+        DEFAULT_QUEUE_ID, "canvas"
+    ),
+    "session_queue.enqueue_batch_prepend": lambda s: s.session_queue.enqueue_batch(
+        DEFAULT_QUEUE_ID, Batch(graph=Graph(), runs=1), prepend=True
+    ),
+    "session_queue.cancel_by_destination": lambda s: s.session_queue.cancel_by_destination(DEFAULT_QUEUE_ID, "canvas"),
+    "session_queue.cancel_by_queue_id": lambda s: s.session_queue.cancel_by_queue_id(DEFAULT_QUEUE_ID),
+    "session_queue.prune": lambda s: s.session_queue.prune(DEFAULT_QUEUE_ID),
+    "session_queue.archive_history": lambda s: s.session_queue.archive_history(),
+    "board_images.get_board_for_image": lambda s: s.board_images.get_board_for_image("image_0.png"),
+    "board_images.get_all_board_image_names_for_board": lambda s: s.board_images.get_all_board_image_names_for_board(
+        s.board_id
+    ),
+    "board_images.get_image_count_for_board": lambda s: s.board_images.get_image_count_for_board(s.board_id),
+    "board_images.get_board_summaries": lambda s: s.board_images.get_board_summaries([s.board_id]),
+    "images.get": lambda s: s.images.get("image_0.png"),
+    "images.get_many": lambda s: s.images.get_many(limit=10),
+    "images.get_many_not_starred_first": lambda s: s.images.get_many(limit=10, starred_first=False),
+    "images.get_many_by_board": lambda s: s.images.get_many(limit=10, board_id=s.board_id),
+    "images.get_many_by_cursor": lambda s: s.images.get_many_by_cursor(limit=10, is_intermediate=False),
+    "images.search": lambda s: s.images.search("banana"),
+    "images.get_most_recent_image_for_board": lambda s: s.images.get_most_recent_image_for_board(s.board_id),
+    "workflows.get_many": lambda s: s.workflows.get_many(
+        WorkflowRecordOrderBy.UpdatedAt, SQLiteDirection.Descending, WorkflowCategory.User, per_page=10
+    ),
+    "workflows.get_many_by_cursor": lambda s: s.workflows.get_many_by_cursor(
+        WorkflowRecordOrderBy.Name, SQLiteDirection.Ascending, WorkflowCategory.User, limit=10
+    ),
+    "workflows.search": lambda s: s.workflows.get_many(
+        WorkflowRecordOrderBy.Name, SQLiteDirection.Ascending, WorkflowCategory.User, per_page=10, query="banana"
+    ),
+}
+
+
+@pytest.mark.parametrize("hot_path", HOT_PATHS.keys())
+def test_hot_path_does_not_scan_tables(db: SqliteDatabase, stores: Stores, hot_path: str):
+    with record_statements(db) as statements:
+        HOT_PATHS[hot_path](stores)
+
+    queries = [s for s in statements if is_query(s)]
+    assert queries, "no queries were recorded"
+    full_scans = {query: get_full_scans(db, query) for query in queries}
+    assert not any(full_scans.values()), f"full table scans: {full_scans}"
+
+
+def test_full_scans_are_detected(db: SqliteDatabase):
+    assert get_full_scans(db, "SELECT * FROM session_queue WHERE session = 'x'") == ["session_queue"]
+    assert get_full_scans(db, "SELECT * FROM models WHERE hash = 'x'") == []
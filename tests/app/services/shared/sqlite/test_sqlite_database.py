@@ -0,0 +1,123 @@
+import sqlite3
+import threading
+from pathlib import Path
+
+import pytest
+
+from invokeai.app.services.config.config_default import InvokeAIAppConfig
+from invokeai.app.services.invoker import Invoker
+from invokeai.app.services.session_queue.session_queue_common import DEFAULT_QUEUE_ID, Batch
+from invokeai.app.services.session_queue.session_queue_sqlite import SqliteSessionQueue
+from invokeai.app.services.shared.graph import Graph
+from invokeai.app.services.shared.sqlite.sqlite_database import SqliteDatabase
+from invokeai.backend.util.logging import InvokeAILogger
+from tests.fixtures.sqlite_database import create_mock_sqlite_database
+from tests.test_nodes import PromptTestInvocation
+
+
+@pytest.fixture
+def db(tmp_path: Path) -> SqliteDatabase:
+    db = SqliteDatabase(db_path=tmp_path / "invokeai.db", logger=InvokeAILogger.get_logger(), reader_pool_size=2)
+    db.conn.execute("CREATE TABLE test (id INTEGER PRIMARY KEY);")
+    db.conn.execute("INSERT INTO test (id) VALUES (1);")
+    db.conn.commit()
+    return db
+
+
+def hold_write(db: SqliteDatabase, writing: threading.Event, release: threading.Event) -> None:
+    """Holds the writer lock, with an uncommitted write, until released."""
+    with db.lock:
+        db.conn.execute("INSERT INTO test (id) VALUES (2);")
+        writing.set()
+        release.wait(timeout=10)
+        db.conn.commit()
+
+
+def test_file_db_uses_wal(db: SqliteDatabase):
+    assert db.conn.execute("PRAGMA journal_mode;").fetchone()[0] == "wal"
+    with db.read() as cursor:
+        assert cursor.execute("PRAGMA journal_mode;").fetchone()[0] == "wal"
+        with pytest.raises(sqlite3.OperationalError):
+            cursor.execute("INSERT INTO test (id) VALUES (3);")
+
+
+def test_concurrent_reads_during_long_write(db: SqliteDatabase):
+    writing = threading.Event()
+    release = threading.Event()
+    writer = threading.Thread(target=hold_write, args=(db, writing, release))
+    writer.start()
+    assert writing.wait(timeout=10)
+
+    results: list[list[int]] = []
+    results_lock = threading.Lock()
+
+    def reader():
+        for _ in range(5):
+            with db.read() as cursor:
+                ids = [row[0] for row in cursor.execute("SELECT id FROM test ORDER BY id;").fetchall()]
+            with results_lock:
+                results.append(ids)
+
+    # The readers finish while the write is still in progress, and do not see the uncommitted row
+    readers = [threading.Thread(target=reader) for _ in range(4)]
+    for thread in readers:
+        thread.start()
+    for thread in readers:
+        thread.join(timeout=10)
+        assert not thread.is_alive()
+    assert results == [[1]] * 20
+
+    release.set()
+    writer.join(timeout=10)
+    with db.read() as cursor:
+        assert [row[0] for row in cursor.execute("SELECT id FROM test ORDER BY id;").fetchall()] == [1, 2]
+
+    # The readers did not take the writer lock, and shared the pool of two connections
+    assert db.stats.writer_lock_hold.count == 1
+    assert db.stats.writer_lock_wait.count == 1
+    assert db.stats.read.count == 21
+    assert 1 <= db._reader_count <= 2
+
+
+def test_read_snapshot_is_consistent(db: SqliteDatabase):
+    with db.read() as cursor:
+        assert cursor.execute("SELECT count(*) FROM test;").fetchone()[0] == 1
+        with db.lock:
+            db.conn.execute("INSERT INTO test (id) VALUES (2);")
+            db.conn.commit()
+        # A write committed during the read is not seen until the next read
+        assert cursor.execute("SELECT count(*) FROM test;").fetchone()[0] == 1
+    with db.read() as cursor:
+        assert cursor.execute("SELECT count(*) FROM test;").fetchone()[0] == 2
+
+
+def test_memory_db_reads_with_writer_connection():
+    db = SqliteDatabase(db_path=None, logger=InvokeAILogger.get_logger())
+    db.conn.execute("CREATE TABLE test (id INTEGER PRIMARY KEY);")
+    with db.read() as cursor:
+        assert cursor.connection is db.conn
+        assert cursor.execute("SELECT count(*) FROM test;").fetchone()[0] == 0
+    assert db.stats.writer_lock_wait.count == 1
+
+
+def test_queue_status_is_not_blocked_by_writes(mock_invoker: Invoker, tmp_path: Path):
+    config = InvokeAIAppConfig(use_memory_db=False)
+    config._root = tmp_path
+    db = create_mock_sqlite_database(config, InvokeAILogger.get_logger())
+    session_queue = SqliteSessionQueue(db=db)
+    session_queue.start(mock_invoker)
+    g = Graph()
+    g.add_node(PromptTestInvocation(id="1", prompt="Banana sushi"))
+    session_queue.enqueue_batch(DEFAULT_QUEUE_ID, Batch(graph=g, runs=2), prepend=False)
+
+    status: list[int] = []
+
+    def get_status():
+        status.append(session_queue.get_queue_status(DEFAULT_QUEUE_ID).pending)
+
+    with db.lock:
+        thread = threading.Thread(target=get_status)
+        thread.start()
+        thread.join(timeout=10)
+        assert not thread.is_alive()
+    assert status == [2]
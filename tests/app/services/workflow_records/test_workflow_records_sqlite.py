@@ -0,0 +1,139 @@
+from typing import Optional
+
+import pytest
+
+from invokeai.app.services.config.config_default import InvokeAIAppConfig
+from invokeai.app.services.shared.sqlite.sqlite_common import SQLiteDirection
+from invokeai.app.services.workflow_records.workflow_records_common import (
+    WorkflowCategory,
+    WorkflowMeta,
+    WorkflowRecordOrderBy,
+    WorkflowWithoutID,
+)
+from invokeai.app.services.workflow_records.workflow_records_sqlite import SqliteWorkflowRecordsStorage
+from invokeai.backend.util.logging import InvokeAILogger
+from tests.fixtures.sqlite_database import create_mock_sqlite_database
+
+
+@pytest.fixture
+def workflow_records() -> SqliteWorkflowRecordsStorage:
+    db = create_mock_sqlite_database(InvokeAIAppConfig(use_memory_db=True), InvokeAILogger.get_logger())
+    return SqliteWorkflowRecordsStorage(db)
+
+
+def create_workflow(workflow_records: SqliteWorkflowRecordsStorage, name: str, description: str = "") -> str:
+    workflow = WorkflowWithoutID(
+        name=name,
+        author="",
+        description=description,
+        version="1.0.0",
+        contact="",
+        tags="",
+        notes="",
+        exposedFields=[],
+        meta=WorkflowMeta(version="3.0.0", category=WorkflowCategory.User),
+        nodes=[],
+        edges=[],
+    )
+    return workflow_records.create(workflow).workflow_id
+
+
+@pytest.mark.parametrize("order_by", [WorkflowRecordOrderBy.Name, WorkflowRecordOrderBy.CreatedAt])
+@pytest.mark.parametrize("direction", [SQLiteDirection.Ascending, SQLiteDirection.Descending])
+def test_cursor_pages_match_offset_listing(
+    workflow_records: SqliteWorkflowRecordsStorage, order_by: WorkflowRecordOrderBy, direction: SQLiteDirection
+):
+    # Duplicate names, so that the workflow id breaks ties
+    for i in range(11):
+        create_workflow(workflow_records, f"workflow {i // 2}")
+
+    expected = workflow_records.get_many(order_by, direction, WorkflowCategory.User)
+    assert expected.total == 11
+
+    workflow_ids: list[str] = []
+    cursor: Optional[str] = None
+    while True:
+        page = workflow_records.get_many_by_cursor(order_by, direction, WorkflowCategory.User, limit=3, cursor=cursor)
+        assert page.total == 11
+        workflow_ids.extend(w.workflow_id for w in page.items)
+        if not page.has_more:
+            break
+        cursor = page.next_cursor
+
+    assert workflow_ids == [w.workflow_id for w in expected.items]
+
+
+def test_query_matches_name_or_description_within_category(workflow_records: SqliteWorkflowRecordsStorage):
+    create_workflow(workflow_records, "upscale", "")
+    create_workflow(workflow_records, "other", "an upscaling workflow")
+    create_workflow(workflow_records, "unrelated", "")
+
+    results = workflow_records.get_many(
+        WorkflowRecordOrderBy.Name, SQLiteDirection.Ascending, WorkflowCategory.User, query="upscal"
+    )
+    assert [w.name for w in results.items] == ["other", "upscale"]
+    assert results.total == 2
+    # The description condition must not bypass the category filter
+    assert (
+        workflow_records.get_many(
+            WorkflowRecordOrderBy.Name, SQLiteDirection.Ascending, WorkflowCategory.Default, query="upscal"
+        ).total
+        == 0
+    )
+
+
+def test_cached_counts_are_invalidated_by_changes(workflow_records: SqliteWorkflowRecordsStorage):
+    def count() -> int:
+        return workflow_records.get_many(
+            WorkflowRecordOrderBy.Name, SQLiteDirection.Ascending, WorkflowCategory.User
+        ).total
+
+    assert count() == 0
+    workflow_id = create_workflow(workflow_records, "a")
+    assert count() == 1
+    create_workflow(workflow_records, "b")
+    assert count() == 2
+    workflow_records.delete(workflow_id)
+    assert count() == 1
+
+
+def test_query_follows_workflow_updates(workflow_records: SqliteWorkflowRecordsStorage):
+    workflow_id = create_workflow(workflow_records, "upscale")
+    workflow = workflow_records.get(workflow_id).workflow
+    workflow.name = "denoise"
+    workflow_records.update(workflow)
+
+    def query(text: str) -> int:
+        return workflow_records.get_many(
+            WorkflowRecordOrderBy.Name, SQLiteDirection.Ascending, WorkflowCategory.User, query=text
+        ).total
+
+    assert query("upscale") == 0
+    assert query("denoise") == 1
+
+
+def test_cached_counts_are_invalidated_by_workflow_updates(workflow_records: SqliteWorkflowRecordsStorage):
+    def count(category: WorkflowCategory, query: Optional[str] = None) -> int:
+        return workflow_records.get_many(
+            WorkflowRecordOrderBy.Name, SQLiteDirection.Ascending, category, query=query
+        ).total
+
+    def version() -> int:
+        cursor = workflow_records._conn.cursor()
+        cursor.execute("SELECT version FROM table_versions WHERE table_name = 'workflow_library';")
+        return cursor.fetchone()[0]
+
+    workflow_id = create_workflow(workflow_records, "upscale")
+    assert count(WorkflowCategory.User, "upscale") == 1
+    assert count(WorkflowCategory.Default) == 0
+
+    # The name and category are generated from the workflow JSON, which is the only column that updates change
+    workflow = workflow_records.get(workflow_id).workflow
+    workflow.name = "denoise"
+    workflow.meta.category = WorkflowCategory.Default
+    version_before = version()
+    workflow_records.update(workflow)
+
+    assert version() > version_before
+    assert count(WorkflowCategory.User, "upscale") == 0
+    assert count(WorkflowCategory.Default) == 1
@@ -0,0 +1,60 @@
+from pathlib import Path
+from typing import Any
+
+from fastapi import FastAPI
+from pydantic import BaseModel
+
+from invokeai.app.util import custom_openapi
+from invokeai.app.util.custom_openapi import get_openapi_cache_key, get_openapi_func
+
+
+class Greeting(BaseModel):
+    message: str
+
+
+def make_app() -> FastAPI:
+    app = FastAPI(title="Test")
+
+    @app.get("/hello")
+    def hello() -> Greeting:
+        return Greeting(message="hello")
+
+    return app
+
+
+def test_openapi_schema_is_cached_on_disk(tmp_path: Path, monkeypatch: Any):
+    schema = get_openapi_func(make_app(), cache_dir=tmp_path)()
+    assert len(list(tmp_path.glob("openapi_*.json"))) == 1
+    assert "/hello" in schema["paths"]
+
+    def fail_get_openapi(*args, **kwargs):
+        raise AssertionError("The schema should be loaded from the cache")
+
+    # A new app, e.g. after a restart, loads the cached schema instead of generating it
+    monkeypatch.setattr(custom_openapi, "get_openapi", fail_get_openapi)
+    assert get_openapi_func(make_app(), cache_dir=tmp_path)() == schema
+
+
+def test_openapi_cache_key_changes_with_version(tmp_path: Path, monkeypatch: Any):
+    get_openapi_func(make_app(), cache_dir=tmp_path)()
+    key = get_openapi_cache_key()
+    assert get_openapi_cache_key() == key
+
+    monkeypatch.setattr(custom_openapi, "__version__", "0.0.0-test")
+    assert get_openapi_cache_key() != key
+
+    # The schema is regenerated for the new key, and the stale schema is removed
+    get_openapi_func(make_app(), cache_dir=tmp_path)()
+    assert [p.name for p in tmp_path.glob("openapi_*.json")] == [f"openapi_{get_openapi_cache_key()}.json"]
+
+
+def test_openapi_schema_is_served_if_cache_write_fails(tmp_path: Path, monkeypatch: Any):
+    def fail_write_openapi_cache(*args, **kwargs):
+        raise PermissionError("read-only")
+
+    monkeypatch.setattr(custom_openapi, "write_openapi_cache", fail_write_openapi_cache)
+    app = make_app()
+    schema = get_openapi_func(app, cache_dir=tmp_path)()
+    assert "/hello" in schema["paths"]
+    assert app.openapi_schema == schema
+    assert list(tmp_path.glob("openapi_*.json")) == []
@@ -0,0 +1,33 @@
+import sys
+from pathlib import Path
+from typing import Any
+
+from invokeai.app.util.startup_profiler import StartupProfiler
+
+
+def test_startup_profiler_times_imports_and_node_modules(tmp_path: Path, monkeypatch: Any):
+    package = tmp_path / "startup_test_nodes"
+    package.mkdir()
+    (package / "__init__.py").write_text('__all__ = ["slow_node", "fast_node"]\n')
+    (package / "slow_node.py").write_text("import time\n\ntime.sleep(0.2)\n")
+    (package / "fast_node.py").write_text("from . import slow_node  # noqa: F401\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.setattr(StartupProfiler, "NODE_MODULE_PREFIX", "startup_test_nodes.")
+
+    profiler = StartupProfiler()
+    profiler.start()
+    try:
+        with profiler.phase("import nodes"):
+            exec("from startup_test_nodes import *", {})
+    finally:
+        profiler.stop()
+        for name in [m for m in sys.modules if m.startswith("startup_test_nodes")]:
+            del sys.modules[name]
+
+    assert profiler._phases[0][0] == "import nodes"
+    assert profiler._phases[0][1] >= 0.2
+    # Node modules imported via `import *` are timed individually
+    assert profiler._node_module_times["startup_test_nodes.slow_node"] >= 0.2
+    assert profiler._node_module_times["startup_test_nodes.fast_node"] < 0.2
+    assert profiler._package_times["startup_test_nodes"] >= 0.2
+    assert "slow_node" in profiler.get_report()
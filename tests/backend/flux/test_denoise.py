@@ -0,0 +1,306 @@
+import pytest
+import torch
+
+from invokeai.app.services.session_processor.session_processor_common import CanceledException
+from invokeai.backend.flux.controlnet.controlnet_flux_output import ControlNetFluxOutput
+from invokeai.backend.flux.denoise import DenoiseBatchItem, denoise, denoise_batch
+from invokeai.backend.flux.extensions.regional_prompting_extension import RegionalPromptingExtension
+from invokeai.backend.flux.extensions.step_cache_extension import StepCacheExtension
+from invokeai.backend.flux.extensions.xlabs_ip_adapter_extension import XLabsIPAdapterExtension
+from invokeai.backend.flux.ip_adapter.xlabs_ip_adapter_flux import XlabsIpAdapterFlux, XlabsIpAdapterParams
+from invokeai.backend.flux.model import Flux, FluxParams
+from invokeai.backend.flux.sampling_utils import generate_img_ids
+from invokeai.backend.flux.segmented_attention import SegmentedAttnMask
+from invokeai.backend.flux.text_conditioning import FluxTextConditioning
+from invokeai.backend.stable_diffusion.diffusers_pipeline import PipelineIntermediateState
+from invokeai.backend.util.step_cache import StepCache
+
+HIDDEN_SIZE = 32
+CONTEXT_DIM = 16
+VEC_DIM = 8
+PACKED_H = 4
+PACKED_W = 4
+IMG_SEQ_LEN = PACKED_H * PACKED_W
+
+
+def make_model() -> Flux:
+    params = FluxParams(
+        in_channels=8,
+        vec_in_dim=VEC_DIM,
+        context_in_dim=CONTEXT_DIM,
+        hidden_size=HIDDEN_SIZE,
+        mlp_ratio=2.0,
+        num_heads=2,
+        depth=2,
+        depth_single_blocks=2,
+        axes_dim=[4, 6, 6],
+        theta=10_000,
+        qkv_bias=True,
+        guidance_embed=True,
+    )
+    return Flux(params).eval()
+
+
+def make_regional_prompting_extension(txt_seq_lens: list[int], masked: bool) -> RegionalPromptingExtension:
+    text_conditionings: list[FluxTextConditioning] = []
+    for i, txt_seq_len in enumerate(txt_seq_lens):
+        mask = None
+        if masked and i > 0:
+            mask = torch.zeros((1, 1, IMG_SEQ_LEN))
+            mask[..., : IMG_SEQ_LEN // 2] = 1.0
+        text_conditionings.append(
+            FluxTextConditioning(
+                t5_embeddings=torch.randn(1, txt_seq_len, CONTEXT_DIM),
+                clip_embeddings=torch.randn(1, VEC_DIM),
+                mask=mask,
+            )
+        )
+    return RegionalPromptingExtension.from_text_conditioning(text_conditionings, img_seq_len=IMG_SEQ_LEN)
+
+
+class FakeControlNetExtension:
+    def __init__(self, model: Flux):
+        self._residuals = [torch.randn(1, IMG_SEQ_LEN, HIDDEN_SIZE) for _ in model.double_blocks]
+
+    def run_controlnet(self, **kwargs: object) -> ControlNetFluxOutput:
+        return ControlNetFluxOutput(single_block_residuals=None, double_block_residuals=self._residuals)
+
+
+def make_ip_adapter_extensions() -> tuple[list[XLabsIPAdapterExtension], list[XLabsIPAdapterExtension]]:
+    model = XlabsIpAdapterFlux(
+        XlabsIpAdapterParams(
+            num_double_blocks=2,
+            context_dim=16,
+            hidden_dim=HIDDEN_SIZE,
+            clip_embeddings_dim=12,
+            clip_extra_context_tokens=2,
+        )
+    )
+    extensions: list[XLabsIPAdapterExtension] = []
+    for _ in range(2):
+        extension = XLabsIPAdapterExtension(
+            model=model,
+            image_prompt_clip_embed=torch.randn(1, 12),
+            weight=0.8,
+            begin_step_percent=0.0,
+            end_step_percent=1.0,
+        )
+        extension.run_image_proj(dtype=torch.float32)
+        extensions.append(extension)
+    return [extensions[0]], [extensions[1]]
+
+
+@pytest.mark.parametrize(
+    ["pos_txt_seq_lens", "neg_txt_seq_lens", "masked"],
+    [
+        ([5], [5], False),
+        # Prompts of different lengths are padded.
+        ([7], [3], False),
+        ([3], [2, 4], False),
+        # Regional prompts.
+        ([3, 4], [6], True),
+    ],
+)
+@pytest.mark.parametrize("with_extensions", [False, True])
+@torch.no_grad()
+def test_batched_cfg_matches_two_passes(
+    pos_txt_seq_lens: list[int], neg_txt_seq_lens: list[int], masked: bool, with_extensions: bool
+):
+    torch.manual_seed(0)
+    model = make_model()
+    pos_regional_prompting_extension = make_regional_prompting_extension(pos_txt_seq_lens, masked)
+    neg_regional_prompting_extension = make_regional_prompting_extension(neg_txt_seq_lens, masked=False)
+    img = torch.randn(1, IMG_SEQ_LEN, 8)
+    img_ids = generate_img_ids(PACKED_H * 2, PACKED_W * 2, batch_size=1, device=img.device, dtype=img.dtype)
+
+    controlnet_extensions = [FakeControlNetExtension(model)] if with_extensions else []
+    pos_ip_adapter_extensions, neg_ip_adapter_extensions = make_ip_adapter_extensions() if with_extensions else ([], [])
+
+    def run(batched_cfg: bool) -> torch.Tensor:
+        return denoise(
+            model=model,
+            img=img,
+            img_ids=img_ids,
+            pos_regional_prompting_extension=pos_regional_prompting_extension,
+            neg_regional_prompting_extension=neg_regional_prompting_extension,
+            timesteps=[1.0, 0.75, 0.5, 0.0],
+            step_callback=lambda _: None,
+            guidance=4.0,
+            # The last step does not use CFG.
+            cfg_scale=[3.0, 2.0, 1.0],
+            inpaint_extension=None,
+            controlnet_extensions=controlnet_extensions,  # type: ignore
+            pos_ip_adapter_extensions=pos_ip_adapter_extensions,
+            neg_ip_adapter_extensions=neg_ip_adapter_extensions,
+            img_cond=None,
+            batched_cfg=batched_cfg,
+        )
+
+    two_passes = run(batched_cfg=False)
+    batched = run(batched_cfg=True)
+    assert torch.isfinite(batched).all()
+    torch.testing.assert_close(batched, two_passes, rtol=1e-4, atol=1e-5)
+
+
+def test_concat_batch_masks_txt_padding():
+    extension = RegionalPromptingExtension.concat_batch(
+        [make_regional_prompting_extension([2], False), make_regional_prompting_extension([5], False)],
+        img_seq_len=IMG_SEQ_LEN,
+    )
+    assert extension.regional_text_conditioning.t5_embeddings.shape == (2, 5, CONTEXT_DIM)
+    assert extension.regional_text_conditioning.t5_txt_ids.shape == (2, 5, 3)
+    assert extension.regional_text_conditioning.clip_embeddings.shape == (2, VEC_DIM)
+
+    mask = extension.txt_padding_attn_mask
+    assert mask is not None
+    assert mask.shape == (2, 1, 5 + IMG_SEQ_LEN, 5 + IMG_SEQ_LEN)
+    assert not mask[0, :, :, 2:5].any()
+    assert mask[0, :, :, :2].all() and mask[0, :, :, 5:].all()
+    assert mask[1].all()
+    # Without regional masks, the padding mask is used in every block, in its segmented form.
+    segmented_mask = extension.get_double_stream_attn_mask(0)
+    assert isinstance(segmented_mask, SegmentedAttnMask)
+    assert extension.get_double_stream_attn_mask(1) is segmented_mask
+    assert extension.get_single_stream_attn_mask(1) is segmented_mask
+
+
+def test_concat_batch_of_equal_lengths_needs_no_mask():
+    extension = RegionalPromptingExtension.concat_batch(
+        [make_regional_prompting_extension([4], False), make_regional_prompting_extension([4], False)],
+        img_seq_len=IMG_SEQ_LEN,
+    )
+    assert extension.get_double_stream_attn_mask(0) is None
+    assert extension.get_double_stream_attn_mask(1) is None
+
+
+@pytest.mark.parametrize("batched_cfg", [False, True])
+@torch.no_grad()
+def test_denoise_batch_matches_denoise(batched_cfg: bool):
+    torch.manual_seed(0)
+    model = make_model()
+    timesteps = [1.0, 0.75, 0.5, 0.0]
+    cfg_scale = [3.0, 2.0, 1.0]
+    img_ids = generate_img_ids(
+        PACKED_H * 2, PACKED_W * 2, batch_size=1, device=torch.device("cpu"), dtype=torch.float32
+    )
+    items = [
+        DenoiseBatchItem(
+            img=torch.randn(1, IMG_SEQ_LEN, 8),
+            img_ids=img_ids,
+            pos_regional_prompting_extension=make_regional_prompting_extension(pos_txt_seq_lens, masked),
+            neg_regional_prompting_extension=make_regional_prompting_extension([3], masked=False),
+            step_callback=lambda _: None,
+            inpaint_extension=None,
+            img_cond=None,
+        )
+        for pos_txt_seq_lens, masked in [([5], False), ([2], False), ([3, 4], True)]
+    ]
+
+    results = denoise_batch(
+        model=model, items=items, timesteps=timesteps, guidance=4.0, cfg_scale=cfg_scale, batched_cfg=batched_cfg
+    )
+
+    for item, result in zip(items, results, strict=True):
+        expected = denoise(
+            model=model,
+            img=item.img,
+            img_ids=item.img_ids,
+            pos_regional_prompting_extension=item.pos_regional_prompting_extension,
+            neg_regional_prompting_extension=item.neg_regional_prompting_extension,
+            timesteps=timesteps,
+            step_callback=lambda _: None,
+            guidance=4.0,
+            cfg_scale=cfg_scale,
+            inpaint_extension=None,
+            controlnet_extensions=[],
+            pos_ip_adapter_extensions=[],
+            neg_ip_adapter_extensions=[],
+            img_cond=item.img_cond,
+            batched_cfg=batched_cfg,
+        )
+        assert isinstance(result, torch.Tensor)
+        torch.testing.assert_close(result, expected, rtol=1e-4, atol=1e-5)
+
+
+@torch.no_grad()
+def test_denoise_batch_drops_canceled_items():
+    torch.manual_seed(0)
+    model = make_model()
+    img_ids = generate_img_ids(
+        PACKED_H * 2, PACKED_W * 2, batch_size=1, device=torch.device("cpu"), dtype=torch.float32
+    )
+    steps: list[list[int]] = [[], []]
+
+    def build_step_callback(i: int, cancel_at_step: int | None):
+        def step_callback(state: PipelineIntermediateState) -> None:
+            steps[i].append(state.step)
+            if state.step == cancel_at_step:
+                raise CanceledException
+
+        return step_callback
+
+    items = [
+        DenoiseBatchItem(
+            img=torch.randn(1, IMG_SEQ_LEN, 8),
+            img_ids=img_ids,
+            pos_regional_prompting_extension=make_regional_prompting_extension([4], masked=False),
+            neg_regional_prompting_extension=None,
+            step_callback=build_step_callback(i, cancel_at_step),
+            inpaint_extension=None,
+            img_cond=None,
+        )
+        for i, cancel_at_step in enumerate([1, None])
+    ]
+
+    results = denoise_batch(
+        model=model, items=items, timesteps=[1.0, 0.75, 0.5, 0.0], guidance=4.0, cfg_scale=[1.0] * 3
+    )
+
+    assert isinstance(results[0], CanceledException)
+    assert isinstance(results[1], torch.Tensor)
+    assert steps == [[0, 1], [0, 1, 2, 3]]
+
+
+@pytest.mark.parametrize("interval,threshold,expected_cached_calls", [(1, 0.0, 0), (2, 0.0, 2), (1, 1e6, 3)])
+@torch.no_grad()
+def test_denoise_with_step_cache(interval: int, threshold: float, expected_cached_calls: int):
+    torch.manual_seed(0)
+    model = make_model()
+    img_ids = generate_img_ids(
+        PACKED_H * 2, PACKED_W * 2, batch_size=1, device=torch.device("cpu"), dtype=torch.float32
+    )
+    img = torch.randn(1, IMG_SEQ_LEN, 8)
+    pos_regional_prompting_extension = make_regional_prompting_extension([4], masked=False)
+    neg_regional_prompting_extension = make_regional_prompting_extension([3], masked=False)
+
+    def run_denoise(step_cache_extension: StepCacheExtension | None) -> torch.Tensor:
+        return denoise(
+            model=model,
+            img=img,
+            img_ids=img_ids,
+            pos_regional_prompting_extension=pos_regional_prompting_extension,
+            neg_regional_prompting_extension=neg_regional_prompting_extension,
+            timesteps=[1.0, 0.75, 0.5, 0.25, 0.0],
+            step_callback=lambda _: None,
+            guidance=4.0,
+            cfg_scale=[2.0] * 4,
+            inpaint_extension=None,
+            controlnet_extensions=[],
+            pos_ip_adapter_extensions=[],
+            neg_ip_adapter_extensions=[],
+            img_cond=None,
+            step_cache_extension=step_cache_extension,
+        )
+
+    expected = run_denoise(None)
+    step_cache = StepCache(interval=interval, threshold=threshold)
+    result = run_denoise(StepCacheExtension(step_cache))
+
+    # The positive and negative passes of a step both compute or both reuse the blocks.
+    assert step_cache.stats.cached_calls == expected_cached_calls * 2
+    assert step_cache.stats.computed_calls == (4 - expected_cached_calls) * 2
+    assert step_cache.stats.skipped_blocks == expected_cached_calls * 2 * 4
+    if expected_cached_calls == 0:
+        torch.testing.assert_close(result, expected)
+    else:
+        assert not torch.allclose(result, expected)
@@ -0,0 +1,158 @@
+from dataclasses import replace
+
+import pytest
+import torch
+
+from invokeai.backend.flux.controlnet.instantx_controlnet_flux import InstantXControlNetFlux
+from invokeai.backend.flux.controlnet.xlabs_controlnet_flux import XLabsControlNetFlux
+from invokeai.backend.flux.embedding_cache import FluxEmbeddingCache
+from invokeai.backend.flux.extensions.regional_prompting_extension import RegionalPromptingExtension
+from invokeai.backend.flux.model import Flux, FluxParams
+from invokeai.backend.flux.sampling_utils import generate_img_ids
+from invokeai.backend.flux.text_conditioning import FluxTextConditioning
+
+PARAMS = FluxParams(
+    in_channels=4,
+    vec_in_dim=8,
+    context_in_dim=16,
+    hidden_size=32,
+    mlp_ratio=2.0,
+    num_heads=2,
+    depth=2,
+    depth_single_blocks=2,
+    axes_dim=[4, 6, 6],
+    theta=10_000,
+    qkv_bias=True,
+    guidance_embed=True,
+)
+
+
+def make_inputs(txt_seq_len: int = 4) -> dict[str, torch.Tensor]:
+    return {
+        "img": torch.randn(1, 16, 4),
+        "img_ids": generate_img_ids(8, 8, batch_size=1, device=torch.device("cpu"), dtype=torch.float32),
+        "txt": torch.randn(1, txt_seq_len, 16),
+        "txt_ids": torch.zeros(1, txt_seq_len, 3),
+        "y": torch.randn(1, 8),
+        "timesteps": torch.full((1,), 0.5),
+        "guidance": torch.full((1,), 4.0),
+    }
+
+
+def count_calls(module: torch.nn.Module) -> list[int]:
+    calls = [0]
+
+    def hook(*args: object) -> None:
+        calls[0] += 1
+
+    module.register_forward_pre_hook(hook)
+    return calls
+
+
+def test_get_pe_matches_pe_embedder():
+    model = Flux(PARAMS)
+    cache = FluxEmbeddingCache()
+    inputs = make_inputs()
+    pe = cache.get_pe(model.pe_embedder, inputs["txt_ids"], inputs["img_ids"])
+    torch.testing.assert_close(pe, model.pe_embedder(torch.cat((inputs["txt_ids"], inputs["img_ids"]), dim=1)))
+    # The same ids get the same table, and other ids get their own.
+    assert cache.get_pe(model.pe_embedder, inputs["txt_ids"], inputs["img_ids"]) is pe
+    assert cache.get_pe(model.pe_embedder, torch.zeros(1, 2, 3), inputs["img_ids"]).shape[2] == 2 + 16
+
+
+def test_get_vec_is_cached_until_the_next_step():
+    model = Flux(PARAMS)
+    cache = FluxEmbeddingCache()
+    timesteps = torch.full((1,), 0.5)
+    guidance = torch.full((1,), 4.0)
+    time_in_calls = count_calls(model.time_in)
+
+    cache.start_step(0)
+    vec = cache.get_vec(model.time_in, model.guidance_in, timesteps, guidance)
+    assert cache.get_vec(model.time_in, model.guidance_in, timesteps, guidance) is vec
+    assert time_in_calls == [1]
+
+    cache.start_step(1)
+    cache.get_vec(model.time_in, model.guidance_in, timesteps, guidance)
+    assert time_in_calls == [2]
+
+
+@torch.no_grad()
+def test_flux_forward_with_embedding_cache_matches_recomputing():
+    torch.manual_seed(0)
+    model = Flux(PARAMS).eval()
+    pe_embedder_calls = count_calls(model.pe_embedder)
+    time_in_calls = count_calls(model.time_in)
+    cache = FluxEmbeddingCache()
+    passes: list[tuple[dict[str, torch.Tensor], RegionalPromptingExtension]] = []
+    for txt_seq_len in [4, 3]:
+        inputs = make_inputs(txt_seq_len)
+        txt_conditioning = FluxTextConditioning(t5_embeddings=inputs["txt"], clip_embeddings=inputs["y"], mask=None)
+        regional_prompting_extension = RegionalPromptingExtension.from_text_conditioning(
+            [txt_conditioning], img_seq_len=16
+        )
+        inputs["txt_ids"] = regional_prompting_extension.regional_text_conditioning.t5_txt_ids
+        passes.append((inputs, regional_prompting_extension))
+
+    # As in denoise(), all of the passes of a step get the same timestep and guidance tensors.
+    guidance = torch.full((1,), 4.0)
+    for step_index in range(3):
+        timesteps = torch.full((1,), 1.0 - step_index / 3)
+        cache.start_step(step_index)
+        for inputs, regional_prompting_extension in passes:
+            kwargs = {
+                **inputs,
+                "timesteps": timesteps,
+                "guidance": guidance,
+                "timestep_index": step_index,
+                "total_num_timesteps": 3,
+                "controlnet_double_block_residuals": None,
+                "controlnet_single_block_residuals": None,
+                "ip_adapter_extensions": [],
+                "regional_prompting_extension": regional_prompting_extension,
+            }
+            torch.testing.assert_close(model(**kwargs, embedding_cache=cache), model(**kwargs), rtol=0, atol=0)
+
+    # Without the cache, the embeddings are computed on every call. With it, the RoPE tables are computed once per
+    # conditioning, and the timestep embedding once per step.
+    assert pe_embedder_calls == [6 + 2]
+    assert time_in_calls == [6 + 3]
+
+
+@pytest.mark.parametrize("num_control_modes", [None, 4])
+@torch.no_grad()
+def test_instantx_controlnet_with_embedding_cache_matches_recomputing(num_control_modes: int | None):
+    torch.manual_seed(0)
+    model = InstantXControlNetFlux(PARAMS, num_control_modes=num_control_modes).eval()
+    for block in [*model.controlnet_blocks, *model.controlnet_single_blocks]:
+        torch.nn.init.normal_(block.weight)
+    inputs = make_inputs()
+    kwargs = {
+        **inputs,
+        "controlnet_cond": torch.randn(1, 16, 4),
+        "controlnet_mode": torch.tensor([[1]]) if num_control_modes is not None else None,
+    }
+    expected = model(**kwargs)
+    result = model(**kwargs, embedding_cache=FluxEmbeddingCache())
+    for r, e in zip(
+        result.controlnet_block_samples + result.controlnet_single_block_samples,
+        expected.controlnet_block_samples + expected.controlnet_single_block_samples,
+        strict=True,
+    ):
+        torch.testing.assert_close(r, e, rtol=0, atol=0)
+
+
+@torch.no_grad()
+def test_xlabs_controlnet_with_embedding_cache_matches_recomputing():
+    torch.manual_seed(0)
+    # The XLabs ControlNet patchifies the control image into 64 channels.
+    model = XLabsControlNetFlux(replace(PARAMS, in_channels=64)).eval()
+    for block in model.controlnet_blocks:
+        torch.nn.init.normal_(block.weight)
+    kwargs = {**make_inputs(), "img": torch.randn(1, 16, 64), "controlnet_cond": torch.randn(1, 3, 64, 64)}
+    expected = model(**kwargs)
+    result = model(**kwargs, embedding_cache=FluxEmbeddingCache())
+    assert result.controlnet_double_block_residuals is not None
+    assert expected.controlnet_double_block_residuals is not None
+    for r, e in zip(result.controlnet_double_block_residuals, expected.controlnet_double_block_residuals, strict=True):
+        torch.testing.assert_close(r, e, rtol=0, atol=0)
@@ -0,0 +1,79 @@
+import pytest
+import torch
+
+from invokeai.backend.flux.extensions.regional_prompting_extension import RegionalPromptingExtension
+from invokeai.backend.flux.segmented_attention import SegmentedAttnMask
+from invokeai.backend.flux.text_conditioning import FluxTextConditioning
+
+IMG_SEQ_LEN = 64
+
+
+def make_text_conditioning(txt_seq_len: int, region: slice | None) -> FluxTextConditioning:
+    mask = None
+    if region is not None:
+        mask = torch.zeros((1, 1, IMG_SEQ_LEN))
+        mask[..., region] = 1.0
+    return FluxTextConditioning(
+        t5_embeddings=torch.randn(1, txt_seq_len, 16), clip_embeddings=torch.randn(1, 8), mask=mask
+    )
+
+
+def dense_attention(q: torch.Tensor, k: torch.Tensor, v: torch.Tensor, attn_mask: torch.Tensor) -> torch.Tensor:
+    return torch.nn.functional.scaled_dot_product_attention(q, k, v, attn_mask=attn_mask)
+
+
+@pytest.mark.parametrize(
+    "regions",
+    [
+        # Two regions and a global prompt.
+        [None, slice(0, 32), slice(32, 48)],
+        # Overlapping regions, without a global prompt.
+        [slice(0, 40), slice(24, 64)],
+    ],
+)
+def test_restricted_attn_mask_segments_match_dense_attention(regions: list[slice | None]):
+    torch.manual_seed(0)
+    extension = RegionalPromptingExtension.from_text_conditioning(
+        [make_text_conditioning(3 + i, region) for i, region in enumerate(regions)], img_seq_len=IMG_SEQ_LEN
+    )
+    dense_mask = extension.restricted_attn_mask
+    assert dense_mask is not None
+    segmented_mask = extension.get_double_stream_attn_mask(0)
+    assert isinstance(segmented_mask, SegmentedAttnMask)
+
+    q, k, v = torch.randn(3, 2, 2, dense_mask.shape[0], 8).unbind(0)
+    torch.testing.assert_close(segmented_mask.attention(q, k, v), dense_attention(q, k, v, dense_mask))
+
+
+def test_batched_attn_mask_segments_match_dense_attention():
+    torch.manual_seed(0)
+    extension = RegionalPromptingExtension.concat_batch(
+        [
+            RegionalPromptingExtension.from_text_conditioning(
+                [make_text_conditioning(2, None), make_text_conditioning(3, slice(0, 16))], img_seq_len=IMG_SEQ_LEN
+            ),
+            RegionalPromptingExtension.from_text_conditioning(
+                [make_text_conditioning(4, None)], img_seq_len=IMG_SEQ_LEN
+            ),
+        ],
+        img_seq_len=IMG_SEQ_LEN,
+    )
+    for dense_mask, segmented_mask in [
+        (extension.restricted_attn_mask, extension.get_double_stream_attn_mask(0)),
+        (extension.txt_padding_attn_mask, extension.get_double_stream_attn_mask(1)),
+    ]:
+        assert dense_mask is not None
+        assert isinstance(segmented_mask, SegmentedAttnMask)
+        assert len(segmented_mask.segments) == 2
+        q, k, v = torch.randn(3, 2, 2, dense_mask.shape[-1], 8).unbind(0)
+        torch.testing.assert_close(segmented_mask.attention(q, k, v), dense_attention(q, k, v, dense_mask))
+
+
+def test_from_dense_with_too_many_segments():
+    # Causal masks have a segment per query.
+    attn_mask = torch.ones((8, 8), dtype=torch.bool).tril()
+    assert SegmentedAttnMask.from_dense(attn_mask, max_segments=4) is None
+    segmented_mask = SegmentedAttnMask.from_dense(attn_mask, max_segments=8)
+    assert segmented_mask is not None
+    q, k, v = torch.randn(3, 1, 2, 8, 8).unbind(0)
+    torch.testing.assert_close(segmented_mask.attention(q, k, v), dense_attention(q, k, v, attn_mask))
@@ -6,6 +6,9 @@ import torch
 from invokeai.backend.model_manager.load.model_cache.cached_model.cached_model_with_partial_load import (
     CachedModelWithPartialLoad,
 )
+from invokeai.backend.model_manager.load.model_cache.torch_module_autocast.custom_modules.custom_module_mixin import (
+    CustomModuleMixin,
+)
 from invokeai.backend.model_manager.load.model_cache.torch_module_autocast.torch_module_autocast import (
     apply_custom_layers_to_model,
 )
@@ -339,3 +342,67 @@ def test_cached_model_partial_load_and_inference(device: str, model: DummyModule
 
     # The output should be the same as the output from the CPU.
     assert torch.allclose(output1, output2.to("cpu"))
+
+
+class DeepModule(torch.nn.Module):
+    """A module tree with nested blocks, modules with names that are prefixes of other names, and weights outside of
+    the leaf layers.
+    """
+
+    def __init__(self, num_blocks: int = 12):
+        super().__init__()
+        self.blocks = torch.nn.ModuleList(
+            torch.nn.ModuleDict(
+                {
+                    "norm": torch.nn.GroupNorm(1, 4),
+                    "norm_out": torch.nn.LayerNorm(4),
+                    "attn": torch.nn.ModuleDict({"to_q": torch.nn.Linear(4, 4), "to_out": torch.nn.Linear(4, 4)}),
+                }
+            )
+            for _ in range(num_blocks)
+        )
+        self.scale = torch.nn.Parameter(torch.ones(4))
+
+
+def find_keys_in_modules_that_do_not_support_autocast_reference(model: torch.nn.Module) -> set[str]:
+    """Check every key against every module that supports autocasting."""
+    module_names = [n for n, m in model.named_modules() if isinstance(m, CustomModuleMixin)]
+    return {
+        key
+        for key in model.state_dict().keys()
+        if not any(key == name or key.startswith(name + ".") or name == "" for name in module_names)
+    }
+
+
+@pytest.mark.parametrize("model_factory", [DummyModule, DeepModule])
+def test_cached_model_keys_in_modules_that_do_not_support_autocast(model_factory: type[torch.nn.Module]):
+    model = model_factory()
+    apply_custom_layers_to_model(model)
+    cached_model = CachedModelWithPartialLoad(model=model, compute_device=torch.device("cpu"))
+    expected = find_keys_in_modules_that_do_not_support_autocast_reference(model)
+    assert cached_model._keys_in_modules_that_do_not_support_autocast == expected
+
+
+def test_cached_model_keys_in_modules_that_do_not_support_autocast_match_on_module_paths():
+    model = DeepModule(num_blocks=11)
+    apply_custom_layers_to_model(model)
+    cached_model = CachedModelWithPartialLoad(model=model, compute_device=torch.device("cpu"))
+    keys = cached_model._keys_in_modules_that_do_not_support_autocast
+    # `blocks.1.norm` supports autocasting, but `blocks.1.norm_out` (a LayerNorm) does not. Neither does
+    # `blocks.10.norm_out`, even though its name starts with `blocks.1`.
+    assert "blocks.1.norm.weight" not in keys
+    assert "blocks.1.norm_out.weight" in keys
+    assert "blocks.10.norm_out.weight" in keys
+    assert "scale" in keys
+
+
+def test_cached_model_keys_in_modules_that_do_not_support_autocast_are_memoized():
+    cached_models = []
+    for _ in range(2):
+        model = DeepModule()
+        apply_custom_layers_to_model(model)
+        cached_models.append(CachedModelWithPartialLoad(model=model, compute_device=torch.device("cpu")))
+    assert (
+        cached_models[0]._keys_in_modules_that_do_not_support_autocast
+        is cached_models[1]._keys_in_modules_that_do_not_support_autocast
+    )
@@ -0,0 +1,135 @@
+import threading
+
+import gguf
+import pytest
+import torch
+
+from invokeai.backend.model_manager.load.model_cache.cache_stats import CacheStats
+from invokeai.backend.model_manager.load.model_cache.model_cache import MB, ModelCache
+from invokeai.backend.quantization.gguf.ggml_tensor import GGMLTensor
+from invokeai.backend.util.calc_tensor_size import calc_tensor_size
+from invokeai.backend.util.logging import InvokeAILogger
+
+KB = 2**10
+
+
+def make_model_cache(cache_patched_weights: bool = True) -> ModelCache:
+    return ModelCache(
+        execution_device_working_mem_gb=0,
+        enable_partial_loading=False,
+        keep_ram_copy_of_weights=True,
+        max_ram_cache_size_gb=1 / 1024,  # 1MB
+        execution_device="cpu",
+        logger=InvokeAILogger.get_logger(),
+        cache_patched_weights=cache_patched_weights,
+    )
+
+
+def make_weights(size: int) -> dict[str, torch.Tensor]:
+    return {"linear.weight": torch.zeros(size // 4, dtype=torch.float32)}
+
+
+@pytest.fixture
+def model_cache() -> ModelCache:
+    model_cache = make_model_cache()
+    # 0.4MB
+    model_cache.put("model", torch.nn.Linear(320, 320, bias=False))
+    return model_cache
+
+
+def test_patched_weights_are_cached(model_cache: ModelCache):
+    weights = make_weights(100 * KB)
+    model_cache.put_patched_weights("model", ("lora", 0.5), weights)
+    assert model_cache.get_patched_weights("model", ("lora", 0.5)) is weights
+    assert model_cache.get_patched_weights("model", ("lora", 1.0)) is None
+    assert model_cache._get_ram_in_use() == 320 * 320 * 4 + 100 * KB
+
+
+def test_patched_weights_only_use_free_ram(model_cache: ModelCache):
+    model_cache.put_patched_weights("model", ("lora", 0.5), make_weights(400 * KB))
+    model_cache.put_patched_weights("model", ("lora", 1.0), make_weights(400 * KB))
+    # The older patched weights are dropped to make room, but the model is not.
+    assert model_cache.get_patched_weights("model", ("lora", 0.5)) is None
+    assert model_cache.get_patched_weights("model", ("lora", 1.0)) is not None
+
+    # Patched weights larger than the free RAM are not cached.
+    model_cache.put_patched_weights("model", ("lora", 2.0), make_weights(MB))
+    assert model_cache.get_patched_weights("model", ("lora", 2.0)) is None
+    assert model_cache.get_patched_weights("model", ("lora", 1.0)) is not None
+    assert model_cache._get_ram_in_use() <= model_cache._ram_cache_size_bytes
+
+
+def test_patched_weights_are_dropped_before_models(model_cache: ModelCache):
+    model_cache.put_patched_weights("model", ("lora", 0.5), make_weights(400 * KB))
+    model_cache.make_room(400 * KB)
+    assert model_cache.get_patched_weights("model", ("lora", 0.5)) is None
+    assert model_cache.get("model") is not None
+
+
+def test_patched_weights_are_dropped_with_their_model(model_cache: ModelCache):
+    model_cache.put_patched_weights("model", ("lora", 0.5), make_weights(100 * KB))
+    model_cache.make_room(MB)
+    with pytest.raises(IndexError):
+        model_cache.get("model")
+    assert model_cache.get_patched_weights("model", ("lora", 0.5)) is None
+    assert model_cache._get_ram_in_use() == 0
+
+
+def test_patched_weights_cache_disabled():
+    model_cache = make_model_cache(cache_patched_weights=False)
+    model_cache.put("model", torch.nn.Linear(8, 8))
+    model_cache.put_patched_weights("model", ("lora", 0.5), make_weights(100 * KB))
+    assert model_cache.get_patched_weights("model", ("lora", 0.5)) is None
+
+
+def make_quantized_model() -> torch.nn.Linear:
+    """Make a model with a 256KB GGUF Q8_0 weight, once dequantized."""
+    linear = torch.nn.Linear(256, 256, bias=False)
+    quantized_data = gguf.quantize(linear.weight.detach().numpy(), gguf.GGMLQuantizationType.Q8_0)
+    weight = GGMLTensor(
+        torch.from_numpy(quantized_data), gguf.GGMLQuantizationType.Q8_0, linear.weight.shape, torch.float32
+    )
+    linear.weight = torch.nn.Parameter(weight, requires_grad=False)
+    return linear
+
+
+def test_dequantized_weights_are_dropped_before_models():
+    model_cache = ModelCache(
+        execution_device_working_mem_gb=0,
+        enable_partial_loading=False,
+        keep_ram_copy_of_weights=True,
+        max_ram_cache_size_gb=1 / 1024,  # 1MB
+        execution_device="cpu",
+        logger=InvokeAILogger.get_logger(),
+        dequantized_weights_cache_gb=1 / 1024,  # 1MB
+    )
+    model_cache.put("model", make_quantized_model())
+    model = model_cache.get("model").cached_model.model
+    model(torch.randn(1, 256))
+    dequantized_weights_cache = model_cache.dequantized_weights_cache
+    assert dequantized_weights_cache is not None
+    assert dequantized_weights_cache.cached_bytes() == 256 * KB
+    assert model_cache._get_ram_in_use() == calc_tensor_size(model.weight) + 256 * KB
+
+    model_cache.make_room(MB - calc_tensor_size(model.weight))
+    assert dequantized_weights_cache.cached_bytes() == 0
+    assert model_cache.get("model") is not None
+
+
+def test_stats_are_collected_per_thread_and_readable_from_any_thread(model_cache: ModelCache):
+    worker_stats = CacheStats()
+
+    def worker():
+        model_cache.stats = worker_stats
+        model_cache.get("model")
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    thread.join()
+
+    # The worker's stats are collected on its own thread, but are visible to other threads, e.g. the API.
+    assert model_cache.stats is worker_stats
+    assert worker_stats.hits == 1
+    # Lookups on other threads are not counted in the worker's stats.
+    model_cache.get("model")
+    assert worker_stats.hits == 1
@@ -0,0 +1,112 @@
+import os
+from pathlib import Path
+
+import pytest
+import torch
+from safetensors.torch import save_file
+
+from invokeai.backend.model_manager.load.prepared_weights_cache import (
+    PreparedWeightsCache,
+    load_mmapped_state_dict,
+)
+from invokeai.backend.util.logging import InvokeAILogger
+
+KB = 2**10
+
+
+@pytest.fixture
+def cache(tmp_path: Path) -> PreparedWeightsCache:
+    return PreparedWeightsCache(cache_path=tmp_path / "cache", max_size=100 * KB, logger=InvokeAILogger.get_logger())
+
+
+def make_state_dict(size: int = 10 * KB) -> dict[str, torch.Tensor]:
+    return {
+        "linear.weight": torch.randn(size // 2 // 2, dtype=torch.bfloat16).reshape(-1, 8),
+        "linear.bias": torch.randn(size // 2 // 2, dtype=torch.float16),
+        "empty": torch.empty(0, 4),
+    }
+
+
+def test_load_mmapped_state_dict(tmp_path: Path):
+    state_dict = make_state_dict()
+    save_file(state_dict, tmp_path / "model.safetensors", metadata={"format": "pt"})
+
+    loaded = load_mmapped_state_dict(tmp_path / "model.safetensors")
+    assert loaded.keys() == state_dict.keys()
+    for key, tensor in state_dict.items():
+        assert loaded[key].dtype == tensor.dtype
+        assert torch.equal(loaded[key], tensor)
+
+    # Changes to the tensors are not written back to the file
+    loaded["linear.weight"].zero_()
+    assert torch.equal(
+        load_mmapped_state_dict(tmp_path / "model.safetensors")["linear.weight"], state_dict["linear.weight"]
+    )
+
+    module = torch.nn.Linear(8, 8)
+    module.load_state_dict({"weight": loaded["linear.weight"][:8], "bias": loaded["linear.bias"][:8]}, assign=True)
+    assert module.weight.dtype == torch.bfloat16
+
+
+def test_state_dict_round_trip(cache: PreparedWeightsCache):
+    state_dict = make_state_dict()
+    assert cache.get_state_dict("key", "hash", torch.bfloat16) is None
+    cache.put_state_dict("key", "hash", torch.bfloat16, state_dict)
+
+    loaded = cache.get_state_dict("key", "hash", torch.bfloat16)
+    assert loaded is not None
+    assert all(torch.equal(loaded[k], state_dict[k]) for k in state_dict)
+    # Entries are per dtype
+    assert cache.get_state_dict("key", "hash", torch.float16) is None
+
+
+def test_changed_hash_invalidates_entry(cache: PreparedWeightsCache):
+    cache.put_state_dict("key", "hash", torch.bfloat16, make_state_dict())
+    assert cache.get_state_dict("key", "new_hash", torch.bfloat16) is None
+    # The stale entry is discarded
+    assert cache.get_state_dict("key", "hash", torch.bfloat16) is None
+
+
+def test_least_recently_used_entries_are_evicted(cache: PreparedWeightsCache):
+    for i in range(3):
+        cache.put_state_dict(f"key_{i}", "hash", torch.bfloat16, make_state_dict(30 * KB))
+        entry_path = cache.get(f"key_{i}", "hash", torch.bfloat16)
+        assert entry_path is not None
+        os.utime(entry_path / "prepared.json", (i, i))
+
+    # Using the first entry makes the second one the least recently used
+    assert cache.get("key_0", "hash", torch.bfloat16) is not None
+    cache.put_state_dict("key_3", "hash", torch.bfloat16, make_state_dict(30 * KB))
+
+    assert cache.get("key_1", "hash", torch.bfloat16) is None
+    for key in ("key_0", "key_2", "key_3"):
+        assert cache.get(key, "hash", torch.bfloat16) is not None
+
+
+def test_entries_larger_than_the_cache_are_not_stored(cache: PreparedWeightsCache):
+    cache.put_state_dict("small", "hash", torch.bfloat16, make_state_dict())
+    cache.put_state_dict("large", "hash", torch.bfloat16, make_state_dict(200 * KB))
+    cache.put("large_dir", "hash", torch.bfloat16, lambda path: (path / "weights").write_bytes(bytes(200 * KB)))
+
+    assert cache.get("large", "hash", torch.bfloat16) is None
+    assert cache.get("large_dir", "hash", torch.bfloat16) is None
+    # Other entries are not evicted to make room for them
+    assert cache.get("small", "hash", torch.bfloat16) is not None
+
+
+def test_failed_write_is_not_stored(cache: PreparedWeightsCache, tmp_path: Path):
+    def write(path: Path) -> None:
+        (path / "partial").write_bytes(b"partial")
+        raise RuntimeError("write failed")
+
+    cache.put("key", "hash", torch.bfloat16, write)
+    assert cache.get("key", "hash", torch.bfloat16) is None
+    # The partially written entry is removed
+    assert list((tmp_path / "cache").iterdir()) == []
+
+
+def test_disabled_cache_stores_nothing(tmp_path: Path):
+    cache = PreparedWeightsCache(cache_path=tmp_path / "cache", max_size=0, logger=InvokeAILogger.get_logger())
+    cache.put_state_dict("key", "hash", torch.bfloat16, make_state_dict())
+    assert cache.get_state_dict("key", "hash", torch.bfloat16) is None
+    assert not (tmp_path / "cache").exists()
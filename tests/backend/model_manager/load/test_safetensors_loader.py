@@ -0,0 +1,142 @@
+import json
+from pathlib import Path
+
+import accelerate
+import pytest
+import torch
+from safetensors.torch import load_file, save_file
+
+from invokeai.backend.model_manager.load import safetensors_loader
+from invokeai.backend.model_manager.load.safetensors_loader import (
+    iter_safetensors,
+    load_safetensors,
+    load_safetensors_into_module,
+)
+
+
+@pytest.fixture
+def small_reads(monkeypatch: pytest.MonkeyPatch) -> None:
+    # Small reads split the tensors into many reads, and keep only a few tensors in flight
+    monkeypatch.setattr(safetensors_loader, "_READ_SIZE", 1000)
+
+
+def make_state_dict() -> dict[str, torch.Tensor]:
+    return {
+        "large": torch.randn(1000, 37, dtype=torch.float32),
+        "bf16": torch.randn(100, 3, dtype=torch.bfloat16),
+        "f16": torch.randn(7, dtype=torch.float16),
+        "int": torch.arange(100, dtype=torch.int64),
+        "bool": torch.rand(33) > 0.5,
+        "empty": torch.empty(0, 4),
+        "scalar": torch.tensor(3.0),
+    }
+
+
+@pytest.mark.parametrize("num_threads", [1, 4])
+def test_load_safetensors_matches_load_file(tmp_path: Path, small_reads: None, num_threads: int):
+    path = tmp_path / "model.safetensors"
+    save_file(make_state_dict(), path)
+
+    expected = load_file(path)
+    loaded = load_safetensors(path, num_threads=num_threads)
+    assert loaded.keys() == expected.keys()
+    for key, tensor in expected.items():
+        assert loaded[key].dtype == tensor.dtype
+        assert loaded[key].shape == tensor.shape
+        assert torch.equal(loaded[key], tensor)
+
+
+def test_load_safetensors_casts_floating_point_tensors(tmp_path: Path):
+    path = tmp_path / "model.safetensors"
+    state_dict = make_state_dict()
+    save_file(state_dict, path)
+
+    loaded = load_safetensors(path, dtype=torch.bfloat16)
+    assert loaded["large"].dtype == torch.bfloat16
+    assert loaded["f16"].dtype == torch.bfloat16
+    assert torch.equal(loaded["large"], state_dict["large"].to(torch.bfloat16))
+    assert loaded["int"].dtype == torch.int64
+    assert loaded["bool"].dtype == torch.bool
+
+
+def test_load_safetensors_reads_unsigned_integer_tensors(tmp_path: Path):
+    # Older versions of safetensors can't save unsigned integer tensors wider than 8 bits, so the file is written here.
+    path = tmp_path / "model.safetensors"
+    data = torch.arange(6, dtype=torch.int32).numpy().tobytes()
+    header = json.dumps({"u32": {"dtype": "U32", "shape": [2, 3], "data_offsets": [0, len(data)]}}).encode()
+    path.write_bytes(len(header).to_bytes(8, "little") + header + data)
+
+    loaded = load_safetensors(path)
+    assert loaded["u32"].dtype == torch.uint32
+    assert loaded["u32"].to(torch.int64).tolist() == [[0, 1, 2], [3, 4, 5]]
+
+
+def test_load_safetensors_falls_back_to_load_file_for_unknown_dtypes(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    path = tmp_path / "model.safetensors"
+    state_dict = make_state_dict()
+    save_file(state_dict, path)
+    monkeypatch.setattr(
+        safetensors_loader,
+        "SAFETENSORS_DTYPES",
+        {k: v for k, v in safetensors_loader.SAFETENSORS_DTYPES.items() if k != "F16"},
+    )
+
+    loaded = load_safetensors(path, dtype=torch.bfloat16)
+    assert loaded.keys() == state_dict.keys()
+    assert loaded["f16"].dtype == torch.bfloat16
+    assert torch.equal(loaded["int"], state_dict["int"])
+
+
+def test_iter_safetensors_can_be_closed_early(tmp_path: Path, small_reads: None):
+    path = tmp_path / "model.safetensors"
+    save_file({f"t{i}": torch.randn(1000) for i in range(20)}, path)
+
+    tensors = iter_safetensors(path, num_threads=2)
+    key, _ = next(tensors)
+    tensors.close()
+    assert key.startswith("t")
+
+
+class _Model(torch.nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.linear = torch.nn.Linear(8, 4)
+        self.norm = torch.nn.BatchNorm1d(4)
+
+
+def test_load_safetensors_into_module(tmp_path: Path, small_reads: None):
+    path = tmp_path / "model.safetensors"
+    state_dict = _Model().state_dict()
+    save_file(state_dict, path)
+
+    with accelerate.init_empty_weights():
+        model = _Model()
+    load_safetensors_into_module(model, path, dtype=torch.bfloat16)
+
+    for key, tensor in model.state_dict().items():
+        assert tensor.device.type == "cpu"
+        assert torch.equal(
+            tensor, state_dict[key].to(torch.bfloat16) if tensor.is_floating_point() else state_dict[key]
+        )
+    assert isinstance(model.linear.weight, torch.nn.Parameter)
+    assert model.linear.weight.requires_grad
+    assert not isinstance(model.norm.running_mean, torch.nn.Parameter)
+
+
+def test_load_safetensors_into_module_strict(tmp_path: Path):
+    path = tmp_path / "model.safetensors"
+    state_dict = _Model().state_dict()
+    del state_dict["linear.bias"]
+    state_dict["unexpected"] = torch.zeros(1)
+    save_file(state_dict, path)
+
+    with accelerate.init_empty_weights():
+        model = _Model()
+    with pytest.raises(RuntimeError, match="linear.bias"):
+        load_safetensors_into_module(model, path)
+
+    with accelerate.init_empty_weights():
+        model = _Model()
+    load_safetensors_into_module(model, path, strict=False)
+    assert model.linear.weight.device.type == "cpu"
+    assert model.linear.bias.device.type == "meta"
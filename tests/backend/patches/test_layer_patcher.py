@@ -1,3 +1,5 @@
+from typing import Hashable, Iterator, Optional
+
 import pytest
 import torch
 
@@ -311,3 +313,113 @@ def test_apply_smart_model_patches_force_sidecar_and_direct_patching():
             force_sidecar_patching=True,
         ):
             pass
+
+
+class DictPatchedWeightsCache:
+    def __init__(self):
+        self.weights: dict[Hashable, dict[str, torch.Tensor]] = {}
+
+    def get_patched_weights(self, patches_key: Hashable) -> Optional[dict[str, torch.Tensor]]:
+        return self.weights.get(patches_key)
+
+    def put_patched_weights(self, patches_key: Hashable, weights: dict[str, torch.Tensor]) -> None:
+        self.weights[patches_key] = weights
+
+
+@torch.no_grad()
+def test_apply_smart_model_patches_with_patched_weights_cache():
+    """Test that the patched weights are cached, and that the cached weights are applied without computing the patches
+    when the same patches are applied again.
+    """
+    dtype = torch.float32
+    linear_in_features = 4
+    linear_out_features = 8
+    lora_rank = 2
+    model = DummyModuleWithTwoLayers(linear_in_features, linear_out_features, device="cpu", dtype=dtype)
+    apply_custom_layers_to_model(model)
+
+    lora_layers = {
+        "linear_layer_1": LoRALayer.from_state_dict_values(
+            values={
+                "lora_down.weight": torch.ones((lora_rank, linear_in_features), device="cpu", dtype=torch.float16),
+                "lora_up.weight": torch.ones((linear_out_features, lora_rank), device="cpu", dtype=torch.float16),
+            },
+        )
+    }
+    lora = ModelPatchRaw(lora_layers)
+    orig_state_dict = {k: v.clone() for k, v in model.state_dict().items()}
+    cache = DictPatchedWeightsCache()
+
+    def unexpected_patches() -> Iterator[tuple[ModelPatchRaw, float]]:
+        raise AssertionError("The patches should not be computed when the patched weights are cached.")
+        yield
+
+    with LayerPatcher.apply_smart_model_patches(
+        model=model,
+        patches=[(lora, 0.5)],
+        prefix="",
+        dtype=dtype,
+        force_direct_patching=True,
+        patched_weights_cache=cache,
+        patches_key=(("lora", 0.5),),
+    ):
+        patched_state_dict = {k: v.clone() for k, v in model.state_dict().items()}
+
+    # Only the parameters changed by the patches are cached.
+    assert list(cache.weights.keys()) == [("", (("lora", 0.5),))]
+    assert list(cache.weights[("", (("lora", 0.5),))].keys()) == ["linear_layer_1.weight"]
+    for key, tensor in model.state_dict().items():
+        assert torch.equal(tensor, orig_state_dict[key])
+
+    with LayerPatcher.apply_smart_model_patches(
+        model=model,
+        patches=unexpected_patches(),
+        prefix="",
+        dtype=dtype,
+        force_direct_patching=True,
+        patched_weights_cache=cache,
+        patches_key=(("lora", 0.5),),
+    ):
+        for key, tensor in model.state_dict().items():
+            assert torch.equal(tensor, patched_state_dict[key])
+
+    for key, tensor in model.state_dict().items():
+        assert torch.equal(tensor, orig_state_dict[key])
+
+    # A different weight is a different stack of patches.
+    with LayerPatcher.apply_smart_model_patches(
+        model=model,
+        patches=[(lora, 1.0)],
+        prefix="",
+        dtype=dtype,
+        force_direct_patching=True,
+        patched_weights_cache=cache,
+        patches_key=(("lora", 1.0),),
+    ):
+        assert not torch.equal(model.linear_layer_1.weight, patched_state_dict["linear_layer_1.weight"])
+    assert len(cache.weights) == 2
+
+
+@torch.no_grad()
+def test_sidecar_patches_are_not_cached():
+    dtype = torch.float32
+    model = DummyModuleWithOneLayer(4, 8, device="cpu", dtype=dtype)
+    apply_custom_layers_to_model(model)
+    lora_layers = {
+        "linear_layer_1": LoRALayer.from_state_dict_values(
+            values={"lora_down.weight": torch.ones((2, 4)), "lora_up.weight": torch.ones((8, 2))},
+        )
+    }
+    cache = DictPatchedWeightsCache()
+
+    # On the CPU, layers are patched with sidecar patches.
+    with LayerPatcher.apply_smart_model_patches(
+        model=model,
+        patches=[(ModelPatchRaw(lora_layers), 0.5)],
+        prefix="",
+        dtype=dtype,
+        patched_weights_cache=cache,
+        patches_key=(("lora", 0.5),),
+    ):
+        assert model.linear_layer_1.get_num_patches() == 1
+    assert cache.weights == {}
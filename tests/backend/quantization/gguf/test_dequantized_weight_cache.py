@@ -0,0 +1,131 @@
+import gc
+
+import gguf
+import torch
+
+from invokeai.backend.quantization.gguf.dequantized_weight_cache import DequantizedWeightCache
+from invokeai.backend.quantization.gguf.ggml_tensor import GGMLTensor
+from invokeai.backend.util.calc_tensor_size import calc_tensor_size
+
+
+def quantize_tensor(data: torch.Tensor, ggml_quantization_type: gguf.GGMLQuantizationType) -> GGMLTensor:
+    quantized_np = gguf.quantize(data.detach().cpu().numpy(), ggml_quantization_type)
+    return GGMLTensor(
+        data=torch.from_numpy(quantized_np),
+        ggml_quantization_type=ggml_quantization_type,
+        tensor_shape=data.shape,
+        compute_dtype=data.dtype,
+    )
+
+
+def make_quantized_tensor(rows: int, cache: DequantizedWeightCache | None = None) -> GGMLTensor:
+    tensor = quantize_tensor(torch.randn(rows, 32), gguf.GGMLQuantizationType.Q8_0)
+    tensor.dequantized_weight_cache = cache
+    return tensor
+
+
+def make_quantized_linear(cache: DequantizedWeightCache | None) -> torch.nn.Linear:
+    linear = torch.nn.Linear(32, 16)
+    linear.weight = torch.nn.Parameter(
+        quantize_tensor(linear.weight.detach(), gguf.GGMLQuantizationType.Q8_0), requires_grad=False
+    )
+    if cache is not None:
+        assert cache.attach_to_model(linear) == 1
+    return linear
+
+
+@torch.no_grad()
+def test_linear_with_cache_matches_without_cache():
+    torch.manual_seed(0)
+    cache = DequantizedWeightCache(max_bytes=2**20)
+    linear = make_quantized_linear(cache)
+    x = torch.randn(2, 32)
+
+    expected = torch.nn.functional.linear(x, linear.weight.get_dequantized_tensor(), linear.bias)
+    for _ in range(3):
+        torch.testing.assert_close(linear(x), expected)
+
+    # The weight is dequantized once, on the first call.
+    assert cache.stats.misses == 1
+    assert cache.stats.hits == 3
+    assert cache.stats.hit_rate == 0.75
+    assert cache.cached_bytes() == 16 * 32 * 4
+
+
+def test_cache_is_passed_on_to_derived_tensors():
+    cache = DequantizedWeightCache(max_bytes=2**20)
+    tensor = make_quantized_tensor(8, cache)
+    moved = tensor.to("cpu", copy=True)
+    assert isinstance(moved, GGMLTensor)
+    assert moved is not tensor
+    assert moved.dequantized_weight_cache is cache
+
+
+def test_torch_compatible_types_are_not_cached():
+    cache = DequantizedWeightCache(max_bytes=2**20)
+    tensor = quantize_tensor(torch.randn(8, 32), gguf.GGMLQuantizationType.F16)
+    tensor.dequantized_weight_cache = cache
+    tensor.get_dequantized_tensor()
+    assert cache.stats.misses == 0
+    assert cache.cached_bytes() == 0
+
+
+def test_size_weighted_frequency_policy():
+    small = make_quantized_tensor(8)
+    large = make_quantized_tensor(16)
+    small_bytes = calc_tensor_size(small.get_dequantized_tensor())
+    large_bytes = calc_tensor_size(large.get_dequantized_tensor())
+    # There is only room for one of the tensors.
+    cache = DequantizedWeightCache(max_bytes=large_bytes)
+    small.dequantized_weight_cache = cache
+    large.dequantized_weight_cache = cache
+
+    # The large tensor is used more often, so its score is higher than that of the small tensor.
+    for _ in range(3):
+        large.get_dequantized_tensor()
+    small.get_dequantized_tensor()
+    assert cache.cached_bytes() == large_bytes
+    assert cache.stats.evictions == 0
+
+    # Once the small tensor is used as often as the large one, it saves more dequantization work per byte.
+    for _ in range(3):
+        small.get_dequantized_tensor()
+    assert cache.cached_bytes() == small_bytes
+    assert cache.stats.evictions == 1
+    assert cache.stats.misses == 3
+
+
+def test_tensors_larger_than_the_budget_are_not_cached():
+    cache = DequantizedWeightCache(max_bytes=8 * 32 * 4 - 1)
+    tensor = make_quantized_tensor(8, cache)
+    tensor.get_dequantized_tensor()
+    tensor.get_dequantized_tensor()
+    assert cache.stats.misses == 2
+    assert cache.cached_bytes() == 0
+
+
+def test_garbage_collected_tensors_are_dropped():
+    cache = DequantizedWeightCache(max_bytes=2**20)
+    tensor = make_quantized_tensor(8, cache)
+    tensor.get_dequantized_tensor()
+    assert cache.cached_bytes() == 8 * 32 * 4
+
+    del tensor
+    gc.collect()
+    assert cache.cached_bytes() == 0
+    assert cache.stats.evictions == 0
+
+
+def test_evict():
+    cache = DequantizedWeightCache(max_bytes=2**20)
+    tensors = [make_quantized_tensor(8, cache) for _ in range(3)]
+    for tensor in tensors:
+        tensor.get_dequantized_tensor()
+
+    assert cache.evict(1, torch.device("cuda")) == 0
+    assert cache.evict(8 * 32 * 4 + 1, torch.device("cpu")) == 2 * 8 * 32 * 4
+    assert cache.cached_bytes(torch.device("cpu")) == 8 * 32 * 4
+    assert cache.stats.evictions == 2
+
+    cache.clear()
+    assert cache.cached_bytes() == 0
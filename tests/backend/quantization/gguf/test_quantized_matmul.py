@@ -0,0 +1,94 @@
+import gguf
+import pytest
+import torch
+
+import invokeai.backend.quantization.gguf.ggml_tensor as ggml_tensor
+import invokeai.backend.quantization.gguf.quantized_matmul as quantized_matmul
+from invokeai.backend.quantization.gguf.dequantized_weight_cache import DequantizedWeightCache
+from invokeai.backend.quantization.gguf.ggml_tensor import GGMLTensor
+from invokeai.backend.quantization.gguf.utils import dequantize
+
+
+def make_random_blocks(out_features: int, in_features: int, qtype: gguf.GGMLQuantizationType) -> torch.Tensor:
+    """Makes random quantized blocks with small, finite scales. The gguf library can't quantize to all types, but any
+    bytes are valid quantized values.
+    """
+    block_size, type_size = gguf.GGML_QUANT_SIZES[qtype]
+    n_blocks = out_features * in_features // block_size
+    generator = torch.Generator().manual_seed(0)
+    blocks = torch.randint(0, 256, (n_blocks, type_size), dtype=torch.uint8, generator=generator)
+    # The scales are the leading float16 values of Q8_0 (d) and Q4_K (d, dmin) blocks.
+    num_scales = 2 if qtype == gguf.GGMLQuantizationType.Q4_K else 1
+    scales = (torch.rand((n_blocks, num_scales), generator=generator) * 0.01).to(torch.float16)
+    blocks[:, : 2 * num_scales] = scales.view(torch.uint8)
+    return blocks.reshape((out_features, -1))
+
+
+def make_quantized_weight(out_features: int, in_features: int, qtype: gguf.GGMLQuantizationType) -> GGMLTensor:
+    return GGMLTensor(
+        make_random_blocks(out_features, in_features, qtype),
+        ggml_quantization_type=qtype,
+        tensor_shape=torch.Size((out_features, in_features)),
+        compute_dtype=torch.float32,
+    )
+
+
+def reference_linear(input: torch.Tensor, weight: GGMLTensor, bias: torch.Tensor | None) -> torch.Tensor:
+    dequantized_weight = dequantize(
+        weight.quantized_data, weight._ggml_quantization_type, weight.tensor_shape, torch.float32
+    )
+    return torch.nn.functional.linear(input, dequantized_weight, bias)
+
+
+@pytest.mark.parametrize("qtype", [gguf.GGMLQuantizationType.Q8_0, gguf.GGMLQuantizationType.Q4_K])
+@pytest.mark.parametrize("with_bias", [True, False])
+@torch.no_grad()
+def test_quantized_linear(qtype: gguf.GGMLQuantizationType, with_bias: bool, monkeypatch: pytest.MonkeyPatch):
+    # Use tiles of 3 rows, so that the last tile is partial.
+    monkeypatch.setattr(quantized_matmul, "TILE_BYTES", 3 * 512 * 4)
+    weight = make_quantized_weight(16, 512, qtype)
+    bias = torch.randn(16) if with_bias else None
+    input = torch.randn(2, 5, 512)
+
+    assert quantized_matmul.can_use_quantized_linear(input, weight, bias)
+    output = quantized_matmul.quantized_linear(input, weight, bias)
+    torch.testing.assert_close(output, reference_linear(input, weight, bias), rtol=1e-4, atol=1e-4)
+
+
+@torch.no_grad()
+def test_linear_uses_quantized_linear(monkeypatch: pytest.MonkeyPatch):
+    calls: list[GGMLTensor] = []
+
+    def spy(input: torch.Tensor, weight: GGMLTensor, bias: torch.Tensor | None = None) -> torch.Tensor:
+        calls.append(weight)
+        return quantized_matmul.quantized_linear(input, weight, bias)
+
+    monkeypatch.setattr(ggml_tensor, "quantized_linear", spy)
+    linear = torch.nn.Linear(256, 8)
+    weight = make_quantized_weight(8, 256, gguf.GGMLQuantizationType.Q4_K)
+    linear.weight = torch.nn.Parameter(weight, requires_grad=False)
+    # GGUF models keep their biases as F32 GGMLTensors.
+    bias = linear.bias.detach()
+    linear.bias = torch.nn.Parameter(
+        GGMLTensor(bias, gguf.GGMLQuantizationType.F32, bias.shape, torch.float32), requires_grad=False
+    )
+    input = torch.randn(3, 256)
+
+    output = linear(input)
+    assert calls == [linear.weight]
+    torch.testing.assert_close(output, reference_linear(input, weight, bias), rtol=1e-4, atol=1e-4)
+
+    # If the dequantized weight is cached, the cached weight is used instead.
+    linear.weight.dequantized_weight_cache = DequantizedWeightCache(max_bytes=2**20)
+    linear(input)
+    assert len(calls) == 1
+
+
+def test_can_use_quantized_linear():
+    weight = make_quantized_weight(8, 256, gguf.GGMLQuantizationType.Q8_0)
+    assert quantized_matmul.can_use_quantized_linear(torch.randn(1, 256), weight, None)
+    # The input must have the compute dtype of the weight.
+    assert not quantized_matmul.can_use_quantized_linear(torch.randn(1, 256, dtype=torch.bfloat16), weight, None)
+    # Only some quantization types are supported.
+    q5_k_weight = make_quantized_weight(8, 256, gguf.GGMLQuantizationType.Q5_K)
+    assert not quantized_matmul.can_use_quantized_linear(torch.randn(1, 256), q5_k_weight, None)
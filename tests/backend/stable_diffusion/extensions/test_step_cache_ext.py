@@ -0,0 +1,67 @@
+import torch
+from diffusers import UNet2DConditionModel
+
+from invokeai.backend.stable_diffusion.extensions.step_cache import StepCacheExt
+from invokeai.backend.util.step_cache import StepCache
+
+
+def make_unet() -> UNet2DConditionModel:
+    torch.manual_seed(0)
+    return UNet2DConditionModel(
+        sample_size=8,
+        in_channels=4,
+        out_channels=4,
+        down_block_types=("CrossAttnDownBlock2D", "DownBlock2D"),
+        up_block_types=("UpBlock2D", "CrossAttnUpBlock2D"),
+        block_out_channels=(8, 16),
+        layers_per_block=1,
+        norm_num_groups=4,
+        cross_attention_dim=8,
+        attention_head_dim=2,
+    ).eval()
+
+
+@torch.no_grad()
+def test_static_patch_model_reuses_deep_blocks():
+    unet = make_unet()
+    sample = torch.randn(1, 4, 8, 8)
+    encoder_hidden_states = torch.randn(1, 3, 8)
+    timesteps = [999, 500, 1]
+    expected = [unet(sample, t, encoder_hidden_states).sample for t in timesteps]
+
+    step_cache = StepCache(interval=2)
+    deep_block_calls = 0
+
+    def count_call(*args):
+        nonlocal deep_block_calls
+        deep_block_calls += 1
+
+    unet.mid_block.resnets[0].register_forward_pre_hook(count_call)
+    with StepCacheExt.static_patch_model(unet, step_cache):
+        results = [unet(sample, t, encoder_hidden_states).sample for t in timesteps]
+
+    # The deep blocks are computed on the first and last steps, and reused on the second step.
+    assert deep_block_calls == 2
+    assert step_cache.stats.computed_calls == 2
+    assert step_cache.stats.cached_calls == 1
+    # down_blocks[1], mid_block and up_blocks[0] are skipped.
+    assert step_cache.stats.skipped_blocks == 3
+    torch.testing.assert_close(results[0], expected[0])
+    torch.testing.assert_close(results[2], expected[2])
+    assert not torch.allclose(results[1], expected[1])
+
+    # The original forward methods are restored.
+    assert "forward" not in unet.mid_block.__dict__
+    torch.testing.assert_close(unet(sample, timesteps[1], encoder_hidden_states).sample, expected[1])
+
+
+@torch.no_grad()
+def test_static_patch_model_with_interval_1_matches_unpatched():
+    unet = make_unet()
+    sample = torch.randn(1, 4, 8, 8)
+    encoder_hidden_states = torch.randn(1, 3, 8)
+    step_cache = StepCache(interval=1)
+    with StepCacheExt.static_patch_model(unet, step_cache):
+        assert "forward" not in unet.mid_block.__dict__
+        result = unet(sample, 500, encoder_hidden_states).sample
+    torch.testing.assert_close(result, unet(sample, 500, encoder_hidden_states).sample)
@@ -0,0 +1,112 @@
+import pytest
+import torch
+from diffusers.models.unets.unet_2d_condition import UNet2DConditionModel
+from diffusers.schedulers.scheduling_dpmsolver_multistep import DPMSolverMultistepScheduler
+from diffusers.schedulers.scheduling_euler_ancestral_discrete import EulerAncestralDiscreteScheduler
+from diffusers.schedulers.scheduling_euler_discrete import EulerDiscreteScheduler
+
+from invokeai.app.invocations.denoise_latents import DenoiseLatentsInvocation
+from invokeai.app.services.session_processor.session_processor_common import CanceledException
+from invokeai.backend.stable_diffusion.diffusers_pipeline import DenoiseBatchItem, PipelineIntermediateState
+from invokeai.backend.stable_diffusion.diffusion.conditioning_data import BasicConditioningInfo, TextConditioningData
+
+CROSS_ATTENTION_DIM = 16
+SCHEDULER_CLASSES = [EulerDiscreteScheduler, EulerAncestralDiscreteScheduler, DPMSolverMultistepScheduler]
+
+
+def make_unet() -> UNet2DConditionModel:
+    return UNet2DConditionModel(
+        sample_size=8,
+        in_channels=4,
+        out_channels=4,
+        down_block_types=("CrossAttnDownBlock2D", "DownBlock2D"),
+        up_block_types=("UpBlock2D", "CrossAttnUpBlock2D"),
+        block_out_channels=(8, 16),
+        layers_per_block=1,
+        norm_num_groups=4,
+        cross_attention_dim=CROSS_ATTENTION_DIM,
+        attention_head_dim=2,
+    ).eval()
+
+
+def make_conditioning_data() -> TextConditioningData:
+    return TextConditioningData(
+        uncond_text=BasicConditioningInfo(embeds=torch.randn(1, 5, CROSS_ATTENTION_DIM)),
+        cond_text=BasicConditioningInfo(embeds=torch.randn(1, 7, CROSS_ATTENTION_DIM)),
+        uncond_regions=None,
+        cond_regions=None,
+        guidance_scale=[5.0, 4.0, 3.0, 2.0],
+        guidance_rescale_multiplier=0.5,
+    )
+
+
+def make_item(scheduler_class: type, seed: int, latents: torch.Tensor, noise: torch.Tensor, conditioning_data):
+    """Make a batch item with a fresh scheduler, so that each run starts from the same scheduler state."""
+    scheduler = scheduler_class(num_train_timesteps=1000, steps_offset=1)
+    scheduler.set_timesteps(4)
+    return DenoiseBatchItem(
+        latents=latents,
+        noise=noise,
+        conditioning_data=conditioning_data,
+        scheduler=scheduler,
+        scheduler_step_kwargs={"generator": torch.Generator().manual_seed(seed)},
+        callback=lambda _: None,
+    )
+
+
+@pytest.mark.parametrize("scheduler_class", SCHEDULER_CLASSES)
+@torch.no_grad()
+def test_latents_from_embeddings_batch_matches_latents_from_embeddings(scheduler_class: type):
+    torch.manual_seed(0)
+    unet = make_unet()
+    inputs = [(seed, torch.randn(1, 4, 8, 8), torch.randn(1, 4, 8, 8), make_conditioning_data()) for seed in range(3)]
+
+    items = [make_item(scheduler_class, *i) for i in inputs]
+    timesteps = items[0].scheduler.timesteps
+    pipeline = DenoiseLatentsInvocation.create_pipeline(unet, items[0].scheduler)
+    results = pipeline.latents_from_embeddings_batch(items=items, timesteps=timesteps, init_timestep=timesteps[:1])
+
+    for (seed, latents, noise, conditioning_data), result in zip(inputs, results, strict=True):
+        item = make_item(scheduler_class, seed, latents, noise, conditioning_data)
+        expected = DenoiseLatentsInvocation.create_pipeline(unet, item.scheduler).latents_from_embeddings(
+            latents=latents,
+            scheduler_step_kwargs=item.scheduler_step_kwargs,
+            conditioning_data=conditioning_data,
+            noise=noise,
+            seed=seed,
+            timesteps=timesteps,
+            init_timestep=timesteps[:1],
+            callback=lambda _: None,
+        )
+        assert isinstance(result, torch.Tensor)
+        torch.testing.assert_close(result, expected, rtol=1e-4, atol=1e-5)
+
+
+@torch.no_grad()
+def test_latents_from_embeddings_batch_drops_canceled_items():
+    torch.manual_seed(0)
+    unet = make_unet()
+    steps: list[list[int]] = [[], []]
+
+    def build_callback(i: int, cancel_at_step: int | None):
+        def callback(state: PipelineIntermediateState) -> None:
+            steps[i].append(state.step)
+            if state.step == cancel_at_step:
+                raise CanceledException
+
+        return callback
+
+    items = [
+        make_item(EulerDiscreteScheduler, i, torch.randn(1, 4, 8, 8), torch.randn(1, 4, 8, 8), make_conditioning_data())
+        for i in range(2)
+    ]
+    items[0].callback = build_callback(0, cancel_at_step=2)
+    items[1].callback = build_callback(1, cancel_at_step=None)
+    timesteps = items[0].scheduler.timesteps
+    pipeline = DenoiseLatentsInvocation.create_pipeline(unet, items[0].scheduler)
+
+    results = pipeline.latents_from_embeddings_batch(items=items, timesteps=timesteps, init_timestep=timesteps[:1])
+
+    assert isinstance(results[0], CanceledException)
+    assert isinstance(results[1], torch.Tensor)
+    assert steps == [[0, 1, 2], [0, 1, 2, 3, 4]]
@@ -0,0 +1,72 @@
+import torch
+
+from invokeai.backend.stable_diffusion.diffusion.conditioning_data import (
+    BasicConditioningInfo,
+    Range,
+    TextConditioningData,
+    TextConditioningRegions,
+)
+from invokeai.backend.stable_diffusion.diffusion.regional_prompt_data import RegionalPromptData
+
+
+def test_get_cross_attn_mask():
+    # Prompt 0 covers the left column, prompt 1 the top row of a 2x2 image.
+    masks = torch.tensor([[[[1.0, 0.0], [1.0, 0.0]], [[1.0, 1.0], [0.0, 0.0]]]])
+    regions = TextConditioningRegions(masks=masks, ranges=[Range(start=0, end=2), Range(start=2, end=3)])
+    regional_prompt_data = RegionalPromptData(
+        regions=[regions], device=torch.device("cpu"), dtype=torch.float32, max_downscale_factor=1
+    )
+
+    attn_mask = regional_prompt_data.get_cross_attn_mask(query_seq_len=4, key_seq_len=4)
+
+    # The last key is not in any prompt's range, so all queries attend to it.
+    m = -10000.0
+    expected = torch.tensor([[[0, 0, 0, 0], [m, m, 0, 0], [0, 0, m, 0], [m, m, m, 0]]])
+    torch.testing.assert_close(attn_mask, expected)
+    # The mask is built once per query and key sequence length.
+    assert regional_prompt_data.get_cross_attn_mask(query_seq_len=4, key_seq_len=4) is attn_mask
+
+
+def test_get_cross_attn_mask_at_each_downscaling_level():
+    masks = torch.zeros((1, 2, 8, 8))
+    masks[:, 0, :, :4] = 1.0
+    masks[:, 1, :, 4:] = 1.0
+    regions = TextConditioningRegions(masks=masks, ranges=[Range(start=0, end=3), Range(start=3, end=5)])
+    regional_prompt_data = RegionalPromptData(regions=[regions] * 2, device=torch.device("cpu"), dtype=torch.float16)
+
+    for query_seq_len in [64, 16, 4, 1]:
+        attn_mask = regional_prompt_data.get_cross_attn_mask(query_seq_len=query_seq_len, key_seq_len=5)
+        assert attn_mask.shape == (2, query_seq_len, 5)
+        assert attn_mask.dtype == torch.float16
+
+
+def test_text_conditioning_data_reuses_regional_prompt_data():
+    uncond_text = BasicConditioningInfo(embeds=torch.randn(1, 3, 8))
+    cond_text = BasicConditioningInfo(embeds=torch.randn(1, 5, 8))
+    cond_regions = TextConditioningRegions(masks=torch.ones((1, 1, 4, 4)), ranges=[Range(start=0, end=5)])
+    conditioning_data = TextConditioningData(
+        uncond_text=uncond_text,
+        cond_text=cond_text,
+        uncond_regions=None,
+        cond_regions=cond_regions,
+        guidance_scale=7.5,
+    )
+
+    def get_regional_prompt_data(conditionings: list[BasicConditioningInfo], regions: list) -> RegionalPromptData:
+        return conditioning_data.get_regional_prompt_data(
+            conditionings=conditionings,
+            regions=regions,
+            latent_height=4,
+            latent_width=4,
+            device=torch.device("cpu"),
+            dtype=torch.float32,
+        )
+
+    both = get_regional_prompt_data([uncond_text, cond_text], [None, cond_regions])
+    assert get_regional_prompt_data([uncond_text, cond_text], [None, cond_regions]) is both
+    assert get_regional_prompt_data([cond_text], [cond_regions]) is not both
+
+    # The unconditioned text has no regions, so it applies to the whole image.
+    attn_mask = both.get_cross_attn_mask(query_seq_len=16, key_seq_len=5)
+    assert attn_mask.shape == (2, 16, 5)
+    assert (attn_mask == 0).all()
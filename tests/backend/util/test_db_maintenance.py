@@ -0,0 +1,115 @@
+import os
+import sqlite3
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from invokeai.backend.util.db_maintenance import (
+    ConfigMapper,
+    DatabaseMapper,
+    InvokeAIDatabaseMaintenanceApp,
+    MaintenanceOperation,
+    PhysicalFileMapper,
+)
+
+
+@pytest.fixture
+def config(tmp_path: Path) -> ConfigMapper:
+    config = ConfigMapper()
+    config.database_path = str(tmp_path / "databases" / "invokeai.db")
+    config.database_backup_dir = str(tmp_path / "databases" / "backup")
+    config.outputs_path = str(tmp_path / "outputs" / "images")
+    config.archive_path = str(tmp_path / "outputs" / "images-archive")
+    config.thumbnails_path = os.path.join(config.outputs_path, "thumbnails")
+    config.thumbnails_archive_path = os.path.join(config.archive_path, "thumbnails")
+    os.makedirs(config.thumbnails_path)
+    os.makedirs(os.path.dirname(config.database_path))
+
+    with sqlite3.connect(config.database_path) as conn:
+        conn.execute("CREATE TABLE images (image_name TEXT NOT NULL PRIMARY KEY)")
+        # a.png is on disk, b.png is on disk without a thumbnail, and c.png is only in the db
+        conn.executemany("INSERT INTO images VALUES (?)", [("a.png",), ("b.png",), ("c.png",)])
+    # d.png is only on disk, and e.webp is a thumbnail without an image
+    for name in ("a.png", "b.png", "d.png"):
+        Image.new("RGB", (512, 512)).save(os.path.join(config.outputs_path, name))
+    for name in ("a.webp", "c.webp", "d.webp", "e.webp"):
+        Image.new("RGB", (64, 64)).save(os.path.join(config.thumbnails_path, name), "webp")
+    return config
+
+
+def run_all(config: ConfigMapper, dry_run: bool, workers: int = 1) -> None:
+    app = InvokeAIDatabaseMaintenanceApp(MaintenanceOperation.All, dry_run=dry_run, workers=workers)
+    file_mapper = PhysicalFileMapper(
+        config.outputs_path, config.thumbnails_path, config.archive_path, config.thumbnails_archive_path
+    )
+    db_mapper = DatabaseMapper(config.database_path, config.database_backup_dir)
+    try:
+        app.clean_orphaned_db_entries(config, file_mapper, db_mapper)
+        app.clean_orphaned_disk_files(config, file_mapper, db_mapper)
+        app.regenerate_thumbnails(config, file_mapper, db_mapper)
+    finally:
+        db_mapper.disconnect()
+    app.print_report()
+
+
+def get_db_image_names(config: ConfigMapper) -> set[str]:
+    with sqlite3.connect(config.database_path) as conn:
+        return {row[0] for row in conn.execute("SELECT image_name FROM images")}
+
+
+def test_dry_run_reports_without_changes(config: ConfigMapper, capsys: pytest.CaptureFixture[str]):
+    run_all(config, dry_run=True)
+
+    assert get_db_image_names(config) == {"a.png", "b.png", "c.png"}
+    assert set(os.listdir(config.thumbnails_path)) == {"a.webp", "c.webp", "d.webp", "e.webp"}
+    assert not os.path.exists(config.archive_path)
+    assert not os.path.exists(config.database_backup_dir)
+
+    report = capsys.readouterr().out
+    counts = {k.strip(): v.strip() for k, v in (line.split(":") for line in report.splitlines() if ":" in line)}
+    assert "= Dry Run Complete - no changes were made" in report
+    assert counts["Orphaned db entries that would be cleaned"] == "1"
+    assert counts["Orphaned disk files that would be archived"] == "1"
+    # c.webp is archived with the orphaned db entry and d.webp with the orphaned file, leaving e.webp
+    assert counts["Orphaned thumbnail files that would be archived"] == "1"
+    assert counts["Thumbnails that would be regenerated"] == "1"
+    assert counts["Errors during operation"] == "0"
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_reconciles_db_and_outputs(config: ConfigMapper, workers: int):
+    run_all(config, dry_run=False, workers=workers)
+
+    assert get_db_image_names(config) == {"a.png", "b.png"}
+    assert set(os.listdir(config.archive_path)) == {"d.png", "thumbnails"}
+    assert set(os.listdir(config.thumbnails_archive_path)) == {"c.webp", "d.webp", "e.webp"}
+    assert set(os.listdir(config.thumbnails_path)) == {"a.webp", "b.webp"}
+    with Image.open(os.path.join(config.thumbnails_path, "b.webp")) as thumbnail:
+        assert thumbnail.size == (256, 256)
+    assert len(os.listdir(config.database_backup_dir)) == 1
+
+
+def test_thumbnails_are_kept_if_db_entries_are_not_removed(config: ConfigMapper):
+    with sqlite3.connect(config.database_path) as conn:
+        conn.execute("INSERT INTO images VALUES ('f.png')")
+        conn.execute(
+            "CREATE TRIGGER fail_delete BEFORE DELETE ON images WHEN old.image_name = 'f.png'"
+            " BEGIN SELECT RAISE(ABORT, 'delete failed'); END"
+        )
+    Image.new("RGB", (64, 64)).save(os.path.join(config.thumbnails_path, "f.webp"), "webp")
+
+    app = InvokeAIDatabaseMaintenanceApp(MaintenanceOperation.CleanOrphanedDbEntries, dry_run=False)
+    file_mapper = PhysicalFileMapper(
+        config.outputs_path, config.thumbnails_path, config.archive_path, config.thumbnails_archive_path
+    )
+    db_mapper = DatabaseMapper(config.database_path, config.database_backup_dir)
+    try:
+        app.clean_orphaned_db_entries(config, file_mapper, db_mapper)
+    finally:
+        db_mapper.disconnect()
+
+    # c.png and f.png are deleted in the same transaction, which is rolled back, so neither thumbnail is archived
+    assert get_db_image_names(config) == {"a.png", "b.png", "c.png", "f.png"}
+    assert set(os.listdir(config.thumbnails_path)) == {"a.webp", "c.webp", "d.webp", "e.webp", "f.webp"}
+    assert os.listdir(config.thumbnails_archive_path) == []
@@ -2,6 +2,7 @@
 Test abstract device class.
 """
 
+import threading
 from unittest.mock import patch
 
 import pytest
@@ -130,3 +131,24 @@ def test_legacy_precision_name():
         assert "float16" == choose_precision(torch.device("cuda"))
         assert "float16" == choose_precision(torch.device("mps"))
         assert "float32" == choose_precision(torch.device("cpu"))
+
+
+def test_thread_device_override():
+    config = get_config()
+    config.device = "cpu"
+    results: dict[str, torch.device] = {}
+
+    def worker():
+        TorchDevice.set_thread_device("mps")
+        results["worker"] = TorchDevice.choose_torch_device()
+        TorchDevice.set_thread_device(None)
+        results["worker_cleared"] = TorchDevice.choose_torch_device()
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    thread.join()
+
+    # The override only applies to the thread that set it
+    assert results["worker"] == torch.device("mps")
+    assert results["worker_cleared"] == torch.device("cpu")
+    assert TorchDevice.choose_torch_device() == torch.device("cpu")
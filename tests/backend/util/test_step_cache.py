@@ -0,0 +1,65 @@
+import pytest
+import torch
+
+from invokeai.backend.util.step_cache import StepCache
+
+
+def run_steps(step_cache: StepCache, probes: list[torch.Tensor], calls_per_step: int = 1) -> list[list[bool]]:
+    """Runs the step cache over the given steps, and returns whether each call reused the cache."""
+    reused: list[list[bool]] = []
+    for step, probe in enumerate(probes):
+        step_reused: list[bool] = []
+        for call in range(calls_per_step):
+            step_cache.start_call(step)
+            value = step_cache.lookup(probe)
+            step_reused.append(value is not None)
+            if value is None:
+                step_cache.store(probe, (step, call))
+            else:
+                # Each call of a step gets the value cached by the same call.
+                assert value[1] == call
+        reused.append(step_reused)
+    return reused
+
+
+@pytest.mark.parametrize(
+    "interval,expected",
+    [
+        (1, [False, False, False, False, False]),
+        (2, [False, True, False, True, False]),
+        (3, [False, True, True, False, True]),
+    ],
+)
+def test_interval(interval: int, expected: list[bool]):
+    step_cache = StepCache(interval=interval)
+    reused = run_steps(step_cache, [torch.ones(2)] * 5, calls_per_step=2)
+    assert reused == [[r, r] for r in expected]
+    assert step_cache.stats.cached_calls == 2 * sum(expected)
+    assert step_cache.stats.computed_calls == 2 * (len(expected) - sum(expected))
+
+
+def test_threshold_accumulates_distance():
+    step_cache = StepCache(threshold=0.25)
+    # The relative L1 distances between consecutive probes are 0.1, 0.1, 0.1, 0.1.
+    probes = [torch.full((2,), 1.0), torch.full((2,), 1.1), torch.full((2,), 1.21), torch.full((2,), 1.331)]
+    probes.append(probes[-1] * 1.1)
+    reused = run_steps(step_cache, probes)
+    assert reused == [[False], [True], [True], [False], [True]]
+
+
+def test_shape_change_forces_compute():
+    step_cache = StepCache(interval=10)
+    reused = run_steps(step_cache, [torch.ones(2), torch.ones(2), torch.ones(3), torch.ones(3)])
+    assert reused == [[False], [True], [False], [True]]
+
+
+def test_disabled():
+    assert not StepCache().enabled
+    assert StepCache(interval=2).enabled
+    assert StepCache(threshold=0.1).enabled
+
+
+@pytest.mark.parametrize("interval,threshold", [(0, 0.0), (1, -0.1)])
+def test_invalid_arguments(interval: int, threshold: float):
+    with pytest.raises(ValueError):
+        StepCache(interval=interval, threshold=threshold)